@@ -24,5 +24,10 @@ class Settings(BaseSettings):
     FIRST_SUPERUSER_PASSWORD: str = "admin123" # Definitivamente cambia esto en .env
     FIRST_SUPERUSER_FULL_NAME: str = "Administrador Principal del Sistema"
 
+    # Segundos que se reutilizan los indicadores calculados del dashboard (por proceso).
+    # La invalidación al registrar pagos o tasas solo afecta al proceso que atiende la petición: con varios
+    # workers de uvicorn, o tras las tareas programadas, los demás procesos pueden mostrar datos con este atraso.
+    DASHBOARD_CACHE_TTL_SECONDS: int = 60
+
 settings = Settings()
 
@@ -0,0 +1,58 @@
+# backend/benchmarks/bench_annual_financial_summary.py
+"""
+Benchmark del resumen financiero anual (crud.get_student_annual_financial_summary).
+
+Carga N estudiantes (3.000 por defecto) con una mensualidad por mes del año escolar y mide
+el tiempo y el número de sentencias SQL de la primera página y de cada filtro de morosidad.
+
+    python -m backend.benchmarks.bench_annual_financial_summary [--students 3000] [--limit 100]
+"""
+
+import argparse
+from datetime import date
+from dateutil.relativedelta import relativedelta
+
+from .. import crud
+from .common import (
+    make_session, seed_school, seed_monthly_charges, create_charge_concept,
+    count_statements, timed, print_results
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=3000)
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+
+    db = make_session()
+    today = date.today()
+    school_year_start_year = today.year if today.month >= 9 else today.year - 1
+    school_year_start = date(school_year_start_year, 9, 1)
+    months = []
+    month_start = school_year_start
+    while month_start <= today and len(months) < 12:
+        months.append(month_start)
+        month_start += relativedelta(months=1)
+
+    seeded = seed_school(db, args.students)
+    concept = create_charge_concept(db, "Mensualidad Benchmark", 50.0)
+    charges_count = seed_monthly_charges(db, seeded["student_ids"], concept.id, months)
+
+    results = {"estudiantes": len(seeded["student_ids"]), "cargos": charges_count}
+    for label, delinquency_filter in (("todos", None), ("green", "green"), ("orange", "orange"), ("red", "red")):
+        with count_statements(db) as counter, timed(f"resumen [{label}] ms", results):
+            summary = crud.get_student_annual_financial_summary(
+                db, school_year_start_month=9, school_year_start_year=school_year_start_year,
+                current_processing_date=today, delinquency_filter=delinquency_filter,
+                skip=0, limit=args.limit
+            )
+        results[f"resumen [{label}] sentencias SQL"] = counter["n"]
+        results[f"resumen [{label}] total"] = summary["total"]
+
+    print_results(f"Resumen financiero anual ({args.students} estudiantes)", results)
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
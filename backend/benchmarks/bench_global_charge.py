@@ -0,0 +1,49 @@
+# backend/benchmarks/bench_global_charge.py
+"""
+Benchmark del cargo global (crud.run_apply_global_charge_process): duración por fase, sentencias SQL
+y una segunda corrida idempotente (skip_existing) que no debe crear nada.
+
+    python -m backend.benchmarks.bench_global_charge [--students 5000]
+"""
+
+import argparse
+from datetime import date, timedelta
+
+from .. import crud, models, schemas
+from .common import make_session, seed_school, create_charge_concept, count_statements, timed, print_results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=5000)
+    args = parser.parse_args()
+
+    db = make_session()
+    seed_school(db, args.students)
+    concept = create_charge_concept(
+        db, "Seguro Escolar Benchmark", 20.0, frequency=models.ChargeFrequency.UNICO, category=models.ChargeCategory.CARGO_UNICO
+    )
+    today = date.today()
+    charge_details = schemas.GlobalChargeCreate(
+        charge_concept_id=concept.id, issue_date=today, due_date=today + timedelta(days=15), skip_existing=True
+    )
+    results = {}
+
+    with count_statements(db) as counter, timed("primera corrida ms", results):
+        summary = crud.run_apply_global_charge_process(db, charge_details)
+    results["primera corrida sentencias SQL"] = counter["n"]
+    results["cargos creados"] = summary.charges_successfully_created
+    for phase, elapsed_ms in summary.phase_timings_ms.items():
+        results[f"  fase {phase} ms"] = elapsed_ms
+
+    with count_statements(db) as counter, timed("segunda corrida (idempotente) ms", results):
+        summary = crud.run_apply_global_charge_process(db, charge_details)
+    results["segunda corrida sentencias SQL"] = counter["n"]
+    results["segunda corrida cargos creados / omitidos"] = f"{summary.charges_successfully_created} / {summary.duplicates_skipped}"
+
+    print_results(f"Cargo global ({args.students} estudiantes, {db.get_bind().dialect.name})", results)
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
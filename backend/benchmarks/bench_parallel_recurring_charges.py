@@ -0,0 +1,64 @@
+# backend/benchmarks/bench_parallel_recurring_charges.py
+"""
+Benchmark del cálculo de cargos mensuales repartido entre procesos (crud._plan_recurring_charges_parallel).
+
+Carga N estudiantes (40.000 por defecto) y 6 conceptos mensuales, toma un solo snapshot y mide el
+cálculo en memoria con 1, 2 y 4 procesos (y por grado), verificando que todos produzcan las mismas filas.
+La aceleración depende de los núcleos disponibles (se informan en el resultado).
+
+    python -m backend.benchmarks.bench_parallel_recurring_charges [--students 40000] [--workers 1 2 4]
+"""
+
+import argparse
+import os
+from datetime import date
+
+from .. import crud, models
+from .common import make_session, seed_school, create_charge_concept, timed, print_results
+
+
+def _row_keys(plan):
+    return sorted((row["student_id"], row["charge_concept_id"], row["amount_due_ves_at_emission"]) for row in plan["rows"])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=40000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    db = make_session()
+    seed_school(db, args.students)
+    for name, amount, currency in [
+        ("Mensualidad", 50.0, models.Currency.USD), ("Comedor", 800.0, models.Currency.VES),
+        ("Transporte", 15.0, models.Currency.USD), ("Robótica", 8.0, models.Currency.USD),
+        ("Seguro", 300.0, models.Currency.VES), ("Deportes", 5.0, models.Currency.USD),
+    ]:
+        create_charge_concept(db, f"{name} Benchmark", amount, currency=currency)
+    today = date.today()
+    snapshot = crud._load_recurring_charge_snapshot(db, today.year, today.month, today.replace(day=1), today.replace(day=1))
+    db.close()
+
+    results = {"núcleos disponibles": os.cpu_count(), "estudiantes": len(snapshot["students"])}
+    crud.RECURRING_CHARGE_MIN_STUDENTS_PER_WORKER = 1 # Para medir exactamente los procesos pedidos
+    baseline_ms = None
+    baseline_rows = None
+    for workers in args.workers:
+        label = f"{workers} proceso(s) ms"
+        with timed(label, results):
+            plan = crud._plan_recurring_charges_parallel(snapshot, workers)
+        baseline_ms = baseline_ms or results[label]
+        baseline_rows = baseline_rows or _row_keys(plan)
+        results[f"{workers} proceso(s) aceleración"] = f"{baseline_ms / results[label]:.2f}x"
+        assert _row_keys(plan) == baseline_rows, "El cálculo repartido no coincide con el secuencial"
+
+    with timed(f"{max(args.workers)} procesos por grado ms", results):
+        plan = crud._plan_recurring_charges_parallel(snapshot, max(args.workers), shard_by="grade_level")
+    assert _row_keys(plan) == baseline_rows, "El reparto por grado no coincide con el secuencial"
+    results["cargos calculados"] = len(plan["rows"])
+
+    print_results(f"Cálculo de cargos en paralelo ({args.students} estudiantes x 6 conceptos)", results)
+
+
+if __name__ == "__main__":
+    main()
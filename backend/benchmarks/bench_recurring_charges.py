@@ -0,0 +1,61 @@
+# backend/benchmarks/bench_recurring_charges.py
+"""
+Benchmark de la generación mensual de cargos recurrentes (crud.run_generate_recurring_charges_process).
+
+Carga N estudiantes (3.000 por defecto) y 3 conceptos mensuales y mide la corrida por lotes
+frente a una muestra del camino anterior (create_applied_charge por estudiante y concepto,
+con commit por cargo), extrapolada al total.
+
+    python -m backend.benchmarks.bench_recurring_charges [--students 3000] [--legacy-sample 100]
+"""
+
+import argparse
+from datetime import date
+
+from .. import crud, models, schemas
+from .common import make_session, seed_school, create_charge_concept, count_statements, timed, print_results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=3000)
+    parser.add_argument("--legacy-sample", type=int, default=100, help="Estudiantes medidos con el camino anterior.")
+    args = parser.parse_args()
+
+    db = make_session()
+    seeded = seed_school(db, args.students)
+    concepts = [
+        create_charge_concept(db, "Mensualidad Benchmark", 50.0),
+        create_charge_concept(db, "Comedor Benchmark", 800.0, currency=models.Currency.VES),
+        create_charge_concept(db, "Transporte Benchmark", 15.0, category=models.ChargeCategory.SERVICIO_RECURRENTE),
+    ]
+    today = date.today()
+    results = {"estudiantes": len(seeded["student_ids"]), "conceptos": len(concepts)}
+
+    # Camino anterior: una llamada a create_applied_charge (con su commit) por estudiante y concepto
+    legacy_students = db.query(models.Student).order_by(models.Student.id).limit(args.legacy_sample).all()
+    with timed("camino anterior (muestra) ms", results):
+        for student in legacy_students:
+            for concept in concepts:
+                crud.create_applied_charge(db, schemas.AppliedChargeClientCreate(
+                    student_id=student.id, charge_concept_id=concept.id, description="muestra",
+                    issue_date=today.replace(day=1), due_date=today.replace(day=1)
+                ), student_model=student, charge_concept_model=concept)
+    results["camino anterior extrapolado s"] = round(
+        results["camino anterior (muestra) ms"] / max(len(legacy_students), 1) * len(seeded["student_ids"]) / 1000, 1
+    )
+
+    with count_statements(db) as counter, timed("corrida por lotes ms", results):
+        summary = crud.run_generate_recurring_charges_process(db, target_year=today.year, target_month=today.month)
+    results["corrida por lotes sentencias SQL"] = counter["n"]
+    results["cargos creados"] = summary["charges_created"]
+    results["duplicados omitidos (muestra previa)"] = sum(
+        int(warning.split(" ")[0]) for warning in summary["warnings_and_omissions"] if "duplicado" in warning
+    )
+
+    print_results(f"Cargos recurrentes ({args.students} estudiantes x {len(concepts)} conceptos, {db.get_bind().dialect.name})", results)
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# backend/benchmarks/bench_typeahead.py
+"""
+Benchmark del autocompletado de representantes y estudiantes (objetivo: p95 < 20 ms) frente a la
+búsqueda completa de GET /representatives/ (que calcula saldos antes de paginar).
+
+    python -m backend.benchmarks.bench_typeahead [--people 50000] [--repetitions 50]
+
+Para medir los índices *_prefix use PostgreSQL con BENCH_DATABASE_URL.
+"""
+
+import argparse
+
+from sqlalchemy import text
+
+from .. import crud
+from .common import make_session, seed_school, latency_percentiles_ms, print_results
+
+TYPEAHEAD_TERMS = ["apellido4", "rep12", "10001", "v1000", "est33", "apellido123 rep"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--people", type=int, default=50000)
+    parser.add_argument("--repetitions", type=int, default=50)
+    args = parser.parse_args()
+
+    db = make_session()
+    seed_school(db, students_count=(args.people * 2) // 3)
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("ANALYZE"))
+
+    results = {}
+    for term in TYPEAHEAD_TERMS:
+        results[f"typeahead representantes '{term}' p50/p95 ms"] = latency_percentiles_ms(
+            lambda: crud.typeahead_representatives(db, term=term, limit=10), args.repetitions
+        )
+        results[f"typeahead estudiantes '{term}' p50/p95 ms"] = latency_percentiles_ms(
+            lambda: crud.typeahead_students(db, term=term, limit=10), args.repetitions
+        )
+    results["GET /representatives/ (search) p50/p95 ms"] = latency_percentiles_ms(
+        lambda: crud.get_representatives(db, search="Apellido4", limit=5), max(args.repetitions // 10, 3)
+    )
+
+    print_results(f"Autocompletado ({args.people} personas, {db.get_bind().dialect.name})", results)
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
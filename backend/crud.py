@@ -1,16 +1,25 @@
 # backend/crud.py
 
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import or_, and_, UniqueConstraint, func as sql_func, extract
+from sqlalchemy.orm import Session, joinedload, aliased
+from sqlalchemy import or_, and_, UniqueConstraint, func as sql_func, extract, update, insert, delete, case, cast, literal, Numeric, String, select, union_all, true
 from sqlalchemy.exc import IntegrityError
-from typing import Optional, List, Dict, Any, Literal, Tuple
+from typing import Optional, List, Dict, Any, Literal, Tuple, Callable
 from datetime import date, timedelta, datetime
 from dateutil.relativedelta import relativedelta
+from concurrent.futures import ProcessPoolExecutor
 
 import pytz
 import json
 import calendar
+import csv
+import io
+import hashlib
+import re
+import unicodedata
+import threading
+import time
+from pydantic import ValidationError
 from .app_config import settings
 
 from . import models, schemas
@@ -115,6 +124,34 @@ def update_user_details(
 def get_representative(db: Session, representative_id: int) -> Optional[models.Representative]:
     return db.query(models.Representative).filter(models.Representative.id == representative_id).first()
 
+# Tope de IDs aceptados por las consultas de búsqueda en lote
+MAX_BATCH_LOOKUP_IDS = 500
+
+
+def _build_batch_lookup_result(requested_ids: List[int], found_objects: List[Any]) -> Dict[str, Any]:
+    """Ordena los resultados según los IDs pedidos (sin duplicados) e informa los que no existen."""
+    unique_ids = list(dict.fromkeys(requested_ids))
+    found_by_id = {obj.id: obj for obj in found_objects}
+    return {
+        "items": [found_by_id[obj_id] for obj_id in unique_ids if obj_id in found_by_id],
+        "missing_ids": [obj_id for obj_id in unique_ids if obj_id not in found_by_id]
+    }
+
+
+def _validate_batch_lookup_ids(ids: List[int]) -> List[int]:
+    unique_ids = list(dict.fromkeys(ids))
+    if not unique_ids:
+        raise ValueError("Debe indicar al menos un ID.")
+    if len(unique_ids) > MAX_BATCH_LOOKUP_IDS:
+        raise ValueError(f"Se pueden consultar como máximo {MAX_BATCH_LOOKUP_IDS} IDs por solicitud.")
+    return unique_ids
+
+
+def get_representatives_by_ids(db: Session, ids: List[int]) -> Dict[str, Any]:
+    unique_ids = _validate_batch_lookup_ids(ids)
+    representatives = db.query(models.Representative).filter(models.Representative.id.in_(unique_ids)).all()
+    return _build_batch_lookup_result(unique_ids, representatives)
+
 def get_representative_by_cedula(db: Session, cedula: str) -> Optional[models.Representative]:
     return db.query(models.Representative).filter(models.Representative.cedula == cedula).first()
 
@@ -371,6 +408,14 @@ def get_student(db: Session, student_id: int) -> Optional[models.Student]:
     return db.query(models.Student).options(joinedload(models.Student.representative),
                                             joinedload(models.Student.grade_level_assigned)).filter(models.Student.id == student_id).first()
 
+def get_students_by_ids(db: Session, ids: List[int]) -> Dict[str, Any]:
+    unique_ids = _validate_batch_lookup_ids(ids)
+    students = db.query(models.Student).options(
+        joinedload(models.Student.representative),
+        joinedload(models.Student.grade_level_assigned)
+    ).filter(models.Student.id.in_(unique_ids)).all()
+    return _build_batch_lookup_result(unique_ids, students)
+
 def get_student_by_cedula(db: Session, cedula: str) -> Optional[models.Student]:
     return db.query(models.Student).options(joinedload(models.Student.representative),
                                             joinedload(models.Student.grade_level_assigned)).filter(models.Student.cedula == cedula).first()
@@ -386,7 +431,8 @@ def get_students(
     representative_id: Optional[int] = None,
     grade_level_id: Optional[int] = None,  
     grade_level_name: Optional[str] = None,
-    is_active: Optional[bool] = True
+    is_active: Optional[bool] = True,
+    delinquency_status: Optional[Literal["green", "orange", "red"]] = None
 ) -> Dict[str, any]:
     
     query = db.query(models.Student).options(
@@ -407,6 +453,14 @@ def get_students(
         
     if is_active is not None:
         query = query.filter(models.Student.is_active == is_active)
+
+    if delinquency_status:
+        # Estado precalculado (tabla student_delinquency); sin registro se considera al día
+        query = query.outerjoin(models.StudentDelinquency, models.StudentDelinquency.student_id == models.Student.id)
+        if delinquency_status == "green":
+            query = query.filter(or_(models.StudentDelinquency.student_id.is_(None), models.StudentDelinquency.status == "green"))
+        else:
+            query = query.filter(models.StudentDelinquency.status == delinquency_status)
         
     if search:
         search_term = f"%{search}%"
@@ -529,6 +583,784 @@ def activate_student(db: Session, student_id: int) -> Optional[models.Student]:
     return get_student(db, student_id=db_student.id)
 
 
+# --- Promoción de grado de fin de año escolar ---
+
+def _build_grade_promotion_plan(db: Session, repeating_student_ids: List[int]) -> Dict[str, Any]:
+    """
+    Calcula el mapeo grado actual -> grado siguiente (por order_index entre los grados activos).
+    Los estudiantes del último grado egresan. Solo lectura: una consulta de grados y un conteo agrupado.
+    """
+    grade_levels = db.query(models.GradeLevel).filter(models.GradeLevel.is_active == True)\
+        .order_by(models.GradeLevel.order_index.asc(), models.GradeLevel.id.asc()).all()
+    if not grade_levels:
+        raise ValueError("No hay grados activos para realizar la promoción.")
+
+    repeating_student_ids = sorted({int(sid) for sid in repeating_student_ids or []})
+    students_query = db.query(models.Student.grade_level_id, sql_func.count(models.Student.id))\
+        .filter(models.Student.is_active == True)
+    if repeating_student_ids:
+        students_query = students_query.filter(models.Student.id.notin_(repeating_student_ids))
+    counts_by_grade = dict(students_query.group_by(models.Student.grade_level_id).all())
+
+    steps = []
+    for index, grade_level in enumerate(grade_levels):
+        next_grade_level = grade_levels[index + 1] if index + 1 < len(grade_levels) else None
+        steps.append({
+            "from_grade_level_id": grade_level.id,
+            "from_grade_level_name": grade_level.name,
+            "to_grade_level_id": next_grade_level.id if next_grade_level else None,
+            "to_grade_level_name": next_grade_level.name if next_grade_level else None,
+            "action": "promote" if next_grade_level else "graduate",
+            "students_count": counts_by_grade.get(grade_level.id, 0),
+        })
+
+    active_grade_ids = {gl.id for gl in grade_levels}
+    repeating_count = 0
+    if repeating_student_ids:
+        repeating_count = db.query(sql_func.count(models.Student.id)).filter(
+            models.Student.id.in_(repeating_student_ids), models.Student.is_active == True
+        ).scalar() or 0
+
+    return {
+        "steps": steps,
+        "repeating_student_ids": repeating_student_ids,
+        "promoted_count": sum(s["students_count"] for s in steps if s["action"] == "promote"),
+        "graduated_count": sum(s["students_count"] for s in steps if s["action"] == "graduate"),
+        "repeating_count": repeating_count,
+        "unmapped_students_count": sum(count for gl_id, count in counts_by_grade.items() if gl_id not in active_grade_ids),
+    }
+
+
+def _grade_promotion_run_to_dict(run: models.GradePromotionRun, already_applied: bool) -> Dict[str, Any]:
+    details = json.loads(run.details_json) if run.details_json else {}
+    return {
+        "id": run.id,
+        "school_year_label": run.school_year_label,
+        "promoted_count": run.promoted_count,
+        "graduated_count": run.graduated_count,
+        "repeating_count": run.repeating_count,
+        "steps": details.get("steps", []),
+        "repeating_student_ids": details.get("repeating_student_ids", []),
+        "notes": run.notes,
+        "executed_by_user_id": run.executed_by_user_id,
+        "executed_at": run.executed_at,
+        "already_applied": already_applied,
+    }
+
+
+def get_grade_promotion_run_by_label(db: Session, school_year_label: str) -> Optional[models.GradePromotionRun]:
+    return db.query(models.GradePromotionRun).filter(models.GradePromotionRun.school_year_label == school_year_label.strip()).first()
+
+
+def get_grade_promotion_runs(db: Session) -> List[Dict[str, Any]]:
+    runs = db.query(models.GradePromotionRun).order_by(models.GradePromotionRun.executed_at.desc()).all()
+    return [_grade_promotion_run_to_dict(run, already_applied=True) for run in runs]
+
+
+def preview_grade_promotion(db: Session, school_year_label: str, repeating_student_ids: List[int]) -> Dict[str, Any]:
+    plan = _build_grade_promotion_plan(db, repeating_student_ids)
+    plan["school_year_label"] = school_year_label.strip()
+    plan["already_applied"] = get_grade_promotion_run_by_label(db, school_year_label) is not None
+    return plan
+
+
+def apply_grade_promotion(
+    db: Session,
+    promotion_in: schemas.GradePromotionApplyRequest,
+    user_id: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Aplica la promoción con dos UPDATE masivos: primero desactiva a los egresados del último grado y luego
+    mueve al resto con un CASE grado_actual -> grado_siguiente (una sola sentencia, para no promover dos veces).
+    Idempotente por año escolar: si ya existe la corrida se devuelve sin volver a aplicar.
+    """
+    school_year_label = promotion_in.school_year_label.strip()
+    existing_run = get_grade_promotion_run_by_label(db, school_year_label)
+    if existing_run:
+        return _grade_promotion_run_to_dict(existing_run, already_applied=True)
+
+    plan = _build_grade_promotion_plan(db, promotion_in.repeating_student_ids)
+    repeating_student_ids = plan["repeating_student_ids"]
+    promotion_mapping = {s["from_grade_level_id"]: s["to_grade_level_id"] for s in plan["steps"] if s["action"] == "promote"}
+    graduating_grade_level_id = plan["steps"][-1]["from_grade_level_id"]
+
+    Student = models.Student
+    base_filters = [Student.is_active == True]
+    if repeating_student_ids:
+        base_filters.append(Student.id.notin_(repeating_student_ids))
+    try:
+        graduated = db.execute(
+            update(Student)
+            .where(*base_filters, Student.grade_level_id == graduating_grade_level_id)
+            .values(is_active=False)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        promoted = 0
+        if promotion_mapping:
+            promoted = db.execute(
+                update(Student)
+                .where(*base_filters, Student.grade_level_id.in_(list(promotion_mapping.keys())))
+                .values(grade_level_id=case(promotion_mapping, value=Student.grade_level_id))
+                .execution_options(synchronize_session=False)
+            ).rowcount
+
+        run = models.GradePromotionRun(
+            school_year_label=school_year_label,
+            promoted_count=promoted,
+            graduated_count=graduated,
+            repeating_count=plan["repeating_count"],
+            details_json=json.dumps({"steps": plan["steps"], "repeating_student_ids": repeating_student_ids}),
+            notes=promotion_in.notes,
+            executed_by_user_id=user_id
+        )
+        db.add(run)
+        db.commit()
+    except IntegrityError:
+        # Otra corrida del mismo año escolar se registró en paralelo: se descarta esta
+        db.rollback()
+        return _grade_promotion_run_to_dict(get_grade_promotion_run_by_label(db, school_year_label), already_applied=True)
+
+    db.refresh(run)
+    return _grade_promotion_run_to_dict(run, already_applied=False)
+
+
+# --- Importación masiva de representantes y estudiantes ---
+
+BULK_IMPORT_INSERT_BATCH_SIZE = 500
+BULK_IMPORT_REPRESENTATIVE_PREFIX = "rep_"
+BULK_IMPORT_STUDENT_PREFIX = "student_"
+BULK_IMPORT_STUDENT_FIELDS = [f for f in schemas.StudentBase.model_fields if f != "photo_url"]
+
+
+def _normalize_bulk_import_value(value: Any) -> Any:
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)  # Excel guarda las cédulas como números
+    value = str(value).strip()
+    if not value:
+        return None
+    try:  # Fechas en formato venezolano DD/MM/AAAA
+        return datetime.strptime(value, "%d/%m/%Y").date()
+    except ValueError:
+        return value
+
+
+def _read_bulk_import_rows(filename: str, content: bytes) -> List[Dict[str, Any]]:
+    """Lee un CSV (UTF-8, separador ',' o ';') o XLSX y devuelve una lista de dicts con encabezados en minúsculas."""
+    extension = (filename or "").lower().rsplit(".", 1)[-1]
+    if extension == "csv":
+        try:
+            text = content.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            text = content.decode("latin-1")
+        first_line = text.split("\n", 1)[0]
+        delimiter = ";" if first_line.count(";") > first_line.count(",") else ","
+        raw_rows = list(csv.reader(io.StringIO(text), delimiter=delimiter))
+    elif extension == "xlsx":
+        try:
+            import openpyxl
+        except ImportError:
+            raise ValueError("La importación de archivos XLSX requiere el paquete 'openpyxl'. Use un archivo CSV o instale openpyxl.")
+        workbook = openpyxl.load_workbook(io.BytesIO(content), read_only=True, data_only=True)
+        raw_rows = [list(row) for row in workbook.active.iter_rows(values_only=True)]
+        workbook.close()
+    else:
+        raise ValueError("Formato de archivo no soportado. Use CSV o XLSX.")
+
+    if not raw_rows:
+        raise ValueError("El archivo está vacío.")
+    headers = [str(h).strip().lower() if h is not None else "" for h in raw_rows[0]]
+    if "rep_identification_number" not in headers:
+        raise ValueError("El archivo debe incluir al menos la columna 'rep_identification_number'.")
+
+    rows = []
+    for raw_row in raw_rows[1:]:
+        row = {
+            header: _normalize_bulk_import_value(raw_row[index] if index < len(raw_row) else None)
+            for index, header in enumerate(headers) if header
+        }
+        rows.append(row)  # Se conservan las filas vacías para que el número de fila coincida con el archivo
+    return rows
+
+
+def _format_validation_error(error: ValidationError, prefix: str) -> str:
+    return "; ".join(
+        f"{prefix}{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in error.errors()
+    )
+
+
+def bulk_import_representatives_and_students(
+    db: Session,
+    filename: str,
+    content: bytes,
+    skip_invalid_rows: bool = False
+) -> Dict[str, Any]:
+    """
+    Importa familias desde un CSV/XLSX con una fila por estudiante. Columnas:
+    - rep_*: campos de RepresentativeCreate (rep_identification_type, rep_identification_number, rep_first_name,
+      rep_last_name, rep_phone_main, rep_email, ...). Se repiten en cada fila de la misma familia; si el
+      representante ya existe (misma cédula) se le asignan los estudiantes.
+    - student_*: campos del estudiante (student_first_name, student_last_name, student_cedula, student_birth_date, ...).
+      Una fila sin student_first_name solo registra al representante.
+    - grade_level: nombre (o ID) del grado del estudiante.
+
+    Todas las filas se validan antes de escribir. Las cédulas y correos existentes se resuelven con
+    una consulta IN cada uno y la inserción se hace por lotes en una sola transacción.
+    Si hay errores y skip_invalid_rows es False no se guarda nada.
+    """
+    rows = _read_bulk_import_rows(filename, content)
+    errors: List[Dict[str, Any]] = []
+    representatives_by_key: Dict[str, Dict[str, Any]] = {}
+    students_to_create: List[Dict[str, Any]] = []
+    student_cedula_rows: Dict[str, int] = {}
+
+    grade_levels = db.query(models.GradeLevel.id, models.GradeLevel.name).all()
+    grade_level_ids_by_name = {name.strip().lower(): gl_id for gl_id, name in grade_levels}
+    grade_level_ids = {gl_id for gl_id, _ in grade_levels}
+
+    # 1. Validación fila por fila (sin tocar la base de datos)
+    for row_number, row in enumerate(rows, start=2):
+        if not any(value is not None for value in row.values()):
+            continue
+        row_errors = []
+        representative_data = {
+            key[len(BULK_IMPORT_REPRESENTATIVE_PREFIX):]: value for key, value in row.items()
+            if key.startswith(BULK_IMPORT_REPRESENTATIVE_PREFIX) and value is not None
+        }
+        if isinstance(representative_data.get("identification_type"), str):
+            representative_data["identification_type"] = representative_data["identification_type"].upper()
+        representative_key = None
+        try:
+            representative_in = schemas.RepresentativeCreate(**representative_data)
+            representative_key = f"{representative_in.identification_type.upper()}{representative_in.identification_number}"
+            if representative_key not in representatives_by_key:
+                representatives_by_key[representative_key] = {"data": representative_in, "row_number": row_number}
+            elif representatives_by_key[representative_key]["data"].email != representative_in.email:
+                row_errors.append(f"El representante {representative_key} aparece con otro correo en la fila {representatives_by_key[representative_key]['row_number']}.")
+        except ValidationError as e:
+            row_errors.append(_format_validation_error(e, BULK_IMPORT_REPRESENTATIVE_PREFIX))
+
+        if row.get(f"{BULK_IMPORT_STUDENT_PREFIX}first_name") is not None:
+            student_data = {
+                field: row.get(f"{BULK_IMPORT_STUDENT_PREFIX}{field}") for field in BULK_IMPORT_STUDENT_FIELDS
+                if row.get(f"{BULK_IMPORT_STUDENT_PREFIX}{field}") is not None
+            }
+            grade_level_value = row.get("grade_level")
+            grade_level_id = None
+            if grade_level_value is None:
+                row_errors.append("grade_level: el grado del estudiante es obligatorio.")
+            elif str(grade_level_value).lower() in grade_level_ids_by_name:
+                grade_level_id = grade_level_ids_by_name[str(grade_level_value).lower()]
+            elif str(grade_level_value).isdigit() and int(grade_level_value) in grade_level_ids:
+                grade_level_id = int(grade_level_value)
+            else:
+                row_errors.append(f"grade_level: el grado '{grade_level_value}' no existe.")
+            try:
+                student_in = schemas.StudentBase(**student_data)
+                if student_in.cedula:
+                    if student_in.cedula in student_cedula_rows:
+                        row_errors.append(f"{BULK_IMPORT_STUDENT_PREFIX}cedula: '{student_in.cedula}' repetida (fila {student_cedula_rows[student_in.cedula]}).")
+                    else:
+                        student_cedula_rows[student_in.cedula] = row_number
+                if not row_errors:
+                    students_to_create.append({
+                        "row_number": row_number, "representative_key": representative_key,
+                        "data": student_in, "grade_level_id": grade_level_id
+                    })
+            except ValidationError as e:
+                row_errors.append(_format_validation_error(e, BULK_IMPORT_STUDENT_PREFIX))
+
+        if row_errors:
+            errors.append({"row_number": row_number, "message": " | ".join(row_errors)})
+
+    # 2. Resolución de existentes con una consulta IN por clave
+    existing_representative_ids = {}
+    new_emails = {}
+    if representatives_by_key:
+        existing_representative_ids = dict(
+            db.query(models.Representative.cedula, models.Representative.id)
+            .filter(models.Representative.cedula.in_(list(representatives_by_key.keys()))).all()
+        )
+        new_emails = {
+            str(entry["data"].email).lower(): key for key, entry in representatives_by_key.items()
+            if key not in existing_representative_ids
+        }
+    if new_emails:
+        taken_emails = {
+            email.lower() for (email,) in db.query(models.Representative.email)
+            .filter(sql_func.lower(models.Representative.email).in_(list(new_emails.keys()))).all()
+        }
+        for email in taken_emails:
+            key = new_emails[email]
+            errors.append({"row_number": representatives_by_key[key]["row_number"], "message": f"{BULK_IMPORT_REPRESENTATIVE_PREFIX}email: el correo '{email}' ya está registrado."})
+            representatives_by_key.pop(key)
+    if student_cedula_rows:
+        for (cedula,) in db.query(models.Student.cedula).filter(models.Student.cedula.in_(list(student_cedula_rows.keys()))).all():
+            errors.append({"row_number": student_cedula_rows[cedula], "message": f"{BULK_IMPORT_STUDENT_PREFIX}cedula: ya existe un estudiante con la cédula '{cedula}'."})
+
+    known_representative_keys = set(representatives_by_key) | set(existing_representative_ids)
+    for student in students_to_create:
+        if student["representative_key"] not in known_representative_keys:
+            errors.append({"row_number": student["row_number"], "message": f"El representante {student['representative_key']} fue rechazado; el estudiante no se puede registrar."})
+
+    errors.sort(key=lambda e: e["row_number"])
+    error_rows = {e["row_number"] for e in errors}
+    summary = {
+        "total_rows": sum(1 for row in rows if any(value is not None for value in row.values())),
+        "representatives_created": 0,
+        "representatives_matched": 0,
+        "students_created": 0,
+        "errors": errors,
+        "committed": False,
+    }
+    if errors and not skip_invalid_rows:
+        summary["message"] = f"Importación cancelada: {len(errors)} fila(s) con errores. No se guardó ningún registro."
+        return summary
+
+    # 3. Inserción por lotes en una sola transacción
+    representative_rows = [
+        {
+            **entry["data"].model_dump(exclude={"identification_type", "identification_number"}),
+            "cedula": key
+        }
+        for key, entry in representatives_by_key.items()
+        if key not in existing_representative_ids
+    ]
+    try:
+        representative_ids = dict(existing_representative_ids)
+        for start in range(0, len(representative_rows), BULK_IMPORT_INSERT_BATCH_SIZE):
+            result = db.execute(
+                insert(models.Representative).returning(models.Representative.cedula, models.Representative.id),
+                representative_rows[start:start + BULK_IMPORT_INSERT_BATCH_SIZE]
+            )
+            representative_ids.update({cedula: rep_id for cedula, rep_id in result.all()})
+
+        student_rows = [
+            {
+                **student["data"].model_dump(exclude_none=True),
+                "representative_id": representative_ids[student["representative_key"]],
+                "grade_level_id": student["grade_level_id"],
+                "is_active": True
+            }
+            for student in students_to_create
+            if student["row_number"] not in error_rows
+        ]
+        for start in range(0, len(student_rows), BULK_IMPORT_INSERT_BATCH_SIZE):
+            db.execute(insert(models.Student), student_rows[start:start + BULK_IMPORT_INSERT_BATCH_SIZE])
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        print(f"IntegrityError en la importación masiva: {e}")
+        raise ValueError("Conflicto de datos únicos al guardar la importación (cédula, correo o RIF duplicado). No se guardó ningún registro.")
+
+    summary.update({
+        "representatives_created": len(representative_rows),
+        "representatives_matched": len([k for k in representatives_by_key if k in existing_representative_ids]),
+        "students_created": len(student_rows),
+        "committed": True,
+        "message": f"Importación completada: {len(representative_rows)} representantes y {len(student_rows)} estudiantes creados."
+    })
+    return summary
+
+
+
+# --- Detección y fusión de representantes duplicados ---
+
+MAX_DUPLICATE_BLOCK_SIZE = 25 # Bloques más grandes (ej. teléfono genérico) no se comparan
+DUPLICATE_MATCH_WEIGHTS = {"cedula": 0.6, "email": 0.4, "name": 0.3, "phone": 0.25}
+REPRESENTATIVE_MERGE_FILL_FIELDS = ["rif", "phone_secondary", "address", "sex", "profession", "workplace", "photo_url"]
+
+
+def _normalize_cedula_digits(cedula: Optional[str]) -> Optional[str]:
+    digits = re.sub(r"\D", "", cedula or "").lstrip("0")
+    return digits if len(digits) >= 5 else None
+
+
+def _normalize_phone_digits(phone: Optional[str]) -> Optional[str]:
+    # Últimos 10 dígitos: "0412-1234567" y "+58 412 1234567" quedan iguales
+    digits = re.sub(r"\D", "", phone or "")
+    return digits[-10:] if len(digits) >= 7 else None
+
+
+def _spanish_phonetic_key(value: Optional[str]) -> Optional[str]:
+    """
+    Clave fonética simple para nombres en español (primera palabra): sin acentos,
+    b/v, s/z/c suave, k/c/qu, y/ll, h muda y letras repetidas equivalen.
+    """
+    text = unicodedata.normalize("NFKD", (value or "").lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    words = re.findall(r"[a-z]+", text)
+    if not words:
+        return None
+    word = words[0]
+    for pattern, replacement in [
+        (r"ll", "y"), (r"qu", "k"), (r"gu(?=[ei])", "g"), (r"c(?=[ei])", "s"), (r"ch", "x"),
+        (r"c", "k"), (r"z", "s"), (r"v", "b"), (r"w", "u"), (r"h", ""), (r"y$", "i"), (r"(.)\1+", r"\1"),
+    ]:
+        word = re.sub(pattern, replacement, word)
+    return word or None
+
+
+def _representative_blocking_keys(row) -> List[str]:
+    keys = []
+    cedula_digits = _normalize_cedula_digits(row.cedula)
+    if cedula_digits:
+        keys.append(f"cedula:{cedula_digits}")
+    first_key, last_key = _spanish_phonetic_key(row.first_name), _spanish_phonetic_key(row.last_name)
+    if first_key and last_key:
+        keys.append(f"name:{first_key}|{last_key}")
+    for phone in {_normalize_phone_digits(row.phone_main), _normalize_phone_digits(row.phone_secondary)}:
+        if phone:
+            keys.append(f"phone:{phone}")
+    if row.email:
+        keys.append(f"email:{row.email.strip().lower()}")
+    return keys
+
+
+def find_duplicate_representatives(
+    db: Session,
+    min_score: float = 0.5,
+    limit: int = 100
+) -> Dict[str, Any]:
+    """
+    Busca posibles representantes duplicados sin comparar todos contra todos:
+    cada representante se ubica en bloques por cédula normalizada (solo dígitos), clave fonética
+    de nombre + apellido, teléfono y correo, y solo se comparan pares que comparten algún bloque.
+    El puntaje suma los pesos de las claves coincidentes (máximo 1).
+    """
+    Representative = models.Representative
+    rows = db.query(
+        Representative.id, Representative.first_name, Representative.last_name, Representative.cedula,
+        Representative.email, Representative.phone_main, Representative.phone_secondary
+    ).all()
+
+    blocks: Dict[str, List[int]] = {}
+    for row in rows:
+        for key in _representative_blocking_keys(row):
+            blocks.setdefault(key, []).append(row.id)
+
+    matched_keys_by_pair: Dict[Tuple[int, int], set] = {}
+    skipped_blocks = 0
+    for key, block_ids in blocks.items():
+        if len(block_ids) < 2:
+            continue
+        if len(block_ids) > MAX_DUPLICATE_BLOCK_SIZE:
+            skipped_blocks += 1
+            continue
+        key_type = key.split(":", 1)[0]
+        block_ids = sorted(set(block_ids))
+        for index, first_id in enumerate(block_ids):
+            for second_id in block_ids[index + 1:]:
+                matched_keys_by_pair.setdefault((first_id, second_id), set()).add(key_type)
+
+    candidates = []
+    for pair, matched_on in matched_keys_by_pair.items():
+        score = round(min(1.0, sum(DUPLICATE_MATCH_WEIGHTS[key_type] for key_type in matched_on)), 2)
+        if score >= min_score:
+            candidates.append((score, pair, sorted(matched_on)))
+    candidates.sort(key=lambda item: (-item[0], item[1]))
+    page = candidates[:limit]
+
+    rows_by_id = {row.id: row for row in rows}
+    items = [
+        {
+            "score": score,
+            "matched_on": matched_on,
+            "representatives": [
+                {
+                    "id": rows_by_id[rep_id].id,
+                    "first_name": rows_by_id[rep_id].first_name,
+                    "last_name": rows_by_id[rep_id].last_name,
+                    "cedula": rows_by_id[rep_id].cedula,
+                    "email": rows_by_id[rep_id].email,
+                    "phone_main": rows_by_id[rep_id].phone_main,
+                }
+                for rep_id in pair
+            ]
+        }
+        for score, pair, matched_on in page
+    ]
+    return {
+        "representatives_scanned": len(rows),
+        "pairs_compared": len(matched_keys_by_pair),
+        "skipped_large_blocks": skipped_blocks,
+        "total": len(candidates),
+        "items": items
+    }
+
+
+def merge_representatives(
+    db: Session,
+    target_representative_id: int,
+    source_representative_ids: List[int]
+) -> Dict[str, Any]:
+    """
+    Fusiona representantes duplicados en 'target_representative_id' en una sola transacción:
+    mueve estudiantes, pagos, facturas, notas de crédito y cortes de saldo, suma el saldo a favor,
+    completa los datos vacíos del destino y elimina los registros de origen.
+    Los snapshots fiscales de facturas y notas de crédito no se modifican.
+    """
+    source_ids = sorted(set(source_representative_ids))
+    if not source_ids:
+        raise ValueError("Debe indicar al menos un representante a fusionar.")
+    if target_representative_id in source_ids:
+        raise ValueError("El representante destino no puede estar entre los representantes a fusionar.")
+
+    Representative = models.Representative
+    target = db.query(Representative).filter(Representative.id == target_representative_id).with_for_update().first()
+    if not target:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Representante destino con ID {target_representative_id} no encontrado.")
+    sources = db.query(Representative).filter(Representative.id.in_(source_ids)).order_by(Representative.id).with_for_update().all()
+    missing_ids = sorted(set(source_ids) - {source.id for source in sources})
+    if missing_ids:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Representantes no encontrados: {missing_ids}.")
+
+    fill_values = {}
+    for field in REPRESENTATIVE_MERGE_FILL_FIELDS:
+        if getattr(target, field):
+            continue
+        value = next((getattr(source, field) for source in sources if getattr(source, field)), None)
+        if value:
+            fill_values[field] = value
+    credit_transferred = round(sum(source.available_credit_ves or 0.0 for source in sources), 2)
+
+    try:
+        moved_counts = {}
+        for label, model in [("students", models.Student), ("payments", models.Payment),
+                             ("invoices", models.Invoice), ("credit_notes", models.CreditNote)]:
+            result = db.execute(
+                update(model).where(model.representative_id.in_(source_ids))
+                .values(representative_id=target.id)
+                .execution_options(synchronize_session=False)
+            )
+            moved_counts[label] = result.rowcount
+
+        # Cortes de saldo: se suman a los del destino en la misma fecha o se reasignan
+        Snapshot = models.RepresentativeBalanceSnapshot
+        snapshot_fields = ["charges_billed_ves", "allocated_to_charges_ves", "balance_due_ves",
+                           "payments_received_ves", "unallocated_credit_ves"]
+        target_snapshots = {s.snapshot_date: s for s in db.query(Snapshot).filter(Snapshot.representative_id == target.id)}
+        for source_snapshot in db.query(Snapshot).filter(Snapshot.representative_id.in_(source_ids)).order_by(Snapshot.id):
+            existing = target_snapshots.get(source_snapshot.snapshot_date)
+            if existing:
+                for field in snapshot_fields:
+                    setattr(existing, field, round((getattr(existing, field) or 0.0) + (getattr(source_snapshot, field) or 0.0), 2))
+                db.delete(source_snapshot)
+            else:
+                source_snapshot.representative_id = target.id
+                target_snapshots[source_snapshot.snapshot_date] = source_snapshot
+        db.flush()
+
+        for source in sources:
+            db.expunge(source)
+        db.execute(delete(Representative).where(Representative.id.in_(source_ids)).execution_options(synchronize_session=False))
+
+        # Campos únicos (RIF) solo se copian después de eliminar los registros de origen
+        for field, value in fill_values.items():
+            setattr(target, field, value)
+        target.available_credit_ves = round((target.available_credit_ves or 0.0) + credit_transferred, 2)
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        print(f"IntegrityError al fusionar representantes: {e}")
+        raise ValueError("Conflicto de datos únicos al fusionar los representantes. No se realizó ningún cambio.")
+    invalidate_dashboard_cache()
+
+    return {
+        "message": f"{len(source_ids)} representante(s) fusionado(s) en el representante ID {target.id}.",
+        "target_representative_id": target.id,
+        "merged_representative_ids": source_ids,
+        "students_moved": moved_counts["students"],
+        "payments_moved": moved_counts["payments"],
+        "invoices_moved": moved_counts["invoices"],
+        "credit_notes_moved": moved_counts["credit_notes"],
+        "credit_transferred_ves": credit_transferred,
+        "fields_filled": sorted(fill_values)
+    }
+
+
+# --- Búsqueda unificada ---
+
+SEARCH_ENTITY_TYPES = ["representative", "student", "employee", "supplier", "payslip"]
+MAX_SEARCH_RESULTS_PER_TYPE = 50
+
+
+def _search_branch(
+    entity_type: str,
+    id_column,
+    label_expression,
+    subtitle_expression,
+    searched_columns: List[Any],
+    exact_columns: List[Any],
+    term: str,
+    limit: int,
+    use_similarity: bool
+):
+    """
+    Sub-consulta tipada de la búsqueda unificada. Puntaje: 3 coincidencia exacta (cédula/RIF/correo),
+    2 prefijo, 1 contiene; en PostgreSQL se suma similarity() de pg_trgm para ordenar dentro de cada nivel.
+    Los filtros ilike('%termino%') se resuelven con los índices GIN de trigramas definidos en models.
+    """
+    # Los comodines del usuario ('%', '_') se escapan para que coincidan literalmente
+    escaped_term = _escape_like(term)
+    contains_pattern = f"%{escaped_term}%"
+    prefix_pattern = f"{escaped_term}%"
+    score = case(
+        (or_(*[sql_func.lower(column) == term.lower() for column in exact_columns]), 3.0),
+        (or_(*[column.ilike(prefix_pattern, escape="\\") for column in searched_columns]), 2.0),
+        else_=1.0
+    )
+    if use_similarity:
+        score = score + sql_func.similarity(label_expression, term)
+    return (
+        select(
+            literal(entity_type).label("entity_type"),
+            id_column.label("entity_id"),
+            label_expression.label("label"),
+            cast(subtitle_expression, String).label("subtitle"),
+            score.label("score")
+        )
+        .where(or_(*[column.ilike(contains_pattern, escape="\\") for column in searched_columns]))
+        .order_by(score.desc(), label_expression.asc())
+        .limit(limit)
+        .subquery()
+    )
+
+
+def unified_search(
+    db: Session,
+    term: str,
+    entity_types: Optional[List[str]] = None,
+    limit_per_type: int = 10
+) -> Dict[str, Any]:
+    """
+    Busca en representantes, estudiantes, empleados, proveedores y recibos de pago con una sola
+    consulta UNION ALL (una rama por tipo, cada una con su propio límite) y devuelve resultados tipados
+    ordenados por puntaje.
+    """
+    term = (term or "").strip()
+    if len(term) < 2:
+        raise ValueError("El término de búsqueda debe tener al menos 2 caracteres.")
+    entity_types = entity_types or SEARCH_ENTITY_TYPES
+    invalid_types = [t for t in entity_types if t not in SEARCH_ENTITY_TYPES]
+    if invalid_types:
+        raise ValueError(f"Tipos de entidad no válidos: {', '.join(invalid_types)}. Permitidos: {', '.join(SEARCH_ENTITY_TYPES)}")
+    limit_per_type = max(1, min(limit_per_type, MAX_SEARCH_RESULTS_PER_TYPE))
+    use_similarity = db.get_bind().dialect.name == "postgresql"
+
+    Representative, Student, Employee, Supplier, Payslip = (
+        models.Representative, models.Student, models.Employee, models.Supplier, models.Payslip
+    )
+    representative_name = models.full_name_expression(Representative.first_name, Representative.last_name)
+    student_name = models.full_name_expression(Student.first_name, Student.last_name)
+    employee_name = models.full_name_expression(Employee.first_name, Employee.last_name)
+    branch_specs = {
+        "representative": (
+            Representative.id, representative_name, Representative.cedula,
+            [Representative.first_name, Representative.last_name, representative_name, Representative.cedula, Representative.email],
+            [Representative.cedula, Representative.email]
+        ),
+        "student": (
+            Student.id, student_name, Student.cedula,
+            [Student.first_name, Student.last_name, student_name, Student.cedula],
+            [Student.cedula]
+        ),
+        "employee": (
+            Employee.id, employee_name, Employee.identity_document,
+            [Employee.first_name, Employee.last_name, employee_name, Employee.identity_document, Employee.personal_email],
+            [Employee.identity_document, Employee.personal_email]
+        ),
+        "supplier": (
+            Supplier.id, Supplier.name, Supplier.rif_ci,
+            [Supplier.name, Supplier.rif_ci, Supplier.email, Supplier.contact_person],
+            [Supplier.rif_ci, Supplier.email]
+        ),
+        "payslip": (
+            Payslip.id, Payslip.employee_full_name_snapshot, Payslip.payment_date_snapshot,
+            [Payslip.employee_full_name_snapshot, Payslip.employee_identity_document_snapshot],
+            [Payslip.employee_identity_document_snapshot]
+        ),
+    }
+
+    branches = [
+        _search_branch(entity_type, *branch_specs[entity_type], term=term, limit=limit_per_type, use_similarity=use_similarity)
+        for entity_type in SEARCH_ENTITY_TYPES if entity_type in entity_types
+    ]
+    combined = union_all(*[select(branch) for branch in branches]).subquery()
+    rows = db.execute(
+        select(combined).order_by(combined.c.score.desc(), combined.c.label.asc(), combined.c.entity_type.asc())
+    ).all()
+
+    items = [
+        {
+            "entity_type": row.entity_type,
+            "entity_id": row.entity_id,
+            "label": row.label,
+            "subtitle": row.subtitle,
+            "score": round(float(row.score), 4),
+        }
+        for row in rows
+    ]
+    return {"query": term, "total": len(items), "items": items}
+
+
+# --- Autocompletado (typeahead) ---
+
+MAX_TYPEAHEAD_RESULTS = 20
+IDENTIFICATION_TYPE_PREFIXES = ["v", "e", "p", "j", "g"]
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _typeahead_query(db: Session, model, term: str, limit: int, extra_filters: Optional[List[Any]] = None):
+    """
+    Coincidencia por prefijo (sin comodín inicial) sobre "nombre apellido", "apellido nombre" y cédula,
+    en minúsculas para usar los índices *_prefix de models. Si el término es solo numérico también se
+    prueba con cada prefijo de tipo de identificación (V, E, ...), ya que la cédula se guarda como 'V12345678'.
+    Solo se seleccionan tres columnas y nunca más de MAX_TYPEAHEAD_RESULTS filas.
+    """
+    term = " ".join((term or "").split()).lower()
+    if not term:
+        raise ValueError("El término de búsqueda no puede estar vacío.")
+    limit = max(1, min(limit, MAX_TYPEAHEAD_RESULTS))
+    pattern = f"{_escape_like(term)}%"
+
+    first_last = models.full_name_expression(model.first_name, model.last_name)
+    last_first = models.full_name_expression(model.last_name, model.first_name)
+    cedula_lower = sql_func.lower(model.cedula)
+    conditions = [
+        sql_func.lower(first_last).like(pattern, escape="\\"),
+        sql_func.lower(last_first).like(pattern, escape="\\"),
+        cedula_lower.like(pattern, escape="\\"),
+    ]
+    if term.isdigit():
+        conditions.extend(cedula_lower.like(f"{prefix}{term}%") for prefix in IDENTIFICATION_TYPE_PREFIXES)
+
+    return db.query(
+        model.id,
+        first_last.label("display_name"),
+        model.cedula
+    ).filter(or_(*conditions), *(extra_filters or [])).order_by(model.last_name.asc(), model.first_name.asc(), model.id.asc()).limit(limit)
+
+
+def typeahead_representatives(db: Session, term: str, limit: int = 10) -> List[Dict[str, Any]]:
+    rows = _typeahead_query(db, models.Representative, term, limit).all()
+    return [{"id": row.id, "display_name": row.display_name, "cedula": row.cedula} for row in rows]
+
+
+def typeahead_students(db: Session, term: str, limit: int = 10, is_active: Optional[bool] = True) -> List[Dict[str, Any]]:
+    extra_filters = [models.Student.is_active == is_active] if is_active is not None else []
+    rows = _typeahead_query(db, models.Student, term, limit, extra_filters=extra_filters).all()
+    return [{"id": row.id, "display_name": row.display_name, "cedula": row.cedula} for row in rows]
+
+
 # --- Funciones CRUD para Configuración de la Escuela ---
 
 SCHOOL_CONFIG_ID = 1
@@ -555,6 +1387,117 @@ def create_or_update_school_configuration(
     db.refresh(db_config)
     return db_config
 
+# --- Funciones CRUD para Descuentos por Hermanos ---
+
+
+def get_sibling_discount_rule(db: Session, rule_id: int) -> Optional[models.SiblingDiscountRule]:
+    return db.query(models.SiblingDiscountRule).filter(models.SiblingDiscountRule.id == rule_id).first()
+
+
+def get_sibling_discount_rule_by_position(
+    db: Session,
+    sibling_position: int,
+    applicable_category: Optional[models.ChargeCategory] = None
+) -> Optional[models.SiblingDiscountRule]:
+    query = db.query(models.SiblingDiscountRule).filter(models.SiblingDiscountRule.sibling_position == sibling_position)
+    if applicable_category is None:
+        query = query.filter(models.SiblingDiscountRule.applicable_category.is_(None))
+    else:
+        query = query.filter(models.SiblingDiscountRule.applicable_category == applicable_category)
+    return query.first()
+
+
+def get_sibling_discount_rules(db: Session, is_active: Optional[bool] = None) -> List[models.SiblingDiscountRule]:
+    query = db.query(models.SiblingDiscountRule)
+    if is_active is not None:
+        query = query.filter(models.SiblingDiscountRule.is_active == is_active)
+    return query.order_by(models.SiblingDiscountRule.sibling_position.asc(), models.SiblingDiscountRule.id.asc()).all()
+
+
+def create_sibling_discount_rule(db: Session, rule_in: schemas.SiblingDiscountRuleCreate) -> models.SiblingDiscountRule:
+    if get_sibling_discount_rule_by_position(db, rule_in.sibling_position, rule_in.applicable_category):
+        raise ValueError(f"Ya existe una regla de descuento para la posición {rule_in.sibling_position} y esa categoría.")
+    db_rule = models.SiblingDiscountRule(**rule_in.model_dump())
+    db.add(db_rule)
+    db.commit()
+    db.refresh(db_rule)
+    return db_rule
+
+
+def update_sibling_discount_rule(
+    db: Session, rule_id: int, rule_in: schemas.SiblingDiscountRuleUpdate
+) -> Optional[models.SiblingDiscountRule]:
+    db_rule = get_sibling_discount_rule(db, rule_id)
+    if not db_rule:
+        return None # El router manejará el 404
+
+    update_data = rule_in.model_dump(exclude_unset=True)
+    new_position = update_data.get("sibling_position", db_rule.sibling_position)
+    new_category = update_data.get("applicable_category", db_rule.applicable_category)
+    conflicting_rule = get_sibling_discount_rule_by_position(db, new_position, new_category)
+    if conflicting_rule and conflicting_rule.id != db_rule.id:
+        raise ValueError(f"Ya existe una regla de descuento para la posición {new_position} y esa categoría.")
+
+    for key, value in update_data.items():
+        setattr(db_rule, key, value)
+    db.commit()
+    db.refresh(db_rule)
+    return db_rule
+
+
+def delete_sibling_discount_rule(db: Session, rule_id: int) -> Optional[models.SiblingDiscountRule]:
+    db_rule = get_sibling_discount_rule(db, rule_id)
+    if not db_rule:
+        return None
+    db.delete(db_rule)
+    db.commit()
+    return db_rule
+
+
+def get_student_sibling_positions(db: Session) -> Dict[int, int]:
+    """
+    Posición de cada estudiante activo entre los hermanos activos de su representante,
+    calculada con una sola consulta (ROW_NUMBER por representante).
+    El mayor (fecha de nacimiento más antigua) es el 1; sin fecha de nacimiento van al final, y el id desempata.
+    Estudiantes inactivos no tienen posición (no reciben descuento por hermanos).
+    """
+    Student = models.Student
+    position = sql_func.row_number().over(
+        partition_by=Student.representative_id,
+        order_by=(case((Student.birth_date.is_(None), 1), else_=0), Student.birth_date.asc(), Student.id.asc())
+    )
+    rows = db.query(Student.id, position.label("position")).filter(Student.is_active == True).all()
+    return {row.id: row.position for row in rows}
+
+
+def _sibling_discount_percentage(
+    rules: List[models.SiblingDiscountRule],
+    sibling_position: Optional[int],
+    category: Optional[models.ChargeCategory]
+) -> float:
+    """
+    Porcentaje de descuento para un hermano en la posición dada: gana la regla activa con la
+    posición más alta que no supere la del estudiante; a igual posición, la específica de la categoría.
+    """
+    if not sibling_position or sibling_position < 2:
+        return 0.0
+    best_rule = None
+    for rule in rules:
+        if rule.sibling_position > sibling_position:
+            continue
+        if rule.applicable_category is not None and rule.applicable_category != category:
+            continue
+        if best_rule is None or (rule.sibling_position, rule.applicable_category is not None) > \
+                (best_rule.sibling_position, best_rule.applicable_category is not None):
+            best_rule = rule
+    return float(best_rule.discount_percentage) if best_rule else 0.0
+
+
+def _apply_sibling_discount(amount: float, discount_percentage: float) -> float:
+    if not discount_percentage:
+        return amount
+    return round(max(0, amount - amount * (discount_percentage / 100)), 2)
+
 # --- Funciones CRUD para GradeLevel ---
 
 
@@ -762,6 +1705,10 @@ def update_charge_concept(db: Session, charge_concept_id: int, charge_concept_in
             if not grade_level:
                 return None
     
+    # Se recuerda el precio anterior para que el repreciado solo toque los cargos emitidos con él
+    if "default_amount" in update_data and update_data["default_amount"] != db_charge_concept.default_amount:
+        db_charge_concept.previous_default_amount = db_charge_concept.default_amount
+
     for key, value in update_data.items():
         setattr(db_charge_concept, key, value)
         
@@ -771,6 +1718,181 @@ def update_charge_concept(db: Session, charge_concept_id: int, charge_concept_in
     return get_charge_concept(db, charge_concept_id=db_charge_concept.id)
 
 
+REPRICE_DIFF_ITEMS_LIMIT = 500
+
+
+def _repriced_charge_amount_expressions(new_amount: float) -> Tuple[Any, Any]:
+    """
+    Expresiones SQL (para un UPDATE sobre applied_charges) con la fórmula de create_applied_charge aplicada a
+    'new_amount': conversión con la tasa de emisión del propio cargo, beca del estudiante sobre VES
+    (porcentaje o monto fijo) y reconversión a la moneda original. Retorna (monto_original, monto_ves).
+    """
+    AppliedCharge, Student = models.AppliedCharge, models.Student
+
+    def student_column(column):
+        return select(column).where(Student.id == AppliedCharge.student_id).scalar_subquery()
+
+    has_scholarship = student_column(Student.has_scholarship)
+    scholarship_percentage = student_column(Student.scholarship_percentage)
+    scholarship_fixed_amount = student_column(Student.scholarship_fixed_amount)
+
+    gross_ves = case(
+        (AppliedCharge.is_indexed == True, _sql_round_2(literal(new_amount) * AppliedCharge.exchange_rate_applied_at_emission)),
+        else_=literal(new_amount)
+    )
+    net_ves = case(
+        (and_(has_scholarship == True, scholarship_percentage > 0), gross_ves - _sql_round_2(gross_ves * scholarship_percentage / 100)),
+        (and_(has_scholarship == True, scholarship_fixed_amount > 0), gross_ves - scholarship_fixed_amount),
+        else_=gross_ves
+    )
+    amount_due_ves = _sql_round_2(case((net_ves < 0, 0), else_=net_ves))
+    amount_due_original = case(
+        (AppliedCharge.is_indexed == True, _sql_round_2(amount_due_ves / AppliedCharge.exchange_rate_applied_at_emission)),
+        else_=amount_due_ves
+    )
+    return amount_due_original, amount_due_ves
+
+
+def reprice_pending_charges_for_concept(
+    db: Session,
+    charge_concept_id: int,
+    issue_date_from: date,
+    issue_date_to: date,
+    previous_amount: Optional[float] = None,
+    dry_run: bool = False
+) -> Dict[str, Any]:
+    """
+    Aplica el precio actual del concepto (default_amount) a sus cargos intactos emitidos en el rango:
+    PENDING, sin pagos, sin factura, en la misma moneda del concepto y emitidos con el precio anterior
+    (previous_amount, o previous_default_amount del concepto); los de monto sobrescrito no se tocan. Cada grupo de
+    cargos con el mismo descuento por hermanos y prorrateo por ingreso se actualiza con un solo UPDATE (respetando
+    la beca de cada estudiante) y se devuelve la diferencia antes/después. Con dry_run se calcula todo y se revierte.
+    Lanza ValueError si el concepto no existe, el rango es inválido o no se conoce el precio anterior.
+    """
+    if issue_date_to < issue_date_from:
+        raise ValueError("La fecha final del rango no puede ser anterior a la inicial.")
+    concept = get_charge_concept(db, charge_concept_id=charge_concept_id)
+    if not concept:
+        raise ValueError(f"Concepto de Cargo con ID {charge_concept_id} no encontrado.")
+    if previous_amount is None:
+        previous_amount = concept.previous_default_amount
+    if previous_amount is None:
+        raise ValueError("No se conoce el precio anterior del concepto; indique previous_amount (precio con el que se emitieron los cargos).")
+
+    AppliedCharge = models.AppliedCharge
+    untouched_filters = [
+        AppliedCharge.charge_concept_id == charge_concept_id,
+        AppliedCharge.issue_date >= issue_date_from,
+        AppliedCharge.issue_date <= issue_date_to,
+        AppliedCharge.status == models.AppliedChargeStatus.PENDING,
+        AppliedCharge.amount_paid_ves <= 0,
+        AppliedCharge.invoice_id.is_(None),
+        AppliedCharge.source_applied_charge_id.is_(None),
+    ]
+    diff_columns = (AppliedCharge.id, AppliedCharge.student_id, AppliedCharge.amount_due_original_currency, AppliedCharge.amount_due_ves_at_emission)
+    same_currency = AppliedCharge.original_concept_currency == concept.default_amount_currency
+    before = db.query(*diff_columns, AppliedCharge.issue_date, models.Student.enrollment_date).join(
+        models.Student, AppliedCharge.student_id == models.Student.id
+    ).filter(
+        *untouched_filters, same_currency, AppliedCharge.original_concept_amount == previous_amount
+    ).order_by(AppliedCharge.id).all()
+    skipped_other_currency = db.query(sql_func.count(AppliedCharge.id)).filter(*untouched_filters, ~same_currency).scalar()
+    skipped_custom_amount = db.query(sql_func.count(AppliedCharge.id)).filter(
+        *untouched_filters, same_currency, AppliedCharge.original_concept_amount != previous_amount
+    ).scalar()
+
+    # Descuento por hermanos vigente y prorrateo por fecha de ingreso de cada cargo: un UPDATE por combinación distinta.
+    # El período de cada cargo es el mismo que usan los motores de facturación (_charge_period_for_frequency)
+    school_config = get_school_configuration(db)
+    charge_ids_by_adjustment: Dict[Tuple[float, float], List[int]] = {}
+    skipped_not_yet_enrolled = 0
+    sibling_discount_rules = get_sibling_discount_rules(db, is_active=True)
+    sibling_positions = get_student_sibling_positions(db) if sibling_discount_rules else {}
+    for charge in before:
+        discount_pct = _sibling_discount_percentage(sibling_discount_rules, sibling_positions.get(charge.student_id), concept.category)
+        proration_factor = 1.0
+        period = _charge_period_for_frequency(concept.default_frequency, charge.issue_date, school_config)
+        if period is not None and period["start"] is not None:
+            proration_factor, _ = _proration_for_enrollment(
+                charge.enrollment_date, period["start"], period["end"], by_months=period["by_months"]
+            )
+        if proration_factor <= 0:
+            # Ingresó después del período del cargo: se deja como está, igual que los motores de facturación lo omiten
+            skipped_not_yet_enrolled += 1
+            continue
+        charge_ids_by_adjustment.setdefault((discount_pct, proration_factor), []).append(charge.id)
+
+    for (discount_pct, proration_factor), charge_ids in charge_ids_by_adjustment.items():
+        base_amount = concept.default_amount if proration_factor >= 1 else round(concept.default_amount * proration_factor, 2)
+        amount_due_original, amount_due_ves = _repriced_charge_amount_expressions(
+            _apply_sibling_discount(base_amount, discount_pct)
+        )
+        for chunk_start in range(0, len(charge_ids), APPLIED_CHARGE_INSERT_CHUNK_SIZE):
+            db.execute(
+                update(AppliedCharge)
+                .where(AppliedCharge.id.in_(charge_ids[chunk_start:chunk_start + APPLIED_CHARGE_INSERT_CHUNK_SIZE]))
+                .values(
+                    original_concept_amount=concept.default_amount,
+                    amount_due_ves_at_emission=amount_due_ves,
+                    amount_due_original_currency=amount_due_original
+                )
+                .execution_options(synchronize_session=False)
+            )
+
+    charge_ids = [charge.id for charge in before]
+    after_by_id = {}
+    for chunk_start in range(0, len(charge_ids), APPLIED_CHARGE_INSERT_CHUNK_SIZE):
+        for charge in db.query(*diff_columns).filter(
+            AppliedCharge.id.in_(charge_ids[chunk_start:chunk_start + APPLIED_CHARGE_INSERT_CHUNK_SIZE])
+        ):
+            after_by_id[charge.id] = charge
+
+    items = []
+    for old in before:
+        new = after_by_id[old.id]
+        if (old.amount_due_original_currency, old.amount_due_ves_at_emission) != (new.amount_due_original_currency, new.amount_due_ves_at_emission):
+            items.append({
+                "applied_charge_id": old.id,
+                "student_id": old.student_id,
+                "old_amount_due_original_currency": old.amount_due_original_currency,
+                "new_amount_due_original_currency": new.amount_due_original_currency,
+                "old_amount_due_ves_at_emission": old.amount_due_ves_at_emission,
+                "new_amount_due_ves_at_emission": new.amount_due_ves_at_emission,
+            })
+
+    if items:
+        refresh_applied_charges_current_debt_ves(db, applied_charge_ids=[item["applied_charge_id"] for item in items])
+        refresh_student_delinquency(db, student_ids=list({item["student_id"] for item in items}))
+    if dry_run:
+        db.rollback()
+    else:
+        db.commit()
+        if items:
+            invalidate_dashboard_cache()
+
+    old_total_ves = round(sum(charge.amount_due_ves_at_emission for charge in before), 2)
+    new_total_ves = round(sum(charge.amount_due_ves_at_emission for charge in after_by_id.values()), 2)
+    return {
+        "charge_concept_id": concept.id,
+        "concept_name": concept.name,
+        "previous_amount": previous_amount,
+        "new_default_amount": concept.default_amount,
+        "currency": concept.default_amount_currency,
+        "issue_date_from": issue_date_from,
+        "issue_date_to": issue_date_to,
+        "dry_run": dry_run,
+        "charges_evaluated": len(before),
+        "charges_repriced": len(items),
+        "skipped_other_currency": skipped_other_currency,
+        "skipped_custom_amount": skipped_custom_amount,
+        "skipped_not_yet_enrolled": skipped_not_yet_enrolled,
+        "old_total_ves": old_total_ves,
+        "new_total_ves": new_total_ves,
+        "difference_ves": round(new_total_ves - old_total_ves, 2),
+        "items": items[:REPRICE_DIFF_ITEMS_LIMIT],
+    }
+
+
 def deactivate_charge_concept(db: Session, charge_concept_id: int) -> models.ChargeConcept: # Devuelve ChargeConcept o lanza excepción
     db_charge_concept = get_charge_concept(db, charge_concept_id=charge_concept_id)
     if not db_charge_concept:
@@ -919,8 +2041,13 @@ def create_applied_charge(
         amount_paid_ves=0.0, # Valor inicial
         amount_paid_original_currency_equivalent=0.0 # Valor inicial
     )
+    if db_applied_charge.status == models.AppliedChargeStatus.CANCELLED:
+        db_applied_charge.cancelled_at = sql_func.now()
     
     db.add(db_applied_charge)
+    db.flush()
+    refresh_applied_charges_current_debt_ves(db, applied_charge_ids=[db_applied_charge.id])
+    refresh_student_delinquency(db, student_ids=[db_applied_charge.student_id])
     db.commit()
     db.refresh(db_applied_charge)
     
@@ -939,7 +2066,20 @@ def get_applied_charge(db: Session, applied_charge_id: int) -> Optional[models.A
     )
     
     
-def get_applied_charges_for_student(
+def get_applied_charges_by_ids(db: Session, ids: List[int]) -> Dict[str, Any]:
+    unique_ids = _validate_batch_lookup_ids(ids)
+    applied_charges = (
+        db.query(models.AppliedCharge)
+        .options(
+            joinedload(models.AppliedCharge.student),
+            joinedload(models.AppliedCharge.charge_concept).joinedload(models.ChargeConcept.grade_level)
+        )
+        .filter(models.AppliedCharge.id.in_(unique_ids)).all()
+    )
+    return _build_batch_lookup_result(unique_ids, applied_charges)
+    
+    
+def get_applied_charges_for_student(
     db: Session,
     student_id: int,
     skip: int = 0,
@@ -990,6 +2130,7 @@ def get_all_applied_charges(
     end_issue_date: Optional[date] = None,
     start_due_date: Optional[date] = None,
     end_due_date: Optional[date] = None,
+    min_current_debt_ves: Optional[float] = None,
     sort_by: str = "issue_date",
     sort_order: str = "desc"
 ) -> Dict[str, any]: 
@@ -1027,6 +2168,8 @@ def get_all_applied_charges(
         query = query.filter(models.AppliedCharge.due_date >= start_due_date)
     if end_due_date:
         query = query.filter(models.AppliedCharge.due_date <= end_due_date)
+    if min_current_debt_ves is not None:
+        query = query.filter(models.AppliedCharge.current_debt_ves >= min_current_debt_ves)
 
     # --- NUEVO: Calcular el total ANTES de aplicar ordenamiento y paginación a la query principal ---
     # Esto es importante para obtener el conteo correcto basado en los filtros.
@@ -1122,16 +2265,28 @@ def update_applied_charge(
                        f"debido a su estado actual ({db_applied_charge.status.value}) y los campos que se intentan modificar."
             )
 
+    if update_data.get("status") == models.AppliedChargeStatus.CANCELLED and db_applied_charge.status != models.AppliedChargeStatus.CANCELLED:
+        # updated_at cambia con cualquier modificación posterior; la fecha de anulación se guarda aparte
+        db_applied_charge.cancelled_at = sql_func.now()
     for key, value in update_data.items():
         setattr(db_applied_charge, key, value)
 
     db.add(db_applied_charge)
+    db.flush()
+    refresh_applied_charges_current_debt_ves(db, applied_charge_ids=[db_applied_charge.id])
+    refresh_student_delinquency(db, student_ids=[db_applied_charge.student_id])
     db.commit()
     db.refresh(db_applied_charge)
     return get_applied_charge(db, applied_charge_id=db_applied_charge.id)
 
 
-def run_apply_global_charge_process(db: Session, charge_details: schemas.GlobalChargeCreate) -> schemas.GlobalChargeSummaryResponse:
+def _load_global_charge_snapshot(db: Session, charge_details: schemas.GlobalChargeCreate) -> Dict[str, Any]:
+    """
+    Carga con pocas consultas lo necesario para un cargo global: concepto, monto y moneda efectivos,
+    estudiantes objetivo, una sola tasa de cambio (en o antes de la fecha de emisión) y descuentos por hermanos.
+    Con skip_existing, también los estudiantes que ya tienen un cargo no anulado del concepto en esa fecha de emisión.
+    Lanza HTTPException si el concepto no existe o está inactivo.
+    """
     charge_concept = get_charge_concept(db, charge_concept_id=charge_details.charge_concept_id)
     if not charge_concept:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Concepto de Cargo con ID {charge_details.charge_concept_id} no encontrado.")
@@ -1140,148 +2295,408 @@ def run_apply_global_charge_process(db: Session, charge_details: schemas.GlobalC
 
     effective_amount = charge_details.override_amount if charge_details.override_amount is not None else charge_concept.default_amount
     effective_currency = charge_details.override_currency if charge_details.override_currency is not None else charge_concept.default_amount_currency
-    is_indexed_val = (effective_currency != models.Currency.VES)
-    
-    description_for_charge = charge_details.description if charge_details.description else charge_concept.name
 
-    # Obtener estudiantes
-    students_query = db.query(models.Student).options(
-        joinedload(models.Student.representative) # Opcional, pero bueno tenerlo
+    Student = models.Student
+    students_query = db.query(
+        Student.id, Student.first_name, Student.last_name, Student.representative_id, Student.grade_level_id,
+        Student.has_scholarship, Student.scholarship_percentage, Student.scholarship_fixed_amount, Student.enrollment_date
     )
     if charge_details.target_students == "all_active":
-        students_query = students_query.filter(models.Student.is_active == True)
-    
-    target_students_list = students_query.all()
+        students_query = students_query.filter(Student.is_active == True)
+    students = students_query.order_by(Student.id).all()
 
-    students_evaluated_count = 0
-    charges_created_count = 0
-    errors_list_response: List[schemas.GlobalChargeSummaryItemError] = []
-    new_applied_charges_to_add: List[models.AppliedCharge] = []
-    total_sum_original_currency_val = 0.0
-
-    # Obtener tasa de cambio para la fecha de emisión si es necesario
-    exchange_rate_for_emission_val = None
-    if is_indexed_val:
-        # Asumimos que _calculate_converted_amount_ves internamente buscará la tasa más apropiada
-        # para effective_currency a VES en charge_details.issue_date.
-        # Si esa función falla por no encontrar tasa para USD/EUR, lanzará HTTPException.
-        # Para otras monedas indexadas, el manejo de tasa no encontrada debe ser robusto.
-        # Aquí, verificaremos si se puede obtener una tasa para el cálculo de amount_due_ves_at_emission.
-        # Esta llamada es solo para asegurar que la tasa exista para la lógica que sigue.
+    rate, rate_error = None, None
+    if effective_currency != models.Currency.VES:
         try:
-            _, exchange_rate_for_emission_val = _calculate_converted_amount_ves(
-                db, 
-                original_amount=1.0, # Monto de prueba
-                original_currency=effective_currency, 
-                rate_date=charge_details.issue_date
-            )
-            if is_indexed_val and exchange_rate_for_emission_val is None: # Doble chequeo, _calc debería lanzar error para USD/EUR
-                 raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"No se encontró tasa de cambio para {effective_currency.value} a VES en la fecha de emisión {charge_details.issue_date}.")
+            _, rate = _calculate_converted_amount_ves(db, original_amount=1.0, original_currency=effective_currency, rate_date=charge_details.issue_date)
         except HTTPException as e:
-             # Si no se puede obtener la tasa y es necesaria, no podemos continuar
-            errors_list_response.append(schemas.GlobalChargeSummaryItemError(
-                student_id=0, student_name="Sistema", 
-                reason=f"Error crítico obteniendo tasa de cambio para {effective_currency.value} en fecha {charge_details.issue_date}: {e.detail}. No se crearon cargos."
-            ))
-            return schemas.GlobalChargeSummaryResponse(
-                charge_concept_name=charge_concept.name,
-                target_group=charge_details.target_students,
-                students_evaluated=len(target_students_list),
-                charges_successfully_created=0,
-                total_value_of_charges_created_original_currency=0.0,
-                currency_of_sum=effective_currency.value,
-                errors_list=errors_list_response,
-                message="Proceso fallido: Tasa de cambio requerida no encontrada."
-            )
-
+            rate_error = e.detail
+
+    existing_student_ids = set()
+    if charge_details.skip_existing:
+        existing_student_ids = {student_id for (student_id,) in db.query(models.AppliedCharge.student_id).filter(
+            models.AppliedCharge.charge_concept_id == charge_concept.id,
+            models.AppliedCharge.issue_date == charge_details.issue_date,
+            models.AppliedCharge.status != models.AppliedChargeStatus.CANCELLED
+        ).distinct()}
+
+    # Período de prorrateo por fecha de ingreso: el año escolar para conceptos anuales, el mes de emisión para mensuales
+    proration_period, proration_by_months = (None, None), False
+    if charge_concept.default_frequency == models.ChargeFrequency.ANUAL:
+        school_config = get_school_configuration(db)
+        if school_config and school_config.current_period_start_date and school_config.current_period_end_date:
+            proration_period = (school_config.current_period_start_date, school_config.current_period_end_date)
+            proration_by_months = True
+    elif charge_concept.default_frequency == models.ChargeFrequency.MENSUAL:
+        proration_period = _month_bounds(charge_details.issue_date.year, charge_details.issue_date.month)
+
+    sibling_discount_rules = get_sibling_discount_rules(db, is_active=True)
+    return {
+        "charge_concept_id": charge_concept.id,
+        "charge_concept_name": charge_concept.name,
+        "charge_concept_category": charge_concept.category,
+        "description": charge_details.description if charge_details.description else charge_concept.name,
+        "effective_amount": effective_amount,
+        "effective_currency": effective_currency,
+        "issue_date": charge_details.issue_date,
+        "due_date": charge_details.due_date,
+        "students": students,
+        "existing_student_ids": existing_student_ids,
+        "proration_period": proration_period,
+        "proration_by_months": proration_by_months,
+        "rate": rate,
+        "rate_error": rate_error,
+        "sibling_discount_rules": sibling_discount_rules,
+        "sibling_positions": get_student_sibling_positions(db) if sibling_discount_rules else {},
+    }
 
-    for student in target_students_list:
-        students_evaluated_count += 1
-        student_full_name = f"{student.first_name} {student.last_name}"
 
-        # Opcional: Verificar si ya existe un cargo similar para este estudiante/concepto/mes
-        # Esto depende de tu lógica de negocio para evitar duplicados (ej. mensualidades)
-        # Por ahora, lo omitimos para simplificar, pero es importante en producción.
+def _plan_global_charge(snapshot: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Calcula en memoria las filas de AppliedCharge de un cargo global. A diferencia de la generación mensual,
+    la beca porcentual (y el descuento por hermanos) se aplican en moneda original y la beca fija en VES después de convertir.
+    El monto base se prorratea antes si el estudiante ingresó dentro del período del concepto (mes o año escolar).
+    """
+    effective_amount = snapshot["effective_amount"]
+    effective_currency = snapshot["effective_currency"]
+    is_indexed = effective_currency != models.Currency.VES
+    rate = snapshot["rate"]
+    rows = []
+    errors = []
+    duplicates_skipped = 0
+    sibling_discounts_applied = 0
+    prorated_charges = 0
+    students_not_yet_enrolled = 0
+    period_start, period_end = snapshot["proration_period"]
+
+    for student in snapshot["students"]:
+        if student.id in snapshot["existing_student_ids"]:
+            duplicates_skipped += 1
+            continue
+        proration_factor, proration_label = _proration_for_enrollment(
+            student.enrollment_date, period_start, period_end, by_months=snapshot["proration_by_months"]
+        )
+        if proration_factor <= 0:
+            students_not_yet_enrolled += 1
+            continue
+        base_amount = effective_amount if proration_factor >= 1 else round(effective_amount * proration_factor, 2)
 
-        # 1. Aplicar beca porcentual al monto en moneda original
-        net_due_original_currency_after_percentage = effective_amount
+        # 1. Beca porcentual y descuento por hermanos en moneda original (valor de `amount_due_original_currency`)
+        amount_due_original = base_amount
         if student.has_scholarship and student.scholarship_percentage is not None and student.scholarship_percentage > 0:
-            discount = effective_amount * (student.scholarship_percentage / 100)
-            net_due_original_currency_after_percentage -= discount
-        
-        net_due_original_currency_after_percentage = round(max(0, net_due_original_currency_after_percentage), 2)
-        
-        # Este valor se guardará como `amount_due_original_currency`
-        amount_due_original_currency_for_db = net_due_original_currency_after_percentage
-
-        # 2. Convertir a VES (si es necesario) y obtener la tasa que se usó
-        #    Este es el monto en VES *antes* de aplicar becas de monto fijo en VES.
-        try:
-            amount_ves_before_fixed_scholarship, actual_rate_applied = _calculate_converted_amount_ves(
-                db=db,
-                original_amount=amount_due_original_currency_for_db, # Usamos el monto ya con beca porcentual
-                original_currency=effective_currency,
-                rate_date=charge_details.issue_date
-            )
-        except HTTPException as e_conv:
-            errors_list_response.append(schemas.GlobalChargeSummaryItemError(student_id=student.id, student_name=student_full_name, reason=f"Error de conversión de moneda: {e_conv.detail}"))
-            continue # Saltar a la siguiente iteración
+            amount_due_original -= base_amount * (student.scholarship_percentage / 100)
+        amount_due_original = round(max(0, amount_due_original), 2)
+        sibling_discount_pct = _sibling_discount_percentage(
+            snapshot["sibling_discount_rules"], snapshot["sibling_positions"].get(student.id), snapshot["charge_concept_category"]
+        )
+        if sibling_discount_pct > 0:
+            amount_due_original = _apply_sibling_discount(amount_due_original, sibling_discount_pct)
 
-        # 3. Aplicar beca de monto fijo en VES
-        final_due_ves_at_emission = amount_ves_before_fixed_scholarship
+        # 2. Conversión a VES con la tasa de la fecha de emisión y 3. beca de monto fijo en VES
+        amount_due_ves = round(amount_due_original * rate, 2) if is_indexed else amount_due_original
         if student.has_scholarship and student.scholarship_fixed_amount is not None and student.scholarship_fixed_amount > 0:
-            final_due_ves_at_emission -= student.scholarship_fixed_amount
-        
-        final_due_ves_at_emission = round(max(0, final_due_ves_at_emission), 2)
-
-        # Si el monto final es cero o negativo después de becas, podríamos optar por no crear el cargo
-        if final_due_ves_at_emission <= 0 and amount_due_original_currency_for_db <=0:
-             errors_list_response.append(schemas.GlobalChargeSummaryItemError(student_id=student.id, student_name=student_full_name, reason=f"Monto final cero o negativo después de becas. No se creó el cargo."))
-             continue
-
-
-        applied_charge = models.AppliedCharge(
-            student_id=student.id,
-            charge_concept_id=charge_concept.id,
-            description=description_for_charge,
-            original_concept_amount=effective_amount, # Monto base del concepto o override
-            original_concept_currency=effective_currency,
-            amount_due_original_currency=amount_due_original_currency_for_db, # Neto en moneda original post-beca porcentual
-            is_indexed=is_indexed_val,
-            amount_due_ves_at_emission=final_due_ves_at_emission, # Neto en VES post-beca porcentual y fija VES
-            exchange_rate_applied_at_emission=actual_rate_applied if is_indexed_val else None,
-            issue_date=charge_details.issue_date,
-            due_date=charge_details.due_date,
-            status=models.AppliedChargeStatus.PENDING,
-            amount_paid_ves=0.0,
-            amount_paid_original_currency_equivalent=0.0
+            amount_due_ves -= student.scholarship_fixed_amount
+        amount_due_ves = round(max(0, amount_due_ves), 2)
+
+        if amount_due_ves <= 0 and amount_due_original <= 0:
+            errors.append({
+                "student_id": student.id,
+                "student_name": f"{student.first_name} {student.last_name}",
+                "reason": "Monto final cero o negativo después de becas. No se creó el cargo."
+            })
+            continue
+
+        if sibling_discount_pct > 0:
+            sibling_discounts_applied += 1
+        if proration_label:
+            prorated_charges += 1
+        rows.append({
+            "student_id": student.id,
+            "charge_concept_id": snapshot["charge_concept_id"],
+            "description": f"{snapshot['description']} ({proration_label})" if proration_label else snapshot["description"],
+            "original_concept_amount": effective_amount,
+            "original_concept_currency": effective_currency,
+            "amount_due_original_currency": amount_due_original,
+            "amount_paid_original_currency_equivalent": 0.0,
+            "is_indexed": is_indexed,
+            "amount_due_ves_at_emission": amount_due_ves,
+            "amount_paid_ves": 0.0,
+            "exchange_rate_applied_at_emission": rate if is_indexed else None,
+            "issue_date": snapshot["issue_date"],
+            "due_date": snapshot["due_date"],
+            "status": models.AppliedChargeStatus.PENDING,
+            "current_debt_ves": 0.0,
+        })
+
+    return {
+        "rows": rows,
+        "errors": errors,
+        "students_evaluated": len(snapshot["students"]),
+        "duplicates_skipped": duplicates_skipped,
+        "sibling_discounts_applied": sibling_discounts_applied,
+        "prorated_charges": prorated_charges,
+        "students_not_yet_enrolled": students_not_yet_enrolled,
+    }
+
+
+def run_apply_global_charge_process(db: Session, charge_details: schemas.GlobalChargeCreate) -> schemas.GlobalChargeSummaryResponse:
+    """
+    Aplica un concepto a todos los estudiantes objetivo: carga los datos con pocas consultas (una sola tasa),
+    calcula los montos en memoria e inserta los cargos por bloques con INSERT masivo en una transacción.
+    Informa la duración de cada fase en phase_timings_ms.
+    """
+    phase_timings_ms: Dict[str, float] = {}
+    process_start = phase_start = time.perf_counter()
+
+    def _end_phase(phase: str) -> None:
+        nonlocal phase_start
+        now = time.perf_counter()
+        phase_timings_ms[phase] = round((now - phase_start) * 1000, 1)
+        phase_start = now
+
+    snapshot = _load_global_charge_snapshot(db, charge_details)
+    effective_currency = snapshot["effective_currency"]
+    _end_phase("load")
+
+    if snapshot["rate_error"]:
+        # Si no se puede obtener la tasa y es necesaria, no podemos continuar
+        return schemas.GlobalChargeSummaryResponse(
+            charge_concept_name=snapshot["charge_concept_name"],
+            target_group=charge_details.target_students,
+            students_evaluated=len(snapshot["students"]),
+            charges_successfully_created=0,
+            total_value_of_charges_created_original_currency=0.0,
+            currency_of_sum=effective_currency.value,
+            errors_list=[schemas.GlobalChargeSummaryItemError(
+                student_id=0, student_name="Sistema",
+                reason=f"Error crítico obteniendo tasa de cambio para {effective_currency.value} en fecha {charge_details.issue_date}: {snapshot['rate_error']}. No se crearon cargos."
+            )],
+            message="Proceso fallido: Tasa de cambio requerida no encontrada.",
+            phase_timings_ms=phase_timings_ms
         )
-        new_applied_charges_to_add.append(applied_charge)
-        charges_created_count += 1
-        total_sum_original_currency_val += amount_due_original_currency_for_db
 
-    if new_applied_charges_to_add:
+    plan = _plan_global_charge(snapshot)
+    _end_phase("plan")
+
+    new_charge_ids = []
+    if plan["rows"]:
         try:
-            db.add_all(new_applied_charges_to_add)
+            new_charge_ids = _bulk_insert_applied_charges(db, plan["rows"])
             db.commit()
         except Exception as e_commit:
             db.rollback()
-            # Si falla el commit masivo, es un error general del proceso
-            # Podrías añadir un error general a errors_list_response o lanzar una excepción
-            # Por ahora, asumimos que los errores se manejan por estudiante.
-            # Pero un fallo aquí es más grave.
+            # Un fallo al guardar el lote es un error general del proceso, no de un estudiante
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error al guardar los cargos generados: {str(e_commit)}")
+        invalidate_dashboard_cache()
+    _end_phase("insert")
+    phase_timings_ms["total"] = round((time.perf_counter() - process_start) * 1000, 1)
 
     return schemas.GlobalChargeSummaryResponse(
-        charge_concept_name=charge_concept.name,
+        charge_concept_name=snapshot["charge_concept_name"],
         target_group=charge_details.target_students,
-        students_evaluated=students_evaluated_count,
-        charges_successfully_created=charges_created_count,
-        total_value_of_charges_created_original_currency=round(total_sum_original_currency_val, 2),
+        students_evaluated=plan["students_evaluated"],
+        charges_successfully_created=len(new_charge_ids),
+        total_value_of_charges_created_original_currency=round(sum(row["amount_due_original_currency"] for row in plan["rows"]), 2),
         currency_of_sum=effective_currency.value,
-        errors_list=errors_list_response
+        duplicates_skipped=plan["duplicates_skipped"],
+        sibling_discounts_applied=plan["sibling_discounts_applied"],
+        prorated_charges=plan["prorated_charges"],
+        errors_list=[schemas.GlobalChargeSummaryItemError(**error) for error in plan["errors"]],
+        phase_timings_ms=phase_timings_ms
     )
     
+# --- Recargos por mora ---
+
+
+def get_late_fee_rule(db: Session, rule_id: int) -> Optional[models.LateFeeRule]:
+    return db.query(models.LateFeeRule).filter(models.LateFeeRule.id == rule_id).first()
+
+
+def get_late_fee_rules(db: Session, is_active: Optional[bool] = None) -> List[models.LateFeeRule]:
+    query = db.query(models.LateFeeRule)
+    if is_active is not None:
+        query = query.filter(models.LateFeeRule.is_active == is_active)
+    return query.order_by(models.LateFeeRule.id.asc()).all()
+
+
+def _validate_late_fee_rule(db: Session, rule_id: Optional[int], rule_data: Dict[str, Any]) -> None:
+    """Una sola regla activa por categoría (o general), y el concepto del recargo debe existir."""
+    if not get_charge_concept(db, charge_concept_id=rule_data["penalty_charge_concept_id"]):
+        raise ValueError(f"Concepto de Cargo con ID {rule_data['penalty_charge_concept_id']} no encontrado.")
+    if not rule_data["is_active"]:
+        return
+    query = db.query(models.LateFeeRule).filter(models.LateFeeRule.is_active == True)
+    if rule_data["applicable_category"] is None:
+        query = query.filter(models.LateFeeRule.applicable_category.is_(None))
+    else:
+        query = query.filter(models.LateFeeRule.applicable_category == rule_data["applicable_category"])
+    if rule_id is not None:
+        query = query.filter(models.LateFeeRule.id != rule_id)
+    if query.first():
+        raise ValueError("Ya existe una regla de mora activa para esa categoría.")
+
+
+def create_late_fee_rule(db: Session, rule_in: schemas.LateFeeRuleCreate) -> models.LateFeeRule:
+    rule_data = rule_in.model_dump()
+    _validate_late_fee_rule(db, None, rule_data)
+    db_rule = models.LateFeeRule(**rule_data)
+    db.add(db_rule)
+    db.commit()
+    db.refresh(db_rule)
+    return db_rule
+
+
+def update_late_fee_rule(db: Session, rule_id: int, rule_in: schemas.LateFeeRuleUpdate) -> Optional[models.LateFeeRule]:
+    db_rule = get_late_fee_rule(db, rule_id)
+    if not db_rule:
+        return None # El router manejará el 404
+
+    update_data = rule_in.model_dump(exclude_unset=True)
+    merged_data = {
+        "penalty_charge_concept_id": update_data.get("penalty_charge_concept_id", db_rule.penalty_charge_concept_id),
+        "applicable_category": update_data.get("applicable_category", db_rule.applicable_category),
+        "is_active": update_data.get("is_active", db_rule.is_active),
+    }
+    _validate_late_fee_rule(db, db_rule.id, merged_data)
+    new_fee_type = update_data.get("fee_type", db_rule.fee_type)
+    if new_fee_type == models.LateFeeType.PERCENTAGE and update_data.get("amount", db_rule.amount) > 100:
+        raise ValueError("El porcentaje de mora no puede ser mayor a 100.")
+
+    for key, value in update_data.items():
+        setattr(db_rule, key, value)
+    db.commit()
+    db.refresh(db_rule)
+    return db_rule
+
+
+def delete_late_fee_rule(db: Session, rule_id: int) -> Optional[models.LateFeeRule]:
+    db_rule = get_late_fee_rule(db, rule_id)
+    if not db_rule:
+        return None
+    db.delete(db_rule)
+    db.commit()
+    return db_rule
+
+
+def _late_fee_amount(rule, charge) -> Tuple[float, models.Currency]:
+    """Recargo de una regla para un cargo vencido: monto fijo en la moneda de la regla, o porcentaje del saldo pendiente en la moneda del cargo."""
+    if rule.fee_type == models.LateFeeType.FIXED:
+        return round(rule.amount, 2), rule.currency
+    if charge.is_indexed:
+        outstanding = charge.amount_due_original_currency - charge.amount_paid_original_currency_equivalent
+    else:
+        outstanding = charge.amount_due_ves_at_emission - charge.amount_paid_ves
+    return round(max(0, outstanding) * rule.amount / 100, 2), charge.original_concept_currency
+
+
+def run_apply_late_fees_process(db: Session, on_date: Optional[date] = None) -> Dict[str, Any]:
+    """
+    Crea un recargo por mora (AppliedCharge enlazado a su cargo de origen) para cada cargo abierto vencido más allá
+    de los días de gracia de su regla (la de su categoría o, si no hay, la general). Los cargos elegibles salen de
+    una sola consulta que ya excluye los que tienen recargo en el período (AAAA-MM de la fecha), y los recargos se
+    insertan en bloque en una transacción; la restricción única por cargo y período impide aplicarlos dos veces.
+    Lanza ValueError si otra corrida simultánea ya insertó recargos del mismo período.
+    """
+    processing_date = on_date or get_current_venezuelan_date_for_crud()
+    penalty_period = processing_date.strftime("%Y-%m")
+    result = {
+        "as_of_date": processing_date,
+        "penalty_period": penalty_period,
+        "charges_evaluated": 0,
+        "penalties_created": 0,
+        "in_grace_period": 0,
+        "total_penalties_ves": 0.0,
+        "errors": [],
+    }
+    rules = db.query(models.LateFeeRule).filter(models.LateFeeRule.is_active == True).all()
+    if not rules:
+        result["message"] = "No hay reglas de mora activas. No se crearon recargos."
+        return result
+    rules_by_category = {rule.applicable_category: rule for rule in rules}
+
+    AppliedCharge = models.AppliedCharge
+    ExistingPenalty = aliased(models.AppliedCharge)
+    already_penalized = select(ExistingPenalty.id).where(
+        ExistingPenalty.source_applied_charge_id == AppliedCharge.id,
+        ExistingPenalty.penalty_period == penalty_period
+    ).exists()
+    eligible_charges = db.query(
+        AppliedCharge.id, AppliedCharge.student_id, AppliedCharge.description, AppliedCharge.due_date,
+        AppliedCharge.is_indexed, AppliedCharge.original_concept_currency,
+        AppliedCharge.amount_due_original_currency, AppliedCharge.amount_paid_original_currency_equivalent,
+        AppliedCharge.amount_due_ves_at_emission, AppliedCharge.amount_paid_ves,
+        models.ChargeConcept.category
+    ).join(models.ChargeConcept, AppliedCharge.charge_concept_id == models.ChargeConcept.id).filter(
+        AppliedCharge.status.in_(OPEN_APPLIED_CHARGE_STATUSES),
+        AppliedCharge.source_applied_charge_id.is_(None), # Los recargos no generan recargos
+        AppliedCharge.due_date < processing_date - timedelta(days=min(rule.grace_days for rule in rules)),
+        ~already_penalized
+    ).order_by(AppliedCharge.id).all()
+    result["charges_evaluated"] = len(eligible_charges)
+
+    penalties = []
+    for charge in eligible_charges:
+        rule = rules_by_category.get(charge.category) or rules_by_category.get(None)
+        if rule is None:
+            continue
+        if charge.due_date >= processing_date - timedelta(days=rule.grace_days):
+            result["in_grace_period"] += 1
+            continue
+        fee_amount, fee_currency = _late_fee_amount(rule, charge)
+        if fee_amount > 0:
+            penalties.append((charge, rule, fee_amount, fee_currency))
+
+    # Una sola búsqueda de tasa por moneda
+    rates: Dict[models.Currency, Optional[float]] = {}
+    for currency in {fee_currency for _, _, _, fee_currency in penalties} - {models.Currency.VES}:
+        latest_rate = get_latest_exchange_rate(db, from_currency=currency, on_date=processing_date)
+        rates[currency] = latest_rate.rate if latest_rate and latest_rate.rate and latest_rate.rate > 0 else None
+        if rates[currency] is None:
+            result["errors"].append(
+                f"No hay tasa de cambio para {currency.value}->VES en o antes de {processing_date}. Se omitieron sus recargos."
+            )
+
+    rows = []
+    for charge, rule, fee_amount, fee_currency in penalties:
+        is_indexed = fee_currency != models.Currency.VES
+        rate = rates.get(fee_currency) if is_indexed else None
+        if is_indexed and rate is None:
+            continue
+        rows.append({
+            "student_id": charge.student_id,
+            "charge_concept_id": rule.penalty_charge_concept_id,
+            "description": f"Mora {penalty_period}: {charge.description or f'Cargo ID {charge.id}'}"[:500],
+            "original_concept_amount": fee_amount,
+            "original_concept_currency": fee_currency,
+            "amount_due_original_currency": fee_amount,
+            "amount_paid_original_currency_equivalent": 0.0,
+            "is_indexed": is_indexed,
+            "amount_due_ves_at_emission": round(fee_amount * rate, 2) if is_indexed else fee_amount,
+            "amount_paid_ves": 0.0,
+            "exchange_rate_applied_at_emission": rate,
+            "issue_date": processing_date,
+            "due_date": processing_date,
+            "status": models.AppliedChargeStatus.PENDING,
+            "current_debt_ves": 0.0,
+            "source_applied_charge_id": charge.id,
+            "penalty_period": penalty_period,
+        })
+
+    try:
+        new_charge_ids = _bulk_insert_applied_charges(db, rows)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise ValueError(f"Otra corrida ya aplicó recargos por mora del período {penalty_period}. Intente de nuevo.")
+    if new_charge_ids:
+        invalidate_dashboard_cache()
+
+    result["penalties_created"] = len(new_charge_ids)
+    result["total_penalties_ves"] = round(sum(row["amount_due_ves_at_emission"] for row in rows), 2)
+    result["message"] = f"Recargos por mora del período {penalty_period}: {len(new_charge_ids)} creado(s)."
+    return result
+
+
 #--- Funciones para las tasas de cambio ---
 
 
@@ -1333,7 +2748,12 @@ def create_exchange_rate(db: Session, exchange_rate_in: schemas.ExchangeRateCrea
     db_exchange_rate = models.ExchangeRate(**exchange_rate_in.model_dump())
     db.add(db_exchange_rate)
     try:
+        db.flush()
+        # Revalorizar la "deuda hoy" de los cargos abiertos dentro de la misma transacción.
+        # La morosidad (monto abierto por estudiante) se reconstruye fuera de la petición (ver routers/exchange_rates.py)
+        refresh_applied_charges_current_debt_ves(db)
         db.commit()
+        invalidate_dashboard_cache()
         db.refresh(db_exchange_rate)
         return db_exchange_rate
     except IntegrityError:
@@ -1415,6 +2835,8 @@ def update_exchange_rate(
         setattr(db_exchange_rate, key, value)
     
     db.add(db_exchange_rate)
+    db.flush()
+    refresh_applied_charges_current_debt_ves(db)
     db.commit()
     db.refresh(db_exchange_rate)
     return db_exchange_rate
@@ -1426,10 +2848,69 @@ def delete_exchange_rate(db: Session, exchange_rate_id: int) -> Optional[models.
         return None
     
     db.delete(db_exchange_rate)
+    db.flush()
+    refresh_applied_charges_current_debt_ves(db)
     db.commit()
     return db_exchange_rate
 
 
+# Estados en los que un cargo aplicado todavía representa deuda
+OPEN_APPLIED_CHARGE_STATUSES = [
+    models.AppliedChargeStatus.PENDING,
+    models.AppliedChargeStatus.PARTIALLY_PAID,
+    models.AppliedChargeStatus.OVERDUE
+]
+
+
+def _sql_round_2(expression):
+    # round(double precision, int) no existe en PostgreSQL; se redondea sobre NUMERIC
+    return sql_func.round(cast(expression, Numeric), 2)
+
+
+def refresh_applied_charges_current_debt_ves(
+    db: Session,
+    applied_charge_ids: Optional[List[int]] = None,
+    on_date: Optional[date] = None
+) -> int:
+    """
+    Recalcula con un único UPDATE la columna current_debt_ves ("deuda hoy") de los cargos aplicados.
+    - Cargos indexados: saldo en moneda original * tasa más reciente (en o antes de on_date).
+    - Cargos en VES (o indexados sin tasa registrada): saldo nominal en VES.
+    - Cargos pagados o anulados: 0.
+    Sin 'applied_charge_ids' se revalorizan todos los cargos abiertos (uso típico al registrar una tasa).
+    No hace commit; devuelve el número de filas actualizadas.
+    """
+    if applied_charge_ids is not None and not applied_charge_ids:
+        return 0
+    rate_date = on_date or get_current_venezuelan_date_for_crud()
+
+    AppliedCharge = models.AppliedCharge
+    pending_original = AppliedCharge.amount_due_original_currency - AppliedCharge.amount_paid_original_currency_equivalent
+    pending_ves_nominal = AppliedCharge.amount_due_ves_at_emission - AppliedCharge.amount_paid_ves
+
+    whens = [(AppliedCharge.status.notin_(OPEN_APPLIED_CHARGE_STATUSES), 0.0)]
+    for indexed_currency in [models.Currency.USD, models.Currency.EUR]:
+        latest_rate = get_latest_exchange_rate(db, from_currency=indexed_currency, on_date=rate_date)
+        if latest_rate and latest_rate.rate and latest_rate.rate > 0:
+            whens.append((
+                and_(AppliedCharge.is_indexed == True, AppliedCharge.original_concept_currency == indexed_currency),
+                _sql_round_2(pending_original * latest_rate.rate)
+            ))
+
+    stmt = update(AppliedCharge).values(
+        current_debt_ves=case(*whens, else_=_sql_round_2(pending_ves_nominal))
+    )
+    if applied_charge_ids is not None:
+        stmt = stmt.where(AppliedCharge.id.in_(applied_charge_ids))
+    else:
+        stmt = stmt.where(AppliedCharge.status.in_(OPEN_APPLIED_CHARGE_STATUSES))
+
+    db.flush()
+    # synchronize_session=False: los objetos ya cargados en la sesión toman el valor nuevo al expirar en el commit
+    result = db.execute(stmt.execution_options(synchronize_session=False))
+    return result.rowcount
+
+
 def _calculate_converted_amount_ves(
     db: Session,
     original_amount: float,
@@ -1493,211 +2974,1280 @@ def _apply_scholarship(
     return final_amount_due_ves
 
 
+# --- Generación masiva de cargos recurrentes ---
+
+APPLIED_CHARGE_INSERT_CHUNK_SIZE = 1000
+
+
+def _month_bounds(target_year: int, target_month: int) -> Tuple[date, date]:
+    _, last_day_of_month = calendar.monthrange(target_year, target_month)
+    return date(target_year, target_month, 1), date(target_year, target_month, last_day_of_month)
+
+
+def _resolve_recurring_charge_dates(
+    db: Session,
+    target_year: int,
+    target_month: int,
+    issue_date_override: Optional[date] = None,
+    due_date_override: Optional[date] = None
+) -> Tuple[date, date]:
+    """Fechas de emisión y vencimiento del mes a facturar. Lanza ValueError si son inválidas."""
+    charge_issue_date = issue_date_override if issue_date_override else date(target_year, target_month, 1)
+    if due_date_override:
+        charge_due_date = due_date_override
+    else:
+        school_config = get_school_configuration(db)
+        payment_day = school_config.payment_due_day if school_config and school_config.payment_due_day else 5
+        _, last_day_of_month = calendar.monthrange(target_year, target_month)
+        charge_due_date = date(target_year, target_month, min(payment_day, last_day_of_month))
+    if charge_due_date < charge_issue_date:
+        raise ValueError("La fecha de vencimiento no puede ser anterior a la fecha de emisión.")
+    return charge_issue_date, charge_due_date
+
+
+def _load_recurring_charge_students(
+    db: Session,
+    after_student_id: Optional[int] = None,
+    limit: Optional[int] = None
+) -> List[Any]:
+    """Estudiantes activos con los datos necesarios para facturar, ordenados por id (paginación por llave)."""
+    Student = models.Student
+    query = db.query(
+        Student.id, Student.representative_id, Student.grade_level_id,
+        Student.has_scholarship, Student.scholarship_percentage, Student.scholarship_fixed_amount, Student.enrollment_date
+    ).filter(Student.is_active == True)
+    if after_student_id:
+        query = query.filter(Student.id > after_student_id)
+    query = query.order_by(Student.id)
+    if limit:
+        query = query.limit(limit)
+    return query.all()
+
+
+def _load_existing_recurring_charge_pairs(
+    db: Session,
+    charge_concept_ids: List[int],
+    target_year: int,
+    target_month: int,
+    student_ids: Optional[List[int]] = None
+) -> set:
+    """Pares (student_id, charge_concept_id) que ya tienen un cargo no anulado emitido en el mes."""
+    start_of_month, end_of_month = _month_bounds(target_year, target_month)
+    query = db.query(models.AppliedCharge.student_id, models.AppliedCharge.charge_concept_id).filter(
+        models.AppliedCharge.charge_concept_id.in_(charge_concept_ids),
+        models.AppliedCharge.issue_date >= start_of_month,
+        models.AppliedCharge.issue_date <= end_of_month,
+        models.AppliedCharge.status != models.AppliedChargeStatus.CANCELLED
+    )
+    if student_ids is not None:
+        query = query.filter(models.AppliedCharge.student_id.in_(student_ids))
+    return set(query.distinct().all())
+
+
+def _late_fee_penalty_concept_ids():
+    """Sub-consulta con los conceptos usados como recargo por mora: los motores de facturación nunca los generan."""
+    return select(models.LateFeeRule.penalty_charge_concept_id)
+
+
+def _load_recurring_charge_snapshot(
+    db: Session,
+    target_year: int,
+    target_month: int,
+    issue_date: date,
+    due_date: date,
+    specific_charge_concept_ids: Optional[List[int]] = None,
+    include_students: bool = True,
+    rates: Optional[Dict[models.Currency, Optional[float]]] = None
+) -> Dict[str, Any]:
+    """
+    Carga con pocas consultas todo lo necesario para calcular los cargos del mes:
+    conceptos mensuales, estudiantes activos, cargos ya emitidos en el mes, tasas de cambio
+    (una por moneda, en o antes de la fecha de emisión, salvo que se pasen en 'rates') y descuentos por hermanos.
+    Los conceptos usados para recargos por mora se excluyen aunque tengan frecuencia mensual.
+    Con include_students=False los estudiantes y cargos existentes se cargan aparte, por bloques.
+    El resultado solo contiene filas y valores simples (sin objetos de sesión).
+    """
+    ChargeConcept = models.ChargeConcept
+    concepts_query = db.query(
+        ChargeConcept.id, ChargeConcept.name, ChargeConcept.default_amount, ChargeConcept.default_amount_currency,
+        ChargeConcept.category, ChargeConcept.applicable_grade_level_id
+    ).filter(
+        ChargeConcept.is_active == True,
+        ChargeConcept.default_frequency == models.ChargeFrequency.MENSUAL,
+        ChargeConcept.id.not_in(_late_fee_penalty_concept_ids())
+    )
+    if specific_charge_concept_ids:
+        concepts_query = concepts_query.filter(ChargeConcept.id.in_(specific_charge_concept_ids))
+    concepts = concepts_query.order_by(ChargeConcept.id).all()
+
+    students = _load_recurring_charge_students(db) if include_students else []
+    existing_pairs = set()
+    if include_students and concepts and students:
+        existing_pairs = _load_existing_recurring_charge_pairs(db, [concept.id for concept in concepts], target_year, target_month)
+
+    if rates is None:
+        rates = {}
+        for currency in {concept.default_amount_currency for concept in concepts} - {models.Currency.VES}:
+            latest_rate = get_latest_exchange_rate(db, from_currency=currency, on_date=issue_date)
+            rates[currency] = latest_rate.rate if latest_rate and latest_rate.rate and latest_rate.rate > 0 else None
+
+    SiblingDiscountRule = models.SiblingDiscountRule
+    sibling_discount_rules = db.query(
+        SiblingDiscountRule.sibling_position, SiblingDiscountRule.discount_percentage, SiblingDiscountRule.applicable_category
+    ).filter(SiblingDiscountRule.is_active == True).all()
+
+    return {
+        "target_year": target_year,
+        "target_month": target_month,
+        "issue_date": issue_date,
+        "due_date": due_date,
+        "concepts": concepts,
+        "students": students,
+        "existing_pairs": existing_pairs,
+        "rates": rates,
+        "sibling_discount_rules": sibling_discount_rules,
+        "sibling_positions": get_student_sibling_positions(db) if sibling_discount_rules else {},
+    }
+
+
+def _months_between(start: date, end: date) -> int:
+    """Meses calendario de start a end, ambos incluidos."""
+    return (end.year - start.year) * 12 + end.month - start.month + 1
+
+
+def _proration_for_enrollment(
+    enrollment_date: Optional[date],
+    period_start: Optional[date],
+    period_end: Optional[date],
+    by_months: bool = False
+) -> Tuple[float, Optional[str]]:
+    """
+    Fracción del período [period_start, period_end] que corresponde a un estudiante según su fecha de ingreso:
+    por días (cargos mensuales) o por meses calendario completos desde el mes de ingreso (cargos anuales).
+    Retorna (factor, etiqueta): (1.0, None) si ingresó antes del período o no hay datos, (0.0, None) si ingresa después.
+    """
+    if enrollment_date is None or period_start is None or period_end is None or enrollment_date <= period_start:
+        return 1.0, None
+    if enrollment_date > period_end:
+        return 0.0, None
+    if by_months:
+        total, remaining, unit = _months_between(period_start, period_end), _months_between(enrollment_date, period_end), "meses"
+    else:
+        total, remaining, unit = (period_end - period_start).days + 1, (period_end - enrollment_date).days + 1, "días"
+    if remaining >= total:
+        return 1.0, None
+    return remaining / total, f"prorrateo {remaining}/{total} {unit}"
+
+
+def _price_charge_for_student(
+    student,
+    concept,
+    rate: Optional[float],
+    sibling_discount_pct: float = 0.0,
+    proration_factor: float = 1.0
+) -> Tuple[float, float]:
+    """
+    Monto de un cargo para un estudiante con la misma fórmula de create_applied_charge (conversión a VES,
+    beca sobre VES y reconversión a la moneda original), precedida del prorrateo por fecha de ingreso y del
+    descuento por hermanos en moneda original.
+    Retorna (amount_due_original_currency, amount_due_ves_at_emission).
+    """
+    base_amount = concept.default_amount if proration_factor >= 1 else round(concept.default_amount * proration_factor, 2)
+    amount_original = _apply_sibling_discount(base_amount, sibling_discount_pct)
+    amount_ves = round(amount_original * rate, 2) if rate else amount_original
+    amount_due_ves = _apply_scholarship(student=student, amount_to_apply_scholarship_on=amount_ves)
+    amount_due_original = round(amount_due_ves / rate, 2) if rate else amount_due_ves
+    return amount_due_original, amount_due_ves
+
+
+def _price_recurring_charge_concepts(snapshot: Dict[str, Any]) -> Tuple[List[Tuple[Any, bool, Optional[float]]], List[str]]:
+    """Conceptos facturables como (concepto, es_indexado, tasa) y errores de los omitidos por falta de tasa."""
+    priced_concepts = []
+    errors = []
+    for concept in snapshot["concepts"]:
+        is_indexed = concept.default_amount_currency != models.Currency.VES
+        rate = snapshot["rates"].get(concept.default_amount_currency) if is_indexed else None
+        if is_indexed and rate is None:
+            errors.append(
+                f"Concepto '{concept.name}' omitido: no hay tasa de cambio para {concept.default_amount_currency.value}->VES "
+                f"en o antes de {snapshot['issue_date']}. Por favor, registre una tasa."
+            )
+            continue
+        priced_concepts.append((concept, is_indexed, rate))
+    return priced_concepts, errors
+
+
+def _plan_recurring_charges(snapshot: Dict[str, Any], students: Optional[List[Any]] = None) -> Dict[str, Any]:
+    """
+    Calcula en memoria (sin consultas) las filas de AppliedCharge a insertar para los estudiantes dados
+    (por defecto todos los del snapshot). No depende de la sesión, así que puede ejecutarse por partes.
+    """
+    students = snapshot["students"] if students is None else students
+    target_month, target_year = snapshot["target_month"], snapshot["target_year"]
+    month_start, month_end = _month_bounds(target_year, target_month)
+    rows = []
+    duplicates_by_concept: Dict[int, int] = {}
+    sibling_discounts_applied = 0
+    prorated_charges = 0
+    students_not_yet_enrolled = 0
+
+    priced_concepts, errors = _price_recurring_charge_concepts(snapshot)
+    # calendar.month_name consulta el locale en cada acceso: la descripción se arma una vez por concepto
+    descriptions = {
+        concept.id: f"{concept.name} - {calendar.month_name[target_month]} {target_year}" for concept, _, _ in priced_concepts
+    }
+
+    for student in students:
+        # Ingreso dentro del mes: se cobran solo los días desde la fecha de ingreso
+        proration_factor, proration_label = _proration_for_enrollment(student.enrollment_date, month_start, month_end)
+        if proration_factor <= 0:
+            students_not_yet_enrolled += 1
+            continue
+        sibling_position = snapshot["sibling_positions"].get(student.id)
+        for concept, is_indexed, rate in priced_concepts:
+            if concept.applicable_grade_level_id is not None and concept.applicable_grade_level_id != student.grade_level_id:
+                continue
+            if (student.id, concept.id) in snapshot["existing_pairs"]:
+                duplicates_by_concept[concept.id] = duplicates_by_concept.get(concept.id, 0) + 1
+                continue
+
+            sibling_discount_pct = _sibling_discount_percentage(
+                snapshot["sibling_discount_rules"], sibling_position, concept.category
+            )
+            amount_due_original, amount_due_ves = _price_charge_for_student(
+                student, concept, rate, sibling_discount_pct, proration_factor
+            )
+            if sibling_discount_pct > 0:
+                sibling_discounts_applied += 1
+            if proration_label:
+                prorated_charges += 1
+            rows.append({
+                "student_id": student.id,
+                "charge_concept_id": concept.id,
+                "description": f"{descriptions[concept.id]} ({proration_label})" if proration_label else descriptions[concept.id],
+                "original_concept_amount": concept.default_amount,
+                "original_concept_currency": concept.default_amount_currency,
+                "amount_due_original_currency": amount_due_original,
+                "amount_paid_original_currency_equivalent": 0.0,
+                "is_indexed": is_indexed,
+                "amount_due_ves_at_emission": amount_due_ves,
+                "amount_paid_ves": 0.0,
+                "exchange_rate_applied_at_emission": rate,
+                "issue_date": snapshot["issue_date"],
+                "due_date": snapshot["due_date"],
+                "status": models.AppliedChargeStatus.PENDING,
+                "current_debt_ves": 0.0,
+                "billing_job_id": snapshot.get("billing_job_id"),
+            })
+
+    return {
+        "rows": rows,
+        "students_processed": len(students),
+        "duplicates_skipped": sum(duplicates_by_concept.values()),
+        "duplicates_by_concept": duplicates_by_concept,
+        "sibling_discounts_applied": sibling_discounts_applied,
+        "prorated_charges": prorated_charges,
+        "students_not_yet_enrolled": students_not_yet_enrolled,
+        "warnings": _recurring_charge_plan_warnings(snapshot, duplicates_by_concept, students_not_yet_enrolled),
+        "errors": errors,
+    }
+
+
+def _recurring_charge_plan_warnings(
+    snapshot: Dict[str, Any],
+    duplicates_by_concept: Dict[int, int],
+    students_not_yet_enrolled: int = 0
+) -> List[str]:
+    concept_names = {concept.id: concept.name for concept in snapshot["concepts"]}
+    warnings = [
+        f"{duplicates_count} cargo(s) duplicado(s) omitido(s) para el concepto '{concept_names[concept_id]}' "
+        f"en {snapshot['target_month']}-{snapshot['target_year']}."
+        for concept_id, duplicates_count in duplicates_by_concept.items()
+    ]
+    if students_not_yet_enrolled:
+        warnings.append(
+            f"{students_not_yet_enrolled} estudiante(s) omitido(s) por tener fecha de ingreso posterior a {snapshot['target_month']}-{snapshot['target_year']}."
+        )
+    return warnings
+
+
+# Por debajo de este número de estudiantes por proceso, arrancar el pool cuesta más de lo que ahorra
+RECURRING_CHARGE_MIN_STUDENTS_PER_WORKER = 2000
+
+
+def _shard_recurring_charge_students(students: List[Any], shards: int, shard_by: str = "id_range") -> List[List[Any]]:
+    """
+    Reparte los estudiantes en 'shards' grupos: por rangos contiguos de ID ('id_range') o por grado
+    ('grade_level', cada grado completo en un solo grupo, asignando primero los grados más grandes al grupo más liviano).
+    """
+    if shard_by == "grade_level":
+        students_by_grade: Dict[Optional[int], List[Any]] = {}
+        for student in students:
+            students_by_grade.setdefault(student.grade_level_id, []).append(student)
+        groups: List[List[Any]] = [[] for _ in range(shards)]
+        for grade_students in sorted(students_by_grade.values(), key=len, reverse=True):
+            min(groups, key=len).extend(grade_students)
+        return [group for group in groups if group]
+    if shard_by != "id_range":
+        raise ValueError(f"Criterio de reparto '{shard_by}' no válido. Use 'id_range' o 'grade_level'.")
+    ordered = sorted(students, key=lambda student: student.id)
+    shard_size = -(-len(ordered) // shards) if ordered else 1
+    return [ordered[start:start + shard_size] for start in range(0, len(ordered), shard_size)]
+
+
+def _plan_recurring_charges_shard(shard_snapshot: Dict[str, Any]) -> Dict[str, Any]:
+    """Punto de entrada de cada proceso del pool: solo calcula, nunca toca la base de datos."""
+    return _plan_recurring_charges(shard_snapshot)
+
+
+def _plan_recurring_charges_parallel(snapshot: Dict[str, Any], workers: int, shard_by: str = "id_range") -> Dict[str, Any]:
+    """
+    Igual que _plan_recurring_charges, pero reparte los estudiantes entre 'workers' procesos. Cada proceso recibe
+    una copia de solo lectura del snapshot reducida a sus estudiantes (cargos existentes y posiciones de hermanos)
+    y devuelve sus filas; el resultado combinado se inserta luego en un solo lote.
+    """
+    workers = max(1, min(workers, len(snapshot["students"]) // RECURRING_CHARGE_MIN_STUDENTS_PER_WORKER))
+    if workers <= 1:
+        return _plan_recurring_charges(snapshot)
+
+    shard_snapshots = []
+    for shard_students in _shard_recurring_charge_students(snapshot["students"], workers, shard_by):
+        shard_student_ids = {student.id for student in shard_students}
+        shard_snapshots.append({
+            **snapshot,
+            "students": shard_students,
+            "existing_pairs": {pair for pair in snapshot["existing_pairs"] if pair[0] in shard_student_ids},
+            "sibling_positions": {
+                student_id: position for student_id, position in snapshot["sibling_positions"].items() if student_id in shard_student_ids
+            },
+        })
+
+    with ProcessPoolExecutor(max_workers=len(shard_snapshots)) as executor:
+        shard_plans = list(executor.map(_plan_recurring_charges_shard, shard_snapshots))
+
+    duplicates_by_concept: Dict[int, int] = {}
+    students_not_yet_enrolled = sum(shard_plan["students_not_yet_enrolled"] for shard_plan in shard_plans)
+    for shard_plan in shard_plans:
+        for concept_id, duplicates_count in shard_plan["duplicates_by_concept"].items():
+            duplicates_by_concept[concept_id] = duplicates_by_concept.get(concept_id, 0) + duplicates_count
+    return {
+        "rows": [row for shard_plan in shard_plans for row in shard_plan["rows"]],
+        "students_processed": sum(shard_plan["students_processed"] for shard_plan in shard_plans),
+        "duplicates_skipped": sum(duplicates_by_concept.values()),
+        "duplicates_by_concept": duplicates_by_concept,
+        "sibling_discounts_applied": sum(shard_plan["sibling_discounts_applied"] for shard_plan in shard_plans),
+        "prorated_charges": sum(shard_plan["prorated_charges"] for shard_plan in shard_plans),
+        "students_not_yet_enrolled": students_not_yet_enrolled,
+        "warnings": _recurring_charge_plan_warnings(snapshot, duplicates_by_concept, students_not_yet_enrolled),
+        # Los errores de precios (tasas faltantes) son por concepto: iguales en todos los grupos
+        "errors": shard_plans[0]["errors"],
+    }
+
+
+def _bulk_insert_applied_charges(db: Session, rows: List[Dict[str, Any]]) -> List[int]:
+    """Inserta los cargos con INSERT ... RETURNING por bloques y actualiza deuda hoy y morosidad. No hace commit."""
+    new_ids = []
+    # Las filas con y sin tasa (conceptos en VES) van agrupadas: alternarlas impide agrupar el INSERT en lotes
+    rows = sorted(rows, key=lambda row: row["exchange_rate_applied_at_emission"] is None)
+    for chunk_start in range(0, len(rows), APPLIED_CHARGE_INSERT_CHUNK_SIZE):
+        chunk = rows[chunk_start:chunk_start + APPLIED_CHARGE_INSERT_CHUNK_SIZE]
+        new_ids.extend(db.execute(insert(models.AppliedCharge).returning(models.AppliedCharge.id), chunk).scalars().all())
+    if new_ids:
+        refresh_applied_charges_current_debt_ves(db, applied_charge_ids=new_ids)
+        refresh_student_delinquency(db, student_ids=list({row["student_id"] for row in rows}))
+    return new_ids
+
+
+def _representatives_with_available_credit(db: Session, representative_ids: List[int]) -> List[int]:
+    """Representantes (de la lista) con pagos no asignados por completo, en una sola consulta agrupada."""
+    if not representative_ids:
+        return []
+    allocated_by_payment = (
+        db.query(
+            models.PaymentAllocation.payment_id.label("payment_id"),
+            sql_func.sum(models.PaymentAllocation.amount_allocated_ves).label("allocated")
+        )
+        .group_by(models.PaymentAllocation.payment_id)
+        .subquery()
+    )
+    unallocated = models.Payment.amount_paid_ves_equivalent - sql_func.coalesce(allocated_by_payment.c.allocated, 0.0)
+    rows = (
+        db.query(models.Payment.representative_id)
+        .outerjoin(allocated_by_payment, allocated_by_payment.c.payment_id == models.Payment.id)
+        .filter(models.Payment.representative_id.in_(representative_ids))
+        .group_by(models.Payment.representative_id)
+        .having(sql_func.sum(case((unallocated > 0.001, unallocated), else_=0.0)) > 0.001)
+        .all()
+    )
+    return sorted(row.representative_id for row in rows)
+
+
+def _apply_credit_for_representatives(db: Session, representative_ids: List[int]) -> Tuple[List[Dict[str, Any]], List[str], List[str]]:
+    """Aplica el saldo a favor de cada representante con crédito disponible. Retorna (resumen, avisos, errores)."""
+    summaries, warnings, errors = [], [], []
+    for representative_id in _representatives_with_available_credit(db, representative_ids):
+        try:
+            credit_application_result = apply_representative_credit_to_pending_charges(db=db, representative_id=representative_id)
+        except HTTPException as e_http_credit:
+            errors.append(f"Error (HTTP {e_http_credit.status_code}) al aplicar saldo a favor para representante ID {representative_id}: {e_http_credit.detail}")
+            continue
+        except Exception as e_credit:
+            errors.append(f"Error inesperado al aplicar saldo a favor para representante ID {representative_id}: {str(e_credit)}")
+            continue
+        allocations_count = len(credit_application_result.get("allocations_made", []))
+        summaries.append({
+            "representative_id": representative_id,
+            "message": credit_application_result.get("message"),
+            "allocations_count": allocations_count,
+            "remaining_credit": credit_application_result.get("remaining_credit_after_process")
+        })
+        if allocations_count:
+            warnings.append(
+                f"INFO: Saldo a favor aplicado para representante ID {representative_id}. "
+                f"Asignaciones realizadas: {allocations_count}. "
+                f"Nuevo saldo a favor: {credit_application_result.get('remaining_credit_after_process', 'N/A')}"
+            )
+    return summaries, warnings, errors
+
+
 def run_generate_recurring_charges_process(
     db: Session,
     target_year: int,
     target_month: int,
     issue_date_override: Optional[date] = None,
     due_date_override: Optional[date] = None,
-    specific_charge_concept_ids: Optional[List[int]] = None
-) -> Dict[str, any]:
-
-    warnings_list = []
-    errors_list = [] 
-    charges_created_count = 0
-    students_processed_count = 0
-    # NUEVO: Para llevar un registro de los resultados de la aplicación de crédito
-    credit_applications_summary_list = [] 
-    
-    # 1. Determinar Fechas Clave (sin cambios)
-    # ...
+    specific_charge_concept_ids: Optional[List[int]] = None,
+    workers: int = 1,
+    shard_by: Literal["id_range", "grade_level"] = "id_range"
+) -> Dict[str, Any]:
+    """
+    Genera los cargos mensuales de todos los estudiantes activos en un solo paso por lotes:
+    carga los datos con pocas consultas, calcula los montos en memoria, inserta todos los cargos
+    nuevos en una transacción y luego aplica el saldo a favor de los representantes que lo tengan.
+    Con workers > 1 el cálculo se reparte entre procesos (ver _plan_recurring_charges_parallel).
+    """
+    target_period = f"{target_month:02d}-{target_year}"
     try:
-        charge_issue_date = issue_date_override if issue_date_override else date(target_year, target_month, 1)
-        # ... (resto de la lógica de fechas) ...
-        if due_date_override: # Esta parte de la lógica de fechas estaba incompleta en mi copia, la completo
-            charge_due_date = due_date_override
-        else:
-            school_config = get_school_configuration(db)
-            payment_day = school_config.payment_due_day if school_config and school_config.payment_due_day else 5
-            _, last_day_of_month = calendar.monthrange(target_year, target_month)
-            actual_due_day = min(payment_day, last_day_of_month)
-            charge_due_date = date(target_year, target_month, actual_due_day)
+        charge_issue_date, charge_due_date = _resolve_recurring_charge_dates(
+            db, target_year, target_month, issue_date_override, due_date_override
+        )
     except ValueError as e:
-        # ... (manejo de error de fecha) ...
         return {
             "message": "Proceso de generación de cargos falló debido a fechas inválidas.",
-            "target_period": f"{target_month:02d}-{target_year}",
+            "target_period": target_period,
             "students_processed": 0,
             "charges_created": 0,
             "warnings_and_omissions": [],
             "errors": [f"Error al determinar fechas para {target_month}-{target_year}: {e}"],
-            "credit_applications_summary": [] # Incluir el nuevo campo
+            "credit_applications_summary": []
         }
 
-
-    # 2. Obtener Conceptos de Cargo a Procesar (sin cambios)
-    # ...
-    query_charge_concepts = db.query(models.ChargeConcept).filter(
-        models.ChargeConcept.is_active == True,
-        models.ChargeConcept.default_frequency == models.ChargeFrequency.MENSUAL
+    snapshot = _load_recurring_charge_snapshot(
+        db, target_year, target_month, charge_issue_date, charge_due_date, specific_charge_concept_ids
     )
-    if specific_charge_concept_ids:
-        query_charge_concepts = query_charge_concepts.filter(models.ChargeConcept.id.in_(specific_charge_concept_ids))
-    applicable_charge_concepts = query_charge_concepts.all()
-
-    if not applicable_charge_concepts:
-        warnings_list.append(f"No se encontraron conceptos de cargo mensuales activos para procesar (o los IDs especificados no son válidos/activos/mensuales).")
-
-
-    # 3. Obtener Estudiantes Activos (sin cambios)
-    # ...
-    active_students = db.query(models.Student).options(joinedload(models.Student.representative)).filter(models.Student.is_active == True).all() # Añadido joinedload para representative
-    if not active_students:
+    if not snapshot["students"]:
         return {
             "message": "Proceso de generación de cargos completado. No se encontraron estudiantes activos.",
-            "target_period": f"{target_month:02d}-{target_year}",
+            "target_period": target_period,
             "students_processed": 0,
             "charges_created": 0,
             "warnings_and_omissions": ["No se encontraron estudiantes activos para procesar."],
             "errors": None,
-            "credit_applications_summary": [] # Incluir el nuevo campo
+            "credit_applications_summary": []
         }
 
-    # 4. Iterar y Crear Cargos Aplicados
-    processed_representatives_for_credit_application = set() # Para no procesar el crédito del mismo representante múltiples veces si tiene varios estudiantes
+    plan = _plan_recurring_charges_parallel(snapshot, workers, shard_by) if workers > 1 else _plan_recurring_charges(snapshot)
+    warnings_list = list(plan["warnings"])
+    errors_list = list(plan["errors"])
+    if not snapshot["concepts"]:
+        warnings_list.append("No se encontraron conceptos de cargo mensuales activos para procesar (o los IDs especificados no son válidos/activos/mensuales).")
 
-    for student in active_students:
-        students_processed_count += 1
-        student_charges_created_this_run = 0 # Contador de cargos creados para este estudiante en esta corrida
+    try:
+        new_charge_ids = _bulk_insert_applied_charges(db, plan["rows"])
+        db.commit()
+    except Exception as e_insert:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error al guardar los cargos generados: {str(e_insert)}")
+    if new_charge_ids:
+        invalidate_dashboard_cache()
+
+    # El saldo a favor solo se intenta aplicar a representantes con cargos nuevos y pagos sin asignar
+    representative_by_student = {student.id: student.representative_id for student in snapshot["students"]}
+    credit_summaries, credit_warnings, credit_errors = _apply_credit_for_representatives(
+        db, sorted({representative_by_student[row["student_id"]] for row in plan["rows"]})
+    )
+    warnings_list.extend(credit_warnings)
+    errors_list.extend(credit_errors)
 
-        for charge_concept in applicable_charge_concepts:
-            # ... (lógica existente para verificar aplicabilidad, duplicados, conversión de moneda, becas)
-            # ... (y creación de applied_charge_schema_in) ...
-            # Simulo la parte interna del bucle que ya tienes:
-            if charge_concept.applicable_grade_level_id is not None and \
-               charge_concept.applicable_grade_level_id != student.grade_level_id:
-                continue 
-            
-            start_of_month = date(target_year, target_month, 1)
-            # ... (lógica de end_of_month)
-            if target_month == 12:
-                end_of_month = date(target_year + 1, 1, 1) - timedelta(days=1)
-            else:
-                end_of_month = date(target_year, target_month + 1, 1) - timedelta(days=1)
+    return {
+        "message": "Proceso de generación de cargos y aplicación de saldos a favor completado.",
+        "target_period": target_period,
+        "students_processed": plan["students_processed"],
+        "charges_created": len(new_charge_ids),
+        "sibling_discounts_applied": plan["sibling_discounts_applied"],
+        "prorated_charges": plan["prorated_charges"],
+        "warnings_and_omissions": warnings_list,
+        "errors": errors_list if errors_list else None,
+        "credit_applications_summary": credit_summaries
+    }
 
 
-            existing_applied_charge = db.query(models.AppliedCharge).filter(
-                models.AppliedCharge.student_id == student.id,
-                models.AppliedCharge.charge_concept_id == charge_concept.id,
-                models.AppliedCharge.issue_date >= start_of_month,
-                models.AppliedCharge.issue_date <= end_of_month,
-                models.AppliedCharge.status != models.AppliedChargeStatus.CANCELLED
-            ).first()
+# --- Generación de cargos adeudados por frecuencia (mensual, quincenal, anual y único) ---
 
-            if existing_applied_charge:
-                warnings_list.append(
-                    f"Cargo duplicado omitido para Estudiante ID {student.id}, Concepto ID {charge_concept.id} para {target_month}-{target_year}."
-                )
+SCHEDULABLE_CHARGE_FREQUENCIES = [
+    models.ChargeFrequency.MENSUAL,
+    models.ChargeFrequency.QUINCENAL,
+    models.ChargeFrequency.ANUAL,
+    models.ChargeFrequency.UNICO,
+]
+
+
+def _charge_period_for_frequency(
+    frequency: models.ChargeFrequency,
+    on_date: date,
+    school_config: Optional[models.SchoolConfiguration]
+) -> Optional[Dict[str, Any]]:
+    """
+    Período de facturación vigente en on_date para una frecuencia, como {"key", "start", "end", "label", "by_months"}.
+    Un cargo no anulado del concepto emitido dentro de [start, end] es el cargo del período (UNICO: emitido en
+    cualquier fecha, start y end son None). Las quincenas son 1-15 y 16-fin de mes; el año es el período escolar
+    configurado. Retorna None si no hay período calculable (OTRO, o ANUAL sin período escolar vigente).
+    """
+    if frequency == models.ChargeFrequency.MENSUAL:
+        start, end = _month_bounds(on_date.year, on_date.month)
+        return {
+            "key": f"{start:%Y-%m}", "start": start, "end": end,
+            "label": f"{calendar.month_name[on_date.month]} {on_date.year}", "by_months": False,
+        }
+    if frequency == models.ChargeFrequency.QUINCENAL:
+        month_start, month_end = _month_bounds(on_date.year, on_date.month)
+        fortnight = 1 if on_date.day <= 15 else 2
+        start, end = (month_start, month_start.replace(day=15)) if fortnight == 1 else (month_start.replace(day=16), month_end)
+        return {
+            "key": f"{start:%Y-%m}-Q{fortnight}", "start": start, "end": end,
+            "label": f"{'1ra' if fortnight == 1 else '2da'} quincena {calendar.month_name[on_date.month]} {on_date.year}",
+            "by_months": False,
+        }
+    if frequency == models.ChargeFrequency.ANUAL:
+        start = school_config.current_period_start_date if school_config else None
+        end = school_config.current_period_end_date if school_config else None
+        if not start or not end or not (start <= on_date <= end):
+            return None
+        return {
+            "key": f"{start:%Y}-{end:%Y}", "start": start, "end": end,
+            "label": school_config.current_period_name or f"Período {start.year}-{end.year}", "by_months": True,
+        }
+    if frequency == models.ChargeFrequency.UNICO:
+        return {"key": "unico", "start": None, "end": None, "label": None, "by_months": False}
+    return None
+
+
+def _load_due_charge_snapshot(
+    db: Session,
+    on_date: date,
+    specific_charge_concept_ids: Optional[List[int]] = None
+) -> Dict[str, Any]:
+    """
+    Carga con pocas consultas todo lo necesario para calcular los cargos adeudados en on_date: conceptos activos
+    con su período vigente, estudiantes activos, los pares (estudiante, concepto) que ya tienen el cargo de su período
+    (una sola consulta para todas las frecuencias), tasas de cambio a la fecha y descuentos por hermanos.
+    Los conceptos usados para recargos por mora nunca se generan aquí.
+    """
+    school_config = get_school_configuration(db)
+    payment_day = school_config.payment_due_day if school_config and school_config.payment_due_day else 5
+
+    ChargeConcept = models.ChargeConcept
+    concepts_query = db.query(
+        ChargeConcept.id, ChargeConcept.name, ChargeConcept.default_amount, ChargeConcept.default_amount_currency,
+        ChargeConcept.default_frequency, ChargeConcept.category, ChargeConcept.applicable_grade_level_id
+    ).filter(ChargeConcept.is_active == True, ChargeConcept.id.not_in(_late_fee_penalty_concept_ids()))
+    if specific_charge_concept_ids:
+        concepts_query = concepts_query.filter(ChargeConcept.id.in_(specific_charge_concept_ids))
+
+    concepts, periods, warnings = [], {}, []
+    for concept in concepts_query.order_by(ChargeConcept.id).all():
+        period = _charge_period_for_frequency(concept.default_frequency, on_date, school_config)
+        if period is None:
+            reason = (
+                "no hay un período escolar vigente configurado" if concept.default_frequency == models.ChargeFrequency.ANUAL
+                else f"la frecuencia '{concept.default_frequency.value}' no tiene un período calculable; aplíquelo como cargo global"
+            )
+            warnings.append(f"Concepto '{concept.name}' omitido: {reason}.")
+            continue
+        # Emisión al inicio del período (UNICO: en la fecha de la corrida); vencimiento el día de pago configurado
+        issue_date = period["start"] or on_date
+        period["issue_date"] = issue_date
+        period["due_date"] = min(issue_date + timedelta(days=payment_day - 1), period["end"] or date.max)
+        periods[concept.id] = period
+        concepts.append(concept)
+
+    students = _load_recurring_charge_students(db)
+    existing_pairs = set()
+    if concepts and students:
+        # Una condición por período distinto: todas las frecuencias se deduplican en la misma consulta
+        concept_ids_by_bounds: Dict[Tuple[Optional[date], Optional[date]], List[int]] = {}
+        for concept in concepts:
+            concept_ids_by_bounds.setdefault((periods[concept.id]["start"], periods[concept.id]["end"]), []).append(concept.id)
+        AppliedCharge = models.AppliedCharge
+        period_conditions = [
+            and_(AppliedCharge.charge_concept_id.in_(concept_ids), AppliedCharge.issue_date >= start, AppliedCharge.issue_date <= end)
+            if start is not None else AppliedCharge.charge_concept_id.in_(concept_ids)
+            for (start, end), concept_ids in concept_ids_by_bounds.items()
+        ]
+        existing_pairs = set(db.query(AppliedCharge.student_id, AppliedCharge.charge_concept_id).filter(
+            or_(*period_conditions),
+            AppliedCharge.status != models.AppliedChargeStatus.CANCELLED
+        ).distinct().all())
+
+    rates = {}
+    for currency in {concept.default_amount_currency for concept in concepts} - {models.Currency.VES}:
+        latest_rate = get_latest_exchange_rate(db, from_currency=currency, on_date=on_date)
+        rates[currency] = latest_rate.rate if latest_rate and latest_rate.rate and latest_rate.rate > 0 else None
+
+    SiblingDiscountRule = models.SiblingDiscountRule
+    sibling_discount_rules = db.query(
+        SiblingDiscountRule.sibling_position, SiblingDiscountRule.discount_percentage, SiblingDiscountRule.applicable_category
+    ).filter(SiblingDiscountRule.is_active == True).all()
+
+    return {
+        "on_date": on_date,
+        "issue_date": on_date,
+        "concepts": concepts,
+        "periods": periods,
+        "students": students,
+        "existing_pairs": existing_pairs,
+        "rates": rates,
+        "sibling_discount_rules": sibling_discount_rules,
+        "sibling_positions": get_student_sibling_positions(db) if sibling_discount_rules else {},
+        "warnings": warnings,
+    }
+
+
+def _plan_due_charges(snapshot: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Calcula en memoria (sin consultas) los cargos adeudados en la fecha del snapshot: uno por estudiante y concepto
+    aplicable cuyo período vigente aún no tenga cargo. Los cargos periódicos se prorratean por fecha de ingreso
+    (por días en mensual y quincenal, por meses en anual) y se omiten si el estudiante ingresa después del período.
+    """
+    on_date = snapshot["on_date"]
+    rows = []
+    charges_by_frequency: Dict[str, int] = {}
+    duplicates_skipped = 0
+    sibling_discounts_applied = 0
+    prorated_charges = 0
+    not_yet_enrolled_skipped = 0
+
+    priced_concepts, errors = _price_recurring_charge_concepts(snapshot)
+    descriptions = {}
+    for concept, _, _ in priced_concepts:
+        period_label = snapshot["periods"][concept.id]["label"]
+        descriptions[concept.id] = f"{concept.name} - {period_label}" if period_label else concept.name
+
+    for student in snapshot["students"]:
+        sibling_position = snapshot["sibling_positions"].get(student.id)
+        for concept, is_indexed, rate in priced_concepts:
+            if concept.applicable_grade_level_id is not None and concept.applicable_grade_level_id != student.grade_level_id:
+                continue
+            if (student.id, concept.id) in snapshot["existing_pairs"]:
+                duplicates_skipped += 1
                 continue
 
-            try:
-                amount_after_conversion_ves, rate_applied_value = _calculate_converted_amount_ves(
-                    db=db,
-                    original_amount=charge_concept.default_amount,
-                    original_currency=charge_concept.default_amount_currency,
-                    rate_date=charge_issue_date
-                )
-                final_amount_due_ves = _apply_scholarship(
-                    student=student,
-                    amount_to_apply_scholarship_on=amount_after_conversion_ves
-                )
-            except HTTPException as e:
-                error_detail = f"Error al pre-calcular cargo para Estudiante ID {student.id}, Concepto '{charge_concept.name}': {e.detail}"
-                errors_list.append(error_detail)
-                warnings_list.append(error_detail)
+            period = snapshot["periods"][concept.id]
+            # UNICO no se prorratea: solo se exige que el estudiante ya haya ingresado en la fecha de la corrida
+            proration_factor, proration_label = _proration_for_enrollment(
+                student.enrollment_date, period["start"] or on_date, period["end"] or on_date, by_months=period["by_months"]
+            )
+            if proration_factor <= 0:
+                not_yet_enrolled_skipped += 1
                 continue
 
-            applied_charge_schema_in = schemas.AppliedChargeCreate(
-                student_id=student.id,
-                charge_concept_id=charge_concept.id,
-                description=f"{charge_concept.name} - {calendar.month_name[target_month]} {target_year}",
-                issue_date=charge_issue_date,
-                due_date=charge_due_date,
-                status=models.AppliedChargeStatus.PENDING,
-                amount_due_ves=final_amount_due_ves,
-                original_concept_amount=charge_concept.default_amount,
-                original_concept_currency=charge_concept.default_amount_currency,
-                exchange_rate_applied=rate_applied_value
+            sibling_discount_pct = _sibling_discount_percentage(
+                snapshot["sibling_discount_rules"], sibling_position, concept.category
             )
-            
-            try:
-                # create_applied_charge hace commit internamente. Esto está bien.
-                new_charge = create_applied_charge(db=db, applied_charge_in=applied_charge_schema_in)
-                if new_charge:
-                    charges_created_count += 1
-                    student_charges_created_this_run +=1
-            except Exception as e_create:
-                errors_list.append(
-                    f"Error al crear cargo para Estudiante ID {student.id}, Concepto '{charge_concept.name}': {str(e_create)}"
-                )
-        # FIN DEL BUCLE DE CHARGE_CONCEPTS PARA UN ESTUDIANTE
-
-        # --- NUEVA SECCIÓN: Aplicar Crédito Disponible del Representante ---
-        # Se ejecuta después de que todos los cargos del mes para ESE estudiante se hayan intentado crear (y commiteado individualmente).
-        # Solo procesamos el crédito para un representante una vez por corrida del proceso masivo.
-        if student.representative_id and student.representative_id not in processed_representatives_for_credit_application:
-            # Verificamos si se crearon cargos para este estudiante en esta corrida o si ya tenía cargos pendientes
-            # Esto es para optimizar y no llamar a apply_representative_credit si no hay nada nuevo o pendiente relevante.
-            # Sin embargo, la función apply_representative_credit_to_pending_charges ya verifica si hay cargos pendientes.
-            # Así que podemos llamarla directamente.
-
-            warnings_list.append(f"INFO: Intentando aplicar saldo a favor para representante ID {student.representative_id} (asociado al estudiante ID {student.id}).")
-            try:
-                # Llamamos a la función que implementamos en el paso anterior
-                credit_application_result = apply_representative_credit_to_pending_charges(
-                    db=db,
-                    representative_id=student.representative_id
-                )
-                # Guardamos el resumen de esta aplicación de crédito
-                summary_entry = {
-                    "representative_id": student.representative_id,
-                    "message": credit_application_result.get("message"),
-                    "allocations_count": len(credit_application_result.get("allocations_made", [])),
-                    "remaining_credit": credit_application_result.get("remaining_credit_after_process")
-                }
-                credit_applications_summary_list.append(summary_entry)
+            amount_due_original, amount_due_ves = _price_charge_for_student(
+                student, concept, rate, sibling_discount_pct, proration_factor
+            )
+            if sibling_discount_pct > 0:
+                sibling_discounts_applied += 1
+            if proration_label:
+                prorated_charges += 1
+            frequency = concept.default_frequency.value
+            charges_by_frequency[frequency] = charges_by_frequency.get(frequency, 0) + 1
+            rows.append({
+                "student_id": student.id,
+                "charge_concept_id": concept.id,
+                "description": f"{descriptions[concept.id]} ({proration_label})" if proration_label else descriptions[concept.id],
+                "original_concept_amount": concept.default_amount,
+                "original_concept_currency": concept.default_amount_currency,
+                "amount_due_original_currency": amount_due_original,
+                "amount_paid_original_currency_equivalent": 0.0,
+                "is_indexed": is_indexed,
+                "amount_due_ves_at_emission": amount_due_ves,
+                "amount_paid_ves": 0.0,
+                "exchange_rate_applied_at_emission": rate,
+                "issue_date": period["issue_date"],
+                "due_date": period["due_date"],
+                "status": models.AppliedChargeStatus.PENDING,
+                "current_debt_ves": 0.0,
+            })
 
-                if credit_application_result.get("allocations_made"):
-                     warnings_list.append(
-                        f"INFO: Saldo a favor aplicado para representante ID {student.representative_id}. "
-                        f"Asignaciones realizadas: {len(credit_application_result['allocations_made'])}. "
-                        f"Nuevo saldo a favor: {credit_application_result.get('remaining_credit_after_process', 'N/A')}"
-                    )
+    warnings = list(snapshot["warnings"])
+    if duplicates_skipped:
+        warnings.append(f"{duplicates_skipped} cargo(s) omitido(s) por existir ya en su período.")
+    if not_yet_enrolled_skipped:
+        warnings.append(f"{not_yet_enrolled_skipped} cargo(s) omitido(s) por fecha de ingreso posterior al período.")
+    return {
+        "rows": rows,
+        "students_processed": len(snapshot["students"]),
+        "charges_by_frequency": charges_by_frequency,
+        "duplicates_skipped": duplicates_skipped,
+        "sibling_discounts_applied": sibling_discounts_applied,
+        "prorated_charges": prorated_charges,
+        "warnings": warnings,
+        "errors": errors,
+    }
+
+
+def run_generate_due_charges_process(
+    db: Session,
+    on_date: Optional[date] = None,
+    specific_charge_concept_ids: Optional[List[int]] = None,
+    dry_run: bool = False
+) -> Dict[str, Any]:
+    """
+    Genera todos los cargos adeudados en on_date (por defecto, hoy) para los conceptos activos de frecuencia mensual,
+    quincenal, anual y única: un cargo por estudiante y período vigente del concepto (ver _charge_period_for_frequency).
+    Repetirlo en el mismo período no duplica cargos, así que puede programarse a diario. Carga los datos con pocas
+    consultas, calcula en memoria, inserta todo en una sola transacción y luego aplica el saldo a favor.
+    Con dry_run=True solo informa lo que crearía.
+    """
+    processing_date = on_date or get_current_venezuelan_date_for_crud()
+    snapshot = _load_due_charge_snapshot(db, processing_date, specific_charge_concept_ids)
+    plan = _plan_due_charges(snapshot)
+    warnings_list = list(plan["warnings"])
+    errors_list = list(plan["errors"])
+    result = {
+        "as_of_date": processing_date,
+        "dry_run": dry_run,
+        "periods": {str(concept_id): period["key"] for concept_id, period in snapshot["periods"].items()},
+        "students_processed": plan["students_processed"],
+        "charges_created": len(plan["rows"]),
+        "charges_by_frequency": plan["charges_by_frequency"],
+        "duplicates_skipped": plan["duplicates_skipped"],
+        "sibling_discounts_applied": plan["sibling_discounts_applied"],
+        "prorated_charges": plan["prorated_charges"],
+        "credit_applications_summary": [],
+    }
+    if not snapshot["concepts"]:
+        warnings_list.append("No se encontraron conceptos activos con un período de facturación vigente.")
+    if dry_run:
+        result.update({
+            "message": f"Simulación completada: se crearían {len(plan['rows'])} cargo(s) al {processing_date}.",
+            "warnings_and_omissions": warnings_list,
+            "errors": errors_list if errors_list else None,
+        })
+        return result
+
+    try:
+        new_charge_ids = _bulk_insert_applied_charges(db, plan["rows"])
+        db.commit()
+    except Exception as e_insert:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error al guardar los cargos generados: {str(e_insert)}")
+    if new_charge_ids:
+        invalidate_dashboard_cache()
+
+    representative_by_student = {student.id: student.representative_id for student in snapshot["students"]}
+    credit_summaries, credit_warnings, credit_errors = _apply_credit_for_representatives(
+        db, sorted({representative_by_student[row["student_id"]] for row in plan["rows"]})
+    )
+    warnings_list.extend(credit_warnings)
+    errors_list.extend(credit_errors)
+    result.update({
+        "message": f"Generación de cargos adeudados al {processing_date} completada.",
+        "charges_created": len(new_charge_ids),
+        "warnings_and_omissions": warnings_list,
+        "errors": errors_list if errors_list else None,
+        "credit_applications_summary": credit_summaries,
+    })
+    return result
+
+# --- Trabajos de facturación en segundo plano (reanudables) ---
+
+BILLING_JOB_DEFAULT_CHUNK_SIZE = 500
+BILLING_JOB_STALE_AFTER_SECONDS = 300 # Un trabajo "running" sin confirmar bloques en este tiempo se considera caído
+BILLING_JOB_MAX_MESSAGES = 200
+
+
+def get_billing_job(db: Session, job_id: int) -> Optional[models.BillingJob]:
+    return db.query(models.BillingJob).filter(models.BillingJob.id == job_id).first()
+
+
+def get_billing_jobs(db: Session, skip: int = 0, limit: int = 20) -> Dict[str, Any]:
+    query = db.query(models.BillingJob)
+    total = query.count()
+    items = query.order_by(models.BillingJob.id.desc()).offset(skip).limit(limit).all()
+    return {
+        "items": items,
+        "total": total,
+        "page": (skip // limit) + 1 if limit > 0 else 1,
+        "pages": (total + limit - 1) // limit if limit > 0 else 1,
+        "limit": limit
+    }
+
+
+def _is_billing_job_stale(job: models.BillingJob) -> bool:
+    last_activity = job.heartbeat_at or job.started_at or job.created_at
+    if last_activity is None:
+        return True
+    if last_activity.tzinfo is None: # SQLite devuelve fechas sin zona horaria
+        last_activity = last_activity.replace(tzinfo=pytz.utc)
+    return (datetime.now(pytz.utc) - last_activity).total_seconds() > BILLING_JOB_STALE_AFTER_SECONDS
+
+
+def is_billing_job_resumable(job: models.BillingJob) -> bool:
+    """
+    Fallido, o pendiente / 'running' sin actividad en BILLING_JOB_STALE_AFTER_SECONDS (el proceso que lo
+    ejecutaba se cayó). Un trabajo pendiente recién creado no es reanudable: su tarea en segundo plano aún puede estar por iniciar.
+    """
+    if job.status == models.BillingJobStatus.FAILED:
+        return True
+    return job.status in (models.BillingJobStatus.PENDING, models.BillingJobStatus.RUNNING) and _is_billing_job_stale(job)
+
+
+def get_resumable_billing_jobs(db: Session) -> List[models.BillingJob]:
+    jobs = db.query(models.BillingJob).filter(models.BillingJob.status.in_([
+        models.BillingJobStatus.PENDING, models.BillingJobStatus.RUNNING, models.BillingJobStatus.FAILED
+    ])).order_by(models.BillingJob.id).all()
+    return [job for job in jobs if is_billing_job_resumable(job)]
+
+
+def _claim_billing_job(db: Session, job_id: int) -> bool:
+    """
+    Toma el trabajo con un UPDATE condicional (pendiente, fallido, o 'running' con latido vencido) y confirma.
+    Si otro proceso ya lo tomó, el UPDATE no afecta filas y se devuelve False: solo un ejecutor procesa cada bloque.
+    """
+    BillingJob = models.BillingJob
+    now_utc = datetime.now(pytz.utc)
+    stale_cutoff = now_utc - timedelta(seconds=BILLING_JOB_STALE_AFTER_SECONDS)
+    claimed = db.execute(
+        update(BillingJob)
+        .where(
+            BillingJob.id == job_id,
+            or_(
+                BillingJob.status.in_([models.BillingJobStatus.PENDING, models.BillingJobStatus.FAILED]),
+                and_(BillingJob.status == models.BillingJobStatus.RUNNING, BillingJob.heartbeat_at < stale_cutoff)
+            )
+        )
+        .values(
+            status=models.BillingJobStatus.RUNNING,
+            heartbeat_at=now_utc,
+            error_message=None
+        )
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return claimed > 0
+
+
+def create_recurring_charges_job(
+    db: Session,
+    params: schemas.GenerateChargesRequest,
+    user_id: Optional[int] = None,
+    chunk_size: int = BILLING_JOB_DEFAULT_CHUNK_SIZE
+) -> models.BillingJob:
+    """
+    Registra un trabajo de generación mensual para ejecutarse en segundo plano.
+    Lanza ValueError si las fechas son inválidas o si ya hay un trabajo sin terminar para el mismo mes.
+    """
+    charge_issue_date, charge_due_date = _resolve_recurring_charge_dates(
+        db, params.target_year, params.target_month, params.issue_date_override, params.due_date_override
+    )
+    unfinished_job = db.query(models.BillingJob).filter(
+        models.BillingJob.job_type == "recurring_charges",
+        models.BillingJob.target_year == params.target_year,
+        models.BillingJob.target_month == params.target_month,
+        models.BillingJob.status.in_([models.BillingJobStatus.PENDING, models.BillingJobStatus.RUNNING, models.BillingJobStatus.FAILED])
+    ).first()
+    if unfinished_job:
+        raise ValueError(
+            f"Ya existe el trabajo de facturación ID {unfinished_job.id} sin terminar para {params.target_month:02d}-{params.target_year} "
+            f"(estado: {unfinished_job.status.value}). Reanúdelo en lugar de crear uno nuevo."
+        )
+
+    db_job = models.BillingJob(
+        job_type="recurring_charges",
+        status=models.BillingJobStatus.PENDING,
+        target_year=params.target_year,
+        target_month=params.target_month,
+        issue_date=charge_issue_date,
+        due_date=charge_due_date,
+        charge_concept_ids_json=json.dumps(params.charge_concept_ids) if params.charge_concept_ids else None,
+        chunk_size=chunk_size,
+        total_students=db.query(sql_func.count(models.Student.id)).filter(models.Student.is_active == True).scalar() or 0,
+        created_by_user_id=user_id
+    )
+    db.add(db_job)
+    db.commit()
+    db.refresh(db_job)
+    return db_job
+
+
+def _append_billing_job_messages(job: models.BillingJob, messages: List[str]) -> None:
+    if not messages:
+        return
+    stored = json.loads(job.messages_json) if job.messages_json else []
+    stored.extend(messages)
+    job.messages_json = json.dumps(stored[-BILLING_JOB_MAX_MESSAGES:], ensure_ascii=False)
+
+
+def run_billing_job(db: Session, job_id: int) -> Optional[models.BillingJob]:
+    """
+    Ejecuta (o reanuda) un trabajo de generación mensual por bloques de estudiantes.
+    Cada bloque inserta sus cargos y avanza el punto de control (último estudiante procesado) en el mismo commit,
+    así que tras una caída se retoma desde el bloque siguiente sin duplicar cargos.
+    Las tasas de cambio se resuelven al iniciar y se guardan en el trabajo para que una reanudación use las mismas.
+    Los errores inesperados dejan el trabajo en estado FAILED (no se relanzan).
+    Si otro proceso ya lo tiene tomado, se devuelve el trabajo sin ejecutarlo.
+    """
+    if not _claim_billing_job(db, job_id):
+        # Completado, inexistente, o lo está ejecutando otro proceso (tarea en segundo plano, reanudación o cron)
+        return get_billing_job(db, job_id)
+    job = get_billing_job(db, job_id)
+    if job.started_at is None:
+        job.started_at = job.heartbeat_at
+        db.commit()
+
+    try:
+        concept_ids = json.loads(job.charge_concept_ids_json) if job.charge_concept_ids_json else None
+        stored_rates = json.loads(job.exchange_rates_json) if job.exchange_rates_json else None
+        snapshot = _load_recurring_charge_snapshot(
+            db, job.target_year, job.target_month, job.issue_date, job.due_date, concept_ids,
+            include_students=False,
+            rates={models.Currency(code): rate for code, rate in stored_rates.items()} if stored_rates is not None else None
+        )
+        snapshot["billing_job_id"] = job.id
+        if stored_rates is None:
+            job.exchange_rates_json = json.dumps({currency.value: rate for currency, rate in snapshot["rates"].items()})
+            _, concept_errors = _price_recurring_charge_concepts(snapshot)
+            if not snapshot["concepts"]:
+                concept_errors.append("No se encontraron conceptos de cargo mensuales activos para procesar.")
+            job.errors_count += len(concept_errors)
+            _append_billing_job_messages(job, concept_errors)
+            db.commit()
+        concept_ids_to_check = [concept.id for concept in snapshot["concepts"]]
+
+        while snapshot["concepts"]:
+            students_chunk = _load_recurring_charge_students(db, after_student_id=job.last_processed_student_id, limit=job.chunk_size)
+            if not students_chunk:
+                break
+            snapshot["existing_pairs"] = _load_existing_recurring_charge_pairs(
+                db, concept_ids_to_check, job.target_year, job.target_month,
+                student_ids=[student.id for student in students_chunk]
+            )
+            plan = _plan_recurring_charges(snapshot, students_chunk)
+            new_charge_ids = _bulk_insert_applied_charges(db, plan["rows"])
+
+            job.processed_students += plan["students_processed"]
+            job.charges_created += len(new_charge_ids)
+            job.duplicates_skipped += plan["duplicates_skipped"]
+            job.last_processed_student_id = students_chunk[-1].id
+            job.heartbeat_at = datetime.now(pytz.utc)
+            db.commit()
+
+        if job.charges_created:
+            invalidate_dashboard_cache()
+        representative_ids = [row.representative_id for row in db.query(models.Student.representative_id).join(
+            models.AppliedCharge, models.AppliedCharge.student_id == models.Student.id
+        ).filter(models.AppliedCharge.billing_job_id == job.id).distinct().all()]
+        _, credit_warnings, credit_errors = _apply_credit_for_representatives(db, representative_ids)
+
+        job = get_billing_job(db, job_id)
+        job.errors_count += len(credit_errors)
+        _append_billing_job_messages(job, credit_warnings + credit_errors)
+        job.status = models.BillingJobStatus.COMPLETED
+        job.finished_at = datetime.now(pytz.utc)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"ERROR:    Trabajo de facturación ID {job_id} falló: {e}")
+        job = get_billing_job(db, job_id)
+        job.status = models.BillingJobStatus.FAILED
+        job.error_message = str(e)
+        job.errors_count += 1
+        db.commit()
+    db.refresh(job)
+    return job
+
+
+# --- Reversión de corridas de facturación ---
+
+
+def rollback_billing_run(
+    db: Session,
+    billing_job_id: Optional[int] = None,
+    charge_concept_id: Optional[int] = None,
+    issue_date_from: Optional[date] = None,
+    issue_date_to: Optional[date] = None,
+    dry_run: bool = False
+) -> Dict[str, Any]:
+    """
+    Anula todos los cargos de una corrida (por trabajo de facturación, o por concepto y rango de fechas de emisión),
+    junto con los recargos por mora que generaron. Borra sus asignaciones de pago para que el monto vuelva a quedar
+    disponible en los pagos (saldo a favor), dejando copia en PaymentAllocationReversal para los saldos a fechas
+    anteriores, y recalcula deuda y morosidad, todo en una transacción.
+    Los cargos ya facturados se omiten: deben revertirse con una nota de crédito.
+    Lanza ValueError si el alcance es incompleto.
+    """
+    AppliedCharge, PaymentAllocation = models.AppliedCharge, models.PaymentAllocation
+    if billing_job_id is not None:
+        scope_filters = [AppliedCharge.billing_job_id == billing_job_id]
+        scope_description = f"trabajo de facturación ID {billing_job_id}"
+    elif charge_concept_id is not None and issue_date_from is not None and issue_date_to is not None:
+        if issue_date_to < issue_date_from:
+            raise ValueError("La fecha final del rango no puede ser anterior a la inicial.")
+        scope_filters = [
+            AppliedCharge.charge_concept_id == charge_concept_id,
+            AppliedCharge.issue_date >= issue_date_from,
+            AppliedCharge.issue_date <= issue_date_to,
+        ]
+        scope_description = f"concepto ID {charge_concept_id} emitido entre {issue_date_from} y {issue_date_to}"
+    else:
+        raise ValueError("Indique un trabajo de facturación, o un concepto con su rango de fechas de emisión.")
+
+    charges = db.query(AppliedCharge.id, AppliedCharge.student_id, AppliedCharge.invoice_id).filter(
+        *scope_filters, AppliedCharge.status != models.AppliedChargeStatus.CANCELLED
+    ).all()
+    skipped_invoiced = sum(1 for charge in charges if charge.invoice_id is not None)
+    charge_ids = [charge.id for charge in charges if charge.invoice_id is None]
+    penalties = []
+    for chunk_start in range(0, len(charge_ids), APPLIED_CHARGE_INSERT_CHUNK_SIZE):
+        penalties.extend(db.query(AppliedCharge.id, AppliedCharge.student_id).filter(
+            AppliedCharge.source_applied_charge_id.in_(charge_ids[chunk_start:chunk_start + APPLIED_CHARGE_INSERT_CHUNK_SIZE]),
+            AppliedCharge.status != models.AppliedChargeStatus.CANCELLED,
+            AppliedCharge.invoice_id.is_(None)
+        ).all())
+    charge_ids.extend(penalty.id for penalty in penalties)
+    student_ids = list({charge.student_id for charge in charges if charge.invoice_id is None} | {penalty.student_id for penalty in penalties})
+
+    allocations_deleted = 0
+    credit_returned_ves = 0.0
+    payment_ids = set()
+    for chunk_start in range(0, len(charge_ids), APPLIED_CHARGE_INSERT_CHUNK_SIZE):
+        chunk_ids = charge_ids[chunk_start:chunk_start + APPLIED_CHARGE_INSERT_CHUNK_SIZE]
+        for payment_id, allocations_count, allocated_ves in db.query(
+            PaymentAllocation.payment_id, sql_func.count(PaymentAllocation.id), sql_func.sum(PaymentAllocation.amount_allocated_ves)
+        ).filter(PaymentAllocation.applied_charge_id.in_(chunk_ids)).group_by(PaymentAllocation.payment_id):
+            payment_ids.add(payment_id)
+            allocations_deleted += allocations_count
+            credit_returned_ves += allocated_ves or 0.0
+        # Se conserva una copia de cada asignación borrada para que los saldos a fechas anteriores no cambien
+        db.execute(insert(models.PaymentAllocationReversal).from_select(
+            ["payment_id", "applied_charge_id", "amount_allocated_ves", "allocated_at", "reason"],
+            select(
+                PaymentAllocation.payment_id, PaymentAllocation.applied_charge_id, PaymentAllocation.amount_allocated_ves,
+                PaymentAllocation.created_at, literal(f"Reversión del {scope_description}"[:255])
+            ).where(PaymentAllocation.applied_charge_id.in_(chunk_ids))
+        ))
+        db.execute(delete(PaymentAllocation).where(PaymentAllocation.applied_charge_id.in_(chunk_ids)).execution_options(synchronize_session=False))
+        db.execute(
+            update(AppliedCharge)
+            .where(AppliedCharge.id.in_(chunk_ids))
+            .values(
+                status=models.AppliedChargeStatus.CANCELLED, cancelled_at=sql_func.now(),
+                amount_paid_ves=0.0, amount_paid_original_currency_equivalent=0.0
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    representatives_affected = 0
+    if payment_ids:
+        representatives_affected = db.query(sql_func.count(sql_func.distinct(models.Payment.representative_id))).filter(
+            models.Payment.id.in_(list(payment_ids))
+        ).scalar()
+    if charge_ids:
+        refresh_applied_charges_current_debt_ves(db, applied_charge_ids=charge_ids)
+        refresh_student_delinquency(db, student_ids=student_ids)
+    if dry_run:
+        db.rollback()
+    else:
+        db.commit()
+        if charge_ids:
+            invalidate_dashboard_cache()
+
+    verb = "se anularían" if dry_run else "anulado(s)"
+    return {
+        "message": f"Reversión del {scope_description}: {len(charge_ids)} cargo(s) {verb}.",
+        "dry_run": dry_run,
+        "charges_cancelled": len(charge_ids),
+        "penalties_cancelled": len(penalties),
+        "skipped_invoiced": skipped_invoiced,
+        "allocations_deleted": allocations_deleted,
+        "credit_returned_ves": round(credit_returned_ves, 2),
+        "representatives_affected": representatives_affected,
+    }
+
+
+# --- Vista previa (simulación) de procesos de facturación ---
+
+BILLING_PREVIEW_CSV_COLUMNS = [
+    "student_id", "student_name", "grade_level_name", "charge_concept_id", "concept_name", "currency",
+    "original_concept_amount", "amount_due_original_currency", "exchange_rate", "amount_due_ves_at_emission"
+]
+
+
+def _build_billing_preview(
+    db: Session,
+    process: str,
+    issue_date: date,
+    due_date: date,
+    rows: List[Dict[str, Any]],
+    students_evaluated: int,
+    concept_names: Dict[int, str],
+    duplicates_by_concept: Optional[Dict[int, int]] = None,
+    warnings: Optional[List[str]] = None,
+    errors: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """Arma el detalle por estudiante y los totales por concepto y por grado a partir de las filas calculadas."""
+    duplicates_by_concept = duplicates_by_concept or {}
+    student_ids = sorted({row["student_id"] for row in rows})
+    students_by_id = {}
+    for chunk_start in range(0, len(student_ids), 1000):
+        chunk_ids = student_ids[chunk_start:chunk_start + 1000]
+        for student in db.query(
+            models.Student.id, models.Student.first_name, models.Student.last_name, models.Student.grade_level_id
+        ).filter(models.Student.id.in_(chunk_ids)):
+            students_by_id[student.id] = student
+    grade_level_names = dict(db.query(models.GradeLevel.id, models.GradeLevel.name).all())
+
+    items = []
+    totals_by_concept: Dict[Tuple[int, str], Dict[str, Any]] = {}
+    totals_by_grade: Dict[Optional[int], Dict[str, Any]] = {}
+    for row in rows:
+        student = students_by_id.get(row["student_id"])
+        grade_level_id = student.grade_level_id if student else None
+        currency = row["original_concept_currency"].value
+        items.append({
+            "student_id": row["student_id"],
+            "student_name": f"{student.first_name} {student.last_name}" if student else "",
+            "grade_level_id": grade_level_id,
+            "grade_level_name": grade_level_names.get(grade_level_id),
+            "charge_concept_id": row["charge_concept_id"],
+            "concept_name": concept_names.get(row["charge_concept_id"], ""),
+            "currency": currency,
+            "original_concept_amount": row["original_concept_amount"],
+            "amount_due_original_currency": row["amount_due_original_currency"],
+            "exchange_rate": row["exchange_rate_applied_at_emission"],
+            "amount_due_ves_at_emission": row["amount_due_ves_at_emission"],
+        })
+
+        concept_total = totals_by_concept.setdefault((row["charge_concept_id"], currency), {
+            "charge_concept_id": row["charge_concept_id"],
+            "concept_name": concept_names.get(row["charge_concept_id"], ""),
+            "currency": currency,
+            "charges_count": 0,
+            "duplicates_skipped": duplicates_by_concept.get(row["charge_concept_id"], 0),
+            "total_original_currency": 0.0,
+            "total_ves_at_emission": 0.0,
+        })
+        concept_total["charges_count"] += 1
+        concept_total["total_original_currency"] += row["amount_due_original_currency"]
+        concept_total["total_ves_at_emission"] += row["amount_due_ves_at_emission"]
+
+        grade_total = totals_by_grade.setdefault(grade_level_id, {
+            "grade_level_id": grade_level_id,
+            "grade_level_name": grade_level_names.get(grade_level_id),
+            "students_count": set(),
+            "charges_count": 0,
+            "total_ves_at_emission": 0.0,
+        })
+        grade_total["students_count"].add(row["student_id"])
+        grade_total["charges_count"] += 1
+        grade_total["total_ves_at_emission"] += row["amount_due_ves_at_emission"]
+
+    # Conceptos cuyos cargos se omitieron todos por duplicados
+    charged_concept_ids = {concept_id for concept_id, _ in totals_by_concept}
+    for concept_id, duplicates_count in duplicates_by_concept.items():
+        if concept_id not in charged_concept_ids:
+            totals_by_concept[(concept_id, "")] = {
+                "charge_concept_id": concept_id, "concept_name": concept_names.get(concept_id, ""), "currency": None,
+                "charges_count": 0, "duplicates_skipped": duplicates_count,
+                "total_original_currency": 0.0, "total_ves_at_emission": 0.0,
+            }
+
+    for concept_total in totals_by_concept.values():
+        concept_total["total_original_currency"] = round(concept_total["total_original_currency"], 2)
+        concept_total["total_ves_at_emission"] = round(concept_total["total_ves_at_emission"], 2)
+    for grade_total in totals_by_grade.values():
+        grade_total["students_count"] = len(grade_total["students_count"])
+        grade_total["total_ves_at_emission"] = round(grade_total["total_ves_at_emission"], 2)
+
+    return {
+        "process": process,
+        "issue_date": issue_date,
+        "due_date": due_date,
+        "students_evaluated": students_evaluated,
+        "charges_to_create": len(rows),
+        "duplicates_skipped": sum(duplicates_by_concept.values()),
+        "total_ves_at_emission": round(sum(row["amount_due_ves_at_emission"] for row in rows), 2),
+        "totals_by_concept": sorted(totals_by_concept.values(), key=lambda total: (total["concept_name"], total["currency"] or "")),
+        "totals_by_grade_level": sorted(totals_by_grade.values(), key=lambda total: total["grade_level_name"] or ""),
+        "items": items,
+        "warnings": warnings or [],
+        "errors": errors or [],
+    }
+
+
+def preview_recurring_charges(db: Session, params: schemas.GenerateChargesRequest) -> Dict[str, Any]:
+    """
+    Simula run_generate_recurring_charges_process sin escribir nada: mismos datos cargados en bloque y mismo
+    cálculo en memoria. Lanza ValueError si las fechas son inválidas.
+    """
+    charge_issue_date, charge_due_date = _resolve_recurring_charge_dates(
+        db, params.target_year, params.target_month, params.issue_date_override, params.due_date_override
+    )
+    snapshot = _load_recurring_charge_snapshot(
+        db, params.target_year, params.target_month, charge_issue_date, charge_due_date, params.charge_concept_ids
+    )
+    plan = _plan_recurring_charges(snapshot)
+    warnings = list(plan["warnings"])
+    if not snapshot["concepts"]:
+        warnings.append("No se encontraron conceptos de cargo mensuales activos para procesar (o los IDs especificados no son válidos/activos/mensuales).")
+    return _build_billing_preview(
+        db, "recurring_charges", charge_issue_date, charge_due_date, plan["rows"], plan["students_processed"],
+        concept_names={concept.id: concept.name for concept in snapshot["concepts"]},
+        duplicates_by_concept=plan["duplicates_by_concept"],
+        warnings=warnings,
+        errors=plan["errors"]
+    )
 
-            except HTTPException as e_http_credit: # Captura errores HTTP (ej. 500) de la función de crédito
-                errors_list.append(
-                    f"Error (HTTP {e_http_credit.status_code}) al aplicar saldo a favor para representante ID {student.representative_id}: {e_http_credit.detail}"
-                )
-            except Exception as e_credit: # Captura cualquier otro error inesperado
-                 errors_list.append(
-                    f"Error inesperado al aplicar saldo a favor para representante ID {student.representative_id}: {str(e_credit)}"
-                )
-            finally:
-                processed_representatives_for_credit_application.add(student.representative_id)
-    
-    # FIN DEL BUCLE DE ESTUDIANTES
 
-    final_summary = {
-        "message": "Proceso de generación de cargos y aplicación de saldos a favor completado.",
-        "target_period": f"{target_month:02d}-{target_year}",
-        "students_processed": students_processed_count,
-        "charges_created": charges_created_count,
-        "warnings_and_omissions": warnings_list,
-        "errors": errors_list if errors_list else None,
-        "credit_applications_summary": credit_applications_summary_list # Añadimos el resumen de la aplicación de créditos
-    }
+def preview_global_charge(db: Session, charge_details: schemas.GlobalChargeCreate) -> Dict[str, Any]:
+    """Simula run_apply_global_charge_process sin escribir nada."""
+    snapshot = _load_global_charge_snapshot(db, charge_details)
+    concept_names = {snapshot["charge_concept_id"]: snapshot["charge_concept_name"]}
+    if snapshot["rate_error"]:
+        return _build_billing_preview(
+            db, "global_charge", charge_details.issue_date, charge_details.due_date, [], len(snapshot["students"]),
+            concept_names=concept_names,
+            errors=[f"Tasa de cambio requerida no encontrada: {snapshot['rate_error']}"]
+        )
+    plan = _plan_global_charge(snapshot)
+    return _build_billing_preview(
+        db, "global_charge", charge_details.issue_date, charge_details.due_date, plan["rows"], plan["students_evaluated"],
+        concept_names=concept_names,
+        duplicates_by_concept={snapshot["charge_concept_id"]: plan["duplicates_skipped"]} if plan["duplicates_skipped"] else None,
+        errors=[f"Estudiante ID {error['student_id']} ({error['student_name']}): {error['reason']}" for error in plan["errors"]]
+    )
 
-    return final_summary
+
+def billing_preview_to_csv(preview: Dict[str, Any]) -> str:
+    """Detalle de la vista previa en CSV (separador ';', compatible con Excel en español)."""
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=BILLING_PREVIEW_CSV_COLUMNS, delimiter=";", extrasaction="ignore")
+    writer.writeheader()
+    writer.writerows(preview["items"])
+    return output.getvalue()
 
 
 def create_payment(db: Session, payment_in: schemas.PaymentCreate) -> models.Payment:
@@ -1903,7 +4453,14 @@ def create_payment(db: Session, payment_in: schemas.PaymentCreate) -> models.Pay
         db.add(db_applied_charge_to_update)
 
     try:
+        refresh_applied_charges_current_debt_ves(
+            db, applied_charge_ids=[a["applied_charge_to_update"].id for a in allocations_to_process]
+        )
+        refresh_student_delinquency(
+            db, student_ids=[a["applied_charge_to_update"].student_id for a in allocations_to_process]
+        )
         db.commit()
+        invalidate_dashboard_cache()
     except Exception as e:
         db.rollback()
         # Log e
@@ -2157,6 +4714,9 @@ def apply_representative_credit_to_pending_charges(db: Session, representative_i
 
     # 5. Commit de la transacción
     try:
+        affected_charge_ids = list({a["applied_charge_id_target"] for a in allocations_made_summary})
+        refresh_applied_charges_current_debt_ves(db, applied_charge_ids=affected_charge_ids)
+        refresh_student_delinquency_for_applied_charges(db, affected_charge_ids)
         db.commit()
     except Exception as e:
         db.rollback()
@@ -2699,6 +5259,110 @@ def get_credit_notes(
 
 
 
+# --- Caché en memoria de los datos del dashboard ---
+# Los indicadores del dashboard se recalculan como máximo cada DASHBOARD_CACHE_TTL_SECONDS por proceso.
+# Se invalida al registrar pagos o tasas de cambio, y cada endpoint acepta refresh=true para forzar el cálculo.
+# La invalidación solo alcanza al proceso actual (ver DASHBOARD_CACHE_TTL_SECONDS en app_config).
+# La clave incluye la fecha de Venezuela, no la del servidor, para no arrastrar datos del día anterior.
+
+_dashboard_cache: Dict[str, Tuple[float, Any]] = {}
+_dashboard_cache_lock = threading.Lock()
+
+
+def get_dashboard_cached(key: str, compute: Callable[[], Any], refresh: bool = False) -> Any:
+    cache_key = f"{key}:{get_current_venezuelan_date_for_crud().isoformat()}"
+    now = time.monotonic()
+    if not refresh:
+        with _dashboard_cache_lock:
+            cached = _dashboard_cache.get(cache_key)
+        if cached and now - cached[0] < settings.DASHBOARD_CACHE_TTL_SECONDS:
+            return cached[1]
+    value = compute()
+    with _dashboard_cache_lock:
+        _dashboard_cache[cache_key] = (now, value)
+    return value
+
+
+def invalidate_dashboard_cache() -> None:
+    with _dashboard_cache_lock:
+        _dashboard_cache.clear()
+
+
+def get_dashboard_grade_level_breakdown(db: Session, on_date: Optional[date] = None) -> Dict[str, Any]:
+    """
+    Cuentas por cobrar y cobranza por grado, con tres consultas agrupadas por grado del estudiante:
+    1. estudiantes activos y estudiantes morosos (tabla student_delinquency, estado orange o red);
+    2. cargos emitidos en el mes (VES a la emisión) y deuda abierta revalorizada a hoy (current_debt_ves);
+    3. lo cobrado en el mes (asignaciones de pagos con fecha de pago en el mes).
+    """
+    today = on_date or get_current_venezuelan_date_for_crud()
+    month_start = today.replace(day=1)
+    Student, AppliedCharge = models.Student, models.AppliedCharge
+
+    student_rows = db.query(
+        Student.grade_level_id,
+        sql_func.count(Student.id),
+        sql_func.sum(case((models.StudentDelinquency.status.in_(["orange", "red"]), 1), else_=0))
+    ).outerjoin(models.StudentDelinquency, models.StudentDelinquency.student_id == Student.id)\
+        .filter(Student.is_active == True).group_by(Student.grade_level_id).all()
+
+    in_current_month = and_(AppliedCharge.issue_date >= month_start, AppliedCharge.issue_date <= today)
+    charge_rows = db.query(
+        Student.grade_level_id,
+        sql_func.sum(case(
+            (and_(in_current_month, AppliedCharge.status != models.AppliedChargeStatus.CANCELLED), AppliedCharge.amount_due_ves_at_emission),
+            else_=0.0
+        )),
+        sql_func.sum(case((AppliedCharge.status.in_(OPEN_APPLIED_CHARGE_STATUSES), AppliedCharge.current_debt_ves), else_=0.0))
+    ).join(Student, AppliedCharge.student_id == Student.id)\
+        .filter(or_(in_current_month, AppliedCharge.status.in_(OPEN_APPLIED_CHARGE_STATUSES)))\
+        .group_by(Student.grade_level_id).all()
+
+    collected_rows = db.query(
+        Student.grade_level_id,
+        sql_func.sum(models.PaymentAllocation.amount_allocated_ves)
+    ).join(AppliedCharge, models.PaymentAllocation.applied_charge_id == AppliedCharge.id)\
+        .join(Student, AppliedCharge.student_id == Student.id)\
+        .join(models.Payment, models.PaymentAllocation.payment_id == models.Payment.id)\
+        .filter(models.Payment.payment_date >= month_start, models.Payment.payment_date <= today)\
+        .group_by(Student.grade_level_id).all()
+
+    usd_rate_model = get_latest_exchange_rate(db, from_currency=models.Currency.USD, on_date=today)
+    current_rate = usd_rate_model.rate if usd_rate_model and usd_rate_model.rate else None
+
+    students_by_grade = {gl_id: (count or 0, delinquent or 0) for gl_id, count, delinquent in student_rows}
+    charges_by_grade = {gl_id: (billed or 0.0, debt or 0.0) for gl_id, billed, debt in charge_rows}
+    collected_by_grade = {gl_id: collected or 0.0 for gl_id, collected in collected_rows}
+    grade_ids_with_data = set(students_by_grade) | set(charges_by_grade) | set(collected_by_grade)
+
+    grade_levels = db.query(models.GradeLevel).filter(
+        or_(models.GradeLevel.is_active == True, models.GradeLevel.id.in_(grade_ids_with_data))
+    ).order_by(models.GradeLevel.order_index.asc(), models.GradeLevel.id.asc()).all()
+
+    items = []
+    for grade_level in grade_levels:
+        active_students, delinquent_students = students_by_grade.get(grade_level.id, (0, 0))
+        billed_ves, open_debt_ves = charges_by_grade.get(grade_level.id, (0.0, 0.0))
+        open_debt_ves = round(open_debt_ves, 2)
+        items.append({
+            "grade_level_id": grade_level.id,
+            "grade_level_name": grade_level.name,
+            "active_students": active_students,
+            "delinquent_students": delinquent_students,
+            "charges_billed_current_month_ves": round(billed_ves, 2),
+            "collected_current_month_ves": round(collected_by_grade.get(grade_level.id, 0.0), 2),
+            "open_debt_ves_today": open_debt_ves,
+            "open_debt_usd_equivalent": round(open_debt_ves / current_rate, 2) if current_rate else None,
+        })
+
+    return {
+        "as_of_date": today,
+        "period_start_date": month_start,
+        "current_usd_to_ves_rate_used": current_rate,
+        "items": items,
+    }
+
+
 def get_total_representatives_count(db: Session) -> int:
     """Cuenta el número total de representantes."""
     # Si en el futuro añades un campo is_active a Representative, lo filtrarías aquí.
@@ -2718,60 +5382,13 @@ def get_revenue_for_period_ves(db: Session, start_date: date, end_date: date) ->
 
 def get_total_outstanding_debt_ves(db: Session) -> float:
     """
-    Calcula la deuda pendiente total en Bs.S, indexando los cargos en USD a la tasa actual.
+    Calcula la deuda pendiente total en Bs.S, con los cargos indexados a la tasa actual.
+    Usa la columna current_debt_ves, que se revaloriza al registrar cada tasa de cambio.
     """
-    # Obtener la tasa de cambio USD -> VES más reciente
-    # Asumimos que "USD" es la principal moneda extranjera a indexar
-    latest_usd_rate_model = get_latest_exchange_rate(db, from_currency=Currency.USD, on_date=date.today()) #
-    current_usd_to_ves_rate = latest_usd_rate_model.rate if latest_usd_rate_model and latest_usd_rate_model.rate else None
-
-    if current_usd_to_ves_rate is None:
-        # ¿Qué hacer si no hay tasa USD hoy? Podríamos usar la última conocida o dar un error/advertencia.
-        # Por ahora, si no hay tasa, los cargos USD no se podrán sumar a la deuda total en VES.
-        # O podríamos lanzar una excepción o devolver un indicador de que el cálculo es parcial.
-        # Para simplificar, si no hay tasa, solo sumaremos los cargos en VES.
-        # Esto debería ser manejado con más robustez en un sistema real (ej. forzar registro de tasa).
-        print("ADVERTENCIA: No se encontró tasa USD->Bs.S actual para calcular la deuda total pendiente. El resultado podría ser incompleto.")
-        # Alternativamente, podrías buscar la última tasa disponible sin importar la fecha, pero esto
-        # no sería "la tasa actual del día".
-        # O usar una tasa de fallback si la lógica de negocio lo permite.
-
-    outstanding_charges = db.query(
-        models.AppliedCharge.amount_due_original_currency,
-        models.AppliedCharge.amount_paid_original_currency_equivalent,
-        models.AppliedCharge.is_indexed,
-        models.AppliedCharge.original_concept_currency, # Para otras monedas indexadas si las hubiera
-        # Si is_indexed es falso, amount_due_original_currency es en VES y amount_paid_original_currency_equivalent también representa el pago en VES
-        # así que podríamos simplificar y usar amount_paid_ves para cargos no indexados.
-        models.AppliedCharge.amount_paid_ves # Necesitamos este para cargos originalmente en VES
-    ).filter(
-        models.AppliedCharge.status.in_([
-            models.AppliedChargeStatus.PENDING,
-            models.AppliedChargeStatus.PARTIALLY_PAID,
-            models.AppliedChargeStatus.OVERDUE
-        ])
-    ).all()
-
-    total_debt_ves = 0.0
-    for charge in outstanding_charges:
-        pending_debt_for_this_charge_ves = 0.0
-        if charge.is_indexed and charge.original_concept_currency == Currency.USD:
-            if current_usd_to_ves_rate:
-                pending_debt_original_currency = charge.amount_due_original_currency - charge.amount_paid_original_currency_equivalent
-                pending_debt_for_this_charge_ves = pending_debt_original_currency * current_usd_to_ves_rate
-            else:
-                # No hay tasa USD, no podemos calcular la deuda de este cargo en VES hoy. Omitir o manejar error.
-                pass 
-        elif not charge.is_indexed and charge.original_concept_currency == Currency.VES:
-            # El cargo es originalmente en VES.
-            # amount_due_original_currency es en VES.
-            # amount_paid_ves es el total pagado en VES para este cargo.
-            pending_debt_for_this_charge_ves = charge.amount_due_original_currency - charge.amount_paid_ves
-        # Podrías añadir lógica para EUR si también lo quieres indexar y tienes su tasa
-
-        total_debt_ves += pending_debt_for_this_charge_ves
-
-    return round(total_debt_ves, 2)
+    total_debt_ves = db.query(sql_func.sum(models.AppliedCharge.current_debt_ves)).filter(
+        models.AppliedCharge.status.in_(OPEN_APPLIED_CHARGE_STATUSES)
+    ).scalar()
+    return round(total_debt_ves or 0.0, 2)
 
 
 def get_revenue_trend(
@@ -3727,80 +6344,358 @@ def _get_month_details_for_year(school_year_start_month: int, school_year_start_
     return months_details
 
 
+def _delinquency_red_cutoff_date(current_processing_date: date) -> date:
+    """
+    Fecha límite para "red": un vencimiento en o antes de esta fecha tiene 2+ meses completos de retraso.
+    Equivale a la regla de meses calendario (diferencia de meses, restando uno si el día de
+    vencimiento es posterior al día actual) y permite evaluarla directamente en SQL.
+    """
+    return current_processing_date - relativedelta(months=2)
+
+
+def _calculate_months_late(oldest_due_date: date, current_processing_date: date) -> int:
+    """Meses completos de retraso del cargo vencido más antiguo (0 si vence en el mes en curso)."""
+    months_late = (current_processing_date.year - oldest_due_date.year) * 12 + (current_processing_date.month - oldest_due_date.month)
+    if oldest_due_date.day > current_processing_date.day and months_late > 0:
+        months_late -= 1
+    return max(months_late, 0)
+
+
+def _delinquency_status_from_oldest_due_date(
+    oldest_overdue_due_date: Optional[date],
+    current_processing_date: date
+) -> Literal["green", "orange", "red"]:
+    """
+    - green: Al día (sin cargos vencidos pendientes).
+    - orange: Hay cargos vencidos, con menos de dos meses completos de retraso.
+    - red: El cargo vencido más antiguo tiene dos o más meses completos de retraso.
+    """
+    if oldest_overdue_due_date is None:
+        return "green"
+    if oldest_overdue_due_date <= _delinquency_red_cutoff_date(current_processing_date):
+        return "red"
+    return "orange"
+
+
 def _calculate_delinquency_status(
     db: Session, 
     student_id: int, 
     current_processing_date: date
 ) -> Literal["green", "orange", "red", "none"]:
     """
-    Calcula el estado de morosidad de un estudiante basado en sus cargos aplicados pendientes.
-    - green: Al día (sin cargos vencidos pendientes).
-    - orange: Cargos vencidos del mes anterior inmediato no pagados.
-    - red: Cargos vencidos de dos o más meses anteriores no pagados.
-    - none: Sin cargos pendientes o sin cargos para evaluar.
+    Calcula el estado de morosidad de un estudiante basado en sus cargos aplicados pendientes
+    (ver _delinquency_status_from_oldest_due_date).
     """
-    # Cargos pendientes o parcialmente pagados y vencidos
-    overdue_charges = db.query(models.AppliedCharge)\
+    oldest_due_date = db.query(sql_func.min(models.AppliedCharge.due_date))\
         .filter(models.AppliedCharge.student_id == student_id)\
         .filter(models.AppliedCharge.due_date < current_processing_date)\
-        .filter(models.AppliedCharge.status.in_([
-            models.AppliedChargeStatus.PENDING, 
-            models.AppliedChargeStatus.PARTIALLY_PAID,
-            models.AppliedChargeStatus.OVERDUE # Si tienes un estado específico para vencido
-        ]))\
-        .order_by(models.AppliedCharge.due_date.asc())\
-        .all()
+        .filter(models.AppliedCharge.status.in_(OPEN_APPLIED_CHARGE_STATUSES))\
+        .scalar()
+    return _delinquency_status_from_oldest_due_date(oldest_due_date, current_processing_date)
 
-    if not overdue_charges:
-        return "green" # O "none" si no tiene ningún cargo en absoluto para mayor claridad
 
-    oldest_due_date = overdue_charges[0].due_date
+def refresh_student_delinquency(
+    db: Session,
+    student_ids: Optional[List[int]] = None,
+    on_date: Optional[date] = None
+) -> int:
+    """
+    Recalcula la tabla student_delinquency (estado de morosidad precalculado por estudiante).
+    - Con 'student_ids' solo se recalculan esos estudiantes (refresco incremental tras pagos, cargos o anulaciones).
+    - Sin 'student_ids' se reconstruye la tabla completa (reconstrucción nocturna o tras un cambio de tasa).
+    Una consulta agrupada + un upsert masivo por student_id, así dos refrescos simultáneos del mismo estudiante
+    no chocan con la llave primaria. No hace commit; devuelve el número de filas escritas.
+    """
+    if student_ids is not None:
+        student_ids = list({sid for sid in student_ids if sid is not None})
+        if not student_ids:
+            return 0
+    processing_date = on_date or get_current_venezuelan_date_for_crud()
+
+    AppliedCharge = models.AppliedCharge
+    is_overdue = AppliedCharge.due_date < processing_date
+    query = db.query(
+        models.Student.id,
+        sql_func.min(case((is_overdue, AppliedCharge.due_date))).label("oldest_overdue_due_date"),
+        sql_func.coalesce(sql_func.sum(case((is_overdue, 1), else_=0)), 0).label("overdue_charges_count"),
+        sql_func.coalesce(sql_func.sum(AppliedCharge.current_debt_ves), 0.0).label("open_amount_ves")
+    ).outerjoin(
+        AppliedCharge,
+        and_(AppliedCharge.student_id == models.Student.id, AppliedCharge.status.in_(OPEN_APPLIED_CHARGE_STATUSES))
+    ).group_by(models.Student.id)
+
+    if student_ids is not None:
+        query = query.filter(models.Student.id.in_(student_ids))
+
+    db.flush()
+    rows = []
+    for student_id, oldest_overdue_due_date, overdue_charges_count, open_amount_ves in query.all():
+        rows.append({
+            "student_id": student_id,
+            "status": _delinquency_status_from_oldest_due_date(oldest_overdue_due_date, processing_date),
+            "oldest_overdue_due_date": oldest_overdue_due_date,
+            "months_late": _calculate_months_late(oldest_overdue_due_date, processing_date) if oldest_overdue_due_date else 0,
+            "overdue_charges_count": int(overdue_charges_count or 0),
+            "open_amount_ves": round(float(open_amount_ves or 0.0), 2),
+            "as_of_date": processing_date,
+        })
+
+    if rows:
+        _upsert_student_delinquency_rows(db, rows)
+    return len(rows)
+
+
+def _upsert_student_delinquency_rows(db: Session, rows: List[Dict[str, Any]]) -> None:
+    """INSERT ... ON CONFLICT (student_id) DO UPDATE en PostgreSQL y SQLite; DELETE + INSERT en otros motores."""
+    dialect_name = db.get_bind().dialect.name
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        db.execute(delete(models.StudentDelinquency).where(
+            models.StudentDelinquency.student_id.in_([row["student_id"] for row in rows])
+        ).execution_options(synchronize_session=False))
+        db.execute(insert(models.StudentDelinquency), rows)
+        return
+
+    stmt = dialect_insert(models.StudentDelinquency)
+    updated_columns = {column: stmt.excluded[column] for column in rows[0] if column != "student_id"}
+    updated_columns["refreshed_at"] = sql_func.now()
+    db.execute(stmt.on_conflict_do_update(index_elements=["student_id"], set_=updated_columns), rows)
+
+
+def refresh_student_delinquency_for_applied_charges(db: Session, applied_charge_ids: List[int]) -> int:
+    """Refresco incremental para los estudiantes dueños de los cargos indicados. No hace commit."""
+    if not applied_charge_ids:
+        return 0
+    db.flush()
+    student_ids = [
+        row[0] for row in db.query(models.AppliedCharge.student_id)
+        .filter(models.AppliedCharge.id.in_(applied_charge_ids)).distinct().all()
+    ]
+    return refresh_student_delinquency(db, student_ids=student_ids)
+
+
+def rebuild_student_delinquency_in_new_session(bind) -> None:
+    """
+    Reconstrucción completa para BackgroundTasks (tras registrar, modificar o eliminar una tasa): usa su propia
+    sesión sobre el mismo motor, porque la sesión de la petición ya está cerrada cuando corre la tarea.
+    """
+    db = Session(bind=bind)
+    try:
+        rebuild_student_delinquency(db)
+    except Exception as e:
+        db.rollback()
+        print(f"ERROR: No se pudo reconstruir la morosidad tras el cambio de tasa: {e}")
+    finally:
+        db.close()
+
+
+def rebuild_student_delinquency(db: Session, on_date: Optional[date] = None) -> Dict[str, Any]:
+    """
+    Reconstrucción completa (tarea nocturna): los meses de retraso cambian con la fecha aunque
+    no haya movimientos, por eso la tabla se recalcula entera una vez al día.
+    """
+    processing_date = on_date or get_current_venezuelan_date_for_crud()
+    students_processed = refresh_student_delinquency(db, on_date=processing_date)
+    db.commit()
+    counts = dict(
+        db.query(models.StudentDelinquency.status, sql_func.count(models.StudentDelinquency.student_id))
+        .group_by(models.StudentDelinquency.status).all()
+    )
+    return {
+        "message": f"Morosidad recalculada para {students_processed} estudiantes al {processing_date.strftime('%d/%m/%Y')}.",
+        "as_of_date": processing_date,
+        "students_processed": students_processed,
+        "green_count": counts.get("green", 0),
+        "orange_count": counts.get("orange", 0),
+        "red_count": counts.get("red", 0),
+    }
+
+
+def sweep_overdue_applied_charges(db: Session, on_date: Optional[date] = None) -> Dict[str, Any]:
+    """
+    Marca como OVERDUE los cargos PENDING/PARTIALLY_PAID con vencimiento anterior a la fecha (un solo UPDATE
+    sobre el índice parcial ix_applied_charges_open_due_date) y devuelve a PENDING/PARTIALLY_PAID los OVERDUE
+    cuyo vencimiento se movió a la fecha o después. Es idempotente: una segunda corrida el mismo día no cambia nada.
+    """
+    processing_date = on_date or get_current_venezuelan_date_for_crud()
+    AppliedCharge = models.AppliedCharge
+    marked_overdue = db.execute(
+        update(AppliedCharge)
+        .where(
+            AppliedCharge.status.in_([AppliedChargeStatus.PENDING, AppliedChargeStatus.PARTIALLY_PAID]),
+            AppliedCharge.due_date < processing_date
+        )
+        .values(status=AppliedChargeStatus.OVERDUE)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    reopened = 0
+    for has_payments, reopened_status in [(True, AppliedChargeStatus.PARTIALLY_PAID), (False, AppliedChargeStatus.PENDING)]:
+        reopened += db.execute(
+            update(AppliedCharge)
+            .where(
+                AppliedCharge.status == AppliedChargeStatus.OVERDUE,
+                AppliedCharge.due_date >= processing_date,
+                (AppliedCharge.amount_paid_ves > 0) if has_payments else (AppliedCharge.amount_paid_ves <= 0)
+            )
+            .values(status=reopened_status)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+    db.commit()
+    if marked_overdue or reopened:
+        invalidate_dashboard_cache()
+    overdue_total = db.query(sql_func.count(AppliedCharge.id)).filter(AppliedCharge.status == AppliedChargeStatus.OVERDUE).scalar()
+    return {
+        "message": f"Barrido de cargos vencidos al {processing_date.strftime('%d/%m/%Y')}: {marked_overdue} marcado(s) como vencido(s), {reopened} reabierto(s).",
+        "as_of_date": processing_date,
+        "marked_overdue": marked_overdue,
+        "reopened": reopened,
+        "overdue_total": overdue_total,
+    }
+
+
+def get_student_account_version(db: Session, student_id: int, on_date: Optional[date] = None) -> Optional[str]:
+    """
+    Versión de la ficha de cuenta de un estudiante (para ETag) con una sola consulta de agregados:
+    cambia cuando se crea/modifica un cargo (incluida su revalorización), se registra una asignación
+    de pago, se modifica el estudiante o cambia el día (la morosidad depende de la fecha).
+    Devuelve None si el estudiante no existe.
+    """
+    processing_date = on_date or get_current_venezuelan_date_for_crud()
+    AppliedCharge, PaymentAllocation = models.AppliedCharge, models.PaymentAllocation
+    charges_sq = db.query(
+        sql_func.count(AppliedCharge.id).label("charges_count"),
+        sql_func.max(AppliedCharge.updated_at).label("charges_updated_at"),
+        sql_func.coalesce(sql_func.sum(AppliedCharge.amount_paid_ves), 0.0).label("paid_ves"),
+        sql_func.coalesce(sql_func.sum(AppliedCharge.current_debt_ves), 0.0).label("debt_ves")
+    ).filter(AppliedCharge.student_id == student_id).subquery()
+    allocations_sq = db.query(
+        sql_func.count(PaymentAllocation.id).label("allocations_count"),
+        sql_func.max(PaymentAllocation.id).label("last_allocation_id"),
+        sql_func.coalesce(sql_func.sum(PaymentAllocation.amount_allocated_ves), 0.0).label("allocated_ves")
+    ).join(AppliedCharge, PaymentAllocation.applied_charge_id == AppliedCharge.id)\
+        .filter(AppliedCharge.student_id == student_id).subquery()
+
+    row = db.query(
+        models.Student.updated_at, models.Student.is_active, models.Student.grade_level_id,
+        charges_sq.c.charges_count, charges_sq.c.charges_updated_at, charges_sq.c.paid_ves, charges_sq.c.debt_ves,
+        allocations_sq.c.allocations_count, allocations_sq.c.last_allocation_id, allocations_sq.c.allocated_ves
+    ).select_from(models.Student).join(charges_sq, true()).join(allocations_sq, true())\
+        .filter(models.Student.id == student_id).first()
+    if row is None:
+        return None
+    fingerprint = "|".join(str(value) for value in (student_id, processing_date.isoformat(), *row))
+    return hashlib.sha1(fingerprint.encode("utf-8")).hexdigest()[:20]
+
+
+def get_student_account_card(
+    db: Session,
+    student_id: int,
+    on_date: Optional[date] = None,
+    version: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Ficha de cuenta de un estudiante: cargos, asignaciones de pago recibidas, saldo abierto por moneda
+    original y en VES a la tasa de hoy, y morosidad. Usa un número fijo de consultas
+    (estudiante, cargos, asignaciones y versión, salvo que se reciba ya calculada) sin importar el tamaño del historial.
+    """
+    processing_date = on_date or get_current_venezuelan_date_for_crud()
+    db_student = db.query(models.Student).options(
+        joinedload(models.Student.representative),
+        joinedload(models.Student.grade_level_assigned)
+    ).filter(models.Student.id == student_id).first()
+    if not db_student:
+        return None
+
+    AppliedCharge = models.AppliedCharge
+    charges = db.query(AppliedCharge).options(joinedload(AppliedCharge.charge_concept))\
+        .filter(AppliedCharge.student_id == student_id)\
+        .order_by(AppliedCharge.issue_date.asc(), AppliedCharge.id.asc()).all()
+    allocation_rows = db.query(
+        models.PaymentAllocation.id, models.PaymentAllocation.payment_id, models.PaymentAllocation.applied_charge_id,
+        models.PaymentAllocation.amount_allocated_ves, models.PaymentAllocation.created_at,
+        models.Payment.payment_date, models.Payment.payment_method, models.Payment.reference_number,
+        models.Payment.currency_paid
+    ).join(AppliedCharge, models.PaymentAllocation.applied_charge_id == AppliedCharge.id)\
+        .join(models.Payment, models.PaymentAllocation.payment_id == models.Payment.id)\
+        .filter(AppliedCharge.student_id == student_id)\
+        .order_by(models.Payment.payment_date.asc(), models.PaymentAllocation.id.asc()).all()
+
+    charge_items = []
+    open_balances_by_currency: Dict[str, float] = {}
+    oldest_overdue_due_date = None
+    overdue_charges_count = 0
+    for charge in charges:
+        is_open = charge.status in OPEN_APPLIED_CHARGE_STATUSES
+        pending_original = round(charge.amount_due_original_currency - charge.amount_paid_original_currency_equivalent, 2) if is_open else 0.0
+        if is_open:
+            currency_key = charge.original_concept_currency.value
+            open_balances_by_currency[currency_key] = round(open_balances_by_currency.get(currency_key, 0.0) + pending_original, 2)
+            if charge.due_date < processing_date:
+                overdue_charges_count += 1
+                if oldest_overdue_due_date is None or charge.due_date < oldest_overdue_due_date:
+                    oldest_overdue_due_date = charge.due_date
+        charge_items.append({
+            "id": charge.id,
+            "charge_concept_id": charge.charge_concept_id,
+            "charge_concept_name": charge.charge_concept.name if charge.charge_concept else None,
+            "description": charge.description,
+            "issue_date": charge.issue_date,
+            "due_date": charge.due_date,
+            "status": charge.status,
+            "original_concept_currency": charge.original_concept_currency,
+            "amount_due_original_currency": charge.amount_due_original_currency,
+            "amount_paid_original_currency_equivalent": charge.amount_paid_original_currency_equivalent,
+            "pending_original_currency": pending_original,
+            "amount_due_ves_at_emission": charge.amount_due_ves_at_emission,
+            "amount_paid_ves": charge.amount_paid_ves,
+            "current_debt_ves": charge.current_debt_ves or 0.0,
+        })
+
+    allocations = [
+        {
+            "id": row.id,
+            "payment_id": row.payment_id,
+            "applied_charge_id": row.applied_charge_id,
+            "payment_date": row.payment_date,
+            "payment_method": row.payment_method,
+            "reference_number": row.reference_number,
+            "currency_paid": row.currency_paid,
+            "amount_allocated_ves": row.amount_allocated_ves,
+            "created_at": row.created_at,
+        }
+        for row in allocation_rows
+    ]
+
+    representative = db_student.representative
+    return {
+        "student_id": db_student.id,
+        "student_full_name": f"{db_student.first_name} {db_student.last_name}",
+        "student_cedula": db_student.cedula,
+        "is_active": db_student.is_active,
+        "grade_level_name": db_student.grade_level_assigned.name if db_student.grade_level_assigned else None,
+        "representative_id": representative.id if representative else None,
+        "representative_full_name": f"{representative.first_name} {representative.last_name}" if representative else None,
+        "as_of_date": processing_date,
+        "version": version or get_student_account_version(db, student_id, on_date=processing_date),
+        "total_billed_ves_at_emission": round(sum(c.amount_due_ves_at_emission for c in charges if c.status != models.AppliedChargeStatus.CANCELLED), 2),
+        "total_allocated_ves": round(sum(a["amount_allocated_ves"] for a in allocations), 2),
+        "open_balances_by_currency": [
+            {"currency": currency, "pending_amount": amount} for currency, amount in sorted(open_balances_by_currency.items())
+        ],
+        "open_balance_ves_today": round(sum(c["current_debt_ves"] for c in charge_items), 2),
+        "delinquency": {
+            "status": _delinquency_status_from_oldest_due_date(oldest_overdue_due_date, processing_date),
+            "oldest_overdue_due_date": oldest_overdue_due_date,
+            "months_late": _calculate_months_late(oldest_overdue_due_date, processing_date) if oldest_overdue_due_date else 0,
+            "overdue_charges_count": overdue_charges_count,
+        },
+        "charges": charge_items,
+        "allocations": allocations,
+    }
 
-    # Calcular diferencia en meses (aproximada)
-    # Esta lógica de meses puede ser compleja por días variables en meses. Una forma simple:
-    months_late = (current_processing_date.year - oldest_due_date.year) * 12 + (current_processing_date.month - oldest_due_date.month)
-    
-    # Ajuste si el día actual es menor que el día de vencimiento más antiguo en el mismo mes de diferencia
-    # Ejemplo: hoy es 5 de Marzo, venció el 15 de Febrero -> months_late = 1.
-    # Ejemplo: hoy es 5 de Marzo, venció el 25 de Febrero -> months_late = 1.
-    # Ejemplo: hoy es 5 de Marzo, venció el 2 de Marzo -> months_late = 0 (pero está vencido si due_date < current_date)
-    
-    if oldest_due_date.day > current_processing_date.day and months_late > 0 : # Si el cargo venció más tarde en el mes que el día actual del mes de procesamiento
-        months_late -=1 # Y estamos en un mes posterior, reducimos un mes "completo" de retraso.
-
-    if months_late <= 0: # Vencido dentro del mes actual o no ha pasado un mes completo
-         # Podríamos diferenciar entre vencido en el mes actual (orange) y al día (green)
-         # Si oldest_due_date < current_processing_date, está vencido.
-         # Para la lógica "un mes de retraso", necesitamos que haya pasado al menos al mes anterior.
-         # Si la deuda más antigua es del mes actual o no ha completado un mes de retraso,
-         # ¿consideramos "orange" o "green" si hay vencidos? La definición dice "un mes de retraso".
-         # Si hay algo vencido, y no tiene ni un mes, podría ser "orange" suave o seguir siendo "green" si no se considera "retraso de mes".
-         # Vamos a seguir estrictamente: "un mes de retraso" = vencido del mes pasado.
-         # "dos meses o más" = vencido de dos meses o más atrás.
-         # Cualquier otra cosa vencida pero no llegando a un mes de retraso, podría ser "green" con advertencia, o "orange"
-         # Para simplificar, si hay algo vencido, no es "green".
-         
-         # Lógica revisada para "months_late" basado en el mes de vencimiento:
-        first_day_current_month = current_processing_date.replace(day=1)
-        first_day_prev_month = (first_day_current_month - timedelta(days=1)).replace(day=1)
-        first_day_two_months_ago = (first_day_prev_month - timedelta(days=1)).replace(day=1)
-
-        if oldest_due_date < first_day_two_months_ago: # Vencido hace dos meses o más
-            return "red"
-        elif oldest_due_date < first_day_prev_month: # Vencido el mes pasado
-            return "orange"
-        else: # Vencido este mes, o no se considera "retraso de mes" aún
-            return "orange" # Consideremos "orange" si hay algo vencido que no sea "red"
-                           # ya que "green" implica "al día".
-                           # Si no hay overdue_charges, ya retornamos "green".
-    
-    if months_late >= 2:
-        return "red"
-    elif months_late == 1:
-        return "orange"
-    else: # months_late es 0 pero hay overdue_charges (vencido este mes)
-        return "orange" # Siguiendo la idea de que si algo está vencido, no es green.
-                        # Se podría ajustar esto a 'green' si solo te importa retraso de MES COMPLETO.
 
 def get_student_annual_financial_summary(
     db: Session, 
@@ -3816,106 +6711,98 @@ def get_student_annual_financial_summary(
     """
     Genera un resumen financiero anual para estudiantes, incluyendo deuda mensual,
     deuda total pendiente y estado de morosidad.
+    La matriz completa (12 meses, deuda pendiente y morosidad) sale de una sola consulta con
+    agregación condicional; el filtro de morosidad y la paginación se resuelven en SQL.
     """
-    
-    # 1. Obtener estudiantes filtrados y paginados
-    student_query_base = db.query(models.Student).filter(models.Student.is_active == True)
+    school_year_months = _get_month_details_for_year(school_year_start_month, school_year_start_year)
+    school_year_start = school_year_months[0]["start_date"]
+    school_year_end = school_year_months[-1]["end_date"]
+
+    AppliedCharge = models.AppliedCharge
+    is_open = AppliedCharge.status.in_(OPEN_APPLIED_CHARGE_STATUSES)
+    not_cancelled = AppliedCharge.status != models.AppliedChargeStatus.CANCELLED
+
+    # 1. Agregado por estudiante: una columna por mes, deuda pendiente y vencimiento abierto más antiguo
+    month_columns = [
+        sql_func.sum(case(
+            (and_(not_cancelled, AppliedCharge.issue_date >= month_info["start_date"], AppliedCharge.issue_date <= month_info["end_date"]),
+             AppliedCharge.amount_due_ves_at_emission),
+            else_=0.0
+        )).label(f"month_{index}")
+        for index, month_info in enumerate(school_year_months)
+    ]
+    charges_summary_sq = db.query(
+        AppliedCharge.student_id.label("student_id"),
+        *month_columns,
+        sql_func.sum(case((is_open, AppliedCharge.amount_due_ves_at_emission - AppliedCharge.amount_paid_ves), else_=0.0)).label("outstanding_ves"),
+        sql_func.min(case((and_(is_open, AppliedCharge.due_date < current_processing_date), AppliedCharge.due_date), else_=None)).label("oldest_overdue_due_date"),
+    ).filter(
+        or_(is_open, and_(AppliedCharge.issue_date >= school_year_start, AppliedCharge.issue_date <= school_year_end))
+    ).group_by(AppliedCharge.student_id).subquery()
+
+    delinquency_expression = case(
+        (charges_summary_sq.c.oldest_overdue_due_date.is_(None), "green"),
+        (charges_summary_sq.c.oldest_overdue_due_date <= _delinquency_red_cutoff_date(current_processing_date), "red"),
+        else_="orange"
+    )
+
+    # 2. Estudiantes activos + agregado, con búsqueda y filtro de morosidad en SQL
+    query = db.query(
+        models.Student.id,
+        models.Student.first_name,
+        models.Student.last_name,
+        models.Student.cedula,
+        *[charges_summary_sq.c[f"month_{index}"] for index in range(len(school_year_months))],
+        charges_summary_sq.c.outstanding_ves,
+        delinquency_expression.label("delinquency_status"),
+    ).outerjoin(charges_summary_sq, charges_summary_sq.c.student_id == models.Student.id)\
+     .filter(models.Student.is_active == True)
+
     if student_search_term:
         search = f"%{student_search_term}%"
-        student_query_base = student_query_base.filter(
+        query = query.filter(
             or_(
-                (models.Student.first_name + " " + models.Student.last_name).ilike(search),
+                models.full_name_expression(models.Student.first_name, models.Student.last_name).ilike(search),
                 models.Student.first_name.ilike(search),
                 models.Student.last_name.ilike(search),
                 models.Student.cedula.ilike(search)
             )
         )
-    
-    all_matching_students = student_query_base.order_by(models.Student.last_name, models.Student.first_name).all()
+    if delinquency_filter:
+        query = query.filter(delinquency_expression == delinquency_filter)
 
-    # 2. Generar la estructura de los 12 meses del año escolar
-    school_year_months = _get_month_details_for_year(school_year_start_month, school_year_start_year)
+    total_filtered_items = query.count()
+    rows = query.order_by(models.Student.last_name, models.Student.first_name, models.Student.id)\
+        .offset(skip).limit(limit).all()
 
-    processed_summaries: List[schemas.StudentAnnualFinancialSummary] = []
-    for student in all_matching_students:
-        monthly_debt_details_list: List[schemas.MonthlyDebtDetail] = []
-        
-        # 3a. Calcular deuda generada mensualmente para el año escolar
-        for month_info in school_year_months:
-            monthly_charges_sum_ves = db.query(sql_func.sum(
-                models.AppliedCharge.amount_due_ves_at_emission
-            ))\
-            .filter(models.AppliedCharge.student_id == student.id)\
-            .filter(models.AppliedCharge.issue_date >= month_info["start_date"])\
-            .filter(models.AppliedCharge.issue_date <= month_info["end_date"])\
-            .filter(models.AppliedCharge.status != models.AppliedChargeStatus.CANCELLED)\
-            .scalar() or 0.0
-            
-            monthly_charges_sum_ves = round(float(monthly_charges_sum_ves), 2)
-            usd_eq_monthly = None
-            if current_usd_rate and current_usd_rate > 0 and monthly_charges_sum_ves is not None:
-                usd_eq_monthly = round(monthly_charges_sum_ves / current_usd_rate, 2)
+    def _usd_equivalent(amount_ves: float) -> Optional[float]:
+        if current_usd_rate and current_usd_rate > 0:
+            return round(amount_ves / current_usd_rate, 2)
+        return None
 
+    paginated_items: List[schemas.StudentAnnualFinancialSummary] = []
+    for row in rows:
+        monthly_debt_details_list = []
+        for index, month_info in enumerate(school_year_months):
+            monthly_charges_sum_ves = round(float(getattr(row, f"month_{index}") or 0.0), 2)
             monthly_debt_details_list.append(schemas.MonthlyDebtDetail(
                 month_year=month_info["month_year_str"],
                 month_name=month_info["month_name"], # Ej: "Agosto 2024"
                 debt_generated_ves=monthly_charges_sum_ves,
-                debt_generated_usd_equivalent=usd_eq_monthly
+                debt_generated_usd_equivalent=_usd_equivalent(monthly_charges_sum_ves)
             ))
 
-        # 3b. Calcular Deuda Total Pendiente (de todos los tiempos, no solo del año escolar)
-        #     (amount_due_original_currency - amount_paid_original_currency_equivalent)
-        #     Esta lógica es más compleja si tenemos monedas mixtas. Simplificaremos a VES por ahora.
-        #     Si los cargos están en USD y se pagan en VES, necesitamos la tasa de cada pago.
-        #     Por ahora, nos basaremos en los saldos VES de los AppliedCharge.
-        
-        total_outstanding_ves = db.query(sql_func.sum(
-            models.AppliedCharge.amount_due_ves_at_emission - models.AppliedCharge.amount_paid_ves
-        ))\
-        .filter(models.AppliedCharge.student_id == student.id)\
-        .filter(models.AppliedCharge.status.in_([
-            models.AppliedChargeStatus.PENDING, 
-            models.AppliedChargeStatus.PARTIALLY_PAID,
-            models.AppliedChargeStatus.OVERDUE
-        ]))\
-        .scalar() or 0.0
-        total_outstanding_ves = round(float(total_outstanding_ves), 2)
-
-        usd_eq_total_outstanding = None
-        if current_usd_rate and current_usd_rate > 0 and total_outstanding_ves is not None:
-            usd_eq_total_outstanding = round(total_outstanding_ves / current_usd_rate, 2)
-
-        # 3c. Determinar Estado de Morosidad
-        delinquency = _calculate_delinquency_status(db, student.id, current_processing_date)
-        
-        if delinquency_filter and delinquency != delinquency_filter:
-            continue # Saltar este estudiante si no coincide con el filtro de morosidad
-
-        # (Obtener total_outstanding_ves y usd_eq_total_outstanding como antes)
-        total_outstanding_ves = db.query(sql_func.sum( models.AppliedCharge.amount_due_ves_at_emission - models.AppliedCharge.amount_paid_ves ))\
-            .filter(models.AppliedCharge.student_id == student.id)\
-            .filter(models.AppliedCharge.status.in_([models.AppliedChargeStatus.PENDING, models.AppliedChargeStatus.PARTIALLY_PAID, models.AppliedChargeStatus.OVERDUE ]))\
-            .scalar() or 0.0
-        total_outstanding_ves = round(float(total_outstanding_ves), 2)
-        usd_eq_total_outstanding = None
-        if current_usd_rate and current_usd_rate > 0:
-            usd_eq_total_outstanding = round(total_outstanding_ves / current_usd_rate, 2)
-
-
-        processed_summaries.append(schemas.StudentAnnualFinancialSummary(
-            student_id=student.id,
-            student_full_name=f"{student.first_name} {student.last_name}",
-            student_cedula=student.cedula,
-            monthly_debt_details=monthly_debt_details_list, # Esta ya se calculó antes
+        total_outstanding_ves = round(float(row.outstanding_ves or 0.0), 2)
+        paginated_items.append(schemas.StudentAnnualFinancialSummary(
+            student_id=row.id,
+            student_full_name=f"{row.first_name} {row.last_name}",
+            student_cedula=row.cedula,
+            monthly_debt_details=monthly_debt_details_list,
             total_outstanding_debt_ves=total_outstanding_ves,
-            total_outstanding_debt_usd_equivalent=usd_eq_total_outstanding,
-            delinquency_status=delinquency
+            total_outstanding_debt_usd_equivalent=_usd_equivalent(total_outstanding_ves),
+            delinquency_status=row.delinquency_status
         ))
 
-    # Ahora aplicar paginación a la lista ya filtrada (incluyendo por morosidad)
-    total_filtered_items = len(processed_summaries)
-    paginated_items = processed_summaries[skip : skip + limit]
-
     return {
         "items": paginated_items,
         "total": total_filtered_items, # Total de items DESPUÉS de todos los filtros
@@ -3925,6 +6812,383 @@ def get_student_annual_financial_summary(
     }
 
 
+# --- Reporte de Antigüedad de Saldos (Cuentas por Cobrar) ---
+
+RECEIVABLES_AGING_BUCKET_KEYS = ["current", "days_1_30", "days_31_60", "days_61_90", "days_over_90", "total"]
+
+
+def get_receivables_aging_report(
+    db: Session,
+    group_by: Literal["representative", "grade_level", "school"] = "representative",
+    skip: int = 0,
+    limit: int = 20,
+    sort_by: str = "total",
+    sort_order: str = "desc"
+) -> Dict[str, Any]:
+    """
+    Antigüedad de saldos de los cargos abiertos por días transcurridos desde due_date
+    (al día, 1-30, 31-60, 61-90, 90+), usando la deuda hoy (current_debt_ves) ya revalorizada.
+    Todo se resuelve con una sola consulta agrupada: las funciones de ventana devuelven,
+    junto a la página pedida, el total de grupos y los totales del colegio.
+    """
+    as_of_date = get_current_venezuelan_date_for_crud()
+    AppliedCharge = models.AppliedCharge
+    debt = AppliedCharge.current_debt_ves
+    due = AppliedCharge.due_date
+
+    def _bucket_sum(condition):
+        return sql_func.coalesce(sql_func.sum(case((condition, debt), else_=0.0)), 0.0)
+
+    bucket_columns = {
+        "current": _bucket_sum(due >= as_of_date),
+        "days_1_30": _bucket_sum(and_(due < as_of_date, due >= as_of_date - timedelta(days=30))),
+        "days_31_60": _bucket_sum(and_(due < as_of_date - timedelta(days=30), due >= as_of_date - timedelta(days=60))),
+        "days_61_90": _bucket_sum(and_(due < as_of_date - timedelta(days=60), due >= as_of_date - timedelta(days=90))),
+        "days_over_90": _bucket_sum(due < as_of_date - timedelta(days=90)),
+        "total": sql_func.coalesce(sql_func.sum(debt), 0.0),
+    }
+
+    if group_by == "representative":
+        group_columns = [
+            models.Representative.id.label("group_id"),
+            (models.Representative.first_name + " " + models.Representative.last_name).label("group_name"),
+            models.Representative.cedula.label("group_code"),
+        ]
+        group_by_columns = [models.Representative.id, models.Representative.first_name, models.Representative.last_name, models.Representative.cedula]
+    elif group_by == "grade_level":
+        group_columns = [
+            models.GradeLevel.id.label("group_id"),
+            models.GradeLevel.name.label("group_name"),
+            cast(None, models.GradeLevel.name.type).label("group_code"),
+        ]
+        group_by_columns = [models.GradeLevel.id, models.GradeLevel.name]
+    elif group_by == "school":
+        group_columns = []
+        group_by_columns = []
+    else:
+        raise ValueError(f"Agrupación no válida para el reporte de antigüedad: {group_by}")
+
+    selected_columns = list(group_columns)
+    selected_columns += [expr.label(key) for key, expr in bucket_columns.items()]
+    selected_columns.append(sql_func.count(AppliedCharge.id).label("open_charges_count"))
+    # Ventanas sobre el resultado agrupado: total de grupos y totales del colegio en la misma consulta
+    selected_columns.append(sql_func.count().over().label("total_groups"))
+    selected_columns += [sql_func.sum(expr).over().label(f"school_{key}") for key, expr in bucket_columns.items()]
+
+    query = db.query(*selected_columns).select_from(AppliedCharge).filter(
+        AppliedCharge.status.in_(OPEN_APPLIED_CHARGE_STATUSES),
+        AppliedCharge.current_debt_ves > 0
+    )
+    if group_by in ("representative", "grade_level"):
+        query = query.join(models.Student, AppliedCharge.student_id == models.Student.id)
+    if group_by == "representative":
+        query = query.join(models.Representative, models.Student.representative_id == models.Representative.id)
+    elif group_by == "grade_level":
+        query = query.join(models.GradeLevel, models.Student.grade_level_id == models.GradeLevel.id)
+
+    if group_by_columns:
+        query = query.group_by(*group_by_columns)
+        if sort_by in bucket_columns:
+            sort_expression = bucket_columns[sort_by]
+        elif sort_by == "group_name":
+            sort_expression = group_columns[1]
+        else:
+            raise ValueError(f"Campo de ordenamiento no válido: {sort_by}")
+        sort_expression = sort_expression.desc() if sort_order.lower() == "desc" else sort_expression.asc()
+        query = query.order_by(sort_expression, group_by_columns[0].asc())
+        rows = query.offset(skip).limit(limit).all()
+    else:
+        rows = query.all()
+
+    empty_totals = {key: 0.0 for key in RECEIVABLES_AGING_BUCKET_KEYS}
+    if rows:
+        total_groups = rows[0].total_groups
+        school_totals = {key: round(getattr(rows[0], f"school_{key}") or 0.0, 2) for key in RECEIVABLES_AGING_BUCKET_KEYS}
+    elif skip > 0 and group_by_columns:
+        # Página fuera de rango: se recalcula solo el total del colegio para no devolver ceros engañosos
+        school_report = get_receivables_aging_report(db, group_by="school")
+        total_groups = None
+        school_totals = school_report["school_totals"]
+    else:
+        total_groups = 0
+        school_totals = empty_totals
+
+    items = []
+    for row in rows:
+        if group_by == "school" and not row.open_charges_count:
+            continue
+        items.append({
+            "group_id": row.group_id if group_by_columns else None,
+            "group_name": row.group_name if group_by_columns else "Total Colegio",
+            "group_code": row.group_code if group_by_columns else None,
+            "open_charges_count": row.open_charges_count,
+            **{key: round(getattr(row, key) or 0.0, 2) for key in RECEIVABLES_AGING_BUCKET_KEYS}
+        })
+
+    if total_groups is None:
+        total_groups = db.query(sql_func.count(sql_func.distinct(
+            models.Student.representative_id if group_by == "representative" else models.Student.grade_level_id
+        ))).select_from(AppliedCharge).join(models.Student, AppliedCharge.student_id == models.Student.id).filter(
+            AppliedCharge.status.in_(OPEN_APPLIED_CHARGE_STATUSES),
+            AppliedCharge.current_debt_ves > 0
+        ).scalar() or 0
+    if group_by == "school":
+        total_groups = len(items)
+
+    current_page = (skip // limit) + 1 if limit > 0 else 1
+    pages = (total_groups + limit - 1) // limit if limit > 0 else (1 if total_groups > 0 else 0)
+
+    return {
+        "items": items,
+        "total": total_groups,
+        "page": current_page,
+        "pages": pages,
+        "limit": limit,
+        "group_by": group_by,
+        "as_of_date": as_of_date,
+        "school_totals": school_totals
+    }
+
+
+# --- Saldos de Representantes a una Fecha de Corte ("as of date") ---
+
+
+def _end_of_day_cutoff_vet(as_of_date: date) -> datetime:
+    """
+    Primer instante del día siguiente en hora de Venezuela, expresado en UTC; los created_at anteriores cuentan para as_of_date.
+    En UTC porque SQLite descarta la zona horaria al comparar y las marcas de tiempo (now()) se guardan en UTC.
+    """
+    vet_tz = pytz.timezone('America/Caracas')
+    return vet_tz.localize(datetime.combine(as_of_date + timedelta(days=1), datetime.min.time())).astimezone(pytz.utc)
+
+
+def _representative_balances_as_of_query(db: Session, as_of_date: date):
+    """
+    Consulta agregada (una fila por representante) que reconstruye el saldo a la fecha de corte:
+    - Cargos emitidos hasta esa fecha. Los anulados antes del corte (según cancelled_at) no cuentan.
+    - Asignaciones de pago (PaymentAllocation) creadas hasta el corte, más las borradas por una reversión
+      posterior al corte (PaymentAllocationReversal), que a esa fecha seguían vigentes.
+    - Pagos con payment_date hasta el corte.
+    El saldo adeudado sigue la regla de current_debt_ves: en los cargos indexados se descuenta lo pagado en moneda
+    original (cada asignación convertida con la tasa del día de su pago) y el resto se valora con la tasa vigente
+    en la fecha de corte; en los cargos en VES es el saldo nominal.
+    """
+    cutoff = _end_of_day_cutoff_vet(as_of_date)
+    AppliedCharge, PaymentAllocation, Reversal = models.AppliedCharge, models.PaymentAllocation, models.PaymentAllocationReversal
+    ExchangeRate = models.ExchangeRate
+
+    charge_in_scope = and_(
+        AppliedCharge.issue_date <= as_of_date,
+        or_(
+            AppliedCharge.status != models.AppliedChargeStatus.CANCELLED,
+            # Cargos anulados antes de existir cancelled_at: se usa updated_at como aproximación
+            sql_func.coalesce(AppliedCharge.cancelled_at, AppliedCharge.updated_at) >= cutoff
+        )
+    )
+
+    allocations_as_of = union_all(
+        select(PaymentAllocation.payment_id, PaymentAllocation.applied_charge_id, PaymentAllocation.amount_allocated_ves)
+        .where(PaymentAllocation.created_at < cutoff),
+        select(Reversal.payment_id, Reversal.applied_charge_id, Reversal.amount_allocated_ves)
+        .where(Reversal.allocated_at < cutoff, Reversal.reversed_at >= cutoff)
+    ).subquery()
+
+    # Tasa de la moneda del cargo en la fecha del pago (la misma que usa create_payment para el equivalente en moneda original)
+    rate_at_payment_date = select(ExchangeRate.rate).where(
+        ExchangeRate.from_currency == AppliedCharge.original_concept_currency,
+        ExchangeRate.to_currency == models.Currency.VES,
+        ExchangeRate.rate_date <= models.Payment.payment_date,
+        ExchangeRate.rate > 0
+    ).order_by(ExchangeRate.rate_date.desc()).limit(1).correlate(AppliedCharge, models.Payment).scalar_subquery()
+    allocated_original = case(
+        (
+            AppliedCharge.is_indexed == True,
+            allocations_as_of.c.amount_allocated_ves / sql_func.coalesce(rate_at_payment_date, AppliedCharge.exchange_rate_applied_at_emission)
+        ),
+        else_=allocations_as_of.c.amount_allocated_ves
+    )
+    charge_allocations_sq = select(
+        allocations_as_of.c.applied_charge_id.label("applied_charge_id"),
+        sql_func.sum(allocations_as_of.c.amount_allocated_ves).label("allocated_ves"),
+        sql_func.sum(allocated_original).label("allocated_original")
+    ).select_from(allocations_as_of)\
+     .join(AppliedCharge, allocations_as_of.c.applied_charge_id == AppliedCharge.id)\
+     .join(models.Payment, allocations_as_of.c.payment_id == models.Payment.id)\
+     .group_by(allocations_as_of.c.applied_charge_id).subquery()
+
+    charge_allocated_ves = sql_func.coalesce(charge_allocations_sq.c.allocated_ves, 0.0)
+    pending_original = AppliedCharge.amount_due_original_currency - sql_func.coalesce(charge_allocations_sq.c.allocated_original, 0.0)
+    pending_ves_nominal = AppliedCharge.amount_due_ves_at_emission - charge_allocated_ves
+    revalued_whens = []
+    for indexed_currency in [models.Currency.USD, models.Currency.EUR]:
+        rate_as_of = get_latest_exchange_rate(db, from_currency=indexed_currency, on_date=as_of_date)
+        if rate_as_of and rate_as_of.rate and rate_as_of.rate > 0:
+            revalued_whens.append((
+                and_(AppliedCharge.is_indexed == True, AppliedCharge.original_concept_currency == indexed_currency),
+                pending_original * rate_as_of.rate
+            ))
+    charge_balance = case(*revalued_whens, else_=pending_ves_nominal) if revalued_whens else pending_ves_nominal
+    # Un cargo pagado por completo puede quedar con centésimas negativas por el redondeo de la conversión
+    charge_balance = case((charge_balance < 0, 0.0), else_=charge_balance)
+
+    charges_sq = db.query(
+        models.Student.representative_id.label("representative_id"),
+        sql_func.sum(AppliedCharge.amount_due_ves_at_emission).label("charges_billed_ves"),
+        sql_func.sum(charge_allocated_ves).label("allocated_to_charges_ves"),
+        sql_func.sum(charge_balance).label("balance_due_ves")
+    ).select_from(AppliedCharge)\
+     .join(models.Student, AppliedCharge.student_id == models.Student.id)\
+     .outerjoin(charge_allocations_sq, charge_allocations_sq.c.applied_charge_id == AppliedCharge.id)\
+     .filter(charge_in_scope)\
+     .group_by(models.Student.representative_id).subquery()
+
+    payments_sq = db.query(
+        models.Payment.representative_id.label("representative_id"),
+        sql_func.sum(models.Payment.amount_paid_ves_equivalent).label("payments_received_ves")
+    ).filter(models.Payment.payment_date <= as_of_date)\
+     .group_by(models.Payment.representative_id).subquery()
+
+    payment_allocations_sq = db.query(
+        models.Payment.representative_id.label("representative_id"),
+        sql_func.sum(allocations_as_of.c.amount_allocated_ves).label("allocated_from_payments_ves")
+    ).join(models.Payment, allocations_as_of.c.payment_id == models.Payment.id)\
+     .filter(models.Payment.payment_date <= as_of_date)\
+     .group_by(models.Payment.representative_id).subquery()
+
+    charges_billed = sql_func.coalesce(charges_sq.c.charges_billed_ves, 0.0)
+    allocated = sql_func.coalesce(charges_sq.c.allocated_to_charges_ves, 0.0)
+    payments_received = sql_func.coalesce(payments_sq.c.payments_received_ves, 0.0)
+    allocated_from_payments = sql_func.coalesce(payment_allocations_sq.c.allocated_from_payments_ves, 0.0)
+
+    return db.query(
+        models.Representative.id.label("representative_id"),
+        (models.Representative.first_name + " " + models.Representative.last_name).label("representative_name"),
+        models.Representative.cedula.label("representative_cedula"),
+        charges_billed.label("charges_billed_ves"),
+        allocated.label("allocated_to_charges_ves"),
+        sql_func.coalesce(charges_sq.c.balance_due_ves, 0.0).label("balance_due_ves"),
+        payments_received.label("payments_received_ves"),
+        (payments_received - allocated_from_payments).label("unallocated_credit_ves"),
+    ).outerjoin(charges_sq, charges_sq.c.representative_id == models.Representative.id)\
+     .outerjoin(payments_sq, payments_sq.c.representative_id == models.Representative.id)\
+     .outerjoin(payment_allocations_sq, payment_allocations_sq.c.representative_id == models.Representative.id)
+
+
+def get_representative_balances_as_of(
+    db: Session,
+    as_of_date: date,
+    representative_id: Optional[int] = None,
+    only_with_balance: bool = False,
+    skip: int = 0,
+    limit: int = 50
+) -> Dict[str, Any]:
+    """Saldos de uno o todos los representantes a una fecha de corte, calculados por agregación en la BD."""
+    if as_of_date > get_current_venezuelan_date_for_crud():
+        raise ValueError("La fecha de corte no puede ser futura.")
+
+    query = _representative_balances_as_of_query(db, as_of_date)
+    if representative_id is not None:
+        query = query.filter(models.Representative.id == representative_id)
+    if only_with_balance:
+        subquery = query.subquery()
+        query = db.query(subquery).filter(or_(subquery.c.balance_due_ves > 0.001, subquery.c.unallocated_credit_ves > 0.001))
+        order_columns = [subquery.c.balance_due_ves.desc(), subquery.c.representative_id.asc()]
+    else:
+        order_columns = [models.Representative.last_name.asc(), models.Representative.first_name.asc(), models.Representative.id.asc()]
+
+    total = query.count()
+    rows = query.order_by(*order_columns).offset(skip).limit(limit).all()
+
+    round_fields = ["charges_billed_ves", "allocated_to_charges_ves", "balance_due_ves", "payments_received_ves", "unallocated_credit_ves"]
+    items = []
+    for row in rows:
+        item = dict(row._mapping)
+        for field in round_fields:
+            item[field] = round(item[field] or 0.0, 2)
+        items.append(item)
+
+    current_page = (skip // limit) + 1 if limit > 0 else 1
+    pages = (total + limit - 1) // limit if limit > 0 else (1 if total > 0 else 0)
+    return {
+        "items": items,
+        "total": total,
+        "page": current_page,
+        "pages": pages,
+        "limit": limit,
+        "as_of_date": as_of_date
+    }
+
+
+def create_month_end_balance_snapshots(db: Session, year: int, month: int) -> Dict[str, Any]:
+    """
+    Guarda la foto de saldos de todos los representantes al último día del mes con un único
+    INSERT ... SELECT. Repetir el cierre de un mes reemplaza la foto anterior de esa fecha.
+    """
+    _, last_day = calendar.monthrange(year, month)
+    snapshot_date = date(year, month, last_day)
+    if snapshot_date > get_current_venezuelan_date_for_crud():
+        raise ValueError(f"El mes {month:02d}-{year} aún no ha cerrado.")
+
+    balances_sq = _representative_balances_as_of_query(db, snapshot_date).subquery()
+    snapshot_select = db.query(
+        balances_sq.c.representative_id,
+        literal(snapshot_date, models.RepresentativeBalanceSnapshot.snapshot_date.type),
+        _sql_round_2(balances_sq.c.charges_billed_ves),
+        _sql_round_2(balances_sq.c.allocated_to_charges_ves),
+        _sql_round_2(balances_sq.c.balance_due_ves),
+        _sql_round_2(balances_sq.c.payments_received_ves),
+        _sql_round_2(balances_sq.c.unallocated_credit_ves),
+    ).statement
+
+    try:
+        db.execute(delete(models.RepresentativeBalanceSnapshot).where(
+            models.RepresentativeBalanceSnapshot.snapshot_date == snapshot_date
+        ))
+        result = db.execute(insert(models.RepresentativeBalanceSnapshot).from_select(
+            [
+                "representative_id", "snapshot_date", "charges_billed_ves", "allocated_to_charges_ves",
+                "balance_due_ves", "payments_received_ves", "unallocated_credit_ves"
+            ],
+            snapshot_select
+        ))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return {
+        "message": f"Cierre de saldos al {snapshot_date.strftime('%d/%m/%Y')} generado.",
+        "snapshot_date": snapshot_date,
+        "representatives_count": result.rowcount
+    }
+
+
+def get_representative_balance_snapshots(
+    db: Session,
+    snapshot_date: Optional[date] = None,
+    representative_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 50
+) -> Dict[str, Any]:
+    query = db.query(models.RepresentativeBalanceSnapshot).options(
+        joinedload(models.RepresentativeBalanceSnapshot.representative)
+    )
+    if snapshot_date:
+        query = query.filter(models.RepresentativeBalanceSnapshot.snapshot_date == snapshot_date)
+    if representative_id is not None:
+        query = query.filter(models.RepresentativeBalanceSnapshot.representative_id == representative_id)
+
+    total = query.count()
+    items = query.order_by(
+        models.RepresentativeBalanceSnapshot.snapshot_date.desc(),
+        models.RepresentativeBalanceSnapshot.balance_due_ves.desc()
+    ).offset(skip).limit(limit).all()
+
+    current_page = (skip // limit) + 1 if limit > 0 else 1
+    pages = (total + limit - 1) // limit if limit > 0 else (1 if total > 0 else 0)
+    return {"items": items, "total": total, "page": current_page, "pages": pages, "limit": limit}
+
+
 def get_detailed_expense_transactions(
     db: Session,
     start_date: date,
@@ -4267,7 +7531,7 @@ def get_employees(
         search_term = f"%{search}%"
         query = query.filter(
             or_(
-                (models.Employee.first_name + " " + models.Employee.last_name).ilike(search_term),
+                models.full_name_expression(models.Employee.first_name, models.Employee.last_name).ilike(search_term),
                 models.Employee.first_name.ilike(search_term),
                 models.Employee.last_name.ilike(search_term),
                 models.Employee.identity_document.ilike(search_term),
@@ -5719,6 +8983,7 @@ def apply_available_credit(db: Session, representative_id: int) -> models.Repres
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El representante no tiene deudas pendientes a las cuales aplicar el saldo.")
 
     credit_left_to_apply = available_credit
+    affected_charge_ids: List[int] = []
     
     # 3. Iterar sobre las deudas y aplicar el crédito
     for charge in pending_charges:
@@ -5745,6 +9010,10 @@ def apply_available_credit(db: Session, representative_id: int) -> models.Repres
         
         # Reducir el crédito disponible
         credit_left_to_apply -= amount_to_apply_on_this_charge
+        affected_charge_ids.append(charge.id)
+
+    refresh_applied_charges_current_debt_ves(db, applied_charge_ids=affected_charge_ids)
+    refresh_student_delinquency_for_applied_charges(db, affected_charge_ids)
 
     # 4. Actualizar el saldo a favor del representante
     final_credit_applied = round(available_credit - credit_left_to_apply, 2)
@@ -27,7 +27,9 @@ from .routers import (
     suppliers,          
     expenses,
     personnel,
-    payslips       
+    payslips,
+    reports,
+    search
 )
 # Importaciones CRUD y Schemas para la creación del superusuario
 from .crud import get_user_by_email, create_user, get_expense_category_by_name, create_expense_category
@@ -133,6 +135,8 @@ app.include_router(invoices.router)
 app.include_router(credit_notes.router)
 app.include_router(dashboard.router)
 app.include_router(payslips.router)
+app.include_router(reports.router)
+app.include_router(search.router)
 
 # --- NUEVA INCLUSIÓN DE ROUTERS PARA EL MÓDULO DE GASTOS ---
 app.include_router(expense_categories.router)
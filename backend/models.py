@@ -2,7 +2,8 @@
 
 from sqlalchemy import (
     Boolean, Column, ForeignKey, Integer, String, Date, Float,
-    DateTime, Text, UniqueConstraint, Enum as SQLAlchemyEnum
+    DateTime, Text, UniqueConstraint, Index, Enum as SQLAlchemyEnum,
+    DDL, event, literal_column
 )
 from sqlalchemy.orm import relationship, backref
 from sqlalchemy.sql import func
@@ -38,6 +39,16 @@ class AppliedChargeStatus(str, enum.Enum):
     OVERDUE = "overdue"
     CANCELLED = "cancelled"
 
+class BillingJobStatus(str, enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+class LateFeeType(str, enum.Enum):
+    FIXED = "fixed"
+    PERCENTAGE = "percentage"
+
 # --- NUEVOS ENUMS PARA FACTURACIÓN ---
 class InvoiceStatus(str, enum.Enum): 
     PENDING_EMISSION = "pending_emission" # Estado inicial antes de la emisión fiscal
@@ -162,7 +173,9 @@ class Student(Base):
     scholarship_percentage = Column(Float, nullable=True)
     scholarship_fixed_amount = Column(Float, nullable=True)
     is_active = Column(Boolean, default=True)
+    enrollment_date = Column(Date, nullable=True, comment="Fecha de ingreso. Si cae dentro del período facturado, el cargo se prorratea (NULL = sin prorrateo)")
     applied_charges = relationship("AppliedCharge", back_populates="student", cascade="all, delete-orphan")
+    delinquency = relationship("StudentDelinquency", back_populates="student", uselist=False, cascade="all, delete-orphan")
 
 
 class SchoolConfiguration(Base):
@@ -207,6 +220,7 @@ class ChargeConcept(Base):
     name = Column(String(255), nullable=False, unique=True, index=True)
     description = Column(Text, nullable=True)
     default_amount = Column(Float, nullable=False, default=0.0)
+    previous_default_amount = Column(Float, nullable=True, comment="Precio antes del último cambio de default_amount; identifica los cargos a repreciar")
     default_amount_currency = Column(SQLAlchemyEnum(Currency), nullable=False, default=Currency.USD)
     is_amount_fixed = Column(Boolean, default=True)
     default_frequency = Column(SQLAlchemyEnum(ChargeFrequency), nullable=False, default=ChargeFrequency.UNICO)
@@ -234,12 +248,17 @@ class AppliedCharge(Base):
     amount_due_ves_at_emission = Column(Float, nullable=False)
     amount_paid_ves = Column(Float, nullable=False, default=0.0)
     exchange_rate_applied_at_emission = Column(Float, nullable=True)
-    issue_date = Column(Date, nullable=False)
+    issue_date = Column(Date, nullable=False, index=True)
     due_date = Column(Date, nullable=False)
     status = Column(SQLAlchemyEnum(AppliedChargeStatus), nullable=False, default=AppliedChargeStatus.PENDING, index=True)
+    current_debt_ves = Column(Float, nullable=False, default=0.0, server_default="0", index=True, comment="Deuda pendiente en VES revalorizada a la última tasa registrada (0 si el cargo está pagado o anulado)")
     
     # --- NUEVO CAMPO INVOICE_ID ---
     invoice_id = Column(Integer, ForeignKey('invoices.id', ondelete='SET NULL'), nullable=True, index=True)
+    billing_job_id = Column(Integer, ForeignKey('billing_jobs.id', ondelete='SET NULL'), nullable=True, index=True, comment="Trabajo de facturación que generó el cargo (NULL si fue manual)")
+    source_applied_charge_id = Column(Integer, ForeignKey('applied_charges.id', ondelete='SET NULL'), nullable=True, index=True, comment="Cargo vencido que originó este recargo por mora (NULL si no es mora)")
+    penalty_period = Column(String(7), nullable=True, comment="Período AAAA-MM del recargo por mora")
+    cancelled_at = Column(DateTime(timezone=True), nullable=True, comment="Momento de la anulación (NULL si el cargo no está anulado)")
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now())
@@ -248,6 +267,17 @@ class AppliedCharge(Base):
     charge_concept = relationship("ChargeConcept", back_populates="applied_charges")
     invoice = relationship("Invoice", back_populates="applied_charges_ref") # Relación inversa a Invoice
 
+    __table_args__ = (
+        # Un solo recargo por mora por cargo de origen y período
+        UniqueConstraint('source_applied_charge_id', 'penalty_period', name='uq_applied_charge_penalty_per_period'),
+        # Índice parcial para el barrido de vencidos: solo cargos abiertos no marcados aún, ordenados por vencimiento
+        Index(
+            'ix_applied_charges_open_due_date', 'due_date',
+            postgresql_where=status.in_([AppliedChargeStatus.PENDING, AppliedChargeStatus.PARTIALLY_PAID]),
+            sqlite_where=status.in_([AppliedChargeStatus.PENDING, AppliedChargeStatus.PARTIALLY_PAID])
+        ),
+    )
+
 
 class ExchangeRate(Base):
     __tablename__ = "exchange_rates"
@@ -281,14 +311,141 @@ class Payment(Base):
 
 class PaymentAllocation(Base):
     __tablename__ = "payment_allocations"
+    __table_args__ = (
+        # Para reconstruir saldos a una fecha: asignaciones de un cargo/pago creadas hasta un instante
+        Index('ix_payment_allocations_charge_created_at', 'applied_charge_id', 'created_at'),
+        Index('ix_payment_allocations_payment_created_at', 'payment_id', 'created_at'),
+    )
     id = Column(Integer, primary_key=True, index=True)
     payment_id = Column(Integer, ForeignKey("payments.id"), nullable=False)
     applied_charge_id = Column(Integer, ForeignKey("applied_charges.id"), nullable=False)
     amount_allocated_ves = Column(Float, nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     payment = relationship("Payment", back_populates="allocations")
     applied_charge = relationship("AppliedCharge")
 
+
+class PaymentAllocationReversal(Base):
+    """Copia de una asignación de pago borrada al revertir una corrida: conserva el saldo histórico a fechas anteriores."""
+    __tablename__ = "payment_allocation_reversals"
+    __table_args__ = (
+        Index('ix_payment_allocation_reversals_charge_dates', 'applied_charge_id', 'allocated_at', 'reversed_at'),
+        Index('ix_payment_allocation_reversals_payment_dates', 'payment_id', 'allocated_at', 'reversed_at'),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    payment_id = Column(Integer, ForeignKey("payments.id"), nullable=False)
+    applied_charge_id = Column(Integer, ForeignKey("applied_charges.id"), nullable=False)
+    amount_allocated_ves = Column(Float, nullable=False)
+    allocated_at = Column(DateTime(timezone=True), nullable=True, comment="created_at de la asignación original")
+    reversed_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    reason = Column(String(255), nullable=True)
+
+
+class RepresentativeBalanceSnapshot(Base):
+    __tablename__ = "representative_balance_snapshots"
+    __table_args__ = (UniqueConstraint('representative_id', 'snapshot_date', name='uq_representative_balance_snapshot_date'),)
+    id = Column(Integer, primary_key=True, index=True)
+    representative_id = Column(Integer, ForeignKey("representatives.id", ondelete="CASCADE"), nullable=False, index=True)
+    snapshot_date = Column(Date, nullable=False, index=True, comment="Fecha de corte (normalmente fin de mes)")
+    charges_billed_ves = Column(Float, nullable=False, default=0.0, comment="Cargos emitidos hasta la fecha de corte (VES a la emisión)")
+    allocated_to_charges_ves = Column(Float, nullable=False, default=0.0, comment="Pagos asignados a esos cargos hasta la fecha de corte")
+    balance_due_ves = Column(Float, nullable=False, default=0.0)
+    payments_received_ves = Column(Float, nullable=False, default=0.0, comment="Pagos recibidos hasta la fecha de corte (VES)")
+    unallocated_credit_ves = Column(Float, nullable=False, default=0.0, comment="Parte de esos pagos aún sin asignar a la fecha de corte")
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    representative = relationship("Representative")
+
+
+class StudentDelinquency(Base):
+    __tablename__ = "student_delinquency"
+    student_id = Column(Integer, ForeignKey("students.id", ondelete="CASCADE"), primary_key=True)
+    status = Column(String(10), nullable=False, default="green", index=True, comment="green / orange / red")
+    oldest_overdue_due_date = Column(Date, nullable=True, comment="Vencimiento del cargo abierto y vencido más antiguo")
+    months_late = Column(Integer, nullable=False, default=0)
+    overdue_charges_count = Column(Integer, nullable=False, default=0)
+    open_amount_ves = Column(Float, nullable=False, default=0.0, comment="Suma de la deuda hoy (current_debt_ves) de los cargos abiertos")
+    as_of_date = Column(Date, nullable=False, comment="Fecha con la que se evaluó el retraso")
+    refreshed_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    student = relationship("Student", back_populates="delinquency")
+
+
+class GradePromotionRun(Base):
+    __tablename__ = "grade_promotion_runs"
+    id = Column(Integer, primary_key=True, index=True)
+    school_year_label = Column(String(50), nullable=False, unique=True, index=True, comment="Año escolar cerrado, ej: 2024-2025")
+    promoted_count = Column(Integer, nullable=False, default=0)
+    graduated_count = Column(Integer, nullable=False, default=0)
+    repeating_count = Column(Integer, nullable=False, default=0)
+    details_json = Column(Text, nullable=True, comment="Mapeo aplicado por grado y estudiantes repitientes (JSON)")
+    notes = Column(Text, nullable=True)
+    executed_by_user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    executed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    executed_by = relationship("User")
+
+
+class BillingJob(Base):
+    __tablename__ = "billing_jobs"
+    id = Column(Integer, primary_key=True, index=True)
+    job_type = Column(String(50), nullable=False, default="recurring_charges")
+    status = Column(SQLAlchemyEnum(BillingJobStatus), nullable=False, default=BillingJobStatus.PENDING, index=True)
+    target_year = Column(Integer, nullable=False)
+    target_month = Column(Integer, nullable=False)
+    issue_date = Column(Date, nullable=False)
+    due_date = Column(Date, nullable=False)
+    charge_concept_ids_json = Column(Text, nullable=True, comment="IDs de conceptos a procesar (JSON); NULL = todos los mensuales activos")
+    exchange_rates_json = Column(Text, nullable=True, comment="Tasas resueltas al iniciar, reutilizadas al reanudar (JSON)")
+    chunk_size = Column(Integer, nullable=False, default=500)
+
+    total_students = Column(Integer, nullable=False, default=0)
+    processed_students = Column(Integer, nullable=False, default=0)
+    charges_created = Column(Integer, nullable=False, default=0)
+    duplicates_skipped = Column(Integer, nullable=False, default=0)
+    errors_count = Column(Integer, nullable=False, default=0)
+    last_processed_student_id = Column(Integer, nullable=False, default=0, comment="Punto de control: último estudiante procesado y confirmado")
+    messages_json = Column(Text, nullable=True, comment="Avisos y errores acumulados (JSON)")
+    error_message = Column(Text, nullable=True)
+
+    created_by_user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True, comment="Última confirmación de un bloque; sirve para detectar trabajos caídos")
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    created_by = relationship("User")
+
+
+class SiblingDiscountRule(Base):
+    __tablename__ = "sibling_discount_rules"
+    __table_args__ = (UniqueConstraint('sibling_position', 'applicable_category', name='uq_sibling_discount_position_category'),)
+    id = Column(Integer, primary_key=True, index=True)
+    sibling_position = Column(Integer, nullable=False, comment="Posición del hermano a partir de la cual aplica (2 = segundo hijo)")
+    discount_percentage = Column(Float, nullable=False, comment="Porcentaje de descuento sobre el monto en moneda original (ej: 10 para 10%)")
+    applicable_category = Column(SQLAlchemyEnum(ChargeCategory), nullable=True, comment="Categoría de concepto a la que aplica (NULL = todas)")
+    description = Column(String(255), nullable=True)
+    is_active = Column(Boolean, default=True, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now())
+
+class LateFeeRule(Base):
+    __tablename__ = "late_fee_rules"
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(100), nullable=False)
+    fee_type = Column(SQLAlchemyEnum(LateFeeType), nullable=False, default=LateFeeType.FIXED)
+    amount = Column(Float, nullable=False, comment="Monto fijo (en 'currency') o porcentaje sobre el saldo pendiente del cargo vencido")
+    currency = Column(SQLAlchemyEnum(Currency), nullable=False, default=Currency.USD, comment="Moneda del monto fijo (el porcentual usa la moneda del cargo vencido)")
+    grace_days = Column(Integer, nullable=False, default=0, comment="Días después del vencimiento antes de aplicar la mora")
+    applicable_category = Column(SQLAlchemyEnum(ChargeCategory), nullable=True, comment="Categoría de los cargos vencidos a la que aplica (NULL = todas)")
+    penalty_charge_concept_id = Column(Integer, ForeignKey("charge_concepts.id"), nullable=False, comment="Concepto con el que se registran los recargos")
+    description = Column(String(255), nullable=True)
+    is_active = Column(Boolean, default=True, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now())
+
+    penalty_charge_concept = relationship("ChargeConcept")
+
 # --- NUEVOS MODELOS PARA FACTURACIÓN ---
 
 class Invoice(Base):
@@ -873,3 +1030,63 @@ class LeaveRequest(Base):
     payroll_run = relationship("PayrollRun") # Relación simple
     requested_by_user = relationship("User", foreign_keys=[requested_by_user_id])
     processed_by_user = relationship("User", foreign_keys=[processed_by_user_id])
+
+
+# --- Índices de búsqueda por trigramas (solo PostgreSQL) ---
+# Las búsquedas usan ilike('%termino%'), que no puede aprovechar índices B-tree. Los índices GIN con
+# gin_trgm_ops (extensión pg_trgm) sí lo permiten. En otros motores (SQLite en pruebas) no se crean.
+
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
+
+
+def full_name_expression(first_name_column, last_name_column):
+    """first_name || ' ' || last_name con el espacio como literal, para que las consultas coincidan con el índice de expresión."""
+    return first_name_column + literal_column("' '", String) + last_name_column
+
+
+def _trigram_index(name, *columns):
+    return Index(
+        name, *columns,
+        postgresql_using="gin",
+        postgresql_ops={column.name: "gin_trgm_ops" for column in columns}
+    ).ddl_if(dialect="postgresql")
+
+
+def _trigram_full_name_index(name, model):
+    return Index(
+        name, full_name_expression(model.first_name, model.last_name).label("full_name"),
+        postgresql_using="gin",
+        postgresql_ops={"full_name": "gin_trgm_ops"}
+    ).ddl_if(dialect="postgresql")
+
+
+_trigram_index("ix_representatives_search_trgm", Representative.first_name, Representative.last_name, Representative.cedula, Representative.email)
+_trigram_full_name_index("ix_representatives_full_name_trgm", Representative)
+_trigram_index("ix_students_search_trgm", Student.first_name, Student.last_name, Student.cedula)
+_trigram_full_name_index("ix_students_full_name_trgm", Student)
+_trigram_index("ix_employees_search_trgm", Employee.first_name, Employee.last_name, Employee.identity_document, Employee.personal_email)
+_trigram_full_name_index("ix_employees_full_name_trgm", Employee)
+_trigram_index("ix_suppliers_search_trgm", Supplier.name, Supplier.rif_ci, Supplier.email, Supplier.contact_person)
+_trigram_index("ix_payslips_search_trgm", Payslip.employee_full_name_snapshot, Payslip.employee_identity_document_snapshot)
+
+
+# --- Índices para autocompletado por prefijo (solo PostgreSQL) ---
+# lower(columna) LIKE 'prefijo%' usa un B-tree con text_pattern_ops sin importar la collation de la base.
+
+def _prefix_index(name, expression):
+    return Index(
+        name, func.lower(expression).label("prefix_key"),
+        postgresql_ops={"prefix_key": "text_pattern_ops"}
+    ).ddl_if(dialect="postgresql")
+
+
+_prefix_index("ix_representatives_first_last_prefix", full_name_expression(Representative.first_name, Representative.last_name))
+_prefix_index("ix_representatives_last_first_prefix", full_name_expression(Representative.last_name, Representative.first_name))
+_prefix_index("ix_representatives_cedula_prefix", Representative.cedula)
+_prefix_index("ix_students_first_last_prefix", full_name_expression(Student.first_name, Student.last_name))
+_prefix_index("ix_students_last_first_prefix", full_name_expression(Student.last_name, Student.first_name))
+_prefix_index("ix_students_cedula_prefix", Student.cedula)
@@ -80,6 +80,27 @@ async def create_new_applied_charge(
     return new_applied_charge
 
 
+@router.post("/sweep-overdue", response_model=schemas.OverdueSweepResponse)
+async def sweep_overdue_applied_charges_endpoint(
+    on_date: Optional[date] = Query(None, description="Fecha de evaluación (por defecto, hoy)."),
+    db: Session = Depends(get_db)
+):
+    """Marca como vencidos los cargos abiertos con vencimiento pasado. Normalmente lo ejecuta la tarea nocturna (backend.scheduled_tasks)."""
+    return crud.sweep_overdue_applied_charges(db, on_date=on_date)
+
+
+@router.get("/batch", response_model=schemas.BatchLookupResponse[schemas.AppliedChargeResponse])
+async def read_applied_charges_batch(
+    ids: List[int] = Query(..., description=f"IDs de cargos aplicados a consultar (máximo {crud.MAX_BATCH_LOOKUP_IDS})."),
+    db: Session = Depends(get_db)
+):
+    """Obtiene varios cargos aplicados en una sola consulta. Los IDs inexistentes se informan en missing_ids."""
+    try:
+        return crud.get_applied_charges_by_ids(db, ids=ids)
+    except ValueError as ve:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
+
+
 @router.get("/{applied_charge_id}", response_model=schemas.AppliedChargeResponse)
 async def read_single_applied_charge(
     applied_charge_id: int,
@@ -140,12 +161,13 @@ async def read_all_applied_charges_list(
     end_issue_date: Optional[date] = Query(None, description="Fecha de fin para el filtro de emisión (YYYY-MM-DD)"),
     start_due_date: Optional[date] = Query(None, description="Fecha de inicio para el filtro de vencimiento (YYYY-MM-DD)"),
     end_due_date: Optional[date] = Query(None, description="Fecha de fin para el filtro de vencimiento (YYYY-MM-DD)"),
-    sort_by: str = Query("issue_date", description="Campo para ordenar (ej: issue_date, student_name, charge_concept_name)"),
+    min_current_debt_ves: Optional[float] = Query(None, ge=0, description="Filtrar cargos cuya deuda hoy (VES, revalorizada) sea mayor o igual a este monto"),
+    sort_by: str = Query("issue_date", description="Campo para ordenar (ej: issue_date, student_name, charge_concept_name, current_debt_ves)"),
     sort_order: str = Query("desc", enum=["asc", "desc"])
 ):
 
     allowed_sort_fields = [
-        "issue_date", "due_date", "amount_due", "status", "created_at",
+        "issue_date", "due_date", "amount_due", "status", "created_at", "current_debt_ves",
         "student_name", "charge_concept_name" # Estos requieren joins manejados en el CRUD
     ]
     if sort_by not in allowed_sort_fields:
@@ -163,6 +185,7 @@ async def read_all_applied_charges_list(
         end_issue_date=end_issue_date,
         start_due_date=start_due_date,
         end_due_date=end_due_date,
+        min_current_debt_ves=min_current_debt_ves,
         sort_by=sort_by,
         sort_order=sort_order
     )
@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Path
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Path, BackgroundTasks, Response
 from sqlalchemy.orm import Session
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Literal
 from datetime import date
 from pydantic import Field, BaseModel
 
-from .. import crud, schemas
+from .. import crud, models, schemas
+from ..database import SessionLocal
 from .auth import get_db, get_current_active_user
 from ..schemas import GenerateChargesRequest
 
@@ -19,6 +20,8 @@ router = APIRouter(
 @router.post("/generate-recurring-charges", response_model=schemas.GenerateChargesSummaryResponse) # <--- CAMBIO AQUÍ
 async def generate_recurring_charges_endpoint(
     params: GenerateChargesRequest,
+    workers: int = Query(1, ge=1, le=16, description="Procesos para calcular los cargos en paralelo (1 = sin paralelismo)."),
+    shard_by: Literal["id_range", "grade_level"] = Query("id_range", description="Reparto de estudiantes entre procesos."),
     db: Session = Depends(get_db)
 ):
     try:
@@ -28,7 +31,9 @@ async def generate_recurring_charges_endpoint(
             target_month=params.target_month,
             issue_date_override=params.issue_date_override,
             due_date_override=params.due_date_override,
-            specific_charge_concept_ids=params.charge_concept_ids
+            specific_charge_concept_ids=params.charge_concept_ids,
+            workers=workers,
+            shard_by=shard_by
         )
         
 
@@ -49,6 +54,159 @@ async def generate_recurring_charges_endpoint(
         )
         
         
+def _billing_preview_response(preview: Dict, output_format: str, filename: str):
+    if output_format == "csv":
+        return Response(
+            content=crud.billing_preview_to_csv(preview),
+            media_type="text/csv; charset=utf-8",
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        )
+    return preview
+
+
+@router.post("/generate-recurring-charges/preview", response_model=schemas.BillingPreviewResponse)
+async def preview_recurring_charges_endpoint(
+    params: GenerateChargesRequest,
+    output_format: Literal["json", "csv"] = Query("json", alias="format", description="'csv' descarga el detalle por estudiante."),
+    db: Session = Depends(get_db)
+):
+    """
+    Simulación de la generación mensual: calcula lo que se crearía (montos por estudiante después de becas,
+    descuentos y conversión, duplicados omitidos y totales por concepto y grado) sin escribir nada.
+    """
+    try:
+        preview = crud.preview_recurring_charges(db, params=params)
+    except ValueError as ve:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
+    return _billing_preview_response(
+        preview, output_format, f"vista_previa_cargos_{params.target_year}_{params.target_month:02d}.csv"
+    )
+
+
+def run_billing_job_task(job_id: int) -> None:
+    """Ejecuta un trabajo de facturación fuera de la petición HTTP, con su propia sesión."""
+    db = SessionLocal()
+    try:
+        crud.run_billing_job(db, job_id=job_id)
+    finally:
+        db.close()
+
+
+@router.post("/generate-recurring-charges/jobs", response_model=schemas.BillingJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_recurring_charges_job(
+    params: GenerateChargesRequest,
+    background_tasks: BackgroundTasks,
+    chunk_size: int = Query(crud.BILLING_JOB_DEFAULT_CHUNK_SIZE, ge=50, le=5000, description="Estudiantes por bloque (un commit por bloque)."),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    Registra la generación mensual como un trabajo en segundo plano y responde de inmediato.
+    El progreso se consulta en GET /billing-processes/jobs/{job_id}.
+    """
+    try:
+        job = crud.create_recurring_charges_job(db, params=params, user_id=current_user.id, chunk_size=chunk_size)
+    except ValueError as ve:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(ve))
+    background_tasks.add_task(run_billing_job_task, job.id)
+    return job
+
+
+@router.get("/jobs", response_model=schemas.PaginatedResponse[schemas.BillingJobResponse])
+async def read_billing_jobs(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    return crud.get_billing_jobs(db, skip=skip, limit=limit)
+
+
+@router.get("/jobs/{job_id}", response_model=schemas.BillingJobResponse)
+async def read_billing_job(
+    job_id: int = Path(..., ge=1),
+    db: Session = Depends(get_db)
+):
+    """Estado y progreso (procesados / creados / errores) de un trabajo de facturación."""
+    job = crud.get_billing_job(db, job_id=job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Trabajo de facturación con ID {job_id} no encontrado.")
+    return job
+
+
+@router.post("/jobs/{job_id}/resume", response_model=schemas.BillingJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def resume_billing_job(
+    background_tasks: BackgroundTasks,
+    job_id: int = Path(..., ge=1),
+    db: Session = Depends(get_db)
+):
+    """Reanuda un trabajo fallido o caído desde su último punto de control."""
+    job = crud.get_billing_job(db, job_id=job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Trabajo de facturación con ID {job_id} no encontrado.")
+    if not crud.is_billing_job_resumable(job):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"El trabajo ID {job_id} no se puede reanudar (estado: {job.status.value})."
+        )
+    background_tasks.add_task(run_billing_job_task, job.id)
+    return job
+
+
+@router.post("/rollback", response_model=schemas.BillingRunRollbackResponse)
+async def rollback_billing_run_endpoint(
+    rollback_in: schemas.BillingRunRollbackRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Anula en bloque los cargos de una corrida equivocada (por trabajo de facturación, o por concepto y rango de emisión)
+    y libera los pagos que se les habían asignado como saldo a favor. Con dry_run=true solo informa.
+    """
+    if rollback_in.billing_job_id is not None and not crud.get_billing_job(db, job_id=rollback_in.billing_job_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Trabajo de facturación con ID {rollback_in.billing_job_id} no encontrado.")
+    try:
+        return crud.rollback_billing_run(
+            db,
+            billing_job_id=rollback_in.billing_job_id,
+            charge_concept_id=rollback_in.charge_concept_id,
+            issue_date_from=rollback_in.issue_date_from,
+            issue_date_to=rollback_in.issue_date_to,
+            dry_run=rollback_in.dry_run
+        )
+    except ValueError as ve:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
+
+
+@router.post("/generate-due-charges", response_model=schemas.DueChargesSummaryResponse)
+async def generate_due_charges_endpoint(
+    on_date: Optional[date] = Query(None, description="Fecha de la corrida (por defecto, hoy). Define el período vigente de cada concepto."),
+    charge_concept_ids: Optional[List[int]] = Query(None, description="Opcional: IDs de conceptos a procesar (por defecto, todos los activos)."),
+    dry_run: bool = Query(False, description="Si es verdadero, solo informa los cargos que se crearían."),
+    db: Session = Depends(get_db)
+):
+    """
+    Genera en una sola transacción todos los cargos adeudados a la fecha para los conceptos mensuales, quincenales,
+    anuales (período escolar configurado) y únicos. Ejecutarlo varias veces en el mismo período no duplica cargos.
+    """
+    return crud.run_generate_due_charges_process(
+        db, on_date=on_date, specific_charge_concept_ids=charge_concept_ids, dry_run=dry_run
+    )
+
+
+@router.post("/apply-late-fees", response_model=schemas.LateFeeProcessResponse)
+async def apply_late_fees_endpoint(
+    on_date: Optional[date] = Query(None, description="Fecha de evaluación (por defecto, hoy). Define el período AAAA-MM del recargo."),
+    db: Session = Depends(get_db)
+):
+    """
+    Aplica los recargos por mora configurados a los cargos vencidos más allá de sus días de gracia.
+    Un cargo recibe como máximo un recargo por período, aunque el proceso se ejecute varias veces.
+    """
+    try:
+        return crud.run_apply_late_fees_process(db, on_date=on_date)
+    except ValueError as ve:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(ve))
+
+
 @router.post("/representative/{representative_id}/apply-credit", response_model=schemas.ApplyCreditProcessResponse)
 async def apply_representative_available_credit(
     representative_id: int = Path(..., title="ID del Representante", ge=1),
@@ -114,4 +272,20 @@ async def apply_global_charge_endpoint(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Ocurrió un error interno inesperado al aplicar el cargo global: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+@router.post("/apply-global-charge/preview", response_model=schemas.BillingPreviewResponse)
+async def preview_global_charge_endpoint(
+    charge_details: schemas.GlobalChargeCreate,
+    output_format: Literal["json", "csv"] = Query("json", alias="format", description="'csv' descarga el detalle por estudiante."),
+    db: Session = Depends(get_db)
+):
+    """Simulación del cargo global: mismo cálculo que /apply-global-charge sin crear ningún cargo."""
+    try:
+        preview = crud.preview_global_charge(db, charge_details=charge_details)
+    except ValueError as ve:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
+    return _billing_preview_response(
+        preview, output_format, f"vista_previa_cargo_global_{charge_details.charge_concept_id}_{charge_details.issue_date}.csv"
+    )
@@ -132,6 +132,31 @@ async def update_existing_charge_concept(
     return updated_charge_concept
 
 
+@router.post("/{charge_concept_id}/reprice-pending-charges", response_model=schemas.ChargeConceptRepriceResponse)
+async def reprice_pending_charges(
+    charge_concept_id: int,
+    reprice_in: schemas.ChargeConceptRepriceRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Propaga el precio actual del concepto a sus cargos pendientes intactos (sin pagos ni factura, emitidos con el
+    precio anterior) en el rango, respetando la beca de cada estudiante. Con dry_run=true solo muestra la diferencia.
+    """
+    if not crud.get_charge_concept(db, charge_concept_id=charge_concept_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Concepto de cargo no encontrado")
+    try:
+        return crud.reprice_pending_charges_for_concept(
+            db,
+            charge_concept_id=charge_concept_id,
+            issue_date_from=reprice_in.issue_date_from,
+            issue_date_to=reprice_in.issue_date_to,
+            previous_amount=reprice_in.previous_amount,
+            dry_run=reprice_in.dry_run
+        )
+    except ValueError as ve:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
+
+
 @router.delete("/{charge_concept_id}", response_model=schemas.ChargeConceptResponse)
 async def deactivate_existing_charge_concept(
     charge_concept_id: int,
@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import Optional, List
 
 from .. import crud, models, schemas
 from .auth import get_current_active_user, get_db
@@ -30,4 +30,93 @@ async def set_or_update_school_configurations(
     db: Session = Depends(get_db)
 ):
     updated_config = crud.create_or_update_school_configuration(db=db, config_in=config_in)
-    return updated_config
\ No newline at end of file
+    return updated_config
+
+@router.get("/sibling-discounts/", response_model=List[schemas.SiblingDiscountRuleResponse])
+async def read_sibling_discount_rules(
+    is_active: Optional[bool] = Query(None, description="Filtrar por reglas activas/inactivas"),
+    db: Session = Depends(get_db)
+):
+    return crud.get_sibling_discount_rules(db, is_active=is_active)
+
+
+@router.post("/sibling-discounts/", response_model=schemas.SiblingDiscountRuleResponse, status_code=status.HTTP_201_CREATED)
+async def create_sibling_discount_rule(
+    rule_in: schemas.SiblingDiscountRuleCreate,
+    db: Session = Depends(get_db)
+):
+    try:
+        return crud.create_sibling_discount_rule(db, rule_in=rule_in)
+    except ValueError as ve:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
+
+
+@router.put("/sibling-discounts/{rule_id}", response_model=schemas.SiblingDiscountRuleResponse)
+async def update_sibling_discount_rule(
+    rule_id: int,
+    rule_in: schemas.SiblingDiscountRuleUpdate,
+    db: Session = Depends(get_db)
+):
+    try:
+        db_rule = crud.update_sibling_discount_rule(db, rule_id=rule_id, rule_in=rule_in)
+    except ValueError as ve:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
+    if db_rule is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Regla de descuento por hermanos no encontrada.")
+    return db_rule
+
+
+@router.delete("/sibling-discounts/{rule_id}", response_model=schemas.SiblingDiscountRuleResponse)
+async def delete_sibling_discount_rule(
+    rule_id: int,
+    db: Session = Depends(get_db)
+):
+    db_rule = crud.delete_sibling_discount_rule(db, rule_id=rule_id)
+    if db_rule is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Regla de descuento por hermanos no encontrada.")
+    return db_rule
+
+
+@router.get("/late-fee-rules/", response_model=List[schemas.LateFeeRuleResponse])
+async def read_late_fee_rules(
+    is_active: Optional[bool] = Query(None, description="Filtrar por reglas activas/inactivas"),
+    db: Session = Depends(get_db)
+):
+    return crud.get_late_fee_rules(db, is_active=is_active)
+
+
+@router.post("/late-fee-rules/", response_model=schemas.LateFeeRuleResponse, status_code=status.HTTP_201_CREATED)
+async def create_late_fee_rule(
+    rule_in: schemas.LateFeeRuleCreate,
+    db: Session = Depends(get_db)
+):
+    try:
+        return crud.create_late_fee_rule(db, rule_in=rule_in)
+    except ValueError as ve:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
+
+
+@router.put("/late-fee-rules/{rule_id}", response_model=schemas.LateFeeRuleResponse)
+async def update_late_fee_rule(
+    rule_id: int,
+    rule_in: schemas.LateFeeRuleUpdate,
+    db: Session = Depends(get_db)
+):
+    try:
+        db_rule = crud.update_late_fee_rule(db, rule_id=rule_id, rule_in=rule_in)
+    except ValueError as ve:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
+    if db_rule is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Regla de mora no encontrada.")
+    return db_rule
+
+
+@router.delete("/late-fee-rules/{rule_id}", response_model=schemas.LateFeeRuleResponse)
+async def delete_late_fee_rule(
+    rule_id: int,
+    db: Session = Depends(get_db)
+):
+    db_rule = crud.delete_late_fee_rule(db, rule_id=rule_id)
+    if db_rule is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Regla de mora no encontrada.")
+    return db_rule
@@ -15,7 +15,10 @@ router = APIRouter(
 )
 
 @router.get("/summary", response_model=schemas.DashboardSummaryResponse) 
-async def get_dashboard_summary_endpoint(db: Session = Depends(get_db)):
+async def get_dashboard_summary_endpoint(
+    refresh: bool = Query(False, description="Ignorar la caché y recalcular."),
+    db: Session = Depends(get_db)
+):
     """
     Obtiene un resumen rápido para el dashboard del administrador:
     - Total de representantes.
@@ -23,7 +26,7 @@ async def get_dashboard_summary_endpoint(db: Session = Depends(get_db)):
     - Total recaudado en el mes actual (VES).
     - Total de deuda pendiente general (VES).
     """
-    summary_data = crud.get_enriched_dashboard_summary(db) 
+    summary_data = crud.get_dashboard_cached("summary", lambda: crud.get_enriched_dashboard_summary(db), refresh=refresh)
 
     if not summary_data:
         # Esto podría pasar si la función CRUD devuelve None en caso de un error crítico
@@ -35,6 +38,19 @@ async def get_dashboard_summary_endpoint(db: Session = Depends(get_db)):
     
     return summary_data
 
+@router.get("/grade-level-breakdown", response_model=schemas.DashboardGradeLevelBreakdownResponse)
+async def get_grade_level_breakdown_endpoint(
+    refresh: bool = Query(False, description="Ignorar la caché y recalcular."),
+    db: Session = Depends(get_db)
+):
+    """
+    Por grado: estudiantes activos, cargos emitidos y cobrado en el mes actual,
+    deuda abierta revalorizada a la tasa de hoy y cantidad de estudiantes morosos.
+    """
+    return crud.get_dashboard_cached(
+        "grade_level_breakdown", lambda: crud.get_dashboard_grade_level_breakdown(db), refresh=refresh
+    )
+
 @router.get("/expense-trend", response_model=List[schemas.MonthlyExpenseSummary])
 async def get_expense_trend_endpoint(
     granularity: str = Query("month", enum=["day", "month"], description="Granularidad: 'day' o 'month'."),
@@ -136,9 +152,10 @@ async def get_exchange_rate_alert_status(
 
 @router.get("/", response_model=schemas.DashboardData)
 async def get_dashboard_metrics(
+    refresh: bool = Query(False, description="Ignorar la caché y recalcular."),
     db: Session = Depends(get_db)
 ):
     """
     Obtiene todas las métricas y datos necesarios para el dashboard financiero principal.
     """
-    return crud.get_dashboard_data(db=db)
\ No newline at end of file
+    return crud.get_dashboard_cached("dashboard_data", lambda: crud.get_dashboard_data(db=db), refresh=refresh)
\ No newline at end of file
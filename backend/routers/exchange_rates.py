@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks
 from sqlalchemy.orm import Session
 from typing import Optional, List
 from datetime import date
@@ -17,6 +17,7 @@ router = APIRouter(
 @router.post("/", response_model=schemas.ExchangeRateResponse, status_code=status.HTTP_201_CREATED)
 async def create_new_exchange_rate(
     exchange_rate_in: schemas.ExchangeRateCreate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
 
@@ -43,7 +44,10 @@ async def create_new_exchange_rate(
                 )
             )
             
-        return crud.create_exchange_rate(db=db, exchange_rate_in=exchange_rate_in)
+        new_rate = crud.create_exchange_rate(db=db, exchange_rate_in=exchange_rate_in)
+        # El monto abierto de la morosidad depende de la tasa: se reconstruye después de responder
+        background_tasks.add_task(crud.rebuild_student_delinquency_in_new_session, db.get_bind())
+        return new_rate
     except HTTPException as e: 
         raise e
     except Exception as e: 
@@ -99,12 +103,14 @@ async def read_single_exchange_rate(exchange_rate_id: int, db: Session = Depends
 async def update_an_exchange_rate(
     exchange_rate_id: int,
     exchange_rate_in: schemas.ExchangeRateUpdate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     try:
         updated_rate = crud.update_exchange_rate(db, exchange_rate_id, exchange_rate_in)
         if not updated_rate:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tasa de cambio no encontrada o la actualización crea un conflicto.")
+        background_tasks.add_task(crud.rebuild_student_delinquency_in_new_session, db.get_bind())
         return updated_rate
     except HTTPException as e: 
         raise e
@@ -113,8 +119,9 @@ async def update_an_exchange_rate(
     
     
 @router.delete("/{exchange_rate_id}", response_model=schemas.ExchangeRateResponse) # 
-async def delete_an_exchange_rate(exchange_rate_id: int, db: Session = Depends(get_db)):
+async def delete_an_exchange_rate(exchange_rate_id: int, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     deleted_rate = crud.delete_exchange_rate(db, exchange_rate_id)
     if not deleted_rate:
         raise HTTPException(status_code=404, detail="Tasa de cambio no encontrada para eliminar.")
+    background_tasks.add_task(crud.rebuild_student_delinquency_in_new_session, db.get_bind())
     return deleted_rate
\ No newline at end of file
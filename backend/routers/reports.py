@@ -0,0 +1,104 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.orm import Session
+from typing import Literal, Optional
+from datetime import date
+
+from .. import crud, schemas
+from .auth import get_db, get_current_active_user
+
+
+router = APIRouter(
+    prefix="/reports",
+    tags=["Financial Reports"],
+    dependencies=[Depends(get_current_active_user)]
+)
+
+
+@router.get("/receivables-aging", response_model=schemas.ReceivablesAgingReportResponse)
+async def get_receivables_aging_report_endpoint(
+    group_by: Literal["representative", "grade_level", "school"] = Query("representative", description="Nivel de agrupación del reporte."),
+    sort_by: Literal["current", "days_1_30", "days_31_60", "days_61_90", "days_over_90", "total", "group_name"] = Query("total", description="Tramo o campo por el cual ordenar."),
+    sort_order: str = Query("desc", enum=["asc", "desc"]),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=200),
+    db: Session = Depends(get_db)
+):
+    """
+    Antigüedad de saldos de cuentas por cobrar (al día, 1-30, 31-60, 61-90 y más de 90 días de atraso),
+    por representante, por grado o total del colegio. Los cargos indexados se valoran a la tasa de hoy.
+    """
+    try:
+        return crud.get_receivables_aging_report(
+            db,
+            group_by=group_by,
+            skip=skip,
+            limit=limit,
+            sort_by=sort_by,
+            sort_order=sort_order
+        )
+    except ValueError as ve:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
+
+
+@router.get("/representative-balances-as-of", response_model=schemas.RepresentativeBalancesAsOfResponse)
+async def get_representative_balances_as_of_endpoint(
+    as_of_date: date = Query(..., description="Fecha de corte (YYYY-MM-DD)."),
+    representative_id: Optional[int] = Query(None, description="Limitar a un representante."),
+    only_with_balance: bool = Query(False, description="Solo representantes con saldo deudor o crédito a la fecha."),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    """
+    Reconstruye lo que cada representante debía (y el crédito que tenía) al cierre de una fecha pasada,
+    a partir de los cargos emitidos y las asignaciones de pago creadas hasta esa fecha.
+    """
+    try:
+        return crud.get_representative_balances_as_of(
+            db,
+            as_of_date=as_of_date,
+            representative_id=representative_id,
+            only_with_balance=only_with_balance,
+            skip=skip,
+            limit=limit
+        )
+    except ValueError as ve:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
+
+
+@router.post("/balance-snapshots/month-end", response_model=schemas.BalanceSnapshotRunResponse, status_code=status.HTTP_201_CREATED)
+async def create_month_end_balance_snapshots_endpoint(
+    snapshot_in: schemas.BalanceSnapshotCreate,
+    db: Session = Depends(get_db)
+):
+    """Guarda en bloque los saldos de todos los representantes al último día del mes indicado."""
+    try:
+        return crud.create_month_end_balance_snapshots(db, year=snapshot_in.year, month=snapshot_in.month)
+    except ValueError as ve:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
+
+
+@router.get("/balance-snapshots", response_model=schemas.PaginatedResponse[schemas.RepresentativeBalanceSnapshotResponse])
+async def get_balance_snapshots_endpoint(
+    snapshot_date: Optional[date] = Query(None, description="Fecha de cierre a consultar."),
+    representative_id: Optional[int] = Query(None),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    return crud.get_representative_balance_snapshots(
+        db,
+        snapshot_date=snapshot_date,
+        representative_id=representative_id,
+        skip=skip,
+        limit=limit
+    )
+
+
+@router.post("/student-delinquency/rebuild", response_model=schemas.StudentDelinquencyRebuildResponse)
+async def rebuild_student_delinquency_endpoint(
+    on_date: Optional[date] = Query(None, description="Fecha de evaluación (por defecto, hoy)."),
+    db: Session = Depends(get_db)
+):
+    """Reconstruye la tabla de morosidad precalculada. Normalmente lo ejecuta la tarea nocturna (backend.scheduled_tasks)."""
+    return crud.rebuild_student_delinquency(db, on_date=on_date)
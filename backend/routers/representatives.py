@@ -1,6 +1,6 @@
 # backend/routers/representatives.py
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, File, UploadFile
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
@@ -38,6 +38,27 @@ async def create_new_representative(
     return crud.create_representative(db=db, representative_in=representative_in)
 
 
+@router.post("/bulk-import", response_model=schemas.BulkImportResponse)
+async def bulk_import_representatives_and_students(
+    file: UploadFile = File(..., description="CSV o XLSX con una fila por estudiante (columnas rep_*, student_* y grade_level)."),
+    skip_invalid_rows: bool = Query(False, description="Si es True se importan las filas válidas aunque otras tengan errores."),
+    db: Session = Depends(get_db)
+):
+    """
+    Importa en bloque representantes con sus estudiantes. Todas las filas se validan antes de guardar
+    y la respuesta incluye los errores por fila.
+    """
+    content = await file.read()
+    try:
+        return crud.bulk_import_representatives_and_students(
+            db, filename=file.filename, content=content, skip_invalid_rows=skip_invalid_rows
+        )
+    except ValueError as ve:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
+    finally:
+        await file.close()
+
+
 @router.get("/", response_model=PaginatedResponse[schemas.RepresentativeResponse])
 async def read_representatives_list(
     db: Session = Depends(get_db),
@@ -70,6 +91,63 @@ async def read_representatives_list(
     return representatives
 
 
+@router.get("/typeahead", response_model=List[schemas.TypeaheadItem])
+async def typeahead_representatives(
+    q: str = Query(..., min_length=1, max_length=100, description="Inicio del nombre, apellido o cédula."),
+    limit: int = Query(10, ge=1, le=crud.MAX_TYPEAHEAD_RESULTS),
+    db: Session = Depends(get_db)
+):
+    """Autocompletado liviano para selectores: solo id, nombre y cédula, coincidencia por prefijo."""
+    try:
+        return crud.typeahead_representatives(db, term=q, limit=limit)
+    except ValueError as ve:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
+
+
+@router.get("/duplicates", response_model=schemas.RepresentativeDuplicatesResponse)
+async def find_duplicate_representatives(
+    min_score: float = Query(0.5, ge=0, le=1, description="Puntaje mínimo para reportar un par como posible duplicado."),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    """
+    Lista pares de representantes posiblemente duplicados (misma cédula en otro formato,
+    nombre fonéticamente igual, mismo teléfono o correo), ordenados por puntaje.
+    """
+    return crud.find_duplicate_representatives(db, min_score=min_score, limit=limit)
+
+
+@router.post("/merge", response_model=schemas.RepresentativeMergeResponse)
+async def merge_representatives(
+    merge_in: schemas.RepresentativeMergeRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Fusiona representantes duplicados en uno solo: mueve estudiantes, pagos, facturas y notas de crédito
+    y elimina los registros de origen, todo en una transacción.
+    """
+    try:
+        return crud.merge_representatives(
+            db,
+            target_representative_id=merge_in.target_representative_id,
+            source_representative_ids=merge_in.source_representative_ids
+        )
+    except ValueError as ve:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
+
+
+@router.get("/batch", response_model=schemas.BatchLookupResponse[schemas.RepresentativeResponse])
+async def read_representatives_batch(
+    ids: List[int] = Query(..., description=f"IDs de representantes a consultar (máximo {crud.MAX_BATCH_LOOKUP_IDS})."),
+    db: Session = Depends(get_db)
+):
+    """Obtiene varios representantes en una sola consulta. Los IDs inexistentes se informan en missing_ids."""
+    try:
+        return crud.get_representatives_by_ids(db, ids=ids)
+    except ValueError as ve:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
+
+
 @router.get("/{representative_id}", response_model=schemas.RepresentativeResponse)
 async def read_single_representative(
     representative_id: int,
@@ -0,0 +1,28 @@
+# backend/routers/search.py
+
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from .. import crud, schemas
+from .auth import get_current_active_user, get_db
+
+router = APIRouter(
+    prefix="/search",
+    tags=["Search"],
+    dependencies=[Depends(get_current_active_user)]
+)
+
+
+@router.get("/", response_model=schemas.UnifiedSearchResponse)
+async def unified_search_endpoint(
+    q: str = Query(..., min_length=2, max_length=100, description="Nombre, cédula, RIF o correo a buscar."),
+    types: Optional[List[str]] = Query(None, description=f"Tipos a incluir: {', '.join(crud.SEARCH_ENTITY_TYPES)}. Por defecto, todos."),
+    limit_per_type: int = Query(10, ge=1, le=crud.MAX_SEARCH_RESULTS_PER_TYPE),
+    db: Session = Depends(get_db)
+):
+    """Búsqueda global en representantes, estudiantes, empleados, proveedores y recibos de pago."""
+    try:
+        return crud.unified_search(db, term=q, entity_types=types, limit_per_type=limit_per_type)
+    except ValueError as ve:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional, Literal
 from datetime import date
@@ -47,7 +47,8 @@ async def read_students_list(
     representative_id: Optional[int] = Query(None, description="Filtrar por ID del representante"),
     grade_level_id: Optional[int] = Query(None, description="Filtrar por ID del grado/nivel"),
     grade_level_name: Optional[str] = Query(None, description="Filtrar por nombre del grado/nivel (búsqueda parcial)"), 
-    is_active: Optional[bool] = Query(True, description="Filtrar por estado activo (True/False) o todos (None)") 
+    is_active: Optional[bool] = Query(True, description="Filtrar por estado activo (True/False) o todos (None)"),
+    delinquency_status: Optional[Literal["green", "orange", "red"]] = Query(None, description="Filtrar por estado de morosidad precalculado (green, orange, red)")
 ):
     # ... (validación de allowed_sort_fields sin cambios) ...
     allowed_sort_fields = ["id", "first_name", "last_name", "cedula", "grade_level", "created_at", "updated_at", "is_active"] 
@@ -67,11 +68,72 @@ async def read_students_list(
         representative_id=representative_id,
         grade_level_id=grade_level_id,       
         grade_level_name=grade_level_name, 
-        is_active=is_active                
+        is_active=is_active,
+        delinquency_status=delinquency_status
     )
     return students_data
 
 
+@router.get("/promotions/preview", response_model=schemas.GradePromotionPreviewResponse)
+async def preview_grade_promotion_endpoint(
+    school_year_label: str = Query(..., min_length=4, max_length=50, description="Año escolar que se cierra, ej: 2024-2025"),
+    repeating_student_ids: List[int] = Query([], description="Estudiantes que repiten el año."),
+    db: Session = Depends(get_db)
+):
+    """Muestra el mapeo de grados y cuántos estudiantes se promoverían o egresarían, sin modificar nada."""
+    try:
+        return crud.preview_grade_promotion(db, school_year_label=school_year_label, repeating_student_ids=repeating_student_ids)
+    except ValueError as ve:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
+
+
+@router.post("/promotions", response_model=schemas.GradePromotionRunResponse)
+async def apply_grade_promotion_endpoint(
+    promotion_in: schemas.GradePromotionApplyRequest,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    Promueve a todos los estudiantes activos al grado siguiente y desactiva a los egresados del último grado.
+    Si el año escolar ya fue promovido devuelve la corrida existente (already_applied=True) sin volver a aplicarla.
+    """
+    try:
+        return crud.apply_grade_promotion(db, promotion_in=promotion_in, user_id=current_user.id)
+    except ValueError as ve:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
+
+
+@router.get("/promotions", response_model=List[schemas.GradePromotionRunResponse])
+async def read_grade_promotion_runs(db: Session = Depends(get_db)):
+    return crud.get_grade_promotion_runs(db)
+
+
+@router.get("/typeahead", response_model=List[schemas.TypeaheadItem])
+async def typeahead_students(
+    q: str = Query(..., min_length=1, max_length=100, description="Inicio del nombre, apellido o cédula."),
+    limit: int = Query(10, ge=1, le=crud.MAX_TYPEAHEAD_RESULTS),
+    is_active: Optional[bool] = Query(True, description="Filtrar por estado activo (True/False) o todos (None)"),
+    db: Session = Depends(get_db)
+):
+    """Autocompletado liviano para selectores: solo id, nombre y cédula, coincidencia por prefijo."""
+    try:
+        return crud.typeahead_students(db, term=q, limit=limit, is_active=is_active)
+    except ValueError as ve:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
+
+
+@router.get("/batch", response_model=schemas.BatchLookupResponse[schemas.StudentResponse])
+async def read_students_batch(
+    ids: List[int] = Query(..., description=f"IDs de estudiantes a consultar (máximo {crud.MAX_BATCH_LOOKUP_IDS})."),
+    db: Session = Depends(get_db)
+):
+    """Obtiene varios estudiantes en una sola consulta. Los IDs inexistentes se informan en missing_ids."""
+    try:
+        return crud.get_students_by_ids(db, ids=ids)
+    except ValueError as ve:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
+
+
 @router.get("/{student_id}", response_model=schemas.StudentResponse)
 async def read_single_student(
     student_id: int,
@@ -83,6 +145,31 @@ async def read_single_student(
     return db_student
 
 
+@router.get("/{student_id}/account-card", response_model=schemas.StudentAccountCardResponse)
+async def read_student_account_card(
+    student_id: int,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db)
+):
+    """
+    Ficha de cuenta del estudiante (cargos, pagos asignados, saldos y morosidad).
+    Devuelve un ETag con la versión de la ficha; si el cliente envía If-None-Match con la misma
+    versión se responde 304 sin recalcularla.
+    """
+    version = crud.get_student_account_version(db, student_id=student_id)
+    if version is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Estudiante no encontrado")
+    etag = f'"{version}"'
+    cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
+
+    account_card = crud.get_student_account_card(db, student_id=student_id, version=version)
+    response.headers.update(cache_headers)
+    return account_card
+
+
 @router.put("/{student_id}", response_model=schemas.StudentResponse)
 async def update_existing_student(
     student_id: int,
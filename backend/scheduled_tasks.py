@@ -0,0 +1,145 @@
+# backend/scheduled_tasks.py
+"""
+Tareas programadas (cron / Programador de tareas de Windows).
+
+Ejemplo de crontab para la reconstrucción nocturna de la morosidad (hora de Venezuela):
+
+    5 0 * * * cd /ruta/al/proyecto && python -m backend.scheduled_tasks rebuild-delinquency
+
+Generación diaria de cargos adeudados (mensuales, quincenales, anuales y únicos; no duplica dentro del período):
+
+    0 0 * * * cd /ruta/al/proyecto && python -m backend.scheduled_tasks generate-due-charges
+
+Barrido de cargos vencidos (marca OVERDUE; antes de la morosidad):
+
+    1 0 * * * cd /ruta/al/proyecto && python -m backend.scheduled_tasks sweep-overdue-charges
+
+Recargos por mora (uno por cargo vencido y mes; repetirlo el mismo mes no duplica):
+
+    3 0 * * * cd /ruta/al/proyecto && python -m backend.scheduled_tasks apply-late-fees
+
+Reanudación de trabajos de facturación fallidos o caídos (cada 10 minutos; cada trabajo se toma con un UPDATE
+condicional, así que no choca con la tarea en segundo plano ni con una reanudación manual):
+
+    */10 * * * * cd /ruta/al/proyecto && python -m backend.scheduled_tasks resume-billing-jobs
+
+Carga inicial de la "deuda hoy" (current_debt_ves) de los cargos abiertos. Se ejecuta UNA sola vez tras
+desplegar la columna (nace en 0); luego la mantienen los pagos, las anulaciones y el registro de tasas:
+
+    python -m backend.scheduled_tasks backfill-current-debt
+"""
+
+import argparse
+from datetime import date
+
+from .database import SessionLocal
+from . import crud
+
+
+def run_rebuild_delinquency(on_date: date = None) -> None:
+    db = SessionLocal()
+    try:
+        result = crud.rebuild_student_delinquency(db, on_date=on_date)
+        print(f"INFO:     {result['message']} Verde: {result['green_count']}, "
+              f"naranja: {result['orange_count']}, rojo: {result['red_count']}.")
+    finally:
+        db.close()
+
+
+def run_generate_due_charges(on_date: date = None) -> None:
+    db = SessionLocal()
+    try:
+        result = crud.run_generate_due_charges_process(db, on_date=on_date)
+        print(f"INFO:     {result['message']} Cargos creados: {result['charges_created']}, "
+              f"omitidos por existir: {result['duplicates_skipped']}.")
+        for error in result["errors"] or []:
+            print(f"ERROR:    {error}")
+    finally:
+        db.close()
+
+
+def run_sweep_overdue_charges(on_date: date = None) -> None:
+    db = SessionLocal()
+    try:
+        result = crud.sweep_overdue_applied_charges(db, on_date=on_date)
+        print(f"INFO:     {result['message']} Total vencidos: {result['overdue_total']}.")
+    finally:
+        db.close()
+
+
+def run_apply_late_fees(on_date: date = None) -> None:
+    db = SessionLocal()
+    try:
+        result = crud.run_apply_late_fees_process(db, on_date=on_date)
+        print(f"INFO:     {result['message']} Total: {result['total_penalties_ves']} VES.")
+        for error in result["errors"]:
+            print(f"ERROR:    {error}")
+    finally:
+        db.close()
+
+
+def run_resume_billing_jobs() -> None:
+    db = SessionLocal()
+    try:
+        jobs = crud.get_resumable_billing_jobs(db)
+        if not jobs:
+            print("INFO:     No hay trabajos de facturación fallidos o caídos.")
+        for job in jobs:
+            job = crud.run_billing_job(db, job_id=job.id)
+            print(f"INFO:     Trabajo de facturación ID {job.id}: {job.status.value}. "
+                  f"Procesados: {job.processed_students}/{job.total_students}, cargos creados: {job.charges_created}.")
+    finally:
+        db.close()
+
+
+def run_backfill_current_debt(on_date: date = None) -> None:
+    db = SessionLocal()
+    try:
+        updated = crud.refresh_applied_charges_current_debt_ves(db, on_date=on_date)
+        db.commit()
+        print(f"INFO:     Deuda hoy recalculada para {updated} cargos abiertos.")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Tareas programadas del sistema administrativo escolar.")
+    subparsers = parser.add_subparsers(dest="task", required=True)
+
+    rebuild_parser = subparsers.add_parser("rebuild-delinquency", help="Reconstruye la tabla de morosidad por estudiante.")
+    rebuild_parser.add_argument("--date", type=date.fromisoformat, default=None, help="Fecha de evaluación (AAAA-MM-DD).")
+
+    due_charges_parser = subparsers.add_parser("generate-due-charges", help="Genera los cargos adeudados a la fecha en todas las frecuencias.")
+    due_charges_parser.add_argument("--date", type=date.fromisoformat, default=None, help="Fecha de la corrida (AAAA-MM-DD).")
+
+    sweep_parser = subparsers.add_parser("sweep-overdue-charges", help="Marca como vencidos los cargos abiertos con vencimiento pasado.")
+    sweep_parser.add_argument("--date", type=date.fromisoformat, default=None, help="Fecha de evaluación (AAAA-MM-DD).")
+
+    late_fees_parser = subparsers.add_parser("apply-late-fees", help="Aplica los recargos por mora del período a los cargos vencidos.")
+    late_fees_parser.add_argument("--date", type=date.fromisoformat, default=None, help="Fecha de evaluación (AAAA-MM-DD).")
+
+    subparsers.add_parser("resume-billing-jobs", help="Reanuda los trabajos de facturación fallidos o caídos.")
+
+    backfill_parser = subparsers.add_parser("backfill-current-debt", help="Carga inicial de la deuda hoy (current_debt_ves) de los cargos abiertos.")
+    backfill_parser.add_argument("--date", type=date.fromisoformat, default=None, help="Fecha de la tasa a aplicar (AAAA-MM-DD).")
+
+    args = parser.parse_args()
+    if args.task == "rebuild-delinquency":
+        run_rebuild_delinquency(on_date=args.date)
+    elif args.task == "generate-due-charges":
+        run_generate_due_charges(on_date=args.date)
+    elif args.task == "sweep-overdue-charges":
+        run_sweep_overdue_charges(on_date=args.date)
+    elif args.task == "apply-late-fees":
+        run_apply_late_fees(on_date=args.date)
+    elif args.task == "resume-billing-jobs":
+        run_resume_billing_jobs()
+    elif args.task == "backfill-current-debt":
+        run_backfill_current_debt(on_date=args.date)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,8 @@
 # backend/schemas.py
 
+import json
 from pydantic import BaseModel, EmailStr, Field, computed_field, model_validator
-from typing import Optional, List, Literal, Generic, TypeVar, Any
+from typing import Optional, List, Literal, Generic, TypeVar, Any, Dict
 from datetime import date, datetime
 from . import models
 from .models import ChargeFrequency, ChargeCategory, ChargeConcept, GradeLevel, SchoolConfiguration, AppliedChargeStatus, Currency, InvoiceStatus
@@ -18,6 +19,11 @@ class PaginatedResponse(BaseModel, Generic[T]):
     items: List[T]
 
 
+class BatchLookupResponse(BaseModel, Generic[T]):
+    items: List[T] = Field(..., description="Registros encontrados, en el orden de los IDs solicitados.")
+    missing_ids: List[int] = Field(default_factory=list, description="IDs solicitados que no existen.")
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -143,6 +149,7 @@ class StudentBase(BaseModel):
     has_scholarship: bool = False
     scholarship_percentage: Optional[float] = Field(None, ge=0, le=100) # Porcentaje entre 0 y 100
     scholarship_fixed_amount: Optional[float] = Field(None, ge=0) # Monto fijo no negativo
+    enrollment_date: Optional[date] = Field(None, description="Fecha de ingreso; los cargos del período en que ingresa se prorratean")
     
     class Config:
         from_attributes = True
@@ -170,12 +177,88 @@ class StudentUpdate(BaseModel): # No hereda de StudentBase para hacer todos los
     has_scholarship: Optional[bool] = None
     scholarship_percentage: Optional[float] = Field(None, ge=0, le=100)
     scholarship_fixed_amount: Optional[float] = Field(None, ge=0)
+    enrollment_date: Optional[date] = None
     
     representative_id: Optional[int] = None # Permitir cambiar de representante
     is_active: Optional[bool] = None # Para activar/desactivar (retirar)
 
         
         
+class GradePromotionStep(BaseModel):
+    from_grade_level_id: int
+    from_grade_level_name: str
+    to_grade_level_id: Optional[int] = None
+    to_grade_level_name: Optional[str] = None
+    action: Literal["promote", "graduate"]
+    students_count: int
+
+
+class GradePromotionApplyRequest(BaseModel):
+    school_year_label: str = Field(..., min_length=4, max_length=50, description="Año escolar que se cierra, ej: 2024-2025")
+    repeating_student_ids: List[int] = Field(default_factory=list, description="Estudiantes que repiten el año (no se mueven de grado).")
+    notes: Optional[str] = Field(None, max_length=500)
+
+
+class GradePromotionPreviewResponse(BaseModel):
+    school_year_label: str
+    already_applied: bool
+    steps: List[GradePromotionStep]
+    repeating_student_ids: List[int]
+    promoted_count: int
+    graduated_count: int
+    repeating_count: int
+    unmapped_students_count: int = Field(0, description="Estudiantes activos en grados inactivos (no se modifican).")
+
+
+class GradePromotionRunResponse(BaseModel):
+    id: int
+    school_year_label: str
+    promoted_count: int
+    graduated_count: int
+    repeating_count: int
+    steps: List[GradePromotionStep]
+    repeating_student_ids: List[int]
+    notes: Optional[str] = None
+    executed_by_user_id: Optional[int] = None
+    executed_at: Optional[datetime] = None
+    already_applied: bool = Field(False, description="True si el año escolar ya se había promovido y no se aplicó de nuevo.")
+
+
+class TypeaheadItem(BaseModel):
+    id: int
+    display_name: str
+    cedula: Optional[str] = None
+
+
+class UnifiedSearchResult(BaseModel):
+    entity_type: Literal["representative", "student", "employee", "supplier", "payslip"]
+    entity_id: int
+    label: str
+    subtitle: Optional[str] = None
+    score: float
+
+
+class UnifiedSearchResponse(BaseModel):
+    query: str
+    total: int
+    items: List[UnifiedSearchResult]
+
+
+class BulkImportRowError(BaseModel):
+    row_number: int = Field(..., description="Número de fila en el archivo (la fila 1 son los encabezados).")
+    message: str
+
+
+class BulkImportResponse(BaseModel):
+    message: str
+    committed: bool = Field(..., description="False si la importación se canceló por errores de validación.")
+    total_rows: int
+    representatives_created: int
+    representatives_matched: int = Field(..., description="Representantes que ya existían y recibieron estudiantes.")
+    students_created: int
+    errors: List[BulkImportRowError] = []
+
+
 # --- Esquemas para Configuración de la Escuela ---
 
 class SchoolConfigurationBase(BaseModel):
@@ -227,7 +310,81 @@ class SchoolConfigurationUpdate(SchoolConfigurationBase):
     document_logo_url: Optional[str] = Field(None, max_length=500)
     invoice_terms_and_conditions: Optional[str] = None
 
-        
+
+# --- Esquemas para Descuentos por Hermanos ---
+
+class SiblingDiscountRuleBase(BaseModel):
+    sibling_position: int = Field(..., ge=2, description="Posición del hermano a partir de la cual aplica (2 = segundo hijo, 3 = tercero y siguientes si no hay regla mayor)")
+    discount_percentage: float = Field(..., gt=0, le=100, description="Porcentaje de descuento sobre el monto en moneda original")
+    applicable_category: Optional[ChargeCategory] = Field(None, description="Categoría de concepto a la que aplica. None = todas las categorías")
+    description: Optional[str] = Field(None, max_length=255)
+    is_active: bool = True
+
+    class Config:
+        from_attributes = True
+
+
+class SiblingDiscountRuleCreate(SiblingDiscountRuleBase):
+    pass
+
+
+class SiblingDiscountRuleUpdate(BaseModel):
+    sibling_position: Optional[int] = Field(None, ge=2)
+    discount_percentage: Optional[float] = Field(None, gt=0, le=100)
+    applicable_category: Optional[ChargeCategory] = None
+    description: Optional[str] = Field(None, max_length=255)
+    is_active: Optional[bool] = None
+
+
+class SiblingDiscountRuleResponse(SiblingDiscountRuleBase):
+    id: int
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+
+class LateFeeRuleBase(BaseModel):
+    name: str = Field(..., min_length=1, max_length=100)
+    fee_type: models.LateFeeType = models.LateFeeType.FIXED
+    amount: float = Field(..., gt=0, description="Monto fijo en 'currency', o porcentaje sobre el saldo pendiente del cargo vencido")
+    currency: Currency = Field(Currency.USD, description="Moneda del monto fijo. El recargo porcentual usa la moneda del cargo vencido")
+    grace_days: int = Field(0, ge=0, le=365, description="Días después del vencimiento antes de aplicar la mora")
+    applicable_category: Optional[ChargeCategory] = Field(None, description="Categoría de los cargos vencidos a la que aplica. None = todas")
+    penalty_charge_concept_id: int = Field(..., description="Concepto con el que se registran los recargos")
+    description: Optional[str] = Field(None, max_length=255)
+    is_active: bool = True
+
+    @model_validator(mode='after')
+    def check_percentage(self):
+        if self.fee_type == models.LateFeeType.PERCENTAGE and self.amount > 100:
+            raise ValueError("El porcentaje de mora no puede ser mayor a 100.")
+        return self
+
+    class Config:
+        from_attributes = True
+
+
+class LateFeeRuleCreate(LateFeeRuleBase):
+    pass
+
+
+class LateFeeRuleUpdate(BaseModel):
+    name: Optional[str] = Field(None, min_length=1, max_length=100)
+    fee_type: Optional[models.LateFeeType] = None
+    amount: Optional[float] = Field(None, gt=0)
+    currency: Optional[Currency] = None
+    grace_days: Optional[int] = Field(None, ge=0, le=365)
+    applicable_category: Optional[ChargeCategory] = None
+    penalty_charge_concept_id: Optional[int] = None
+    description: Optional[str] = Field(None, max_length=255)
+    is_active: Optional[bool] = None
+
+
+class LateFeeRuleResponse(LateFeeRuleBase):
+    id: int
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+
 # --- Esquemas para Grados/Niveles Escolares (GradeLevel) ---
 
 class GradeLevelBase(BaseModel):
@@ -276,6 +433,37 @@ class RepresentativeInfo(BaseModel):
     
     class Config: 
         from_attributes = True
+
+
+class RepresentativeDuplicateCandidate(BaseModel):
+    score: float = Field(..., description="Suma de los pesos de las claves coincidentes (0 a 1).")
+    matched_on: List[Literal["cedula", "email", "name", "phone"]]
+    representatives: List[RepresentativeInfo]
+
+
+class RepresentativeDuplicatesResponse(BaseModel):
+    representatives_scanned: int
+    pairs_compared: int = Field(..., description="Pares evaluados dentro de los bloques (en lugar de todos contra todos).")
+    skipped_large_blocks: int = Field(..., description="Bloques omitidos por ser demasiado grandes (ej. teléfono genérico).")
+    total: int
+    items: List[RepresentativeDuplicateCandidate]
+
+
+class RepresentativeMergeRequest(BaseModel):
+    target_representative_id: int = Field(..., ge=1, description="Representante que se conserva.")
+    source_representative_ids: List[int] = Field(..., min_length=1, description="Representantes duplicados que se fusionan y eliminan.")
+
+
+class RepresentativeMergeResponse(BaseModel):
+    message: str
+    target_representative_id: int
+    merged_representative_ids: List[int]
+    students_moved: int
+    payments_moved: int
+    invoices_moved: int
+    credit_notes_moved: int
+    credit_transferred_ves: float
+    fields_filled: List[str] = []
         
 
     
@@ -346,6 +534,7 @@ class ChargeConceptUpdate(BaseModel):
         
 class ChargeConceptResponse(ChargeConceptBase):
     id: int
+    previous_default_amount: Optional[float] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
     grade_level: Optional[GradeLevelResponse] = None
@@ -353,6 +542,48 @@ class ChargeConceptResponse(ChargeConceptBase):
     class Config:
         from_attributes = True
         use_enum_values = True
+
+
+class ChargeConceptRepriceRequest(BaseModel):
+    issue_date_from: date = Field(..., description="Inicio del rango de fechas de emisión de los cargos a actualizar.")
+    issue_date_to: date = Field(..., description="Fin del rango de fechas de emisión de los cargos a actualizar.")
+    previous_amount: Optional[float] = Field(None, ge=0, description="Precio con el que se emitieron los cargos a actualizar. Por defecto, el precio anterior del concepto.")
+    dry_run: bool = Field(False, description="Si es True, calcula la diferencia sin guardar cambios.")
+
+    @model_validator(mode='after')
+    def check_range(self):
+        if self.issue_date_to < self.issue_date_from:
+            raise ValueError("La fecha final del rango no puede ser anterior a la inicial.")
+        return self
+
+
+class RepricedChargeDiffItem(BaseModel):
+    applied_charge_id: int
+    student_id: int
+    old_amount_due_original_currency: float
+    new_amount_due_original_currency: float
+    old_amount_due_ves_at_emission: float
+    new_amount_due_ves_at_emission: float
+
+
+class ChargeConceptRepriceResponse(BaseModel):
+    charge_concept_id: int
+    concept_name: str
+    previous_amount: float
+    new_default_amount: float
+    currency: Currency
+    issue_date_from: date
+    issue_date_to: date
+    dry_run: bool
+    charges_evaluated: int = Field(..., description="Cargos intactos (pendientes, sin pagos ni factura) en el rango.")
+    charges_repriced: int = Field(..., description="Cargos cuyo monto cambió.")
+    skipped_other_currency: int = Field(0, description="Cargos intactos omitidos por estar en otra moneda que el concepto.")
+    skipped_custom_amount: int = Field(0, description="Cargos omitidos por haberse emitido con un monto distinto al precio anterior (ej. monto sobrescrito).")
+    skipped_not_yet_enrolled: int = Field(0, description="Cargos omitidos porque el estudiante ingresó después del período del cargo.")
+    old_total_ves: float
+    new_total_ves: float
+    difference_ves: float
+    items: List[RepricedChargeDiffItem] = Field(default_factory=list, description="Detalle de los cargos modificados (máximo 500).")
         
         
 #  --- Para las notificaciones push para recordar el ajust de la tasa de cambio ---
@@ -414,7 +645,10 @@ class AppliedChargeBaseAttributes(BaseModel): # Base para la respuesta
     amount_paid_ves: float # Total VES pagados
     
     exchange_rate_applied_at_emission: Optional[float] = None # Tasa usada al emitir
+    current_debt_ves: float = 0.0 # Deuda hoy en VES (revalorizada con la última tasa)
     invoice_id: Optional[int] = None
+    source_applied_charge_id: Optional[int] = None # Cargo vencido que originó este recargo por mora
+    penalty_period: Optional[str] = None
     
     issue_date: date
     due_date: date
@@ -422,6 +656,7 @@ class AppliedChargeBaseAttributes(BaseModel): # Base para la respuesta
     
     created_at: datetime
     updated_at: Optional[datetime] = None
+    cancelled_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -452,6 +687,7 @@ class GlobalChargeCreate(BaseModel):
     
     override_amount: Optional[float] = Field(None, gt=0, description="Opcional: Monto para sobrescribir el default_amount del concepto.")
     override_currency: Optional[Currency] = Field(None, description="Opcional: Moneda para sobrescribir la default_amount_currency del concepto.")
+    skip_existing: bool = Field(False, description="Si es True, omite a los estudiantes que ya tienen un cargo no anulado de este concepto con la misma fecha de emisión.")
 
     @model_validator(mode='after')
     def check_dates_v2(self):
@@ -472,6 +708,10 @@ class GlobalChargeSummaryResponse(BaseModel):
     charges_successfully_created: int
     total_value_of_charges_created_original_currency: Optional[float] = Field(None, description="Suma de amount_due_original_currency de los cargos creados.")
     currency_of_sum: Optional[str] = Field(None, description="Moneda de la suma total de cargos creados.")
+    sibling_discounts_applied: int = Field(0, description="Cargos creados con descuento por hermanos.")
+    prorated_charges: int = Field(0, description="Cargos prorrateados por fecha de ingreso del estudiante.")
+    duplicates_skipped: int = Field(0, description="Estudiantes omitidos por tener ya el cargo (solo con skip_existing).")
+    phase_timings_ms: Dict[str, float] = Field(default_factory=dict, description="Duración de cada fase del proceso (load, plan, insert, total).")
     errors_list: List[GlobalChargeSummaryItemError] = Field(default_factory=list, description="Lista de estudiantes a los que no se pudo aplicar el cargo y la razón.")
 
     class Config:
@@ -528,6 +768,8 @@ class GenerateChargesSummaryResponse(BaseModel):
     target_period: str
     students_processed: int
     charges_created: int
+    sibling_discounts_applied: int = Field(0, description="Cargos creados con descuento por hermanos.")
+    prorated_charges: int = Field(0, description="Cargos prorrateados por fecha de ingreso del estudiante.")
     warnings_and_omissions: List[str] = Field(default_factory=list) # Usar default_factory para listas mutables
     errors: Optional[List[str]] = Field(None, description="Lista de errores si el proceso falló parcialmente.")
     
@@ -536,6 +778,22 @@ class GenerateChargesSummaryResponse(BaseModel):
     class Config:
         from_attributes = True
 
+
+class DueChargesSummaryResponse(BaseModel):
+    message: str
+    as_of_date: date
+    dry_run: bool = False
+    periods: Dict[str, str] = Field(default_factory=dict, description="Período vigente por ID de concepto (ej. '2025-09', '2025-09-Q2', '2025-2026', 'unico').")
+    students_processed: int
+    charges_created: int = Field(..., description="Cargos creados (o que se crearían, en simulación).")
+    charges_by_frequency: Dict[str, int] = Field(default_factory=dict)
+    duplicates_skipped: int = Field(0, description="Cargos omitidos por existir ya en su período.")
+    sibling_discounts_applied: int = 0
+    prorated_charges: int = 0
+    warnings_and_omissions: List[str] = Field(default_factory=list)
+    errors: Optional[List[str]] = None
+    credit_applications_summary: List[CreditApplicationAttemptSummary] = Field(default_factory=list)
+
         
 #--- Esquemas para Asignación de Pagos (PaymentAllocation) ---
 
@@ -631,6 +889,119 @@ class GenerateChargesRequest(BaseModel): # Usar BaseModel de Pydantic
     issue_date_override: Optional[date] = Field(None, description="Opcional: Fecha de emisión específica para los cargos generados (YYYY-MM-DD).")
     due_date_override: Optional[date] = Field(None, description="Opcional: Fecha de vencimiento específica para los cargos generados (YYYY-MM-DD).")
     charge_concept_ids: Optional[List[int]] = Field(None, description="Opcional: Lista de IDs de ChargeConcept a procesar. Si es None/vacío, procesa todos los recurrentes aplicables.")
+
+
+class BillingJobResponse(BaseModel):
+    id: int
+    job_type: str
+    status: models.BillingJobStatus
+    target_year: int
+    target_month: int
+    issue_date: date
+    due_date: date
+    total_students: int
+    processed_students: int
+    charges_created: int
+    duplicates_skipped: int
+    errors_count: int
+    last_processed_student_id: int
+    error_message: Optional[str] = None
+    messages_json: Optional[str] = Field(None, exclude=True)
+    created_by_user_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    heartbeat_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    @computed_field
+    @property
+    def progress_percentage(self) -> float:
+        if self.status == models.BillingJobStatus.COMPLETED:
+            return 100.0
+        if not self.total_students:
+            return 0.0
+        return round(min(100.0, self.processed_students * 100 / self.total_students), 1)
+
+    @computed_field
+    @property
+    def messages(self) -> List[str]:
+        return json.loads(self.messages_json) if self.messages_json else []
+
+    class Config:
+        from_attributes = True
+
+class BillingPreviewItem(BaseModel):
+    student_id: int
+    student_name: str
+    grade_level_id: Optional[int] = None
+    grade_level_name: Optional[str] = None
+    charge_concept_id: int
+    concept_name: str
+    currency: str
+    original_concept_amount: float
+    amount_due_original_currency: float
+    exchange_rate: Optional[float] = None
+    amount_due_ves_at_emission: float
+
+
+class BillingPreviewConceptTotal(BaseModel):
+    charge_concept_id: int
+    concept_name: str
+    currency: Optional[str] = None
+    charges_count: int
+    duplicates_skipped: int
+    total_original_currency: float
+    total_ves_at_emission: float
+
+
+class BillingPreviewGradeTotal(BaseModel):
+    grade_level_id: Optional[int] = None
+    grade_level_name: Optional[str] = None
+    students_count: int
+    charges_count: int
+    total_ves_at_emission: float
+
+
+class BillingPreviewResponse(BaseModel):
+    process: str = Field(..., description="'recurring_charges' o 'global_charge'.")
+    issue_date: date
+    due_date: date
+    students_evaluated: int
+    charges_to_create: int
+    duplicates_skipped: int
+    total_ves_at_emission: float
+    totals_by_concept: List[BillingPreviewConceptTotal] = Field(default_factory=list)
+    totals_by_grade_level: List[BillingPreviewGradeTotal] = Field(default_factory=list)
+    items: List[BillingPreviewItem] = Field(default_factory=list, description="Cargo que se crearía por estudiante y concepto.")
+    warnings: List[str] = Field(default_factory=list)
+    errors: List[str] = Field(default_factory=list)
+
+
+class BillingRunRollbackRequest(BaseModel):
+    billing_job_id: Optional[int] = Field(None, description="Trabajo de facturación cuyos cargos se anulan.")
+    charge_concept_id: Optional[int] = Field(None, description="Concepto de los cargos a anular (si no se indica billing_job_id).")
+    issue_date_from: Optional[date] = None
+    issue_date_to: Optional[date] = None
+    dry_run: bool = Field(False, description="Si es True, informa lo que se anularía sin guardar cambios.")
+
+    @model_validator(mode='after')
+    def check_scope(self):
+        if self.billing_job_id is None and (self.charge_concept_id is None or self.issue_date_from is None or self.issue_date_to is None):
+            raise ValueError("Indique billing_job_id, o charge_concept_id con issue_date_from e issue_date_to.")
+        if self.issue_date_from and self.issue_date_to and self.issue_date_to < self.issue_date_from:
+            raise ValueError("La fecha final del rango no puede ser anterior a la inicial.")
+        return self
+
+
+class BillingRunRollbackResponse(BaseModel):
+    message: str
+    dry_run: bool
+    charges_cancelled: int = Field(..., description="Cargos anulados, incluidos los recargos por mora que generaron.")
+    penalties_cancelled: int = 0
+    skipped_invoiced: int = Field(0, description="Cargos omitidos por estar facturados (revertir con nota de crédito).")
+    allocations_deleted: int = 0
+    credit_returned_ves: float = Field(0.0, description="Monto de pagos liberado como saldo a favor.")
+    representatives_affected: int = 0
     
     
 class TransactionDetailSchema(BaseModel):
@@ -884,6 +1255,24 @@ class CreditNoteResponse(BaseModel):
 # Esquema para los Dashboards
     
     
+class DashboardGradeLevelBreakdownItem(BaseModel):
+    grade_level_id: int
+    grade_level_name: str
+    active_students: int
+    delinquent_students: int = Field(..., description="Estudiantes activos en estado orange o red (tabla de morosidad precalculada).")
+    charges_billed_current_month_ves: float
+    collected_current_month_ves: float
+    open_debt_ves_today: float = Field(..., description="Deuda abierta revalorizada a la última tasa.")
+    open_debt_usd_equivalent: Optional[float] = None
+
+
+class DashboardGradeLevelBreakdownResponse(BaseModel):
+    as_of_date: date
+    period_start_date: date
+    current_usd_to_ves_rate_used: Optional[float] = None
+    items: List[DashboardGradeLevelBreakdownItem]
+
+
 class DashboardSummaryResponse(BaseModel):
     total_representatives: int
     total_active_students: int
@@ -1154,6 +1543,170 @@ class StudentAnnualFinancialSummary(BaseModel):
         from_attributes = True
 
 
+# --- Esquemas para la Ficha de Cuenta del Estudiante ---
+
+class StudentAccountCardCharge(BaseModel):
+    id: int
+    charge_concept_id: int
+    charge_concept_name: Optional[str] = None
+    description: Optional[str] = None
+    issue_date: date
+    due_date: date
+    status: AppliedChargeStatus
+    original_concept_currency: Currency
+    amount_due_original_currency: float
+    amount_paid_original_currency_equivalent: float
+    pending_original_currency: float
+    amount_due_ves_at_emission: float
+    amount_paid_ves: float
+    current_debt_ves: float
+
+
+class StudentAccountCardAllocation(BaseModel):
+    id: int
+    payment_id: int
+    applied_charge_id: int
+    payment_date: date
+    payment_method: Optional[str] = None
+    reference_number: Optional[str] = None
+    currency_paid: Currency
+    amount_allocated_ves: float
+    created_at: Optional[datetime] = None
+
+
+class StudentAccountCardBalance(BaseModel):
+    currency: Currency
+    pending_amount: float
+
+
+class StudentAccountCardDelinquency(BaseModel):
+    status: Literal["green", "orange", "red"]
+    oldest_overdue_due_date: Optional[date] = None
+    months_late: int = 0
+    overdue_charges_count: int = 0
+
+
+class StudentAccountCardResponse(BaseModel):
+    student_id: int
+    student_full_name: str
+    student_cedula: Optional[str] = None
+    is_active: bool
+    grade_level_name: Optional[str] = None
+    representative_id: Optional[int] = None
+    representative_full_name: Optional[str] = None
+    as_of_date: date
+    version: str = Field(..., description="Versión de la ficha; se devuelve también como ETag.")
+    total_billed_ves_at_emission: float
+    total_allocated_ves: float
+    open_balances_by_currency: List[StudentAccountCardBalance] = Field(..., description="Saldo pendiente en la moneda original de los cargos.")
+    open_balance_ves_today: float = Field(..., description="Saldo pendiente en VES revalorizado a la tasa de hoy.")
+    delinquency: StudentAccountCardDelinquency
+    charges: List[StudentAccountCardCharge]
+    allocations: List[StudentAccountCardAllocation]
+
+
+# --- Esquemas para el Reporte de Antigüedad de Saldos (Cuentas por Cobrar) ---
+
+
+class ReceivablesAgingBuckets(BaseModel):
+    """Saldos abiertos (VES, revalorizados a la tasa de hoy) agrupados por días de atraso."""
+    current: float = Field(0.0, description="Saldo aún no vencido (vence hoy o después).")
+    days_1_30: float = Field(0.0, description="Saldo con 1 a 30 días de atraso.")
+    days_31_60: float = Field(0.0, description="Saldo con 31 a 60 días de atraso.")
+    days_61_90: float = Field(0.0, description="Saldo con 61 a 90 días de atraso.")
+    days_over_90: float = Field(0.0, description="Saldo con más de 90 días de atraso.")
+    total: float = Field(0.0, description="Saldo abierto total.")
+
+
+class ReceivablesAgingRow(ReceivablesAgingBuckets):
+    group_id: Optional[int] = Field(None, description="ID del representante o grado (None para el total del colegio).")
+    group_name: str = Field(..., description="Nombre del representante, del grado o 'Total Colegio'.")
+    group_code: Optional[str] = Field(None, description="Cédula del representante, si aplica.")
+    open_charges_count: int = Field(0, description="Número de cargos abiertos considerados.")
+
+
+class ReceivablesAgingReportResponse(PaginatedResponse[ReceivablesAgingRow]):
+    group_by: Literal["representative", "grade_level", "school"]
+    as_of_date: date
+    school_totals: ReceivablesAgingBuckets
+
+
+# --- Esquemas para Saldos de Representantes a una Fecha de Corte ---
+
+
+class RepresentativeBalanceAsOf(BaseModel):
+    representative_id: int
+    representative_name: str
+    representative_cedula: str
+    charges_billed_ves: float = Field(0.0, description="Cargos emitidos hasta la fecha de corte (VES a la emisión).")
+    allocated_to_charges_ves: float = Field(0.0, description="Pagos asignados a esos cargos con asignaciones creadas hasta la fecha de corte.")
+    balance_due_ves: float = Field(0.0, description="Saldo adeudado a la fecha de corte; los cargos indexados se valoran con la tasa de esa fecha.")
+    payments_received_ves: float = Field(0.0, description="Pagos recibidos hasta la fecha de corte (VES).")
+    unallocated_credit_ves: float = Field(0.0, description="Parte de esos pagos que aún no estaba asignada a la fecha de corte.")
+
+    class Config:
+        from_attributes = True
+
+
+class RepresentativeBalancesAsOfResponse(PaginatedResponse[RepresentativeBalanceAsOf]):
+    as_of_date: date
+
+
+class BalanceSnapshotCreate(BaseModel):
+    year: int = Field(..., ge=2000, le=2100, description="Año del cierre mensual.")
+    month: int = Field(..., ge=1, le=12, description="Mes del cierre mensual.")
+
+
+class BalanceSnapshotRunResponse(BaseModel):
+    message: str
+    snapshot_date: date
+    representatives_count: int
+
+
+class RepresentativeBalanceSnapshotResponse(BaseModel):
+    id: int
+    representative_id: int
+    snapshot_date: date
+    charges_billed_ves: float
+    allocated_to_charges_ves: float
+    balance_due_ves: float
+    payments_received_ves: float
+    unallocated_credit_ves: float
+    created_at: Optional[datetime] = None
+    representative: Optional[RepresentativeInfo] = None
+
+    class Config:
+        from_attributes = True
+
+
+class StudentDelinquencyRebuildResponse(BaseModel):
+    message: str
+    as_of_date: date
+    students_processed: int
+    green_count: int
+    orange_count: int
+    red_count: int
+
+
+class OverdueSweepResponse(BaseModel):
+    message: str
+    as_of_date: date
+    marked_overdue: int = Field(..., description="Cargos PENDING/PARTIALLY_PAID pasados a OVERDUE en esta corrida.")
+    reopened: int = Field(..., description="Cargos OVERDUE devueltos a PENDING/PARTIALLY_PAID porque su vencimiento se movió.")
+    overdue_total: int = Field(..., description="Cargos en estado OVERDUE después del barrido.")
+
+
+class LateFeeProcessResponse(BaseModel):
+    message: str
+    as_of_date: date
+    penalty_period: str = Field(..., description="Período AAAA-MM de los recargos (uno por cargo vencido y período).")
+    charges_evaluated: int = Field(..., description="Cargos vencidos sin recargo en el período.")
+    penalties_created: int
+    in_grace_period: int = Field(0, description="Cargos vencidos aún dentro de los días de gracia de su regla.")
+    total_penalties_ves: float = 0.0
+    errors: List[str] = Field(default_factory=list)
+
+
 class DetailedExpenseTransaction(BaseModel):
     expense_date: date
     description: str # Nombre del artículo/gasto
@@ -1,4 +1,6 @@
+import itertools
 import pytest
+from typing import Any, Dict, List, Optional, Tuple, Union
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
@@ -70,4 +72,92 @@ app.dependency_overrides[get_current_active_user] = override_get_current_active_
 @pytest.fixture(scope="module") # Podría ser "function" si quieres un cliente totalmente nuevo por test
 def client():
     with TestClient(app) as c: # Usamos un context manager para asegurar limpieza
-        yield c
\ No newline at end of file
+        yield c
+
+
+# --- Datos de prueba compartidos ---
+# La BD en memoria se comparte entre todos los módulos: cada llamada genera nombres, cédulas y correos únicos.
+_test_data_sequence = itertools.count(1)
+
+
+def make_grade_level(client, name: Optional[str] = None) -> Dict[str, Any]:
+    number = next(_test_data_sequence)
+    response = client.post("/grade-levels/", json={"name": name or f"Grado Prueba {number}", "order_index": 1000 + number})
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def make_representative(client, **fields) -> Dict[str, Any]:
+    number = next(_test_data_sequence)
+    response = client.post("/representatives/", json={
+        "first_name": "Representante",
+        "last_name": f"Prueba{number}",
+        "identification_type": "V",
+        "identification_number": str(90000000 + number),
+        "phone_main": f"0414-{number:07d}",
+        "email": f"representante{number}@example.com",
+        **fields,
+    })
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def make_student(client, representative_id: int, grade_level_id: int, **fields) -> Dict[str, Any]:
+    number = next(_test_data_sequence)
+    response = client.post("/students/", json={
+        "first_name": f"Estudiante{number}",
+        "last_name": "Prueba",
+        "representative_id": representative_id,
+        "grade_level_id": grade_level_id,
+        **fields,
+    })
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def make_family(
+    client,
+    children: Union[int, List[Dict[str, Any]]] = 1,
+    grade_level: Optional[Dict[str, Any]] = None,
+    **representative_fields
+) -> Tuple[Dict[str, Any], Dict[str, Any], List[Dict[str, Any]]]:
+    """Grado (nuevo salvo que se pase uno), representante y sus estudiantes. children: cantidad o campos de cada estudiante."""
+    grade_level = grade_level or make_grade_level(client)
+    representative = make_representative(client, **representative_fields)
+    children_fields = [{} for _ in range(children)] if isinstance(children, int) else children
+    students = [make_student(client, representative["id"], grade_level["id"], **fields) for fields in children_fields]
+    return grade_level, representative, students
+
+
+def make_concept(
+    client,
+    amount: float = 100,
+    frequency: str = "mensual",
+    category: str = "mensualidad",
+    currency: str = "VES",
+    grade_level_id: Optional[int] = None,
+    **fields
+) -> Dict[str, Any]:
+    number = next(_test_data_sequence)
+    response = client.post("/charge-concepts/", json={
+        "name": f"Concepto Prueba {number}",
+        "default_amount": amount,
+        "default_amount_currency": currency,
+        "default_frequency": frequency,
+        "category": category,
+        "applicable_grade_level_id": grade_level_id,
+        **fields,
+    })
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def make_charge(client, student_id: int, charge_concept_id: int, issue_date: str, due_date: str) -> Dict[str, Any]:
+    response = client.post("/applied-charges/", json={
+        "student_id": student_id,
+        "charge_concept_id": charge_concept_id,
+        "issue_date": issue_date,
+        "due_date": due_date,
+    })
+    assert response.status_code == 201, response.text
+    return response.json()
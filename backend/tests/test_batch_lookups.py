@@ -0,0 +1,39 @@
+def test_representatives_batch_reports_missing_ids(client):
+    """
+    Prueba que la consulta en lote devuelva los encontrados en el orden pedido y reporte los IDs inexistentes.
+    """
+    created_ids = []
+    for index in range(2):
+        representative_data = {
+            "first_name": f"Lote{index}",
+            "last_name": "Pruebas",
+            "identification_type": "V",
+            "identification_number": f"8800000{index}",
+            "phone_main": "0412-1234567",
+            "email": f"lote{index}.pruebas@example.com",
+        }
+        response = client.post("/representatives/", json=representative_data)
+        assert response.status_code == 201
+        created_ids.append(response.json()["id"])
+
+    requested_ids = [created_ids[1], 999999, created_ids[0], created_ids[1]]
+    response = client.get("/representatives/batch", params={"ids": requested_ids})
+    assert response.status_code == 200
+
+    data = response.json()
+    assert [item["id"] for item in data["items"]] == [created_ids[1], created_ids[0]]
+    assert data["missing_ids"] == [999999]
+
+
+def test_applied_charges_batch_rejects_too_many_ids(client):
+    """
+    Prueba que se rechace una consulta en lote que supere el tope de IDs.
+    """
+    response = client.get("/applied-charges/batch", params={"ids": list(range(1, 502))})
+    assert response.status_code == 400
+
+
+def test_students_batch_all_missing(client):
+    response = client.get("/students/batch", params={"ids": [424242]})
+    assert response.status_code == 200
+    assert response.json() == {"items": [], "missing_ids": [424242]}
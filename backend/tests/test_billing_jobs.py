@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+
+import pytz
+
+from .. import crud, models, schemas
+from .conftest import TestingSessionLocal, make_family, make_concept
+
+
+def test_billing_job_runs_in_chunks_and_resumes_without_duplicates(client):
+    """
+    Prueba que el trabajo de facturación procese por bloques y que, al reanudarlo desde un punto
+    de control perdido, no vuelva a crear los cargos ya confirmados.
+    """
+    grade_level, _, _ = make_family(client, children=3)
+    concept_id = make_concept(client, amount=300, grade_level_id=grade_level["id"])["id"]
+
+    params = schemas.GenerateChargesRequest(target_year=2025, target_month=4, charge_concept_ids=[concept_id])
+    db = TestingSessionLocal()
+    try:
+        job = crud.create_recurring_charges_job(db, params=params, chunk_size=2)
+        job = crud.run_billing_job(db, job_id=job.id)
+        assert job.status == models.BillingJobStatus.COMPLETED
+        assert job.charges_created == 3
+        assert job.processed_students == job.total_students
+
+        # Simula una reanudación sin punto de control: no debe duplicar cargos
+        job.status = models.BillingJobStatus.FAILED
+        job.last_processed_student_id = 0
+        job.processed_students = 0
+        db.commit()
+        job = crud.run_billing_job(db, job_id=job.id)
+        assert job.status == models.BillingJobStatus.COMPLETED
+        assert job.charges_created == 3
+        assert job.duplicates_skipped == 3
+        assert db.query(models.AppliedCharge).filter(
+            models.AppliedCharge.charge_concept_id == concept_id,
+            models.AppliedCharge.billing_job_id == job.id
+        ).count() == 3
+    finally:
+        db.close()
+
+    response = client.get(f"/billing-processes/jobs/{job.id}")
+    assert response.status_code == 200
+    assert response.json()["progress_percentage"] == 100.0
+    assert client.post(f"/billing-processes/jobs/{job.id}/resume").status_code == 409
+
+
+def test_billing_job_is_claimed_by_a_single_worker(client, monkeypatch):
+    """
+    Prueba dos ejecutores sobre el mismo trabajo: mientras el primero procesa un bloque, el segundo
+    (cron o reanudación manual) no logra tomarlo y no inserta cargos duplicados.
+    """
+    grade_level, _, _ = make_family(client, children=2)
+    concept_id = make_concept(client, amount=150, grade_level_id=grade_level["id"])["id"]
+
+    params = schemas.GenerateChargesRequest(target_year=2025, target_month=6, charge_concept_ids=[concept_id])
+    db, other_db = TestingSessionLocal(), TestingSessionLocal()
+    try:
+        job = crud.create_recurring_charges_job(db, params=params, chunk_size=1)
+        # Recién creado: la tarea en segundo plano aún no arranca, así que no es reanudable
+        assert not crud.is_billing_job_resumable(job)
+        assert job.id not in [j.id for j in crud.get_resumable_billing_jobs(db)]
+        assert client.post(f"/billing-processes/jobs/{job.id}/resume").status_code == 409
+
+        original_plan = crud._plan_recurring_charges
+        concurrent_results = []
+
+        def plan_while_another_worker_runs(snapshot, students_chunk):
+            if not concurrent_results:
+                concurrent_results.append(crud.run_billing_job(other_db, job_id=job.id))
+            return original_plan(snapshot, students_chunk)
+
+        monkeypatch.setattr(crud, "_plan_recurring_charges", plan_while_another_worker_runs)
+        job = crud.run_billing_job(db, job_id=job.id)
+
+        assert concurrent_results[0].status == models.BillingJobStatus.RUNNING
+        assert job.status == models.BillingJobStatus.COMPLETED
+        assert (job.charges_created, job.duplicates_skipped) == (2, 0)
+        assert db.query(models.AppliedCharge).filter(models.AppliedCharge.charge_concept_id == concept_id).count() == 2
+
+        # Un trabajo fallido o con el latido vencido sí se puede volver a tomar
+        job.status = models.BillingJobStatus.FAILED
+        db.commit()
+        assert crud.is_billing_job_resumable(job)
+        assert job.id in [j.id for j in crud.get_resumable_billing_jobs(db)]
+        job.status = models.BillingJobStatus.RUNNING
+        job.heartbeat_at = datetime.now(pytz.utc) - timedelta(seconds=crud.BILLING_JOB_STALE_AFTER_SECONDS + 60)
+        db.commit()
+        assert crud.is_billing_job_resumable(job)
+        monkeypatch.setattr(crud, "_plan_recurring_charges", original_plan)
+        job = crud.run_billing_job(other_db, job_id=job.id)
+        assert job.status == models.BillingJobStatus.COMPLETED
+        assert db.query(models.AppliedCharge).filter(models.AppliedCharge.charge_concept_id == concept_id).count() == 2
+    finally:
+        db.close()
+        other_db.close()
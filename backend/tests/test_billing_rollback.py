@@ -0,0 +1,82 @@
+from datetime import datetime, timezone
+
+from .. import crud, models
+from .conftest import TestingSessionLocal, make_family, make_concept
+
+
+def test_rollback_billing_run_cancels_charges_and_frees_payments(client):
+    """
+    Prueba que la reversión de una corrida anule sus cargos, borre las asignaciones de pago (el monto
+    vuelve como saldo a favor) y que dry_run no modifique nada.
+    """
+    grade_level, representative, _ = make_family(client)
+    representative_id = representative["id"]
+    concept_id = make_concept(client, grade_level_id=grade_level["id"])["id"]
+    response = client.post("/billing-processes/generate-recurring-charges", json={
+        "target_year": 2021, "target_month": 7, "charge_concept_ids": [concept_id]
+    })
+    assert response.json()["charges_created"] == 1
+
+    db = TestingSessionLocal()
+    try:
+        charge_id = db.query(models.AppliedCharge.id).filter(models.AppliedCharge.charge_concept_id == concept_id).scalar()
+    finally:
+        db.close()
+    payment_response = client.post("/payments/", json={
+        "representative_id": representative_id,
+        "payment_date": "2021-07-10",
+        "amount_paid": 60,
+        "currency_paid": "VES",
+        "allocations_details": [{"applied_charge_id": charge_id, "amount_to_allocate": 60}],
+    })
+    assert payment_response.status_code == 201
+
+    # La asignación se registró en su fecha: el saldo de fin de julio ya la incluye
+    db = TestingSessionLocal()
+    try:
+        db.query(models.PaymentAllocation).filter(models.PaymentAllocation.applied_charge_id == charge_id).update(
+            {"created_at": datetime(2021, 7, 10, 15, tzinfo=timezone.utc)}, synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+
+    def balance_as_of(as_of_date):
+        response = client.get("/reports/representative-balances-as-of", params={
+            "as_of_date": as_of_date, "representative_id": representative_id
+        })
+        (item,) = response.json()["items"]
+        return {key: item[key] for key in ["charges_billed_ves", "allocated_to_charges_ves", "balance_due_ves", "unallocated_credit_ves"]}
+
+    july_balance = balance_as_of("2021-07-31")
+    assert july_balance == {
+        "charges_billed_ves": 100.0, "allocated_to_charges_ves": 60.0, "balance_due_ves": 40.0, "unallocated_credit_ves": 0.0
+    }
+
+    payload = {"charge_concept_id": concept_id, "issue_date_from": "2021-07-01", "issue_date_to": "2021-07-31", "dry_run": True}
+    response = client.post("/billing-processes/rollback", json=payload)
+    assert response.status_code == 200
+    assert response.json()["charges_cancelled"] == 1
+    assert response.json()["credit_returned_ves"] == 60.0
+    assert client.get(f"/applied-charges/{charge_id}").json()["status"] == "partially_paid"
+
+    payload["dry_run"] = False
+    response = client.post("/billing-processes/rollback", json=payload)
+    assert response.status_code == 200
+    assert response.json()["allocations_deleted"] == 1
+    charge = client.get(f"/applied-charges/{charge_id}").json()
+    assert charge["status"] == "cancelled"
+    assert charge["current_debt_ves"] == 0.0
+    db = TestingSessionLocal()
+    try:
+        assert crud.get_representative_total_available_credit_ves(db, representative_id) == 60.0
+        (reversal,) = db.query(models.PaymentAllocationReversal).filter(models.PaymentAllocationReversal.applied_charge_id == charge_id).all()
+        assert (reversal.payment_id, reversal.amount_allocated_ves) == (payment_response.json()["id"], 60.0)
+    finally:
+        db.close()
+
+    # El saldo histórico no cambia; a partir de la reversión el cargo desaparece y el pago queda como saldo a favor
+    assert balance_as_of("2021-07-31") == july_balance
+    assert balance_as_of(str(crud.get_current_venezuelan_date_for_crud())) == {
+        "charges_billed_ves": 0.0, "allocated_to_charges_ves": 0.0, "balance_due_ves": 0.0, "unallocated_credit_ves": 60.0
+    }
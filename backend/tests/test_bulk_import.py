@@ -0,0 +1,46 @@
+CSV_HEADER = "rep_identification_type,rep_identification_number,rep_first_name,rep_last_name,rep_phone_main,rep_email,student_first_name,student_last_name,student_cedula,student_birth_date,grade_level\n"
+
+
+def _create_grade_level(client, name):
+    response = client.post("/grade-levels/", json={"name": name, "order_index": 90})
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def test_bulk_import_creates_families(client):
+    """
+    Prueba que una familia con dos estudiantes cree un solo representante y ambos estudiantes.
+    """
+    _create_grade_level(client, "Importación 1er Grado")
+    content = CSV_HEADER + (
+        "V,77000001,Ana,Importada,0414-1234567,ana.importada@example.com,Luis,Importada,IMP-0001,15/03/2016,Importación 1er Grado\n"
+        "V,77000001,Ana,Importada,0414-1234567,ana.importada@example.com,Sofía,Importada,IMP-0002,2017-06-01,importación 1er grado\n"
+    )
+    response = client.post("/representatives/bulk-import", files={"file": ("familias.csv", content.encode("utf-8"), "text/csv")})
+    assert response.status_code == 200
+
+    data = response.json()
+    assert data["committed"] is True
+    assert data["representatives_created"] == 1
+    assert data["students_created"] == 2
+    assert data["errors"] == []
+
+
+def test_bulk_import_rejects_whole_file_on_row_errors(client):
+    """
+    Prueba que una fila inválida cancele la importación completa y se reporte con su número de fila.
+    """
+    content = CSV_HEADER + (
+        "V,77000010,Pedro,Valido,0414-1234567,pedro.valido@example.com,Juan,Valido,IMP-0010,01/01/2015,Importación 1er Grado\n"
+        "V,77000011,Rosa,Invalida,0414-1234567,no-es-correo,Eva,Invalida,IMP-0011,01/01/2015,Grado Inexistente\n"
+    )
+    response = client.post("/representatives/bulk-import", files={"file": ("familias.csv", content.encode("utf-8"), "text/csv")})
+    assert response.status_code == 200
+
+    data = response.json()
+    assert data["committed"] is False
+    assert data["students_created"] == 0
+    assert [error["row_number"] for error in data["errors"]] == [3]
+
+    response = client.get("/representatives/", params={"search": "77000010"})
+    assert response.json()["total"] == 0
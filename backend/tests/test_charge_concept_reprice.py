@@ -0,0 +1,87 @@
+from .conftest import make_family, make_concept, make_charge
+
+
+def test_reprice_pending_charges_respects_scholarship_and_dry_run(client):
+    """
+    Prueba que el cambio de precio de un concepto se propague a sus cargos pendientes intactos respetando
+    la beca de cada estudiante, y que dry_run solo informe la diferencia sin guardarla.
+    """
+    grade_level, _, (student,) = make_family(client)
+    _, _, (scholarship_student,) = make_family(
+        client, grade_level=grade_level, children=[{"has_scholarship": True, "scholarship_percentage": 50}]
+    )
+    concept_id = make_concept(client)["id"]
+    charge_ids = [
+        make_charge(client, student_id, concept_id, "2022-09-01", "2022-09-05")["id"]
+        for student_id in [student["id"], scholarship_student["id"]]
+    ]
+    assert [client.get(f"/applied-charges/{charge_id}").json()["amount_due_ves_at_emission"] for charge_id in charge_ids] == [100.0, 50.0]
+
+    assert client.put(f"/charge-concepts/{concept_id}", json={"default_amount": 150}).status_code == 200
+    payload = {"issue_date_from": "2022-09-01", "issue_date_to": "2022-09-30", "dry_run": True}
+    response = client.post(f"/charge-concepts/{concept_id}/reprice-pending-charges", json=payload)
+    assert response.status_code == 200
+    assert response.json()["charges_repriced"] == 2
+    assert response.json()["difference_ves"] == 75.0
+    assert client.get(f"/applied-charges/{charge_ids[0]}").json()["amount_due_ves_at_emission"] == 100.0
+
+    payload["dry_run"] = False
+    response = client.post(f"/charge-concepts/{concept_id}/reprice-pending-charges", json=payload)
+    assert response.status_code == 200
+    assert [client.get(f"/applied-charges/{charge_id}").json()["amount_due_ves_at_emission"] for charge_id in charge_ids] == [150.0, 75.0]
+
+
+def test_reprice_keeps_fortnightly_enrollment_proration(client):
+    """
+    Prueba que el nuevo precio de un concepto quincenal se prorratee sobre la quincena del cargo
+    para un estudiante que ingresó a mitad de ella, igual que en la generación de cargos adeudados.
+    """
+    _, _, (student, enrolled_mid_fortnight) = make_family(client, children=[{}, {"enrollment_date": "2022-10-11"}])
+    concept_id = make_concept(client, frequency="quincenal", category="servicio_recurrente")["id"]
+    charge_ids = [
+        make_charge(client, student_id, concept_id, "2022-10-03", "2022-10-08")["id"]
+        for student_id in [student["id"], enrolled_mid_fortnight["id"]]
+    ]
+
+    assert client.put(f"/charge-concepts/{concept_id}", json={"default_amount": 150}).status_code == 200
+    response = client.post(f"/charge-concepts/{concept_id}/reprice-pending-charges", json={
+        "issue_date_from": "2022-10-01", "issue_date_to": "2022-10-15"
+    })
+    assert response.status_code == 200
+    # 1ra quincena de octubre: ingresó el 11, le corresponden 5 de 15 días
+    assert [client.get(f"/applied-charges/{charge_id}").json()["amount_due_ves_at_emission"] for charge_id in charge_ids] == [150.0, 50.0]
+
+
+def test_reprice_leaves_override_amounts_and_late_enrollments_alone(client):
+    """
+    Prueba que el repreciado solo toque los cargos emitidos con el precio anterior del concepto (no los de monto
+    sobrescrito en un cargo global) y omita, informándolos, los de estudiantes que ingresaron después del período.
+    """
+    _, _, (student, enrolled_later) = make_family(client, children=[{}, {"enrollment_date": "2022-12-05"}])
+    concept_id = make_concept(client)["id"]
+    regular_id = make_charge(client, student["id"], concept_id, "2022-11-03", "2022-11-08")["id"]
+    enrolled_later_id = make_charge(client, enrolled_later["id"], concept_id, "2022-11-03", "2022-11-08")["id"]
+    response = client.post("/billing-processes/apply-global-charge", json={
+        "charge_concept_id": concept_id, "issue_date": "2022-11-10", "due_date": "2022-11-20", "override_amount": 40,
+    })
+    assert response.status_code == 200
+    (override_charge,) = client.get(f"/applied-charges/student/{student['id']}", params={
+        "start_issue_date": "2022-11-10", "end_issue_date": "2022-11-10"
+    }).json()
+    assert override_charge["amount_due_ves_at_emission"] == 40.0
+
+    assert client.put(f"/charge-concepts/{concept_id}", json={"default_amount": 150}).status_code == 200
+    assert client.get(f"/charge-concepts/{concept_id}").json()["previous_default_amount"] == 100.0
+    response = client.post(f"/charge-concepts/{concept_id}/reprice-pending-charges", json={
+        "issue_date_from": "2022-11-01", "issue_date_to": "2022-11-30"
+    })
+    assert response.status_code == 200
+    summary = response.json()
+    assert summary["previous_amount"] == 100.0
+    assert summary["charges_repriced"] == 1
+    assert summary["skipped_not_yet_enrolled"] == 1
+    # Un cargo global por cada estudiante activo, todos con el monto sobrescrito
+    assert summary["skipped_custom_amount"] >= 2
+    assert client.get(f"/applied-charges/{regular_id}").json()["amount_due_ves_at_emission"] == 150.0
+    assert client.get(f"/applied-charges/{enrolled_later_id}").json()["amount_due_ves_at_emission"] == 100.0
+    assert client.get(f"/applied-charges/{override_charge['id']}").json()["amount_due_ves_at_emission"] == 40.0
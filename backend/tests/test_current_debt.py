@@ -0,0 +1,78 @@
+from datetime import timedelta
+
+from .. import crud, models, scheduled_tasks
+from .conftest import TestingSessionLocal, make_family, make_concept, make_charge
+
+
+def test_exchange_rate_changes_revalue_open_indexed_charges(client):
+    """
+    Prueba que registrar, actualizar y eliminar una tasa USD revalorice la deuda hoy de los cargos indexados
+    abiertos, sin tocar los cargos en VES, los pagados ni los anulados, y que el listado filtre y ordene por ella.
+    """
+    today = crud.get_current_venezuelan_date_for_crud()
+    assert client.post("/exchange-rates/", json={
+        "from_currency": "USD", "rate": 10, "rate_date": str(today - timedelta(days=1))
+    }).status_code == 201
+
+    _, representative, (student,) = make_family(client)
+    usd_concept = make_concept(client, amount=10, currency="USD", frequency="unico", category="cargo_unico")
+    ves_concept = make_concept(client, amount=80, frequency="unico", category="cargo_unico")
+    issue_date, due_date = str(today - timedelta(days=1)), str(today + timedelta(days=10))
+    open_id, paid_id, cancelled_id = [
+        make_charge(client, student["id"], usd_concept["id"], issue_date, due_date)["id"] for _ in range(3)
+    ]
+    ves_id = make_charge(client, student["id"], ves_concept["id"], issue_date, due_date)["id"]
+    assert client.post("/payments/", json={
+        "representative_id": representative["id"],
+        "payment_date": str(today),
+        "amount_paid": 100,
+        "currency_paid": "VES",
+        "allocations_details": [{"applied_charge_id": paid_id, "amount_to_allocate": 100}],
+    }).status_code == 201
+    assert client.put(f"/applied-charges/{cancelled_id}", json={"status": "cancelled"}).status_code == 200
+
+    def current_debts():
+        return [
+            client.get(f"/applied-charges/{charge_id}").json()["current_debt_ves"]
+            for charge_id in [open_id, paid_id, cancelled_id, ves_id]
+        ]
+
+    assert current_debts() == [100.0, 0.0, 0.0, 80.0]
+
+    rate_response = client.post("/exchange-rates/", json={"from_currency": "USD", "rate": 20, "rate_date": str(today)})
+    assert rate_response.status_code == 201
+    assert current_debts() == [200.0, 0.0, 0.0, 80.0]
+
+    assert client.put(f"/exchange-rates/{rate_response.json()['id']}", json={"rate": 30}).status_code == 200
+    assert current_debts() == [300.0, 0.0, 0.0, 80.0]
+
+    response = client.get("/applied-charges/", params={
+        "student_id": student["id"], "min_current_debt_ves": 50, "sort_by": "current_debt_ves", "sort_order": "desc"
+    })
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()["items"]] == [open_id, ves_id]
+    assert response.json()["total"] == 2
+
+    # Sin la tasa de hoy vuelve a regir la de ayer
+    assert client.delete(f"/exchange-rates/{rate_response.json()['id']}").status_code == 200
+    assert current_debts() == [100.0, 0.0, 0.0, 80.0]
+
+
+def test_backfill_current_debt_task_fills_open_charges(client, monkeypatch):
+    """La carga inicial recalcula la deuda hoy de los cargos abiertos que quedaron en 0 al crear la columna."""
+    today = crud.get_current_venezuelan_date_for_crud()
+    _, _, (student,) = make_family(client)
+    concept = make_concept(client, amount=55, frequency="unico", category="cargo_unico")
+    charge_id = make_charge(client, student["id"], concept["id"], str(today), str(today + timedelta(days=10)))["id"]
+
+    db = TestingSessionLocal()
+    try:
+        db.query(models.AppliedCharge).filter(models.AppliedCharge.id == charge_id).update({"current_debt_ves": 0.0})
+        db.commit()
+    finally:
+        db.close()
+    assert client.get(f"/applied-charges/{charge_id}").json()["current_debt_ves"] == 0.0
+
+    monkeypatch.setattr(scheduled_tasks, "SessionLocal", TestingSessionLocal)
+    scheduled_tasks.run_backfill_current_debt()
+    assert client.get(f"/applied-charges/{charge_id}").json()["current_debt_ves"] == 55.0
@@ -0,0 +1,52 @@
+from datetime import date
+
+from .. import crud
+from .conftest import make_family
+
+
+def test_dashboard_cache_reuses_value_until_refresh_invalidation_or_new_day(monkeypatch):
+    """
+    Prueba la caché en memoria del dashboard: reutiliza el valor dentro del TTL, recalcula con refresh=True,
+    tras invalidate_dashboard_cache() o al vencer el TTL, y separa las entradas por fecha de Venezuela.
+    """
+    crud.invalidate_dashboard_cache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return len(calls)
+
+    assert crud.get_dashboard_cached("prueba", compute) == 1
+    assert crud.get_dashboard_cached("prueba", compute) == 1
+    assert crud.get_dashboard_cached("prueba", compute, refresh=True) == 2
+    assert crud.get_dashboard_cached("prueba", compute) == 2
+
+    crud.invalidate_dashboard_cache()
+    assert crud.get_dashboard_cached("prueba", compute) == 3
+
+    # Al cambiar el día en Venezuela (aunque el servidor siga en el día anterior) se usa otra entrada
+    monkeypatch.setattr(crud, "get_current_venezuelan_date_for_crud", lambda: date(2031, 1, 1))
+    assert crud.get_dashboard_cached("prueba", compute) == 4
+    assert crud.get_dashboard_cached("prueba", compute) == 4
+
+    monkeypatch.setattr(crud.settings, "DASHBOARD_CACHE_TTL_SECONDS", 0)
+    assert crud.get_dashboard_cached("prueba", compute) == 5
+    crud.invalidate_dashboard_cache()
+
+
+def test_dashboard_summary_is_cached_and_invalidated_by_exchange_rate(client):
+    crud.invalidate_dashboard_cache()
+    response = client.get("/dashboard/summary")
+    assert response.status_code == 200
+    active_students = response.json()["total_active_students"]
+
+    make_family(client)
+    # Dentro del TTL se sirve el resumen en caché
+    assert client.get("/dashboard/summary").json()["total_active_students"] == active_students
+    assert client.get("/dashboard/summary", params={"refresh": True}).json()["total_active_students"] == active_students + 1
+
+    make_family(client)
+    assert client.get("/dashboard/summary").json()["total_active_students"] == active_students + 1
+    response = client.post("/exchange-rates/", json={"from_currency": "USD", "to_currency": "VES", "rate": 36.5, "rate_date": "2019-03-07"})
+    assert response.status_code == 201, response.text
+    assert client.get("/dashboard/summary").json()["total_active_students"] == active_students + 2
@@ -0,0 +1,92 @@
+from datetime import date, timedelta
+
+import pytest
+
+from .. import crud, models
+from .conftest import TestingSessionLocal, make_family, make_concept, make_charge
+
+
+def _status_by_months_late(oldest_due_date: date, processing_date: date) -> str:
+    """Regla original, cargo por cargo: rojo con dos o más meses calendario completos de retraso."""
+    return "red" if crud._calculate_months_late(oldest_due_date, processing_date) >= 2 else "orange"
+
+
+@pytest.mark.parametrize("oldest_due_date, processing_date, expected", [
+    (date(2023, 12, 29), date(2024, 2, 29), "red"),     # Exactamente dos meses (febrero bisiesto)
+    (date(2023, 12, 31), date(2024, 2, 29), "orange"),  # Día 31 -> 29 de febrero: aún no completa el mes
+    (date(2022, 12, 28), date(2023, 2, 28), "red"),
+    (date(2022, 12, 31), date(2023, 2, 28), "orange"),  # Día 31 -> 28 de febrero
+    (date(2024, 2, 29), date(2024, 4, 29), "red"),
+    (date(2024, 2, 29), date(2024, 4, 28), "orange"),   # Un día antes de completar
+    (date(2024, 1, 31), date(2024, 3, 31), "red"),
+    (date(2024, 1, 31), date(2024, 3, 30), "orange"),
+    (date(2024, 3, 15), date(2024, 5, 15), "red"),
+    (date(2024, 3, 16), date(2024, 5, 15), "orange"),
+    (date(2024, 5, 10), date(2024, 5, 15), "orange"),
+])
+def test_red_cutoff_month_end_boundaries(oldest_due_date, processing_date, expected):
+    assert crud._delinquency_status_from_oldest_due_date(oldest_due_date, processing_date) == expected
+    assert _status_by_months_late(oldest_due_date, processing_date) == expected
+
+
+def test_red_cutoff_matches_months_late_rule_for_every_day():
+    """La fecha límite en SQL (fecha - 2 meses) equivale a la regla de meses completos para cada combinación."""
+    processing_date = date(2023, 1, 1)
+    while processing_date <= date(2025, 12, 31):
+        for days_late in range(1, 100):
+            oldest_due_date = processing_date - timedelta(days=days_late)
+            assert crud._delinquency_status_from_oldest_due_date(oldest_due_date, processing_date) == \
+                _status_by_months_late(oldest_due_date, processing_date), (oldest_due_date, processing_date)
+        processing_date += timedelta(days=1)
+
+
+def test_incremental_refresh_rebuild_and_rate_change_update_delinquency_rows(client):
+    """
+    Prueba que el refresco incremental (al crear y pagar un cargo) y la reconstrucción completa actualicen
+    la fila existente del estudiante, que refrescarla varias veces no choque con la llave primaria y que un
+    cambio de tasa actualice el monto abierto en segundo plano.
+    """
+    today = crud.get_current_venezuelan_date_for_crud()
+    _, representative, (student,) = make_family(client)
+    concept = make_concept(client, amount=10, currency="USD", frequency="unico", category="cargo_unico")
+    due_date = str(today - timedelta(days=75))
+    assert client.post("/exchange-rates/", json={"from_currency": "USD", "rate": 10, "rate_date": due_date}).status_code == 201
+    charge_id = make_charge(client, student["id"], concept["id"], due_date, due_date)["id"]
+
+    def delinquency_row():
+        db = TestingSessionLocal()
+        try:
+            return db.query(models.StudentDelinquency).filter(models.StudentDelinquency.student_id == student["id"]).one()
+        finally:
+            db.close()
+
+    row = delinquency_row()
+    assert (row.status, row.overdue_charges_count) == ("red", 1)
+    charge_debt = client.get(f"/applied-charges/{charge_id}").json()["current_debt_ves"]
+    assert row.open_amount_ves == charge_debt
+
+    db = TestingSessionLocal()
+    try:
+        crud.refresh_student_delinquency(db, student_ids=[student["id"]])
+        crud.refresh_student_delinquency(db, student_ids=[student["id"]])
+        result = crud.rebuild_student_delinquency(db, on_date=today - timedelta(days=30))
+        assert result["students_processed"] >= 1
+    finally:
+        db.close()
+    row = delinquency_row()
+    assert (row.status, row.as_of_date) == ("orange", today - timedelta(days=30))
+
+    rate_response = client.post("/exchange-rates/", json={"from_currency": "USD", "rate": 40, "rate_date": str(today)})
+    assert rate_response.status_code == 201
+    assert delinquency_row().open_amount_ves == 400.0
+    assert client.delete(f"/exchange-rates/{rate_response.json()['id']}").status_code == 200
+
+    assert client.post("/payments/", json={
+        "representative_id": representative["id"],
+        "payment_date": str(today),
+        "amount_paid": 10,
+        "currency_paid": "USD",
+        "allocations_details": [{"applied_charge_id": charge_id, "amount_to_allocate": 10}],
+    }).status_code == 201
+    row = delinquency_row()
+    assert (row.status, row.overdue_charges_count, row.open_amount_ves) == ("green", 0, 0.0)
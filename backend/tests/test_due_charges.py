@@ -0,0 +1,53 @@
+from datetime import date
+
+from .conftest import make_family, make_concept
+
+
+def test_due_charges_engine_generates_each_frequency_once_per_period(client):
+    """
+    Prueba que el motor de cargos adeudados cree el cargo quincenal de la quincena vigente y el cargo único
+    una sola vez, que la simulación no escriba nada y que repetir la corrida en el mismo período no duplique.
+    """
+    grade_level, _, (student,) = make_family(client)
+    concept_ids = [
+        make_concept(client, amount=200, frequency="quincenal", category="servicio_recurrente", grade_level_id=grade_level["id"])["id"],
+        make_concept(client, amount=100, frequency="unico", category="inscripcion", grade_level_id=grade_level["id"])["id"],
+    ]
+
+    def run(on_date, dry_run=False):
+        response = client.post("/billing-processes/generate-due-charges", params={
+            "on_date": on_date, "charge_concept_ids": concept_ids, "dry_run": dry_run
+        })
+        assert response.status_code == 200
+        return response.json()
+
+    preview = run("2025-09-20", dry_run=True)
+    assert preview["charges_created"] == 2
+    assert client.get(f"/applied-charges/student/{student['id']}").json() == []
+
+    summary = run("2025-09-20")
+    assert summary["charges_created"] == 2
+    assert summary["charges_by_frequency"] == {"quincenal": 1, "unico": 1}
+    assert summary["periods"][str(concept_ids[0])] == "2025-09-Q2"
+
+    summary = run("2025-09-28")
+    assert summary["charges_created"] == 0
+    assert summary["duplicates_skipped"] == 2
+
+    summary = run("2025-10-03")
+    assert summary["charges_by_frequency"] == {"quincenal": 1}
+    charges = client.get(f"/applied-charges/student/{student['id']}").json()
+    assert sorted(charge["issue_date"] for charge in charges) == ["2025-09-16", "2025-09-20", "2025-10-01"]
+
+
+def test_charge_periods_for_annual_and_other_frequencies():
+    from types import SimpleNamespace
+    from .. import crud, models
+
+    school_config = SimpleNamespace(
+        current_period_start_date=date(2025, 9, 1), current_period_end_date=date(2026, 7, 31), current_period_name=None
+    )
+    annual = crud._charge_period_for_frequency(models.ChargeFrequency.ANUAL, date(2026, 2, 10), school_config)
+    assert (annual["key"], annual["start"], annual["by_months"]) == ("2025-2026", date(2025, 9, 1), True)
+    assert crud._charge_period_for_frequency(models.ChargeFrequency.ANUAL, date(2026, 8, 10), school_config) is None
+    assert crud._charge_period_for_frequency(models.ChargeFrequency.OTRO, date(2026, 2, 10), school_config) is None
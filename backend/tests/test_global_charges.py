@@ -0,0 +1,26 @@
+from .conftest import make_family, make_concept
+
+
+def test_global_charge_skip_existing_is_idempotent(client):
+    """
+    Prueba que el cargo global con skip_existing no vuelva a cobrar a los estudiantes que ya tienen
+    el concepto en la misma fecha de emisión, y que informe la duración de cada fase.
+    """
+    make_family(client, children=2)
+    concept = make_concept(client, amount=150, frequency="unico", category="cargo_unico")
+
+    payload = {
+        "charge_concept_id": concept["id"],
+        "issue_date": "2025-02-10",
+        "due_date": "2025-02-20",
+        "skip_existing": True,
+    }
+    first_run = client.post("/billing-processes/apply-global-charge", json=payload)
+    assert first_run.status_code == 200
+    assert first_run.json()["charges_successfully_created"] >= 2
+    assert set(first_run.json()["phase_timings_ms"]) == {"load", "plan", "insert", "total"}
+
+    second_run = client.post("/billing-processes/apply-global-charge", json=payload)
+    assert second_run.status_code == 200
+    assert second_run.json()["charges_successfully_created"] == 0
+    assert second_run.json()["duplicates_skipped"] == first_run.json()["charges_successfully_created"]
@@ -0,0 +1,124 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from .. import crud
+from ..database import Base
+from ..main import app
+from ..routers.auth import get_db
+from .conftest import override_get_db_test, make_grade_level, make_family, make_student
+
+
+@pytest.fixture()
+def promotion_client(client):
+    """
+    La promoción mueve a TODOS los estudiantes activos: se ejecuta sobre una BD en memoria propia
+    para no alterar los grados de los demás módulos de prueba.
+    """
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    PromotionSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db_promotion():
+        db = PromotionSessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db_promotion
+    try:
+        yield client
+    finally:
+        app.dependency_overrides[get_db] = override_get_db_test
+        engine.dispose()
+
+
+def _create_school(client):
+    """Tres grados: uno en primero, dos en segundo (uno repite) y uno en el último grado."""
+    first, second, last = make_grade_level(client), make_grade_level(client), make_grade_level(client)
+    _, _, (first_student,) = make_family(client, grade_level=first)
+    _, representative, (second_student, repeating_student) = make_family(client, children=2, grade_level=second)
+    last_student = make_student(client, representative["id"], last["id"])
+    return (first, second, last), (first_student, second_student, repeating_student, last_student)
+
+
+def _student(client, student_id):
+    response = client.get(f"/students/{student_id}")
+    assert response.status_code == 200
+    student = response.json()
+    student["grade_level_id"] = student["grade_level_assigned"]["id"]
+    return student
+
+
+def test_promotion_maps_each_grade_once_and_graduates_last_grade(promotion_client):
+    client = promotion_client
+    (first, second, last), (first_student, second_student, repeating_student, last_student) = _create_school(client)
+
+    response = client.get("/students/promotions/preview", params={
+        "school_year_label": "2024-2025", "repeating_student_ids": [repeating_student["id"]]
+    })
+    assert response.status_code == 200
+    preview = response.json()
+    assert [(s["from_grade_level_id"], s["to_grade_level_id"], s["action"], s["students_count"]) for s in preview["steps"]] == [
+        (first["id"], second["id"], "promote", 1),
+        (second["id"], last["id"], "promote", 1),
+        (last["id"], None, "graduate", 1),
+    ]
+    assert (preview["promoted_count"], preview["graduated_count"], preview["repeating_count"]) == (2, 1, 1)
+    assert preview["already_applied"] is False
+
+    response = client.post("/students/promotions", json={
+        "school_year_label": "2024-2025", "repeating_student_ids": [repeating_student["id"]]
+    })
+    assert response.status_code == 200
+    run = response.json()
+    assert (run["promoted_count"], run["graduated_count"], run["repeating_count"]) == (2, 1, 1)
+    assert run["already_applied"] is False
+
+    # El CASE mueve un solo grado: el alumno de primero queda en segundo, no en el último
+    assert _student(client, first_student["id"])["grade_level_id"] == second["id"]
+    assert _student(client, second_student["id"])["grade_level_id"] == last["id"]
+    repeating = _student(client, repeating_student["id"])
+    assert (repeating["grade_level_id"], repeating["is_active"]) == (second["id"], True)
+    graduated = _student(client, last_student["id"])
+    assert (graduated["grade_level_id"], graduated["is_active"]) == (last["id"], False)
+
+
+def test_promotion_is_idempotent_per_school_year_label(promotion_client, monkeypatch):
+    client = promotion_client
+    (first, second, _), (first_student, *_rest) = _create_school(client)
+
+    response = client.post("/students/promotions", json={"school_year_label": "2024-2025"})
+    assert response.status_code == 200
+    run_id = response.json()["id"]
+
+    # La etiqueta es texto libre: se normalizan los espacios para reconocer el mismo año escolar
+    response = client.post("/students/promotions", json={"school_year_label": "  2024-2025 "})
+    assert response.status_code == 200
+    assert response.json()["already_applied"] is True
+    assert response.json()["id"] == run_id
+    assert _student(client, first_student["id"])["grade_level_id"] == second["id"]
+
+    response = client.get("/students/promotions/preview", params={"school_year_label": "2024-2025 "})
+    assert response.json()["already_applied"] is True
+
+    # Dos corridas simultáneas: la segunda no ve la primera al empezar y choca con la restricción única
+    original_get_run = crud.get_grade_promotion_run_by_label
+    calls = []
+
+    def get_run_missing_on_first_call(db, school_year_label):
+        calls.append(school_year_label)
+        return None if len(calls) == 1 else original_get_run(db, school_year_label)
+
+    monkeypatch.setattr(crud, "get_grade_promotion_run_by_label", get_run_missing_on_first_call)
+    response = client.post("/students/promotions", json={"school_year_label": "2024-2025"})
+    assert response.status_code == 200
+    assert response.json()["already_applied"] is True
+    assert response.json()["id"] == run_id
+    # El rollback deshace los UPDATE de la corrida descartada
+    assert _student(client, first_student["id"])["grade_level_id"] == second["id"]
+
+    response = client.get("/students/promotions")
+    assert [run["id"] for run in response.json()] == [run_id]
@@ -0,0 +1,84 @@
+from .. import crud, models, schemas
+from .conftest import TestingSessionLocal, make_family, make_concept, make_charge
+
+
+def test_late_fees_respect_grace_days_and_apply_once_per_period(client):
+    """
+    Prueba que el recargo por mora respete los días de gracia, quede enlazado a su cargo de origen
+    y se aplique una sola vez por período aunque el proceso se repita.
+    """
+    _, _, (student,) = make_family(client)
+    concepts = {
+        name: make_concept(client, amount=200, frequency="unico", category=category)["id"]
+        for name, category in [("Mensualidad Mora VES", "mensualidad"), ("Recargo por Mora", "otro")]
+    }
+    source_id = make_charge(client, student["id"], concepts["Mensualidad Mora VES"], "2023-05-01", "2023-05-05")["id"]
+
+    rule_response = client.post("/config/late-fee-rules/", json={
+        "name": "Mora mensualidades 10%",
+        "fee_type": "percentage",
+        "amount": 10,
+        "grace_days": 5,
+        "applicable_category": "mensualidad",
+        "penalty_charge_concept_id": concepts["Recargo por Mora"],
+    })
+    assert rule_response.status_code == 201
+
+    def penalties_for_source():
+        db = TestingSessionLocal()
+        try:
+            return db.query(models.AppliedCharge).filter(models.AppliedCharge.source_applied_charge_id == source_id).all()
+        finally:
+            db.close()
+
+    # Dentro de los días de gracia
+    response = client.post("/billing-processes/apply-late-fees", params={"on_date": "2023-05-08"})
+    assert response.status_code == 200
+    assert penalties_for_source() == []
+
+    response = client.post("/billing-processes/apply-late-fees", params={"on_date": "2023-05-20"})
+    assert response.status_code == 200
+    assert response.json()["penalty_period"] == "2023-05"
+    penalties = penalties_for_source()
+    assert len(penalties) == 1
+    assert penalties[0].amount_due_ves_at_emission == 20.0
+    assert penalties[0].charge_concept_id == concepts["Recargo por Mora"]
+
+    # Repetir en el mismo período no duplica; el período siguiente sí genera un nuevo recargo
+    client.post("/billing-processes/apply-late-fees", params={"on_date": "2023-05-25"})
+    assert len(penalties_for_source()) == 1
+    client.post("/billing-processes/apply-late-fees", params={"on_date": "2023-06-02"})
+    assert sorted(penalty.penalty_period for penalty in penalties_for_source()) == ["2023-05", "2023-06"]
+
+
+def test_monthly_engines_never_bill_a_penalty_concept(client):
+    """
+    Prueba que un concepto de recargo guardado con frecuencia mensual no se facture como mensualidad
+    en la generación mensual, su vista previa ni los trabajos en segundo plano.
+    """
+    grade_level, _, _ = make_family(client)
+    penalty_concept_id = make_concept(client, amount=50, category="otro", grade_level_id=grade_level["id"])["id"]
+    rule_response = client.post("/config/late-fee-rules/", json={
+        "name": "Mora productos",
+        "amount": 5,
+        "applicable_category": "producto",
+        "penalty_charge_concept_id": penalty_concept_id,
+    })
+    assert rule_response.status_code == 201
+
+    params = {"target_year": 2025, "target_month": 7, "charge_concept_ids": [penalty_concept_id]}
+    response = client.post("/billing-processes/generate-recurring-charges/preview", json=params)
+    assert response.status_code == 200
+    assert response.json()["charges_to_create"] == 0
+
+    response = client.post("/billing-processes/generate-recurring-charges", json=params)
+    assert response.status_code == 200
+    assert response.json()["charges_created"] == 0
+
+    db = TestingSessionLocal()
+    try:
+        job = crud.create_recurring_charges_job(db, params=schemas.GenerateChargesRequest(**params))
+        job = crud.run_billing_job(db, job_id=job.id)
+        assert (job.status, job.charges_created) == (models.BillingJobStatus.COMPLETED, 0)
+    finally:
+        db.close()
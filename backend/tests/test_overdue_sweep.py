@@ -0,0 +1,32 @@
+from .. import models
+from .conftest import TestingSessionLocal, make_family, make_concept, make_charge
+
+
+def test_sweep_overdue_marks_and_reopens_charges(client):
+    """
+    Prueba que el barrido marque como vencidos los cargos abiertos con vencimiento pasado, que una
+    segunda corrida no cambie nada y que un barrido con fecha anterior al vencimiento los reabra.
+    """
+    _, _, (student,) = make_family(client)
+    concept = make_concept(client, amount=120, frequency="unico", category="inscripcion")
+    charge_id = make_charge(client, student["id"], concept["id"], "2024-03-01", "2024-03-10")["id"]
+
+    def charge_status():
+        db = TestingSessionLocal()
+        try:
+            return db.query(models.AppliedCharge.status).filter(models.AppliedCharge.id == charge_id).scalar()
+        finally:
+            db.close()
+
+    response = client.post("/applied-charges/sweep-overdue", params={"on_date": "2024-04-01"})
+    assert response.status_code == 200
+    assert response.json()["marked_overdue"] >= 1
+    assert charge_status() == models.AppliedChargeStatus.OVERDUE
+
+    response = client.post("/applied-charges/sweep-overdue", params={"on_date": "2024-04-01"})
+    assert response.json()["marked_overdue"] == 0
+    assert response.json()["reopened"] == 0
+
+    response = client.post("/applied-charges/sweep-overdue", params={"on_date": "2024-03-05"})
+    assert response.json()["reopened"] >= 1
+    assert charge_status() == models.AppliedChargeStatus.PENDING
@@ -0,0 +1,45 @@
+from datetime import timedelta
+
+from .. import crud
+from .conftest import make_family, make_concept, make_charge
+
+
+def test_receivables_aging_buckets_and_totals_across_pages(client):
+    """
+    Prueba los límites de cada tramo (0, 1, 30, 31, 60, 61, 90 y 91 días de atraso), que los totales
+    del colegio coincidan con la suma de todas las páginas y que una página fuera de rango los conserve.
+    """
+    today = crud.get_current_venezuelan_date_for_crud()
+    grade_level, _, (student,) = make_family(client)
+    concept = make_concept(client, frequency="unico", category="cargo_unico")
+    for days_late in [0, 1, 30, 31, 60, 61, 90, 91]:
+        due_date = str(today - timedelta(days=days_late))
+        make_charge(client, student["id"], concept["id"], due_date, due_date)
+
+    bucket_keys = ["current", "days_1_30", "days_31_60", "days_61_90", "days_over_90", "total"]
+    pages, page_sums, skip = [], {key: 0.0 for key in bucket_keys}, 0
+    while True:
+        response = client.get("/reports/receivables-aging", params={"group_by": "grade_level", "skip": skip, "limit": 1})
+        assert response.status_code == 200
+        report = response.json()
+        if not report["items"]:
+            break
+        pages.append(report)
+        for key in bucket_keys:
+            page_sums[key] += report["items"][0][key]
+        skip += 1
+
+    assert len(pages) == pages[0]["total"]
+    assert all(page["school_totals"] == pages[0]["school_totals"] for page in pages)
+    assert {key: round(value, 2) for key, value in page_sums.items()} == pages[0]["school_totals"]
+
+    grade_row = next(page["items"][0] for page in pages if page["items"][0]["group_id"] == grade_level["id"])
+    assert grade_row["open_charges_count"] == 8
+    assert {key: grade_row[key] for key in bucket_keys} == {
+        "current": 100.0, "days_1_30": 200.0, "days_31_60": 200.0, "days_61_90": 200.0, "days_over_90": 100.0, "total": 800.0
+    }
+
+    # Página fuera de rango: sin filas, pero con el total de grupos y los totales del colegio
+    assert report["items"] == []
+    assert report["total"] == pages[0]["total"]
+    assert report["school_totals"] == pages[0]["school_totals"]
@@ -0,0 +1,116 @@
+from .conftest import make_grade_level, make_representative, make_student, make_family, make_concept
+
+
+def test_generate_recurring_charges_skips_existing_month(client):
+    """
+    Prueba que la generación mensual cree los cargos de un concepto mensual y que una segunda corrida
+    del mismo mes no duplique ninguno.
+    """
+    grade_level, _, _ = make_family(client)
+    concept = make_concept(client, amount=500, grade_level_id=grade_level["id"])
+
+    params = {"target_year": 2025, "target_month": 3, "charge_concept_ids": [concept["id"]]}
+    response = client.post("/billing-processes/generate-recurring-charges", json=params)
+    assert response.status_code == 200
+    assert response.json()["charges_created"] == 1
+    assert response.json()["errors"] is None
+
+    response = client.post("/billing-processes/generate-recurring-charges", json=params)
+    assert response.status_code == 200
+    assert response.json()["charges_created"] == 0
+    assert any("duplicado" in warning for warning in response.json()["warnings_and_omissions"])
+
+
+def test_preview_recurring_charges_does_not_write(client):
+    """
+    Prueba que la vista previa de la generación mensual calcule montos y totales sin crear cargos,
+    y que también pueda descargarse en CSV.
+    """
+    grade_level, _, _ = make_family(client, children=2)
+    concept_id = make_concept(client, amount=400, grade_level_id=grade_level["id"])["id"]
+
+    params = {"target_year": 2025, "target_month": 5, "charge_concept_ids": [concept_id]}
+    response = client.post("/billing-processes/generate-recurring-charges/preview", json=params)
+    assert response.status_code == 200
+    preview = response.json()
+    assert preview["charges_to_create"] == 2
+    assert preview["total_ves_at_emission"] == 800.0
+    assert preview["totals_by_concept"][0]["charges_count"] == 2
+    assert preview["totals_by_grade_level"][0]["grade_level_name"] == grade_level["name"]
+
+    response = client.post("/billing-processes/generate-recurring-charges/preview?format=csv", json=params)
+    assert response.status_code == 200
+    assert "attachment" in response.headers["content-disposition"]
+    assert len(response.text.strip().splitlines()) == 3
+
+    # Nada se escribió: la corrida real todavía crea los dos cargos
+    response = client.post("/billing-processes/generate-recurring-charges", json=params)
+    assert response.json()["charges_created"] == 2
+
+
+def test_parallel_plan_matches_sequential_plan(client, monkeypatch):
+    """
+    Prueba que el cálculo repartido entre procesos (por rango de ID y por grado) produzca exactamente
+    las mismas filas que el cálculo secuencial.
+    """
+    from datetime import date
+    from .. import crud
+    from .conftest import TestingSessionLocal
+
+    grade_levels = [make_grade_level(client), make_grade_level(client)]
+    representative = make_representative(client)
+    for index in range(6):
+        make_student(client, representative["id"], grade_levels[index % 2]["id"])
+    concept = make_concept(client, amount=250)
+
+    db = TestingSessionLocal()
+    try:
+        snapshot = crud._load_recurring_charge_snapshot(
+            db, 2025, 6, date(2025, 6, 1), date(2025, 6, 5), [concept["id"]]
+        )
+    finally:
+        db.close()
+    monkeypatch.setattr(crud, "RECURRING_CHARGE_MIN_STUDENTS_PER_WORKER", 1)
+
+    def row_keys(plan):
+        return sorted((row["student_id"], row["amount_due_ves_at_emission"]) for row in plan["rows"])
+
+    sequential = crud._plan_recurring_charges(snapshot)
+    for shard_by in ["id_range", "grade_level"]:
+        parallel = crud._plan_recurring_charges_parallel(snapshot, workers=2, shard_by=shard_by)
+        assert row_keys(parallel) == row_keys(sequential)
+        assert parallel["students_processed"] == sequential["students_processed"]
+
+
+def test_recurring_charges_prorate_mid_month_enrollment(client):
+    """
+    Prueba que un estudiante que ingresa a mitad de mes reciba el cargo prorrateado por días y que
+    uno que ingresa el mes siguiente no reciba cargo.
+    """
+    grade_level = make_grade_level(client)
+    student_ids = [
+        make_family(client, grade_level=grade_level, children=[{"enrollment_date": enrollment_date}])[2][0]["id"]
+        for enrollment_date in ["2025-09-16", "2025-10-01"]
+    ]
+    concept = make_concept(client, amount=300, grade_level_id=grade_level["id"])
+
+    response = client.post("/billing-processes/generate-recurring-charges", json={
+        "target_year": 2025, "target_month": 9, "charge_concept_ids": [concept["id"]]
+    })
+    assert response.status_code == 200
+    assert response.json()["charges_created"] == 1
+    assert response.json()["prorated_charges"] == 1
+    charges = client.get(f"/applied-charges/student/{student_ids[0]}").json()
+    assert [charge["amount_due_ves_at_emission"] for charge in charges] == [150.0]
+    assert client.get(f"/applied-charges/student/{student_ids[1]}").json() == []
+
+
+def test_proration_for_annual_concepts_counts_remaining_months():
+    from datetime import date
+    from .. import crud
+
+    period = (date(2025, 9, 1), date(2026, 7, 31))
+    assert crud._proration_for_enrollment(date(2026, 1, 10), *period, by_months=True) == (7 / 11, "prorrateo 7/11 meses")
+    assert crud._proration_for_enrollment(date(2025, 8, 20), *period, by_months=True) == (1.0, None)
+    assert crud._proration_for_enrollment(date(2026, 8, 1), *period, by_months=True) == (0.0, None)
+    assert crud._proration_for_enrollment(None, *period, by_months=True) == (1.0, None)
@@ -0,0 +1,116 @@
+from datetime import datetime, timezone
+
+from .. import crud, models
+from .conftest import TestingSessionLocal, make_family, make_concept, make_charge
+
+
+def _balance_as_of(client, representative_id, as_of_date):
+    response = client.get("/reports/representative-balances-as-of", params={
+        "as_of_date": as_of_date, "representative_id": representative_id
+    })
+    assert response.status_code == 200
+    (item,) = response.json()["items"]
+    return {key: item[key] for key in ["charges_billed_ves", "allocated_to_charges_ves", "balance_due_ves", "unallocated_credit_ves"]}
+
+
+def test_balances_as_of_honour_issue_payment_and_cancellation_dates(client):
+    """
+    Prueba que el saldo a una fecha de corte cuente un cargo según su emisión y anulación (cancelled_at, no
+    updated_at) y sus pagos según la creación de la asignación, y que el cierre mensual guarde lo mismo.
+    """
+    _, representative, (student,) = make_family(client)
+    concept = make_concept(client, frequency="unico", category="cargo_unico")
+    small_concept = make_concept(client, amount=50, frequency="unico", category="cargo_unico")
+    paid_id = make_charge(client, student["id"], concept["id"], "2024-01-10", "2024-01-20")["id"]
+    make_charge(client, student["id"], concept["id"], "2024-02-10", "2024-02-20")
+    cancelled_after_cutoff_id = make_charge(client, student["id"], small_concept["id"], "2024-01-05", "2024-01-15")["id"]
+    cancelled_before_cutoff_id = make_charge(client, student["id"], concept["id"], "2024-01-06", "2024-01-16")["id"]
+    assert client.post("/payments/", json={
+        "representative_id": representative["id"],
+        "payment_date": "2024-01-20",
+        "amount_paid": 80,
+        "currency_paid": "VES",
+        "allocations_details": [{"applied_charge_id": paid_id, "amount_to_allocate": 80}],
+    }).status_code == 201
+    for charge_id in [cancelled_after_cutoff_id, cancelled_before_cutoff_id]:
+        assert client.put(f"/applied-charges/{charge_id}", json={"status": "cancelled"}).status_code == 200
+        assert client.get(f"/applied-charges/{charge_id}").json()["cancelled_at"] is not None
+
+    # Fija las marcas de tiempo en el pasado, como si cada operación hubiese ocurrido en su fecha
+    db = TestingSessionLocal()
+    try:
+        AppliedCharge = models.AppliedCharge
+        db.query(models.PaymentAllocation).filter(models.PaymentAllocation.applied_charge_id == paid_id).update(
+            {"created_at": datetime(2024, 1, 20, 15, tzinfo=timezone.utc)}, synchronize_session=False
+        )
+        for charge_id, cancelled_at in [
+            (cancelled_after_cutoff_id, datetime(2024, 2, 15, 15, tzinfo=timezone.utc)),
+            (cancelled_before_cutoff_id, datetime(2024, 1, 15, 15, tzinfo=timezone.utc)),
+        ]:
+            db.query(AppliedCharge).filter(AppliedCharge.id == charge_id).update({"cancelled_at": cancelled_at}, synchronize_session=False)
+        # Una actualización posterior (mueve updated_at) no debe cambiar la fecha de anulación
+        crud.refresh_applied_charges_current_debt_ves(db, applied_charge_ids=[cancelled_after_cutoff_id, cancelled_before_cutoff_id])
+        db.commit()
+    finally:
+        db.close()
+
+    def balance_as_of(as_of_date):
+        return _balance_as_of(client, representative["id"], as_of_date)
+
+    assert balance_as_of("2024-01-14") == {
+        "charges_billed_ves": 250.0, "allocated_to_charges_ves": 0.0, "balance_due_ves": 250.0, "unallocated_credit_ves": 0.0
+    }
+    assert balance_as_of("2024-01-31") == {
+        "charges_billed_ves": 150.0, "allocated_to_charges_ves": 80.0, "balance_due_ves": 70.0, "unallocated_credit_ves": 0.0
+    }
+    assert balance_as_of("2024-02-29") == {
+        "charges_billed_ves": 200.0, "allocated_to_charges_ves": 80.0, "balance_due_ves": 120.0, "unallocated_credit_ves": 0.0
+    }
+
+    response = client.post("/reports/balance-snapshots/month-end", json={"year": 2024, "month": 1})
+    assert response.status_code == 201
+    response = client.get("/reports/balance-snapshots", params={"snapshot_date": "2024-01-31", "representative_id": representative["id"]})
+    assert response.status_code == 200
+    (snapshot,) = response.json()["items"]
+    assert (snapshot["charges_billed_ves"], snapshot["balance_due_ves"]) == (150.0, 70.0)
+
+
+def test_indexed_balance_as_of_is_revalued_at_the_cutoff_rate(client):
+    """
+    Prueba que un cargo en USD pagado por completo después de subir la tasa no deje saldo negativo:
+    lo pagado se descuenta en moneda original y el resto se valora con la tasa de la fecha de corte.
+    """
+    for rate_date, rate in [("2016-03-01", 10), ("2016-03-15", 20)]:
+        assert client.post("/exchange-rates/", json={"from_currency": "USD", "rate": rate, "rate_date": rate_date}).status_code == 201
+    _, representative, (student,) = make_family(client)
+    concept = make_concept(client, amount=10, currency="USD", frequency="unico", category="cargo_unico")
+    charge = make_charge(client, student["id"], concept["id"], "2016-03-05", "2016-03-10")
+    assert charge["amount_due_ves_at_emission"] == 100.0
+    assert client.post("/payments/", json={
+        "representative_id": representative["id"],
+        "payment_date": "2016-03-20",
+        "amount_paid": 10,
+        "currency_paid": "USD",
+        "allocations_details": [{"applied_charge_id": charge["id"], "amount_to_allocate": 10}],
+    }).status_code == 201
+    db = TestingSessionLocal()
+    try:
+        db.query(models.PaymentAllocation).filter(models.PaymentAllocation.applied_charge_id == charge["id"]).update(
+            {"created_at": datetime(2016, 3, 20, 15, tzinfo=timezone.utc)}, synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+
+    assert _balance_as_of(client, representative["id"], "2016-03-10")["balance_due_ves"] == 100.0
+    # Subió la tasa y aún no se paga: 10 USD a 20
+    assert _balance_as_of(client, representative["id"], "2016-03-16")["balance_due_ves"] == 200.0
+    assert _balance_as_of(client, representative["id"], "2016-03-31") == {
+        "charges_billed_ves": 100.0, "allocated_to_charges_ves": 200.0, "balance_due_ves": 0.0, "unallocated_credit_ves": 0.0
+    }
+
+    response = client.post("/reports/balance-snapshots/month-end", json={"year": 2016, "month": 3})
+    assert response.status_code == 201
+    response = client.get("/reports/balance-snapshots", params={"snapshot_date": "2016-03-31", "representative_id": representative["id"]})
+    (snapshot,) = response.json()["items"]
+    assert snapshot["balance_due_ves"] == 0.0
@@ -0,0 +1,41 @@
+from .conftest import make_grade_level, make_representative, make_student
+
+
+def test_find_and_merge_duplicate_representatives(client):
+    """
+    Prueba que se detecte un representante duplicado con la cédula en otro formato y que la fusión
+    mueva sus estudiantes al registro que se conserva.
+    """
+    grade_level = make_grade_level(client)
+    target_id, source_id = [
+        make_representative(
+            client, identification_type=identification_type, first_name=first_name, last_name=last_name,
+            identification_number="68000001", phone_main="0414-5550001"
+        )["id"]
+        for identification_type, first_name, last_name in [("V", "José", "Pérez"), ("E", "Jose", "Peres")]
+    ]
+    student = make_student(client, source_id, grade_level["id"])
+
+    response = client.get("/representatives/duplicates", params={"min_score": 0.9})
+    assert response.status_code == 200
+    pair = next(
+        item for item in response.json()["items"]
+        if {rep["id"] for rep in item["representatives"]} == {target_id, source_id}
+    )
+    assert set(pair["matched_on"]) == {"cedula", "name", "phone"}
+
+    response = client.post("/representatives/merge", json={
+        "target_representative_id": target_id,
+        "source_representative_ids": [source_id],
+    })
+    assert response.status_code == 200
+    assert response.json()["students_moved"] == 1
+
+    assert client.get(f"/representatives/{source_id}").status_code == 404
+    assert client.get(f"/students/{student['id']}").json()["representative"]["id"] == target_id
+
+    response = client.post("/representatives/merge", json={
+        "target_representative_id": target_id,
+        "source_representative_ids": [target_id],
+    })
+    assert response.status_code == 400
@@ -0,0 +1,50 @@
+from .conftest import make_family
+
+
+def test_unified_search_ranks_exact_prefix_and_contains_matches(client):
+    """
+    Prueba la búsqueda unificada (UNION ALL): puntaje 3 exacto, 2 prefijo, 1 contiene, forma de cada
+    resultado, filtro por tipo y límite por tipo. En SQLite no se suma similarity() de pg_trgm.
+    """
+    _, prefix_representative, (prefix_student,) = make_family(client, children=[{"first_name": "Quetzalito"}], first_name="Quetzalia")
+    _, contains_representative, _ = make_family(client, children=0, last_name="Paquetzal")
+
+    response = client.get("/search/", params={"q": "quetzal"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["query"] == "quetzal"
+    assert data["total"] == 3
+    assert [(item["entity_type"], item["entity_id"], item["score"]) for item in data["items"]] == [
+        ("representative", prefix_representative["id"], 2.0),
+        ("student", prefix_student["id"], 2.0),
+        ("representative", contains_representative["id"], 1.0),
+    ]
+    first = data["items"][0]
+    assert first["label"] == f"Quetzalia {prefix_representative['last_name']}"
+    assert first["subtitle"] == prefix_representative["cedula"]
+
+    # La cédula exacta sube al primer nivel aunque el nombre no coincida
+    response = client.get("/search/", params={"q": contains_representative["cedula"]})
+    assert response.json()["items"][0]["entity_id"] == contains_representative["id"]
+    assert response.json()["items"][0]["score"] == 3.0
+
+    response = client.get("/search/", params={"q": "quetzal", "types": ["student"]})
+    assert [item["entity_id"] for item in response.json()["items"]] == [prefix_student["id"]]
+
+    response = client.get("/search/", params={"q": "quetzal", "types": ["representative"], "limit_per_type": 1})
+    assert [item["entity_id"] for item in response.json()["items"]] == [prefix_representative["id"]]
+
+    response = client.get("/search/", params={"q": "quetzal", "types": ["cliente"]})
+    assert response.status_code == 400
+
+
+def test_unified_search_treats_like_wildcards_literally(client):
+    _, underscore_representative, _ = make_family(client, children=0, last_name="Zorzal_Buscado")
+    make_family(client, children=0, last_name="ZorzalXBuscado")
+
+    response = client.get("/search/", params={"q": "zorzal_b", "types": ["representative"]})
+    assert response.status_code == 200
+    assert [item["entity_id"] for item in response.json()["items"]] == [underscore_representative["id"]]
+
+    response = client.get("/search/", params={"q": "zorzal%buscado", "types": ["representative"]})
+    assert response.json()["items"] == []
@@ -0,0 +1,39 @@
+from .. import models
+from .conftest import TestingSessionLocal, make_family, make_concept
+
+
+def test_global_charge_applies_sibling_discount(client):
+    """
+    Prueba que el cargo global aplique el descuento por hermanos según la posición del estudiante
+    dentro de su familia (el mayor paga completo) y que se refleje en el monto en moneda original.
+    """
+    _, _, students = make_family(client, children=[
+        {"birth_date": "2018-03-01"}, {"birth_date": "2014-05-10"}, {"birth_date": "2016-07-20"}
+    ])
+    student_ids = [student["id"] for student in students]
+    youngest_id, oldest_id, middle_id = student_ids
+
+    assert client.post("/config/sibling-discounts/", json={"sibling_position": 2, "discount_percentage": 10}).status_code == 201
+    assert client.post("/config/sibling-discounts/", json={"sibling_position": 3, "discount_percentage": 20}).status_code == 201
+    assert client.post("/config/sibling-discounts/", json={"sibling_position": 2, "discount_percentage": 15}).status_code == 400
+
+    concept = make_concept(client, frequency="unico", category="cargo_unico")
+
+    response = client.post("/billing-processes/apply-global-charge", json={
+        "charge_concept_id": concept["id"],
+        "issue_date": "2025-01-10",
+        "due_date": "2025-01-20",
+    })
+    assert response.status_code == 200
+    assert response.json()["sibling_discounts_applied"] >= 2
+
+    db = TestingSessionLocal()
+    try:
+        charges = db.query(models.AppliedCharge).filter(
+            models.AppliedCharge.charge_concept_id == concept["id"],
+            models.AppliedCharge.student_id.in_(student_ids)
+        ).all()
+        amounts = {charge.student_id: charge.amount_due_original_currency for charge in charges}
+    finally:
+        db.close()
+    assert amounts == {oldest_id: 100.0, middle_id: 90.0, youngest_id: 80.0}
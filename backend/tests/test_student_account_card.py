@@ -0,0 +1,23 @@
+from .conftest import make_family
+
+
+def test_student_account_card_etag(client):
+    """
+    Prueba que la ficha de cuenta devuelva un ETag y responda 304 cuando la versión no cambió.
+    """
+    _, _, (student,) = make_family(client)
+    student_id = student["id"]
+
+    response = client.get(f"/students/{student_id}/account-card")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["charges"] == []
+    assert data["open_balance_ves_today"] == 0
+    assert data["delinquency"]["status"] == "green"
+    etag = response.headers["etag"]
+    assert etag == f'"{data["version"]}"'
+
+    response = client.get(f"/students/{student_id}/account-card", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    assert client.get("/students/999999/account-card").status_code == 404
@@ -0,0 +1,46 @@
+from .conftest import make_family
+
+
+def test_student_typeahead_matches_prefixes_only_and_respects_limit(client):
+    """
+    Prueba el autocompletado: coincide por inicio de "nombre apellido" o "apellido nombre" (sin comodín
+    inicial), ordena por apellido y nunca devuelve más filas que el límite pedido.
+    """
+    _, _, students = make_family(client, children=[
+        {"first_name": "Xilofono", "last_name": "Beta"},
+        {"first_name": "Xilofonia", "last_name": "Alfa"},
+        {"first_name": "Ana", "last_name": "Xilofonero"},
+        {"first_name": "Ana", "last_name": "Noxilofono"},
+    ])
+    first_beta, first_alfa, last_name_match, _ = students
+
+    response = client.get("/students/typeahead", params={"q": "  XILOFON "})
+    assert response.status_code == 200
+    assert response.json() == [
+        {"id": first_alfa["id"], "display_name": "Xilofonia Alfa", "cedula": None},
+        {"id": first_beta["id"], "display_name": "Xilofono Beta", "cedula": None},
+        {"id": last_name_match["id"], "display_name": "Ana Xilofonero", "cedula": None},
+    ]
+
+    response = client.get("/students/typeahead", params={"q": "xilofonia alf"})
+    assert [item["id"] for item in response.json()] == [first_alfa["id"]]
+
+    response = client.get("/students/typeahead", params={"q": "xilofon", "limit": 2})
+    assert [item["id"] for item in response.json()] == [first_alfa["id"], first_beta["id"]]
+
+    response = client.get("/students/typeahead", params={"q": "xilofon", "limit": 21})
+    assert response.status_code == 422
+
+
+def test_representative_typeahead_matches_numeric_cedula_without_type_prefix(client):
+    _, representative, _ = make_family(client, children=0)
+    number = representative["cedula"][1:]
+
+    response = client.get("/representatives/typeahead", params={"q": number})
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()] == [representative["id"]]
+    assert response.json()[0]["cedula"] == representative["cedula"]
+
+    # La cédula tampoco se busca por "contiene"
+    response = client.get("/representatives/typeahead", params={"q": number[2:]})
+    assert representative["id"] not in [item["id"] for item in response.json()]
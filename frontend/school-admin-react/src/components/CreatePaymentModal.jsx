@@ -3,7 +3,7 @@
 import React, { useState, useEffect, useCallback } from 'react';
 import Modal from './Modal';
 import { useNavigate } from 'react-router-dom';
-import { getRepresentatives, getRepresentativeById } from '../services/apiRepresentatives';
+import { typeaheadRepresentatives, getRepresentativeById } from '../services/apiRepresentatives';
 import { getAppliedCharges } from '../services/apiAppliedCharges';
 import { createPayment } from '../services/apiPayments';
 import { getLatestExchangeRate } from '../services/apiExchangeRates';
@@ -108,7 +108,8 @@ function CreatePaymentModal({ isOpen, onClose, token, initialRepresentativeId =
             toast.warn("Se proporcionó un representante inválido.");
             return;
         }
-        const repDisplayName = `${rep.first_name || ''} ${rep.last_name || ''} (${rep.cedula || `ID: ${rep.id}`})`;
+        const repFullName = rep.display_name || `${rep.first_name || ''} ${rep.last_name || ''}`;
+        const repDisplayName = `${repFullName} (${rep.cedula || `ID: ${rep.id}`})`;
         
         setSelectedRepForPayment({ id: rep.id, name: repDisplayName });
         setPaymentFormData(prev => ({ ...prev, representative_id: rep.id.toString() }));
@@ -186,8 +187,8 @@ function CreatePaymentModal({ isOpen, onClose, token, initialRepresentativeId =
         const timer = setTimeout(async () => {
             setIsLoadingRepSearchModal(true);
             try {
-                const data = await getRepresentatives(token, { search: repSearchTermModal, limit: 5 });
-                setRepSearchResultsModal(data.items || []);
+                const data = await typeaheadRepresentatives(token, repSearchTermModal.trim(), 5);
+                setRepSearchResultsModal(data || []);
             } catch (error) { toast.error("Error al buscar representantes."); }
             finally { setIsLoadingRepSearchModal(false); }
         }, 500);
@@ -303,7 +304,7 @@ function CreatePaymentModal({ isOpen, onClose, token, initialRepresentativeId =
                                 <ul className="border border-gray-300 rounded-md mt-2 max-h-36 overflow-y-auto shadow-sm">
                                     {repSearchResultsModal.map(rep => (
                                         <li key={rep.id} onClick={() => handleSelectRepresentativeForPayment(rep)} className="p-2.5 hover:bg-indigo-100 cursor-pointer text-sm border-b last:border-b-0">
-                                            {rep.first_name} {rep.last_name} ({rep.cedula})
+                                            {rep.display_name} ({rep.cedula})
                                         </li>
                                     ))}
                                 </ul>
@@ -2,7 +2,7 @@ import React, { useState, useEffect, useCallback } from 'react';
 import { useAuth } from '../contexts/AuthContext';
 import { getAppliedCharges, createAppliedCharge } from '../services/apiAppliedCharges';
 import { getStudents } from '../services/apiStudents';
-import { getRepresentatives } from '../services/apiRepresentatives';
+import { typeaheadRepresentatives } from '../services/apiRepresentatives';
 import { getChargeConcepts } from '../services/apiChargeConcepts';
 import { getLatestExchangeRate } from '../services/apiExchangeRates';
 import Modal from '../components/Modal';
@@ -178,10 +178,10 @@ function AppliedChargesPage() {
         setSelectedRepresentativeDisplay(term);
         setFilters(prev => ({ ...prev, representativeId: '' }));
 
-        if (term.length > 1) {
+        if (term.trim().length > 1) {
             setIsLoadingRepSearch(true);
-            getRepresentatives(token, { search: term, limit: 7 })
-                .then(data => setRepresentativeSearchResults(data.items || []))
+            typeaheadRepresentatives(token, term.trim(), 7)
+                .then(data => setRepresentativeSearchResults(data || []))
                 .catch(err => { console.error("Error buscando representantes:", err); setRepresentativeSearchResults([]); })
                 .finally(() => setIsLoadingRepSearch(false));
         } else {
@@ -191,7 +191,7 @@ function AppliedChargesPage() {
     const handleSelectRepresentative = (representative) => {
         setFilters(prev => ({ ...prev, representativeId: representative.id.toString() }));
         setRepresentativeSearchTerm('');
-        setSelectedRepresentativeDisplay(`${representative.first_name} ${representative.last_name} (CI: ${representative.identification_number || representative.cedula || 'N/A'})`);
+        setSelectedRepresentativeDisplay(`${representative.display_name} (CI: ${representative.cedula || 'N/A'})`);
         setRepresentativeSearchResults([]);
     };
     const clearRepresentativeFilter = () => {
@@ -354,7 +354,7 @@ function AppliedChargesPage() {
                     <input type="text" id="representativeSearch" placeholder="Buscar..." value={selectedRepresentativeDisplay || representativeSearchTerm} onChange={handleRepresentativeSearchChange} className="mt-1 block w-full input-style"/>
                     {filters.representativeId && (<button onClick={clearRepresentativeFilter} className="absolute right-1 top-7 text-red-500 hover:text-red-700 p-1 text-xs" title="Limpiar">&times;</button>)}
                     {isLoadingRepSearch && <p className="text-xs text-gray-500">Buscando...</p>}
-                    {representativeSearchResults.length > 0 && (<ul className="absolute z-20 w-full bg-white border border-gray-300 rounded-md mt-1 max-h-48 overflow-y-auto shadow-lg">{representativeSearchResults.map(r => (<li key={r.id} onClick={() => handleSelectRepresentative(r)} className="px-3 py-2 hover:bg-indigo-100 cursor-pointer text-sm">{r.first_name} {r.last_name} (CI: {r.identification_number || r.cedula || 'N/A'})</li>))}</ul>)}
+                    {representativeSearchResults.length > 0 && (<ul className="absolute z-20 w-full bg-white border border-gray-300 rounded-md mt-1 max-h-48 overflow-y-auto shadow-lg">{representativeSearchResults.map(r => (<li key={r.id} onClick={() => handleSelectRepresentative(r)} className="px-3 py-2 hover:bg-indigo-100 cursor-pointer text-sm">{r.display_name} (CI: {r.cedula || 'N/A'})</li>))}</ul>)}
                 </div>
                 
                  <div>
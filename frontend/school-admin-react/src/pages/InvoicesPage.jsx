@@ -3,7 +3,7 @@
 import React, { useState, useEffect, useCallback } from 'react';
 import { useAuth } from '../contexts/AuthContext';
 import { getInvoices, annulInvoice } from '../services/apiInvoices';
-import { getRepresentatives } from '../services/apiRepresentatives';
+import { typeaheadRepresentatives } from '../services/apiRepresentatives';
 import { Link } from 'react-router-dom';
 import { toast } from 'react-toastify';
 import Modal from '../components/Modal';
@@ -97,12 +97,12 @@ function InvoicesPage() {
     
     // Búsqueda de representante
     useEffect(() => {
-        if (repSearchTerm.length < 2) { setRepSearchResults([]); return; }
+        if (repSearchTerm.trim().length < 2) { setRepSearchResults([]); return; }
         const timerId = setTimeout(async () => {
             setIsLoadingRepSearch(true);
             try {
-                const data = await getRepresentatives(token, { search: repSearchTerm, limit: 5 });
-                setRepSearchResults(data.items || []);
+                const data = await typeaheadRepresentatives(token, repSearchTerm.trim(), 5);
+                setRepSearchResults(data || []);
             } catch (err) { console.error("Error buscando representantes:", err); }
             finally { setIsLoadingRepSearch(false); }
         }, 500);
@@ -111,7 +111,7 @@ function InvoicesPage() {
 
     const handleSelectRep = (rep) => {
         setFilters(prev => ({...prev, representativeId: rep.id.toString()}));
-        setSelectedRepDisplay(`${rep.first_name} ${rep.last_name} (${rep.cedula})`);
+        setSelectedRepDisplay(`${rep.display_name} (${rep.cedula})`);
         setRepSearchTerm('');
         setRepSearchResults([]);
     };
@@ -167,7 +167,7 @@ function InvoicesPage() {
                     <input type="text" id="repSearch" placeholder="Buscar..." value={selectedRepDisplay || repSearchTerm} onChange={e => { setSelectedRepDisplay(''); setFilters(prev => ({...prev, representativeId: ''})); setRepSearchTerm(e.target.value); }} className="mt-1 w-full input-style"/>
                     {selectedRepDisplay && <button onClick={clearRepFilter} className="absolute right-1 top-7 text-red-500 hover:text-red-700 p-1 text-xs" title="Limpiar">&times;</button>}
                     {isLoadingRepSearch && <p className="text-xs text-gray-500">Buscando...</p>}
-                    {repSearchResults.length > 0 && (<ul className="absolute z-20 w-full bg-white border mt-1 rounded shadow-lg">{repSearchResults.map(r => (<li key={r.id} onClick={()=>handleSelectRep(r)} className="p-2 hover:bg-indigo-100 cursor-pointer">{r.first_name} {r.last_name}</li>))}</ul>)}
+                    {repSearchResults.length > 0 && (<ul className="absolute z-20 w-full bg-white border mt-1 rounded shadow-lg">{repSearchResults.map(r => (<li key={r.id} onClick={()=>handleSelectRep(r)} className="p-2 hover:bg-indigo-100 cursor-pointer">{r.display_name} ({r.cedula})</li>))}</ul>)}
                 </div>
                 <div><label htmlFor="startDate" className="block text-sm font-medium">Fecha Desde</label><input type="date" name="startDate" id="startDate" value={filters.startDate} onChange={handleFilterChange} className="mt-1 w-full input-style"/></div>
                 <div><label htmlFor="endDate" className="block text-sm font-medium">Fecha Hasta</label><input type="date" name="endDate" id="endDate" value={filters.endDate} onChange={handleFilterChange} className="mt-1 w-full input-style"/></div>
@@ -141,6 +141,32 @@ export async function getAppliedChargeById(token, appliedChargeId) {
     }
 }
 
+/**
+ * Obtiene varios cargos aplicados en una sola llamada.
+ * @param {string} token - El token de autenticación.
+ * @param {Array<number>} ids - IDs de los cargos aplicados.
+ * @returns {Promise<object>} - { items: AppliedChargeResponse[], missing_ids: number[] }
+ */
+export async function getAppliedChargesByIds(token, ids = []) {
+    const queryParams = new URLSearchParams();
+    ids.forEach(id => queryParams.append('ids', id));
+    try {
+        const response = await fetch(`${API_BASE_URL}/applied-charges/batch?${queryParams.toString()}`, {
+            method: 'GET',
+            headers: { 'Authorization': `Bearer ${token}` },
+        });
+        const responseData = await response.json().catch(() => null);
+        if (!response.ok) {
+            const detail = typeof responseData?.detail === 'string' ? responseData.detail : `Error ${response.status} al obtener los cargos.`;
+            throw new Error(detail);
+        }
+        return responseData;
+    } catch (error) {
+        console.error('Error fetching applied charges by IDs:', error);
+        throw error;
+    }
+}
+
 // ... tus otras funciones como createAppliedCharge, updateAppliedCharge, getAppliedChargeById ...
 // Asegúrate que createAppliedCharge y otras no tengan el problema de `toast is not defined`.
 // Por ejemplo, para createAppliedCharge:
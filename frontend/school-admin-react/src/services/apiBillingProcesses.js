@@ -70,4 +70,70 @@ export async function generateRecurringChargesService(token, payload) {
         console.error("Error en generateRecurringChargesService:", error);
         throw error;
     }
-}
\ No newline at end of file
+}
+
+// Envía la generación mensual como trabajo en segundo plano; responde de inmediato con el trabajo (202)
+export async function submitRecurringChargesJob(token, payload) {
+    try {
+        const response = await fetch(`${API_BASE_URL}/billing-processes/generate-recurring-charges/jobs`, {
+            method: 'POST',
+            headers: {
+                'Authorization': `Bearer ${token}`,
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify(payload),
+        });
+        return handleApiResponse(response);
+    } catch (error) {
+        console.error("Error en submitRecurringChargesJob:", error);
+        throw error;
+    }
+}
+
+// Estado y progreso de un trabajo de facturación (para consultar periódicamente)
+export async function getBillingJob(token, jobId) {
+    try {
+        const response = await fetch(`${API_BASE_URL}/billing-processes/jobs/${jobId}`, {
+            headers: { 'Authorization': `Bearer ${token}` },
+        });
+        return handleApiResponse(response);
+    } catch (error) {
+        console.error("Error en getBillingJob:", error);
+        throw error;
+    }
+}
+
+export async function resumeBillingJob(token, jobId) {
+    try {
+        const response = await fetch(`${API_BASE_URL}/billing-processes/jobs/${jobId}/resume`, {
+            method: 'POST',
+            headers: { 'Authorization': `Bearer ${token}` },
+        });
+        return handleApiResponse(response);
+    } catch (error) {
+        console.error("Error en resumeBillingJob:", error);
+        throw error;
+    }
+}
+
+// Vista previa (sin escribir nada) de la generación mensual o del cargo global.
+// kind: 'generate-recurring-charges' | 'apply-global-charge'. Con format 'csv' devuelve un Blob descargable.
+export async function previewBillingProcess(token, kind, payload, format = 'json') {
+    try {
+        const response = await fetch(`${API_BASE_URL}/billing-processes/${kind}/preview?format=${format}`, {
+            method: 'POST',
+            headers: {
+                'Authorization': `Bearer ${token}`,
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify(payload),
+        });
+        if (format === 'csv' && response.ok) {
+            return response.blob();
+        }
+        return handleApiResponse(response);
+    } catch (error) {
+        console.error("Error en previewBillingProcess:", error);
+        throw error;
+    }
+}
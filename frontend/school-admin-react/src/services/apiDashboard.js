@@ -29,6 +29,20 @@ export async function getDashboardSummary(token) {
     }
 }
 
+// Cuentas por cobrar y cobranza por grado (el backend la mantiene en caché unos segundos)
+export async function getGradeLevelBreakdown(token, refresh = false) {
+    try {
+        const queryParams = new URLSearchParams({ refresh: refresh.toString() });
+        const response = await fetch(`${API_BASE_URL}/dashboard/grade-level-breakdown?${queryParams.toString()}`, {
+            headers: { 'Authorization': `Bearer ${token}` },
+        });
+        return await handleApiResponse(response);
+    } catch (error) {
+        console.error('Error fetching grade level breakdown:', error);
+        throw error;
+    }
+}
+
 // Nueva función para la tendencia de gastos
 export async function getExpenseTrend(token, granularity = "month", count = 12) {
     try {
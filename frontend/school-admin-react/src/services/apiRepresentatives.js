@@ -97,6 +97,33 @@ export async function getRepresentativeById(token, representativeId) {
     }
 }
 
+export async function typeaheadRepresentatives(token, search, limit = 10) {
+    const queryParams = new URLSearchParams({ q: search, limit });
+    try {
+        const response = await fetch(`${API_BASE_URL}/representatives/typeahead?${queryParams.toString()}`, {
+            headers: { 'Authorization': `Bearer ${token}` },
+        });
+        return await handleApiResponse(response); // [{ id, display_name, cedula }]
+    } catch (error) {
+        console.error('Error en typeaheadRepresentatives:', error.response?.data || error.message);
+        throw error;
+    }
+}
+
+export async function getRepresentativesByIds(token, ids = []) {
+    const queryParams = new URLSearchParams();
+    ids.forEach(id => queryParams.append('ids', id));
+    try {
+        const response = await fetch(`${API_BASE_URL}/representatives/batch?${queryParams.toString()}`, {
+            headers: { 'Authorization': `Bearer ${token}` },
+        });
+        return await handleApiResponse(response); // { items, missing_ids }
+    } catch (error) {
+        console.error('Error en getRepresentativesByIds:', error.response?.data || error.message);
+        throw error;
+    }
+}
+
 export async function updateRepresentative(token, representativeId, representativeData) {
     try {
         const response = await fetch(`${API_BASE_URL}/representatives/${representativeId}`, {
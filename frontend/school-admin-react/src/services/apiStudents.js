@@ -75,6 +75,49 @@ export async function getStudentById(token, studentId) {
   }
 }
 
+// Función para obtener varios estudiantes en una sola llamada. Devuelve { items, missing_ids }
+export async function getStudentsByIds(token, ids = []) {
+  const queryParams = new URLSearchParams();
+  ids.forEach(id => queryParams.append('ids', id));
+  try {
+    const response = await fetch(`${API_BASE_URL}/students/batch?${queryParams.toString()}`, {
+      method: 'GET',
+      headers: {
+        'Authorization': `Bearer ${token}`,
+      },
+    });
+    if (!response.ok) {
+      const errorData = await response.json().catch(() => ({ detail: `Error ${response.status}: ${response.statusText}` }));
+      throw new Error(errorData.detail || `Error ${response.status}`);
+    }
+    return await response.json();
+  } catch (error) {
+    console.error('Error fetching students by IDs:', error);
+    throw error;
+  }
+}
+
+// Ficha de cuenta del estudiante. El servidor envía un ETag; el caché HTTP del navegador
+// revalida con If-None-Match y reutiliza la respuesta si la ficha no cambió (304).
+export async function getStudentAccountCard(token, studentId) {
+  try {
+    const response = await fetch(`${API_BASE_URL}/students/${studentId}/account-card`, {
+      method: 'GET',
+      headers: {
+        'Authorization': `Bearer ${token}`,
+      },
+    });
+    if (!response.ok) {
+      const errorData = await response.json().catch(() => ({ detail: `Error ${response.status}: ${response.statusText}` }));
+      throw new Error(errorData.detail || `Error ${response.status}`);
+    }
+    return await response.json();
+  } catch (error) {
+    console.error('Error fetching student account card:', error);
+    throw error;
+  }
+}
+
 // Función para actualizar un estudiante
 export async function updateStudent(token, studentId, studentData) {
   // studentData debe coincidir con schemas.StudentUpdate